@@ -1122,8 +1122,8 @@ class ImprovedBloomPredictor:
         print(f"✓ Model saved to {path}")
     
     def load_model(self, path='bloom_model_v2.pkl'):
-        """Load trained model"""
-        model_data = joblib.load(path)
+        """Load trained model (numpy arrays memory-mapped read-only when stored uncompressed)"""
+        model_data = joblib.load(path, mmap_mode='r')
         self.model = model_data['model']
         self.scaler = model_data['scaler']
         # Remove feature names to avoid warnings when transforming arrays
@@ -0,0 +1,295 @@
+"""
+Precomputed sakura bloom-date raster for Japan.
+
+The Japan-specific and global models are evaluated once per forecast year on
+a regular latitude/longitude grid over Japan (build_sakura_raster.py). Point
+queries are then answered by bilinear interpolation of the stored grid, and
+bloom-front isolines (day-of-year contours) are traced from it as GeoJSON.
+
+Stored layers per model and year:
+- day: predicted bloom day of year (float32)
+- confidence: prediction confidence (float16)
+- window_days: bloom window half-width in days (int8)
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+try:
+    import contourpy
+    CONTOURPY_AVAILABLE = True
+except ImportError:
+    CONTOURPY_AVAILABLE = False
+
+
+# Same bounds as the Japan check in sakura_predictor (lat_min, lat_max, lon_min, lon_max)
+JAPAN_BOUNDS = (24.0, 46.0, 122.0, 154.0)
+DEFAULT_RESOLUTION = 0.05
+
+RASTER_FILENAME = 'sakura_japan_raster.npz'
+FRONTS_FILENAME = 'sakura_bloom_fronts_{year}.geojson'
+
+# Day-of-year spacing of bloom-front isolines
+ISOLINE_INTERVAL_DAYS = 5
+
+LAYER_DTYPES = {'day': np.float32, 'confidence': np.float16, 'window_days': np.int8}
+
+
+class BloomRaster:
+    """Bloom-date grids per model ('japan', 'global') and year"""
+
+    def __init__(self, lats, lons, years, layers, metadata=None):
+        """
+        Args:
+            lats: Ascending grid latitudes (n_lat,)
+            lons: Ascending grid longitudes (n_lon,)
+            years: Forecast years (n_years,)
+            layers: {model: {layer name: array (n_years, n_lat, n_lon)}}
+            metadata: Build information (species, resolution, build time)
+        """
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.years = [int(y) for y in years]
+        self.layers = layers
+        self.metadata = metadata or {}
+        self._year_index = {year: i for i, year in enumerate(self.years)}
+
+    @property
+    def models(self):
+        return list(self.layers)
+
+    def covers(self, latitude, longitude, year, model='japan'):
+        """Whether a point query can be answered from the raster"""
+        return (
+            model in self.layers and int(year) in self._year_index and
+            self.lats[0] <= latitude <= self.lats[-1] and
+            self.lons[0] <= longitude <= self.lons[-1]
+        )
+
+    def interpolate(self, model, year, latitudes, longitudes, layer='day'):
+        """
+        Bilinear interpolation of one layer at many points.
+
+        Args:
+            model: 'japan' or 'global'
+            year: Forecast year (must be in the raster)
+            latitudes: Query latitudes
+            longitudes: Query longitudes
+            layer: 'day', 'confidence' or 'window_days'
+
+        Returns:
+            Interpolated values (float); NaN outside the grid
+        """
+        grid = self.layers[model][layer][self._year_index[int(year)]]
+        return self._bilinear(grid, *self._cells(latitudes, longitudes))
+
+    def _cells(self, latitudes, longitudes):
+        """Lower-left grid cell, fractional offsets and outside mask per point"""
+        latitudes = np.atleast_1d(np.asarray(latitudes, dtype=float))
+        longitudes = np.atleast_1d(np.asarray(longitudes, dtype=float))
+
+        # Fractional cell positions (regular grid)
+        fi = (latitudes - self.lats[0]) / (self.lats[1] - self.lats[0])
+        fj = (longitudes - self.lons[0]) / (self.lons[1] - self.lons[0])
+        i0 = np.clip(np.floor(fi).astype(np.int64), 0, len(self.lats) - 2)
+        j0 = np.clip(np.floor(fj).astype(np.int64), 0, len(self.lons) - 2)
+        t = np.clip(fi - i0, 0, 1)
+        u = np.clip(fj - j0, 0, 1)
+
+        outside = ((latitudes < self.lats[0]) | (latitudes > self.lats[-1]) |
+                   (longitudes < self.lons[0]) | (longitudes > self.lons[-1]))
+        return i0, j0, t, u, outside
+
+    @staticmethod
+    def _bilinear(grid, i0, j0, t, u, outside):
+        v00 = grid[i0, j0].astype(float)
+        v01 = grid[i0, j0 + 1].astype(float)
+        v10 = grid[i0 + 1, j0].astype(float)
+        v11 = grid[i0 + 1, j0 + 1].astype(float)
+        values = (1 - t) * ((1 - u) * v00 + u * v01) + t * ((1 - u) * v10 + u * v11)
+        values[outside] = np.nan
+        return values
+
+    def lookup(self, model, year, latitude, longitude):
+        """
+        Bloom day, confidence and window half-width at one point
+
+        Returns:
+            Dictionary with bloom_day_of_year (int), confidence and
+            window_days, or None when the point/year/model is not covered
+        """
+        if not self.covers(latitude, longitude, year, model):
+            return None
+
+        # Same interpolation weights for every layer
+        cells = self._cells(latitude, longitude)
+        y = self._year_index[int(year)]
+        layers = self.layers[model]
+        return {
+            'bloom_day_of_year': int(np.rint(self._bilinear(layers['day'][y], *cells)[0])),
+            'confidence': round(float(self._bilinear(layers['confidence'][y], *cells)[0]), 3),
+            'window_days': int(np.rint(self._bilinear(layers['window_days'][y], *cells)[0]))
+        }
+
+    def isolines(self, model, year, interval=ISOLINE_INTERVAL_DAYS):
+        """
+        Bloom-front isolines (day-of-year contours) for one model and year.
+
+        Returns:
+            List of (day_of_year, [lines]) where each line is an (n, 2)
+            array of [lon, lat] vertices
+        """
+        if not CONTOURPY_AVAILABLE:
+            raise ImportError("contourpy is required for bloom-front isolines (pip install contourpy)")
+
+        grid = self.layers[model]['day'][self._year_index[int(year)]].astype(float)
+        low = np.ceil(np.nanmin(grid) / interval) * interval
+        high = np.floor(np.nanmax(grid) / interval) * interval
+
+        generator = contourpy.contour_generator(self.lons, self.lats, grid, line_type='Separate')
+        fronts = []
+        for level in np.arange(low, high + interval / 2, interval):
+            lines = [line for line in generator.lines(level) if len(line) >= 2]
+            if lines:
+                fronts.append((int(level), lines))
+        return fronts
+
+    def save(self, path):
+        """Write the raster as a compressed .npz archive"""
+        arrays = {
+            'lats': self.lats,
+            'lons': self.lons,
+            'years': np.asarray(self.years, dtype=np.int32),
+            'metadata': np.array(json.dumps(self.metadata)),
+        }
+        for model, layers in self.layers.items():
+            for name, values in layers.items():
+                arrays[f'{model}__{name}'] = values.astype(LAYER_DTYPES.get(name, values.dtype))
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Read a raster written by save()"""
+        with np.load(path, allow_pickle=False) as archive:
+            layers = {}
+            for key in archive.files:
+                if '__' in key:
+                    model, name = key.split('__', 1)
+                    layers.setdefault(model, {})[name] = archive[key]
+            return cls(
+                lats=archive['lats'],
+                lons=archive['lons'],
+                years=archive['years'],
+                layers=layers,
+                metadata=json.loads(str(archive['metadata']))
+            )
+
+
+def build_bloom_raster(predictor, years, resolution=DEFAULT_RESOLUTION, bounds=JAPAN_BOUNDS,
+                       species="Prunus × yedoensis", chunk_size=100_000):
+    """
+    Evaluate the loaded sakura models on a grid over Japan for each year.
+
+    Uses the predictor's environmental feature provider and default values
+    (the same inputs as /api/sakura/predict/japan and /compare/models).
+
+    Args:
+        predictor: SakuraBloomPredictor with models loaded
+        years: Forecast years
+        resolution: Grid spacing in degrees
+        bounds: (lat_min, lat_max, lon_min, lon_max)
+        species: Species passed to the predictor
+        chunk_size: Grid cells predicted per batch
+
+    Returns:
+        BloomRaster
+    """
+    lat_min, lat_max, lon_min, lon_max = bounds
+    lats = np.round(np.arange(lat_min, lat_max + resolution / 2, resolution), 6)
+    lons = np.round(np.arange(lon_min, lon_max + resolution / 2, resolution), 6)
+    grid_lat, grid_lon = [a.ravel() for a in np.meshgrid(lats, lons, indexing='ij')]
+    shape = (len(years), len(lats), len(lons))
+
+    models = []
+    if predictor.japan_model is not None:
+        models.append(('japan', True))
+    if predictor.global_model is not None:
+        models.append(('global', False))
+
+    layers = {}
+    for model, use_japan_model in models:
+        layer = {name: np.zeros(shape, dtype=dtype) for name, dtype in LAYER_DTYPES.items()}
+        for y, year in enumerate(years):
+            for start in range(0, len(grid_lat), chunk_size):
+                stop = min(start + chunk_size, len(grid_lat))
+                result = predictor._predict_arrays(
+                    latitudes=grid_lat[start:stop],
+                    longitudes=grid_lon[start:stop],
+                    year=int(year),
+                    species=species,
+                    environmental_data=[None] * (stop - start),
+                    use_japan_model=use_japan_model
+                )
+                rows, cols = np.unravel_index(np.arange(start, stop), shape[1:])
+                layer['day'][y, rows, cols] = result['bloom_day']
+                layer['confidence'][y, rows, cols] = result['confidence']
+                layer['window_days'][y, rows, cols] = result['window_days']
+        layers[model] = layer
+
+    metadata = {
+        'built': datetime.now().isoformat(),
+        'resolution': resolution,
+        'bounds': list(bounds),
+        'species': species,
+        'models': [model for model, _ in models],
+        # Checked at load time so a raster from older models is not served
+        'trained_dates': {model: predictor.metadata.get(model, {}).get('trained_date') for model, _ in models},
+        'environment': getattr(predictor.feature_provider, 'version', None)
+    }
+    return BloomRaster(lats, lons, years, layers, metadata)
+
+
+def write_bloom_fronts(raster, year, path, interval=ISOLINE_INTERVAL_DAYS):
+    """
+    Write bloom-front isolines for every model in the raster as GeoJSON.
+
+    One MultiLineString feature per model and day-of-year level.
+
+    Returns:
+        Number of features written
+    """
+    from geojson_writer import GeoJSONWriter
+
+    metadata = {
+        "source": "bloombly_sakura_raster",
+        "description": f"Sakura bloom fronts (day-of-year isolines every {interval} days) for {year}",
+        "year": int(year),
+        "interval_days": interval,
+        "resolution": raster.metadata.get('resolution'),
+        "generated_on": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+    with GeoJSONWriter(path, metadata=metadata) as writer:
+        for model in raster.models:
+            for day, lines in raster.isolines(model, year, interval):
+                date = datetime(int(year), 1, 1) + timedelta(days=day - 1)
+                writer.write_feature({
+                    "type": "Feature",
+                    "properties": {
+                        "model": model,
+                        "year": int(year),
+                        "bloom_day_of_year": day,
+                        "bloom_date": date.strftime('%Y-%m-%d'),
+                        "display_label": date.strftime('%b %d')
+                    },
+                    "geometry": {
+                        "type": "MultiLineString",
+                        "coordinates": [writer.round_coordinates(line) for line in lines]
+                    }
+                })
+    return writer.feature_count
@@ -0,0 +1,244 @@
+"""
+Prediction uncertainty for sakura bloom models.
+
+Confidence scores and bloom-window widths for a whole batch of predictions:
+1. Stage variance - one staged_predict pass over a boosting model gives the
+   point prediction plus the predictions at 50% and 75% of its stages; rows
+   whose prediction is still moving late in boosting get lower confidence
+2. Quantile interval - optional lower/upper quantile models trained next to
+   the point model (train_sakura_model.py --quantiles) give a per-row
+   prediction interval in days
+
+The two signals live on very different scales (stage spread is often a
+fraction of a day, 80% intervals are one to three weeks), so each is
+calibrated separately: training stores the distribution of the signal over
+the training rows (fit_calibration, saved as 'uncertainty_calibration' in
+the model file) and a row's confidence comes from where its signal falls in
+that distribution. Model files without a calibration use the fixed
+variance_to_confidence curve.
+"""
+
+import numpy as np
+from scipy.stats import norm
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
+
+
+# Fractions of the boosting stages compared for stage variance
+STAGE_FRACTIONS = (0.5, 0.75, 1.0)
+
+# Lower/upper quantiles of the optional interval models (80% interval)
+QUANTILE_ALPHAS = (0.1, 0.9)
+
+DEFAULT_CONFIDENCE = 0.7
+MIN_CONFIDENCE = 0.3
+MAX_CONFIDENCE = 0.95
+
+# Bloom window half-width bounds (days either side of the peak)
+MIN_WINDOW_DAYS = 3
+MAX_WINDOW_DAYS = 14
+
+# Percentiles of the training-time signal distribution kept for calibration
+CALIBRATION_PERCENTILES = np.linspace(0, 100, 101)
+CALIBRATION_MAX_ROWS = 5000
+
+
+def n_stages(model):
+    """Number of fitted boosting stages, or None for models without stages"""
+    if not hasattr(model, 'staged_predict'):
+        return None
+    return getattr(model, 'n_estimators_', None) or getattr(model, 'n_iter_', None)
+
+
+def staged_predictions(model, X, fractions=STAGE_FRACTIONS):
+    """
+    Predictions at several boosting stages from a single staged_predict pass.
+
+    Args:
+        model: Fitted boosting regressor (GradientBoosting or HistGradientBoosting)
+        X: Feature matrix (N, F)
+        fractions: Fractions of the stages to keep; 1.0 is the final prediction
+
+    Returns:
+        Array (len(fractions), N), or None if the model has no stages
+    """
+    total = n_stages(model)
+    if not total:
+        return None
+
+    # 0-based stage index for each fraction (final stage for 1.0)
+    wanted = [min(total - 1, int(total * f)) if f < 1 else total - 1 for f in fractions]
+    keep = {stage: [] for stage in wanted}
+
+    for stage, prediction in enumerate(model.staged_predict(X)):
+        if stage in keep:
+            keep[stage] = prediction
+        if stage >= wanted[-1]:
+            break
+
+    return np.array([keep[stage] for stage in wanted], dtype=float)
+
+
+def variance_to_confidence(variance):
+    """
+    Map prediction variance (days²) to confidence in [0.3, 0.95]
+
+    Variance of 10 days = low confidence (~0.33), variance of 1 day = high
+    confidence (~0.83); lower variance means higher confidence.
+    """
+    confidence = 1.0 / (1.0 + np.asarray(variance, dtype=float) / 5.0)
+    return np.clip(confidence, MIN_CONFIDENCE, MAX_CONFIDENCE)
+
+
+def stage_spread(stages):
+    """Standard deviation (days) of each row's prediction across boosting stages"""
+    return np.std(stages, axis=0)
+
+
+def signal_rank(values, reference):
+    """
+    Fraction of the training rows with a smaller signal (0 = most certain).
+
+    Args:
+        values: Signal per row (N,)
+        reference: Sorted percentiles of the training signal (fit_calibration)
+    """
+    reference = np.asarray(reference, dtype=float)
+    values = np.asarray(values, dtype=float)
+    # Mid-rank so ties (e.g. many rows with zero spread) land in the middle
+    low = np.searchsorted(reference, values, side='left')
+    high = np.searchsorted(reference, values, side='right')
+    return np.clip((low + high) / 2 / len(reference), 0, 1)
+
+
+def rank_to_confidence(rank):
+    """Map a signal rank in [0, 1] to confidence in [0.3, 0.95]"""
+    return MAX_CONFIDENCE - (MAX_CONFIDENCE - MIN_CONFIDENCE) * np.asarray(rank, dtype=float)
+
+
+def interval_to_variance(lower, upper, alphas=QUANTILE_ALPHAS):
+    """Variance of a normal distribution with the given quantile interval"""
+    z = norm.ppf(alphas[1]) - norm.ppf(alphas[0])
+    sigma = np.maximum(np.asarray(upper, dtype=float) - np.asarray(lower, dtype=float), 0) / z
+    return sigma ** 2
+
+
+def predict_with_uncertainty(model, X, quantile_models=None, window_days=7, calibration=None):
+    """
+    Point predictions, confidence and bloom-window half-widths for a batch.
+
+    Uses the quantile models when available (interval half-width is the
+    window); otherwise stage spread from one staged_predict pass, with the
+    window shrinking as confidence grows. Models without stages get the
+    default confidence.
+
+    Args:
+        model: Fitted regressor predicting bloom day of year
+        X: Scaled feature matrix (N, F)
+        quantile_models: Optional dict with 'lower', 'upper' and 'alphas'
+        window_days: Base window size for confidence-derived windows
+        calibration: Training signal distributions from fit_calibration
+            (fixed variance curve when None)
+
+    Returns:
+        Dictionary of arrays (N,): prediction, confidence, window_days
+        (half-width in days), and lower/upper (None without quantile models)
+    """
+    n = len(X)
+    lower = upper = None
+
+    if quantile_models:
+        prediction = np.asarray(model.predict(X), dtype=float)
+        lower = np.asarray(quantile_models['lower'].predict(X), dtype=float)
+        upper = np.asarray(quantile_models['upper'].predict(X), dtype=float)
+        alphas = quantile_models.get('alphas', QUANTILE_ALPHAS)
+        width = np.maximum(upper - lower, 0)
+
+        reference = (calibration or {}).get('interval_width')
+        if reference is not None:
+            confidence = rank_to_confidence(signal_rank(width, reference))
+        else:
+            confidence = variance_to_confidence(interval_to_variance(lower, upper, alphas))
+        window = np.ceil(width / 2)
+    else:
+        stages = staged_predictions(model, X)
+        reference = (calibration or {}).get('stage_spread')
+        if stages is not None and reference is not None:
+            prediction = stages[-1]
+            rank = signal_rank(stage_spread(stages), reference)
+            confidence = rank_to_confidence(rank)
+            # Median row gets the base window, 0.5x to 1.5x either side
+            window = np.rint(window_days * (0.5 + rank))
+        else:
+            if stages is not None:
+                prediction = stages[-1]
+                confidence = variance_to_confidence(np.var(stages, axis=0))
+            else:
+                prediction = np.asarray(model.predict(X), dtype=float)
+                confidence = np.full(n, DEFAULT_CONFIDENCE)
+
+            # Adjust window based on confidence
+            window = np.floor(window_days * (1 - confidence))
+
+    return {
+        'prediction': prediction,
+        'confidence': confidence,
+        'window_days': np.clip(window, MIN_WINDOW_DAYS, MAX_WINDOW_DAYS).astype(np.int64),
+        'lower': lower,
+        'upper': upper
+    }
+
+
+def fit_quantile_models(X, y, alphas=QUANTILE_ALPHAS, backend='gbr', **params):
+    """
+    Train lower/upper quantile gradient boosting models for bloom intervals.
+
+    Args:
+        X: Scaled training features
+        y: Bloom day of year
+        alphas: (lower, upper) quantiles
+        backend: 'gbr' (GradientBoostingRegressor) or 'hist'
+            (HistGradientBoostingRegressor)
+        **params: Regressor parameters (loss and quantile are set here)
+
+    Returns:
+        Dictionary with 'lower', 'upper' and 'alphas', as stored in the
+        model file under 'quantile_models'
+    """
+    models = {'alphas': tuple(alphas)}
+    for name, alpha in zip(('lower', 'upper'), alphas):
+        if backend == 'hist':
+            model = HistGradientBoostingRegressor(loss='quantile', quantile=alpha, **params)
+        else:
+            model = GradientBoostingRegressor(loss='quantile', alpha=alpha, **params)
+        models[name] = model.fit(X, y)
+    return models
+
+
+def fit_calibration(model, X, quantile_models=None, max_rows=CALIBRATION_MAX_ROWS, random_state=0):
+    """
+    Distribution of each uncertainty signal over the training rows.
+
+    Args:
+        model: Fitted point model
+        X: Scaled training features
+        quantile_models: Optional quantile models (fit_quantile_models)
+        max_rows: Rows sampled for the distributions
+        random_state: Seed for the row sample
+
+    Returns:
+        Dictionary with 'stage_spread' and 'interval_width' percentile
+        arrays (None for signals the model doesn't have), as stored in the
+        model file under 'uncertainty_calibration'
+    """
+    X = np.asarray(X)
+    if len(X) > max_rows:
+        X = X[np.random.default_rng(random_state).choice(len(X), max_rows, replace=False)]
+
+    calibration = {'stage_spread': None, 'interval_width': None}
+    stages = staged_predictions(model, X)
+    if stages is not None:
+        calibration['stage_spread'] = np.percentile(stage_spread(stages), CALIBRATION_PERCENTILES)
+    if quantile_models:
+        width = np.maximum(quantile_models['upper'].predict(X) - quantile_models['lower'].predict(X), 0)
+        calibration['interval_width'] = np.percentile(width, CALIBRATION_PERCENTILES)
+    return calibration
@@ -66,6 +66,12 @@ COUNTRY_BOUNDS = {
 # Prediction
 MAX_TIME_SERIES_DAYS = 90
 TIME_SERIES_INTERVAL_DAYS = 7
+MAX_BATCH_LOCATIONS = 10000  # Locations per /api/sakura/predict/batch request
+MAX_MATRIX_CELLS = 100000  # Locations × years × species per /api/sakura/predict/matrix request
+
+# Model registry (see model_registry.py)
+MODEL_REGISTRY_DIR = None  # Will use environment variable MODEL_REGISTRY_DIR (default: api/model_registry)
+ADMIN_TOKEN = None  # Will use environment variable ADMIN_TOKEN; admin endpoints are disabled without it
 
 # Flask
 PORT = 5001
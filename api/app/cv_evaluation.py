@@ -0,0 +1,227 @@
+"""
+Cross-validation engine with cached out-of-fold predictions.
+
+Each CV fold is fitted once (in parallel via cross_validate) and the
+out-of-fold predictions are cached on disk, keyed by the estimator's
+parameters, the training data and the fold indices. Every metric,
+calibration bin and plot in the evaluation scripts is computed from these
+predictions, so re-running a report only reloads the cache.
+
+Rows that are never in a test fold (the first block of a TimeSeriesSplit)
+have fold -1 and NaN predictions.
+"""
+
+import hashlib
+import os
+import time
+
+import numpy as np
+from sklearn.base import is_classifier
+from sklearn.metrics import (
+    accuracy_score, f1_score, mean_absolute_error, mean_squared_error,
+    precision_score, r2_score, recall_score, roc_auc_score
+)
+from sklearn.model_selection import cross_validate
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache', 'cv_predictions')
+
+# Probability bins for calibration tables
+CALIBRATION_BINS = [(0.0, 0.3), (0.3, 0.5), (0.5, 0.7), (0.7, 0.9), (0.9, 1.0)]
+
+
+def _hash_arrays(*arrays):
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(np.asarray(array, dtype=float))
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def data_hash(X, y):
+    """Hash of the feature matrix and target"""
+    return _hash_arrays(X, y)
+
+
+def model_hash(estimator):
+    """Hash of the estimator class and its (nested) parameters"""
+    params = sorted((name, repr(value)) for name, value in estimator.get_params(deep=True).items())
+    description = f"{type(estimator).__module__}.{type(estimator).__name__}{params}"
+    return hashlib.sha1(description.encode()).hexdigest()
+
+
+def splits_hash(splits):
+    """Hash of the (train, test) index arrays of every fold"""
+    digest = hashlib.sha1()
+    for train, test in splits:
+        digest.update(np.asarray(train, dtype=np.int64).tobytes())
+        digest.update(b'|')
+        digest.update(np.asarray(test, dtype=np.int64).tobytes())
+        digest.update(b';')
+    return digest.hexdigest()
+
+
+class OutOfFoldPredictions:
+    """Out-of-fold predictions for one estimator, dataset and set of folds"""
+
+    def __init__(self, y, fold, prediction, probability=None, fit_time=None, key=None, cached=False):
+        """
+        Args:
+            y: Targets (N,)
+            fold: Test fold of each row, -1 if never tested (N,)
+            prediction: predict() output per row, NaN if never tested (N,)
+            probability: Positive-class predict_proba() per row (classifiers)
+            fit_time: Fit seconds per fold
+            key: Cache key
+            cached: Whether the predictions were loaded from the cache
+        """
+        self.y = np.asarray(y, dtype=float)
+        self.fold = np.asarray(fold, dtype=np.int64)
+        self.prediction = np.asarray(prediction, dtype=float)
+        self.probability = None if probability is None else np.asarray(probability, dtype=float)
+        self.fit_time = np.asarray(fit_time if fit_time is not None else [], dtype=float)
+        self.key = key
+        self.cached = cached
+
+    @property
+    def n_folds(self):
+        return int(self.fold.max()) + 1 if len(self.fold) else 0
+
+    @property
+    def tested(self):
+        """Rows with an out-of-fold prediction"""
+        return self.fold >= 0
+
+    def fold_scores(self, metric, use_probability=False):
+        """
+        One score per fold, as cross_val_score would report it.
+
+        Args:
+            metric: Function (y_true, y_pred) -> float
+            use_probability: Score the positive-class probabilities instead of predictions
+        """
+        values = self.probability if use_probability else self.prediction
+        return np.array([metric(self.y[self.fold == k], values[self.fold == k]) for k in range(self.n_folds)])
+
+    def classification_scores(self):
+        """Per-fold ROC-AUC, accuracy, precision, recall and F1"""
+        return {
+            'roc_auc': self.fold_scores(roc_auc_score, use_probability=True),
+            'accuracy': self.fold_scores(accuracy_score),
+            'precision': self.fold_scores(lambda t, p: precision_score(t, p, zero_division=0)),
+            'recall': self.fold_scores(lambda t, p: recall_score(t, p, zero_division=0)),
+            'f1': self.fold_scores(lambda t, p: f1_score(t, p, zero_division=0))
+        }
+
+    def regression_scores(self):
+        """Per-fold MAE, RMSE and R²"""
+        return {
+            'mae': self.fold_scores(mean_absolute_error),
+            'rmse': self.fold_scores(lambda t, p: np.sqrt(mean_squared_error(t, p))),
+            'r2': self.fold_scores(r2_score)
+        }
+
+    def calibration(self, bins=CALIBRATION_BINS):
+        """
+        Observed positive rate per probability bin (out-of-fold).
+
+        Returns:
+            List of dicts: low, high, count, positives, rate
+        """
+        tested = self.tested
+        probability, y = self.probability[tested], self.y[tested]
+        table = []
+        for low, high in bins:
+            mask = (probability >= low) & (probability < high)
+            count = int(mask.sum())
+            positives = int(y[mask].sum())
+            table.append({'low': low, 'high': high, 'count': count, 'positives': positives,
+                          'rate': positives / count if count else None})
+        return table
+
+    def save(self, path):
+        """Write the predictions as a compressed .npz archive"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        arrays = {'y': self.y, 'fold': self.fold, 'prediction': self.prediction, 'fit_time': self.fit_time,
+                  'key': np.array(self.key or '')}
+        if self.probability is not None:
+            arrays['probability'] = self.probability
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Read predictions written by save()"""
+        with np.load(path, allow_pickle=False) as archive:
+            return cls(
+                y=archive['y'],
+                fold=archive['fold'],
+                prediction=archive['prediction'],
+                probability=archive['probability'] if 'probability' in archive.files else None,
+                fit_time=archive['fit_time'],
+                key=str(archive['key']),
+                cached=True
+            )
+
+
+def out_of_fold_predictions(estimator, X, y, cv, n_jobs=-1, cache_dir=DEFAULT_CACHE_DIR, refresh=False):
+    """
+    Fit every CV fold once and return (cached) out-of-fold predictions.
+
+    Args:
+        estimator: Unfitted scikit-learn estimator (cloned per fold)
+        X: Feature matrix (N, F)
+        y: Targets (N,)
+        cv: CV splitter (e.g. TimeSeriesSplit) or list of (train, test) index arrays
+        n_jobs: Parallel fold fits
+        cache_dir: Cache directory (None disables caching)
+        refresh: Ignore an existing cache entry
+
+    Returns:
+        OutOfFoldPredictions
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    splits = list(cv.split(X, y)) if hasattr(cv, 'split') else [(np.asarray(a), np.asarray(b)) for a, b in cv]
+    classifier = is_classifier(estimator)
+
+    key = hashlib.sha1(
+        (model_hash(estimator) + data_hash(X, y) + splits_hash(splits)).encode()
+    ).hexdigest()[:20]
+    path = os.path.join(cache_dir, f'{type(estimator).__name__}_{key}.npz') if cache_dir else None
+
+    if path and os.path.exists(path) and not refresh:
+        try:
+            return OutOfFoldPredictions.load(path)
+        except Exception as e:
+            print(f"  ⚠ Ignoring unreadable CV cache {path}: {e}")
+
+    # Each fold fitted exactly once, in parallel
+    start = time.perf_counter()
+    results = cross_validate(estimator, X, y, cv=splits, n_jobs=n_jobs,
+                             return_estimator=True, return_indices=True)
+
+    fold = np.full(len(y), -1, dtype=np.int64)
+    prediction = np.full(len(y), np.nan)
+    probability = np.full(len(y), np.nan) if classifier else None
+    for k, (fitted, test) in enumerate(zip(results['estimator'], results['indices']['test'])):
+        fold[test] = k
+        prediction[test] = fitted.predict(X[test])
+        if classifier:
+            probability[test] = fitted.predict_proba(X[test])[:, 1]
+
+    oof = OutOfFoldPredictions(y, fold, prediction, probability, fit_time=results['fit_time'], key=key)
+    print(f"  ✓ Fitted {len(splits)} CV folds in {time.perf_counter() - start:.1f}s")
+
+    if path:
+        oof.save(path)
+    return oof
+
+
+def summarize_scores(scores):
+    """Mean/std/min/max of per-fold scores, JSON-serializable"""
+    return {
+        metric: {'mean': float(np.mean(values)), 'std': float(np.std(values)),
+                 'min': float(np.min(values)), 'max': float(np.max(values))}
+        for metric, values in scores.items()
+    }
@@ -2,6 +2,11 @@ import ee
 import json
 from datetime import datetime, timedelta
 import os
+import sys
+
+# Batched reduceRegions sampling is shared with the ml pipeline (ml/src/soil_sampling.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'ml', 'src'))
+from soil_sampling import build_soil_image, sample_points
 
 def validate_service_account_scopes(credentials_dict):
     # Quick heuristic: ensure the credentials are for a service account and have an email
@@ -595,11 +600,85 @@ def get_evapotranspiration_data(lat, lon, start_date, end_date, scale=500):
         }
 
 
+def get_soil_texture_batch(points, scale=250, chunk_size=500):
+    """
+    Get soil texture classification for many locations at once.
+    
+    Sand and clay (0-5cm) come from the shared OpenLandMap soil image
+    (soil_sampling.build_soil_image), sampled with reduceRegions, so one
+    request covers up to chunk_size locations.
+    
+    Parameters:
+    -----------
+    points : list of (lat, lon)
+        Locations to classify
+    scale : int
+        Scale in meters (default 250m)
+    chunk_size : int
+        Locations per Earth Engine request
+    
+    Returns:
+    --------
+    list of dict : same format as get_soil_texture_from_soilgrids, in input order
+    """
+    default = {
+        'sand_percent': 40,  # Default: loam
+        'clay_percent': 20,
+        'silt_percent': 40,
+        'soil_type': 'loam',
+        'success': False
+    }
+    points = list(points)
+    
+    try:
+        # OpenLandMap SoilGrids - soil texture fractions at 0-5cm depth
+        # Using sand and clay content (g/kg, need to convert to %)
+        soil_texture = build_soil_image().select(['soil_sand_0-5cm', 'soil_clay_0-5cm'], ['sand', 'clay'])
+        
+        sampled = sample_points(
+            soil_texture,
+            [(i, lat, lon) for i, (lat, lon) in enumerate(points)],
+            scale=scale,
+            chunk_size=chunk_size
+        )
+    except Exception as e:
+        print(f"Error getting soil texture: {e}")
+        sampled = {}
+    
+    results = []
+    for i in range(len(points)):
+        values = sampled.get(i, {})
+        sand = values.get('sand')
+        clay = values.get('clay')
+        
+        if sand is None or clay is None:
+            results.append(dict(default))
+            continue
+        
+        # Convert from g/kg to percentage
+        sand_pct = float(sand) / 10
+        clay_pct = float(clay) / 10
+        # Calculate silt as remainder
+        silt_pct = max(0, 100 - sand_pct - clay_pct)
+        
+        results.append({
+            'sand_percent': sand_pct,
+            'clay_percent': clay_pct,
+            'silt_percent': silt_pct,
+            # Classify soil texture based on USDA texture triangle
+            'soil_type': classify_soil_texture(sand_pct, clay_pct, silt_pct),
+            'success': True
+        })
+    
+    return results
+
+
 def get_soil_texture_from_soilgrids(lat, lon, scale=250):
     """
     Get soil texture classification from SoilGrids dataset.
     
     SoilGrids provides global soil property maps including sand, silt, and clay content.
+    For many locations use get_soil_texture_batch, which shares one request per chunk.
     
     Parameters:
     -----------
@@ -620,62 +699,7 @@ def get_soil_texture_from_soilgrids(lat, lon, scale=250):
         'success': bool
     }
     """
-    try:
-        point = ee.Geometry.Point([lon, lat])
-        
-        # OpenLandMap SoilGrids - soil texture fractions at 0-5cm depth
-        # Using sand and clay content (g/kg, need to convert to %)
-        soil_sand = ee.Image("OpenLandMap/SOL/SOL_SAND-WFRACTION_USDA-3A1A1A_M/v02") \
-            .select('b0')  # 0-5cm depth
-        soil_clay = ee.Image("OpenLandMap/SOL/SOL_CLAY-WFRACTION_USDA-3A1A1A_M/v02") \
-            .select('b0')
-        # Calculate silt as remainder (100 - sand - clay)
-        soil_silt = None  # Will calculate from sand and clay
-        
-        # Combine into single image
-        soil_texture = soil_sand.addBands([soil_clay]) \
-            .rename(['sand', 'clay'])
-        
-        result = soil_texture.reduceRegion(
-            reducer=ee.Reducer.first(),
-            geometry=point,
-            scale=scale
-        )
-        
-        sand = result.get('sand')
-        clay = result.get('clay')
-        
-        if sand is not None and clay is not None:
-            # Convert from g/kg to percentage
-            sand_pct = float(ee.Number(sand).divide(10).getInfo())
-            clay_pct = float(ee.Number(clay).divide(10).getInfo())
-            # Calculate silt as remainder
-            silt_pct = max(0, 100 - sand_pct - clay_pct)
-            
-            # Classify soil texture based on USDA texture triangle
-            soil_type = classify_soil_texture(sand_pct, clay_pct, silt_pct)
-        else:
-            sand_pct = 40  # Default: loam
-            clay_pct = 20
-            silt_pct = 40
-            soil_type = 'loam'
-        
-        return {
-            'sand_percent': sand_pct,
-            'clay_percent': clay_pct,
-            'silt_percent': silt_pct,
-            'soil_type': soil_type,
-            'success': sand is not None
-        }
-    except Exception as e:
-        print(f"Error getting soil texture: {e}")
-        return {
-            'sand_percent': 40,
-            'clay_percent': 20,
-            'silt_percent': 40,
-            'soil_type': 'loam',
-            'success': False
-        }
+    return get_soil_texture_batch([(lat, lon)], scale=scale)[0]
 
 
 def classify_soil_texture(sand, clay, silt):
@@ -0,0 +1,210 @@
+"""
+Cached environmental features for sakura predictions.
+
+Requests without environmental_data would otherwise fall back to fixed
+regional defaults. An EnvironmentalFeatureProvider fills the weather, soil,
+NDVI, elevation and photoperiod features for a whole batch of
+(latitude, longitude, year) rows in one call instead, so batch predictions
+never need a per-location round trip to weather APIs.
+
+ClimatologyStore answers from a local table built from the processed
+training data (train_sakura_model.py writes it next to the models):
+- yearly rows: feature means per grid cell and year
+- climatology rows: feature means per grid cell over all years, used for
+  years the cell has no observations for (e.g. forecasts)
+Rows farther than max_distance from every stored cell get NaN, so the
+predictor's regional defaults still apply there.
+"""
+
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+
+ENVIRONMENT_STORE_FILENAME = 'sakura_environment_store.npz'
+
+# Grid cell size and nearest-cell search radius (degrees)
+DEFAULT_CELL_DEGREES = 0.5
+DEFAULT_MAX_DISTANCE = 1.5
+
+# Feature name prefixes the store provides (bloom_features_ml.csv columns)
+ENVIRONMENTAL_PREFIXES = (
+    'temp_', 'precip_', 'humidity_', 'solar_', 'gdd_', 'frost_days_',
+    'soil_', 'ndvi_', 'elevation_', 'photoperiod_'
+)
+
+# Year value of the all-years climatology row of each cell
+CLIMATOLOGY_YEAR = 0
+
+
+def environmental_columns(columns):
+    """Columns holding environmental features, in their original order"""
+    return [col for col in columns if str(col).startswith(ENVIRONMENTAL_PREFIXES)]
+
+
+class EnvironmentalFeatureProvider(ABC):
+    """
+    Source of environmental features for batches of locations.
+
+    Subclasses set `columns` and implement features(). `version` identifies
+    the data behind the features (stored with precomputed rasters).
+    """
+
+    columns = []
+    version = None
+
+    @abstractmethod
+    def features(self, latitudes, longitudes, years):
+        """
+        Environmental features for N rows.
+
+        Args:
+            latitudes: Latitudes (N,)
+            longitudes: Longitudes (N,)
+            years: Years (N,)
+
+        Returns:
+            Array (N, len(columns)); NaN where a feature is unknown
+        """
+
+
+class ClimatologyStore(EnvironmentalFeatureProvider):
+    """Environmental features per grid cell and year, with per-cell climatology"""
+
+    def __init__(self, cells, years, values, columns, metadata=None,
+                 max_distance=DEFAULT_MAX_DISTANCE):
+        """
+        Args:
+            cells: Cell centre [lat, lon] per row (R, 2)
+            years: Year per row, CLIMATOLOGY_YEAR for climatology rows (R,)
+            values: Feature values (R, F)
+            columns: Feature names (F,)
+            metadata: Build information (source, cell size, build time)
+            max_distance: Largest distance (degrees) to the nearest cell
+        """
+        self.columns = [str(col) for col in columns]
+        self.metadata = metadata or {}
+        self.version = self.metadata.get('built')
+        self.max_distance = max_distance
+
+        cells = np.asarray(cells, dtype=float)
+        self.years = np.asarray(years, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float32)
+
+        # Cell id per row and a KD-tree over the distinct cells
+        cell_id, unique_cells = pd.factorize(cells[:, 0] + 1j * cells[:, 1])
+        self.cell_coords = np.column_stack([unique_cells.real, unique_cells.imag])
+        self.tree = KDTree(self.cell_coords)
+
+        # Sorted (cell, year) keys for vectorized row lookup
+        keys = self._keys(cell_id, self.years)
+        order = np.argsort(keys)
+        self._keys_sorted = keys[order]
+        self._rows_sorted = order
+        self._cells_stored = cells
+
+    @staticmethod
+    def _keys(cell_id, years):
+        return np.asarray(cell_id, dtype=np.int64) * 10_000 + np.asarray(years, dtype=np.int64)
+
+    def _lookup(self, cell_id, years):
+        """Row index per (cell, year) key, -1 where the store has no row"""
+        keys = self._keys(cell_id, years)
+        position = np.minimum(np.searchsorted(self._keys_sorted, keys), len(self._keys_sorted) - 1)
+        found = self._keys_sorted[position] == keys
+        return np.where(found, self._rows_sorted[position], -1)
+
+    def features(self, latitudes, longitudes, years):
+        latitudes = np.atleast_1d(np.asarray(latitudes, dtype=float))
+        longitudes = np.atleast_1d(np.asarray(longitudes, dtype=float))
+        years = np.broadcast_to(np.asarray(years, dtype=np.int64), latitudes.shape)
+        result = np.full((len(latitudes), len(self.columns)), np.nan)
+        if len(latitudes) == 0:
+            return result
+
+        # Nearest stored cell for every row in one query
+        distance, nearest = self.tree.query(np.column_stack([latitudes, longitudes]), k=1)
+        distance, nearest = distance[:, 0], nearest[:, 0]
+        near = distance <= self.max_distance
+
+        # That year's values, then the cell climatology for anything still missing
+        for lookup_years in (years, np.full(len(years), CLIMATOLOGY_YEAR)):
+            rows = np.where(near, self._lookup(nearest, lookup_years), -1)
+            hit = rows >= 0
+            missing = np.isnan(result[hit])
+            result[hit] = np.where(missing, self.values[rows[hit]], result[hit])
+
+        return result
+
+    def save(self, path):
+        """Write the store as a compressed .npz archive"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(
+            path,
+            cells=self._cells_stored,
+            years=self.years.astype(np.int32),
+            values=self.values,
+            columns=np.array(self.columns),
+            metadata=np.array(json.dumps(self.metadata))
+        )
+
+    @classmethod
+    def load(cls, path, max_distance=DEFAULT_MAX_DISTANCE):
+        """Read a store written by save()"""
+        with np.load(path, allow_pickle=False) as archive:
+            return cls(
+                cells=archive['cells'],
+                years=archive['years'],
+                values=archive['values'],
+                columns=archive['columns'].tolist(),
+                metadata=json.loads(str(archive['metadata'])),
+                max_distance=max_distance
+            )
+
+
+def build_climatology_store(data, cell_degrees=DEFAULT_CELL_DEGREES, source=None):
+    """
+    Aggregate environmental features per grid cell and year.
+
+    Args:
+        data: DataFrame with latitude, longitude, year and environmental columns
+              (e.g. bloom_features_ml.csv)
+        cell_degrees: Grid cell size in degrees
+        source: Description of the data, stored in the metadata
+
+    Returns:
+        ClimatologyStore
+    """
+    columns = [col for col in environmental_columns(data.columns)
+               if pd.api.types.is_numeric_dtype(data[col])]
+
+    located = data.dropna(subset=['latitude', 'longitude', 'year'])
+    frame = located[columns].replace([np.inf, -np.inf], np.nan)
+    frame['cell_lat'] = (np.floor(located['latitude'] / cell_degrees) + 0.5) * cell_degrees
+    frame['cell_lon'] = (np.floor(located['longitude'] / cell_degrees) + 0.5) * cell_degrees
+    frame['year'] = located['year'].astype(np.int64)
+
+    yearly = frame.groupby(['cell_lat', 'cell_lon', 'year'], sort=True)[columns].mean().reset_index()
+    climatology = frame.groupby(['cell_lat', 'cell_lon'], sort=True)[columns].mean().reset_index()
+    climatology['year'] = CLIMATOLOGY_YEAR
+    table = pd.concat([yearly, climatology[yearly.columns]], ignore_index=True)
+
+    metadata = {
+        'built': datetime.now().isoformat(),
+        'source': source,
+        'cell_degrees': cell_degrees,
+        'observations': int(len(located)),
+        'cells': int(len(climatology))
+    }
+    return ClimatologyStore(
+        cells=table[['cell_lat', 'cell_lon']].to_numpy(),
+        years=table['year'].to_numpy(),
+        values=table[columns].to_numpy(dtype=float),
+        columns=columns,
+        metadata=metadata
+    )
@@ -3,6 +3,8 @@ from flask_cors import CORS
 import os
 import logging
 import json
+import signal
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -13,11 +15,15 @@ try:
     from .routes.data import data_bp
     from .routes.predict import predict_bp
     from .routes.sakura import sakura_bp
+    from .routes.admin import admin_bp
+    from .model_registry import reload_all
 except ImportError:
     import config
     from routes.data import data_bp
     from routes.predict import predict_bp
     from routes.sakura import sakura_bp
+    from routes.admin import admin_bp
+    from model_registry import reload_all
 
 # Try to import Earth Engine, but make it optional
 try:
@@ -89,6 +95,16 @@ initialize_earth_engine()
 app.register_blueprint(data_bp, url_prefix='/api/data')
 app.register_blueprint(predict_bp, url_prefix='/api/predict')
 app.register_blueprint(sakura_bp, url_prefix='/api/sakura')
+app.register_blueprint(admin_bp, url_prefix='/api/admin')
+
+def handle_reload_signal(signum, frame):
+    """SIGHUP: load newly activated model versions (in the background, requests keep being served)"""
+    logging.info("Received SIGHUP, reloading models...")
+    threading.Thread(target=reload_all, daemon=True).start()
+
+# Signal handlers can only be installed from the main thread
+if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGHUP, handle_reload_signal)
 
 @app.route('/')
 def index():
@@ -0,0 +1,298 @@
+"""
+Model registry: versioned model artifacts with an atomically switched active version.
+
+Layout (one directory per model name: 'v1', 'v2', 'sakura'):
+
+    <registry>/<name>/ACTIVE                  active version id
+    <registry>/<name>/<version>/manifest.json name, version, created, artifacts, metadata
+    <registry>/<name>/<version>/<artifacts>   model files
+
+Model pickles are stored uncompressed so joblib.load(mmap_mode='r') maps
+their plain numpy arrays (scaler statistics, feature medians, calibration
+tables) read-only instead of copying them; forked API workers then share
+those pages. Tree nodes are only shared for HistGradientBoosting models
+(train_sakura_model.py --backend hist), whose predictors keep their nodes in
+a numpy array. GradientBoostingRegressor ('gbr', the default) stores its
+trees as sklearn Tree objects, which copy their node arrays into private
+memory when unpickled, so each worker holds its own copy of those trees.
+
+A ModelSlot holds the loaded predictor for one name. Each get() checks the
+ACTIVE file; when it changes (publish_model.py, the admin endpoint, or a
+SIGHUP reload) the new version is loaded and swapped in with a single
+reference assignment. Requests that already hold the old predictor finish
+on it. When the registry has no versions for a name, the slot uses its
+fallback loader (the legacy model locations).
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from datetime import datetime
+
+import joblib
+
+try:
+    from . import config
+except ImportError:
+    import config
+
+
+DEFAULT_REGISTRY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_registry')
+
+MODEL_NAMES = ('v1', 'v2', 'sakura')
+MANIFEST_FILENAME = 'manifest.json'
+ACTIVE_FILENAME = 'ACTIVE'
+
+# Model files re-dumped uncompressed on publish so they can be memory-mapped
+PICKLE_EXTENSIONS = ('.pkl', '.joblib')
+
+VERSION_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+
+def load_artifact(path):
+    """Load a joblib/pickle artifact with its numpy arrays memory-mapped read-only"""
+    return joblib.load(path, mmap_mode='r')
+
+
+class ModelRegistry:
+    """Versioned model directories with an active-version pointer per model name"""
+
+    def __init__(self, root=None):
+        """
+        Args:
+            root: Registry directory (default: MODEL_REGISTRY_DIR env var,
+                  config.MODEL_REGISTRY_DIR, then api/model_registry)
+        """
+        self.root = os.path.abspath(
+            root or os.getenv('MODEL_REGISTRY_DIR') or config.MODEL_REGISTRY_DIR or DEFAULT_REGISTRY_DIR
+        )
+
+    def model_dir(self, name):
+        if name not in MODEL_NAMES:
+            raise ValueError(f"Unknown model '{name}' (expected one of {', '.join(MODEL_NAMES)})")
+        return os.path.join(self.root, name)
+
+    def version_dir(self, name, version):
+        return os.path.join(self.model_dir(name), version)
+
+    def versions(self, name):
+        """Published versions, oldest first"""
+        model_dir = self.model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted(
+            entry for entry in os.listdir(model_dir)
+            if os.path.isfile(os.path.join(model_dir, entry, MANIFEST_FILENAME))
+        )
+
+    def manifest(self, name, version):
+        with open(os.path.join(self.version_dir(name, version), MANIFEST_FILENAME)) as f:
+            return json.load(f)
+
+    def pointer_stamp(self, name):
+        """
+        (mtime ns, inode) of the ACTIVE file, None without a pointer
+
+        activate() replaces the file, so the inode changes even when two
+        switches land within the filesystem's timestamp resolution.
+        """
+        try:
+            stat = os.stat(os.path.join(self.model_dir(name), ACTIVE_FILENAME))
+            return stat.st_mtime_ns, stat.st_ino
+        except FileNotFoundError:
+            return None
+
+    def active_pointer(self, name):
+        """(ACTIVE file stamp, version) or (None, None) without a pointer"""
+        path = os.path.join(self.model_dir(name), ACTIVE_FILENAME)
+        try:
+            with open(path) as f:
+                stat = os.fstat(f.fileno())
+                return (stat.st_mtime_ns, stat.st_ino), f.read().strip() or None
+        except FileNotFoundError:
+            return None, None
+
+    def active_version(self, name):
+        """Active version: the ACTIVE pointer, else the newest published version"""
+        _, version = self.active_pointer(name)
+        if version:
+            return version
+        versions = self.versions(name)
+        return versions[-1] if versions else None
+
+    def activate(self, name, version):
+        """Point ACTIVE at a published version (atomic rename)"""
+        if version not in self.versions(name):
+            raise ValueError(f"Version '{version}' of model '{name}' is not published")
+
+        pointer = os.path.join(self.model_dir(name), ACTIVE_FILENAME)
+        tmp = f'{pointer}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp, pointer)
+
+    def publish(self, name, artifacts, metadata=None, version=None, activate=True):
+        """
+        Copy artifacts into a new version directory and write its manifest.
+
+        Args:
+            name: 'v1', 'v2' or 'sakura'
+            artifacts: {artifact name: source file path}
+            metadata: Extra manifest metadata (training parameters, data path, ...)
+            version: Version id (default: current timestamp)
+            activate: Make the new version active
+
+        Returns:
+            Version id
+        """
+        version = version or datetime.now().strftime('%Y%m%d-%H%M%S')
+        if not VERSION_PATTERN.match(version):
+            raise ValueError(f"Invalid version id '{version}'")
+
+        final_dir = self.version_dir(name, version)
+        if os.path.exists(final_dir):
+            raise ValueError(f"Version '{version}' of model '{name}' already exists")
+
+        # Build in a temporary directory, then rename into place
+        staging = os.path.join(self.model_dir(name), f'.{version}.staging')
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        files = {}
+        for artifact, source in artifacts.items():
+            filename = os.path.basename(source)
+            target = os.path.join(staging, filename)
+            if filename.endswith(PICKLE_EXTENSIONS):
+                # Uncompressed so numpy arrays can be memory-mapped
+                joblib.dump(joblib.load(source), target)
+            else:
+                shutil.copy2(source, target)
+            files[artifact] = filename
+
+        manifest = {
+            'name': name,
+            'version': version,
+            'created': datetime.now().isoformat(),
+            'artifacts': files,
+            'metadata': metadata or {}
+        }
+        with open(os.path.join(staging, MANIFEST_FILENAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        os.rename(staging, final_dir)
+        if activate:
+            self.activate(name, version)
+        return version
+
+
+class ModelSlot:
+    """The active predictor for one registry model name, reloaded when ACTIVE changes"""
+
+    def __init__(self, name, loader, fallback=None, registry=None):
+        """
+        Args:
+            name: Registry model name
+            loader: Function (version_dir, manifest) -> predictor
+            fallback: Function () -> predictor used when the registry has no versions
+            registry: ModelRegistry (default registry when None)
+        """
+        self.name = name
+        self.loader = loader
+        self.fallback = fallback
+        self.registry = registry
+        self._current = None  # (version, predictor)
+        self._pointer = None
+        self._lock = threading.Lock()
+
+    def _registry(self):
+        if self.registry is None:
+            self.registry = ModelRegistry()
+        return self.registry
+
+    @property
+    def version(self):
+        current = self._current
+        return current[0] if current else None
+
+    def get(self):
+        """Current predictor, loading the active version first if it changed"""
+        current = self._current
+        if current is None:
+            self.reload()
+        elif self._registry().pointer_stamp(self.name) != self._pointer:
+            # Another thread already reloading: keep serving the loaded version
+            try:
+                self.reload(blocking=False)
+            except Exception as e:
+                logging.error(f"⚠ Failed to load new {self.name} model, keeping version {current[0]}: {e}")
+        return self._current[1]
+
+    def reload(self, version=None, blocking=True):
+        """
+        Load the active (or given) version and swap it in.
+
+        Returns:
+            True if a different version was loaded
+        """
+        if not self._lock.acquire(blocking=blocking):
+            return False
+        try:
+            registry = self._registry()
+            pointer, _ = registry.active_pointer(self.name)
+            version = version or registry.active_version(self.name)
+            current = self._current
+
+            if current is not None and current[0] == version:
+                self._pointer = pointer
+                return False
+
+            if version is None:
+                if self.fallback is None:
+                    raise RuntimeError(f"No published '{self.name}' model in {registry.root}")
+                predictor = self.fallback()
+            else:
+                version_dir = registry.version_dir(self.name, version)
+                logging.info(f"Loading {self.name} model version {version} from {version_dir}...")
+                try:
+                    predictor = self.loader(version_dir, registry.manifest(self.name, version))
+                except Exception:
+                    # Don't retry the same broken pointer on every request
+                    self._pointer = pointer
+                    raise
+
+            # Atomic swap: in-flight requests keep their reference to the old predictor
+            self._current = (version, predictor)
+            self._pointer = pointer
+            logging.info(f"✓ {self.name} model version {version or 'fallback'} active")
+            return True
+        finally:
+            self._lock.release()
+
+
+_slots = {}
+
+
+def register_slot(slot):
+    """Make a slot reachable for admin reloads; returns the slot"""
+    _slots[slot.name] = slot
+    return slot
+
+
+def get_slots():
+    return dict(_slots)
+
+
+def reload_all():
+    """Reload every registered slot that has been loaded (SIGHUP / admin reload)"""
+    reloaded = {}
+    for name, slot in _slots.items():
+        try:
+            # Slots never used in this worker load lazily on their first request
+            reloaded[name] = slot.reload() if slot._current is not None else False
+        except Exception as e:
+            logging.error(f"⚠ Failed to reload {name} model: {e}")
+            reloaded[name] = False
+    return reloaded
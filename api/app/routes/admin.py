@@ -0,0 +1,105 @@
+"""
+Admin Routes (Flask)
+
+Model registry administration: list published model versions, switch the
+active version and reload predictors without restarting the API.
+
+Requests must send the X-Admin-Token header matching the ADMIN_TOKEN
+environment variable (or config.ADMIN_TOKEN); without a configured token
+these endpoints are disabled.
+"""
+
+from flask import Blueprint, request, jsonify
+import hmac
+import logging
+import os
+
+try:
+    from .. import config
+    from ..model_registry import MODEL_NAMES, ModelRegistry, get_slots, reload_all
+except ImportError:
+    import config
+    from model_registry import MODEL_NAMES, ModelRegistry, get_slots, reload_all
+
+admin_bp = Blueprint('admin', __name__)
+
+
+@admin_bp.before_request
+def require_admin_token():
+    """Reject requests without the configured admin token"""
+    token = os.getenv('ADMIN_TOKEN', config.ADMIN_TOKEN)
+    if not token:
+        return jsonify({"error": "Admin endpoints are disabled (set ADMIN_TOKEN)"}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+        return jsonify({"error": "Invalid admin token"}), 401
+
+
+@admin_bp.route('/models', methods=['GET'])
+def list_models():
+    """
+    Published versions, the active version and the version loaded in this worker
+
+    Example: /api/admin/models
+    """
+    registry = ModelRegistry()
+    slots = get_slots()
+
+    models = {}
+    for name in MODEL_NAMES:
+        slot = slots.get(name)
+        models[name] = {
+            "versions": registry.versions(name),
+            "active": registry.active_version(name),
+            "loaded": slot.version if slot is not None else None
+        }
+
+    return jsonify({"registry": registry.root, "models": models})
+
+
+@admin_bp.route('/models/<name>/activate', methods=['POST'])
+def activate_model(name):
+    """
+    Switch the active version of a model and load it in this worker
+
+    Other workers pick up the new version on their next request for the
+    model; in-flight requests finish on the version they started with.
+
+    Request JSON:
+    {
+        "version": "20251019-051200"
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+    if not version:
+        return jsonify({"error": "Missing required field: version"}), 400
+
+    registry = ModelRegistry()
+    try:
+        registry.activate(name, version)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+
+    slot = get_slots().get(name)
+    try:
+        loaded = slot.reload() if slot is not None else False
+    except Exception as e:
+        logging.error(f"⚠ Activated {name} {version} but failed to load it: {e}")
+        return jsonify({"error": f"Version activated but failed to load: {str(e)}"}), 500
+
+    return jsonify({
+        "model": name,
+        "active": version,
+        "loaded": slot.version if slot is not None else None,
+        "reloaded": loaded
+    })
+
+
+@admin_bp.route('/models/reload', methods=['POST'])
+def reload_models():
+    """
+    Reload every loaded model whose active version changed (same as SIGHUP)
+
+    Example: POST /api/admin/models/reload
+    """
+    return jsonify({"reloaded": reload_all()})
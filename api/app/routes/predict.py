@@ -1,56 +1,74 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
 import logging
+import os
 try:
     from ..bloom_predictor import EnhancedBloomPredictor
     from ..bloom_predictor_v2 import ImprovedBloomPredictor
     from .. import config
     from ..models.schemas import BloomsPredictionQuery, EnvironmentalDataQuery
+    from ..model_registry import ModelSlot, register_slot
 except ImportError:
     from bloom_predictor import EnhancedBloomPredictor
     from bloom_predictor_v2 import ImprovedBloomPredictor
     import config
     from models.schemas import BloomsPredictionQuery, EnvironmentalDataQuery
+    from model_registry import ModelSlot, register_slot
 from pydantic import ValidationError
 
 predict_bp = Blueprint('predict', __name__)
 
-predictor = None
-predictor_v2 = None
+MODEL_V2_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bloom_model_v2.pkl')
+
+
+def _load_v1(version_dir=None, manifest=None):
+    """v1 trains on startup; a registry manifest can pin its data file"""
+    logging.info("Initializing Enhanced Bloom Predictor v1...")
+    data_path = (manifest or {}).get('metadata', {}).get('data_path')
+    predictor = EnhancedBloomPredictor(data_path=data_path) if data_path else EnhancedBloomPredictor()
+    logging.info("✓ Bloom Predictor v1 ready!")
+    return predictor
+
+
+def _load_v2(version_dir, manifest):
+    model_path = os.path.join(version_dir, manifest['artifacts']['model'])
+    logging.info(f"  Loading pre-trained model from {model_path}...")
+    predictor = ImprovedBloomPredictor(load_pretrained=model_path)
+    logging.info("✓ Bloom Predictor v2 loaded from model registry!")
+    return predictor
+
+
+def _load_v2_fallback():
+    logging.info("Initializing Improved Bloom Predictor v2 (Learning Bloom Dynamics)...")
+    # Try to load pre-trained model first for fast startup
+    if os.path.exists(MODEL_V2_PATH):
+        logging.info(f"  Loading pre-trained model from {MODEL_V2_PATH}...")
+        predictor = ImprovedBloomPredictor(load_pretrained=MODEL_V2_PATH)
+        logging.info("✓ Bloom Predictor v2 loaded from pre-trained model!")
+    else:
+        logging.info("  No pre-trained model found, training new model...")
+        predictor = ImprovedBloomPredictor()
+        logging.info("✓ Bloom Predictor v2 ready!")
+    return predictor
+
+
+# Active predictors, switched by the model registry (see model_registry.py)
+predictor_slots = {
+    'v1': register_slot(ModelSlot('v1', _load_v1, fallback=_load_v1)),
+    'v2': register_slot(ModelSlot('v2', _load_v2, fallback=_load_v2_fallback)),
+}
 
 def get_predictor(version='v1'):
-    """Initializes and returns the bloom predictor instance."""
-    global predictor, predictor_v2
-    
+    """Returns the active bloom predictor instance for a model version."""
     if version == 'v2':
-        if predictor_v2 is None:
-            logging.info("Initializing Improved Bloom Predictor v2 (Learning Bloom Dynamics)...")
-            try:
-                # Try to load pre-trained model first for fast startup
-                import os
-                model_path = os.path.join(os.path.dirname(__file__), '..', 'bloom_model_v2.pkl')
-                if os.path.exists(model_path):
-                    logging.info(f"  Loading pre-trained model from {model_path}...")
-                    predictor_v2 = ImprovedBloomPredictor(load_pretrained=model_path)
-                    logging.info("✓ Bloom Predictor v2 loaded from pre-trained model!")
-                else:
-                    logging.info("  No pre-trained model found, training new model...")
-                    predictor_v2 = ImprovedBloomPredictor()
-                    logging.info("✓ Bloom Predictor v2 ready!")
-                return predictor_v2
-            except Exception as e:
-                logging.error(f"⚠ Failed to initialize v2: {e}")
-                logging.info("  Falling back to v1...")
-                version = 'v1'
-        else:
-            return predictor_v2
+        try:
+            return predictor_slots['v2'].get()
+        except Exception as e:
+            logging.error(f"⚠ Failed to initialize v2: {e}")
+            logging.info("  Falling back to v1...")
     
     # v1 (default)
-    if predictor is None:
-        logging.info("Initializing Enhanced Bloom Predictor v1...")
-        predictor = EnhancedBloomPredictor()
-        logging.info("✓ Bloom Predictor v1 ready!")
-    return predictor
+    return predictor_slots['v1'].get()
 
 def get_aoi_bounds(aoi_type, aoi_state, aoi_country, bbox):
     """Returns the bounding box for a given AOI."""
@@ -4,20 +4,62 @@ Sakura (Cherry Blossom) Prediction Routes (Flask)
 API endpoints for predicting sakura bloom dates using specialized models
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file
 import sys
 import os
+import json
+
+import numpy as np
+import pandas as pd
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 try:
     from app.sakura_predictor import get_sakura_predictor
+    from app.bloom_raster import FRONTS_FILENAME
+    from app import config
 except ImportError:
     from sakura_predictor import get_sakura_predictor
+    from bloom_raster import FRONTS_FILENAME
+    import config
 
 sakura_bp = Blueprint('sakura', __name__)
 
+# Prefecture coordinates (approximate centers)
+PREFECTURE_COORDS = {
+    'tokyo': (35.6762, 139.6503),
+    'osaka': (34.6937, 135.5023),
+    'kyoto': (35.0116, 135.7681),
+    'hokkaido': (43.0642, 141.3469),
+    'okinawa': (26.2124, 127.6809),
+    'fukuoka': (33.5904, 130.4017),
+    'nagoya': (35.1815, 136.9066),
+    'sendai': (38.2682, 140.8694),
+    'hiroshima': (34.3853, 132.4553),
+    'sapporo': (43.0642, 141.3469),
+}
+
+# Geocoded JMA sakura observation cities
+CITIES_CSV = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data', 'processed', 'japan_cities_geocoded.csv')
+
+_location_coords = None
+
+
+def get_japan_locations():
+    """Prefecture centers plus every geocoded observation city, keyed by lowercase name"""
+    global _location_coords
+    
+    if _location_coords is None:
+        coords = dict(PREFECTURE_COORDS)
+        if os.path.exists(CITIES_CSV):
+            cities = pd.read_csv(CITIES_CSV, usecols=['city_name', 'latitude', 'longitude']).dropna()
+            for name, lat, lon in zip(cities['city_name'], cities['latitude'], cities['longitude']):
+                coords.setdefault(str(name).lower(), (float(lat), float(lon)))
+        _location_coords = coords
+    
+    return _location_coords
+
 
 @sakura_bp.route('/', methods=['GET'])
 def sakura_info():
@@ -25,7 +67,7 @@ def sakura_info():
     Get information about sakura prediction models
     """
     try:
-        predictor = get_sakura_predictor(models_dir='app/models')
+        predictor = get_sakura_predictor()
         info = predictor.get_model_info()
         
         return jsonify({
@@ -40,9 +82,11 @@ def sakura_info():
             "endpoints": {
                 "predict": "/api/sakura/predict",
                 "batch": "/api/sakura/predict/batch",
+                "matrix": "/api/sakura/predict/matrix",
                 "japan": "/api/sakura/predict/japan",
                 "features": "/api/sakura/features/<model_type>",
-                "compare": "/api/sakura/compare/models"
+                "compare": "/api/sakura/compare/models",
+                "fronts": "/api/sakura/fronts"
             }
         })
     except Exception as e:
@@ -93,7 +137,7 @@ def predict_sakura_bloom():
         if not (1900 <= year <= 2100):
             return jsonify({"error": "Year must be between 1900 and 2100"}), 400
         
-        predictor = get_sakura_predictor(models_dir='app/models')
+        predictor = get_sakura_predictor()
         
         if include_window:
             prediction = predictor.predict_bloom_window(
@@ -127,27 +171,13 @@ def predict_japan_sakura():
     Predict sakura bloom for Japanese prefectures using the Japan-specific model
     
     Query parameters:
-    - prefecture: Japanese prefecture name (required)
+    - prefecture: Japanese prefecture or observation city name (required)
     - year: Year to predict (required)
     - include_window: Include bloom window (optional, default false)
     
     Example: /api/sakura/predict/japan?prefecture=Tokyo&year=2025&include_window=true
     """
     
-    # Prefecture coordinates (approximate centers)
-    prefecture_coords = {
-        'tokyo': (35.6762, 139.6503),
-        'osaka': (34.6937, 135.5023),
-        'kyoto': (35.0116, 135.7681),
-        'hokkaido': (43.0642, 141.3469),
-        'okinawa': (26.2124, 127.6809),
-        'fukuoka': (33.5904, 130.4017),
-        'nagoya': (35.1815, 136.9066),
-        'sendai': (38.2682, 140.8694),
-        'hiroshima': (34.3853, 132.4553),
-        'sapporo': (43.0642, 141.3469),
-    }
-    
     prefecture = request.args.get('prefecture')
     year_str = request.args.get('year')
     include_window = request.args.get('include_window', 'false').lower() == 'true'
@@ -165,19 +195,29 @@ def predict_japan_sakura():
     if not (1900 <= year <= 2100):
         return jsonify({"error": "Year must be between 1900 and 2100"}), 400
     
+    locations = get_japan_locations()
     pref_lower = prefecture.lower()
-    if pref_lower not in prefecture_coords:
+    if pref_lower not in locations:
         return jsonify({
             "error": f"Prefecture '{prefecture}' not found",
-            "available": list(prefecture_coords.keys())
+            "available": list(locations.keys())
         }), 400
     
-    lat, lon = prefecture_coords[pref_lower]
+    lat, lon = locations[pref_lower]
     
     try:
-        predictor = get_sakura_predictor(models_dir='app/models')
+        predictor = get_sakura_predictor()
         
-        if include_window:
+        # Precomputed raster when it covers this year, model run otherwise
+        prediction = predictor.predict_from_raster(
+            latitude=lat,
+            longitude=lon,
+            year=year,
+            use_japan_model=True,
+            include_window=include_window
+        )
+        
+        if prediction is None and include_window:
             prediction = predictor.predict_bloom_window(
                 latitude=lat,
                 longitude=lon,
@@ -185,7 +225,7 @@ def predict_japan_sakura():
                 species="Prunus × yedoensis",
                 environmental_data=None
             )
-        else:
+        elif prediction is None:
             prediction = predictor.predict_bloom_date(
                 latitude=lat,
                 longitude=lon,
@@ -217,6 +257,8 @@ def batch_predict_sakura():
             {"latitude": 34.69, "longitude": 135.50, "name": "Osaka"}
         ]
     }
+    
+    Up to config.MAX_BATCH_LOCATIONS locations are predicted in one batch.
     """
     try:
         data = request.get_json()
@@ -235,8 +277,10 @@ def batch_predict_sakura():
         
         if not isinstance(locations, list):
             return jsonify({"error": "locations must be a list"}), 400
+        if len(locations) > config.MAX_BATCH_LOCATIONS:
+            return jsonify({"error": f"At most {config.MAX_BATCH_LOCATIONS} locations per request"}), 400
         
-        predictor = get_sakura_predictor(models_dir='app/models')
+        predictor = get_sakura_predictor()
         
         predictions = predictor.batch_predict(
             locations=locations,
@@ -257,6 +301,118 @@ def batch_predict_sakura():
         return jsonify({"error": f"Batch prediction error: {str(e)}"}), 500
 
 
+@sakura_bp.route('/predict/matrix', methods=['POST'])
+def matrix_predict_sakura():
+    """
+    Predict sakura bloom day of year for every location × year × species
+    
+    Request JSON:
+    {
+        "locations": [
+            {"latitude": 35.68, "longitude": 139.65, "name": "Tokyo"},
+            {"latitude": 34.69, "longitude": 135.50, "name": "Osaka"}
+        ],
+        "years": {"start": 2000, "end": 2030},  // or a list: [2024, 2025]
+        "species": ["Prunus × yedoensis", "Prunus serrulata"]  // optional
+    }
+    
+    Returns columnar arrays indexed [location][year][species]: bloom_day_of_year
+    (null where no model was available), confidence and model (index into
+    "models"). Up to config.MAX_MATRIX_CELLS cells per request.
+    """
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+        
+        for field in ('locations', 'years'):
+            if field not in data:
+                return jsonify({"error": f"Missing required field: {field}"}), 400
+        
+        locations = data['locations']
+        if not isinstance(locations, list) or not locations:
+            return jsonify({"error": "locations must be a non-empty list"}), 400
+        
+        # Year ranges are bounds-checked before being expanded
+        years = data['years']
+        year_range = None
+        if isinstance(years, dict):
+            if 'start' not in years or 'end' not in years:
+                return jsonify({"error": "years range needs start and end"}), 400
+            year_range = (int(years['start']), int(years['end']))
+            if not (1900 <= year_range[0] <= 2100 and 1900 <= year_range[1] <= 2100):
+                return jsonify({"error": "Years must be between 1900 and 2100"}), 400
+            if year_range[0] > year_range[1]:
+                return jsonify({"error": "years range start must not be after end"}), 400
+            n_years = year_range[1] - year_range[0] + 1
+        elif isinstance(years, list):
+            years = [int(year) for year in years]
+            if not years:
+                return jsonify({"error": "years must not be empty"}), 400
+            if not all(1900 <= year <= 2100 for year in years):
+                return jsonify({"error": "Years must be between 1900 and 2100"}), 400
+            n_years = len(years)
+        else:
+            return jsonify({"error": "years must be a list or {\"start\", \"end\"}"}), 400
+        
+        species = data.get('species', ['Prunus × yedoensis'])
+        if isinstance(species, str):
+            species = [species]
+        if not isinstance(species, list) or not species:
+            return jsonify({"error": "species must be a non-empty list"}), 400
+        if not all(isinstance(name, str) and name.strip() for name in species):
+            return jsonify({"error": "species entries must be non-empty strings"}), 400
+        
+        cells = len(locations) * n_years * len(species)
+        if cells > config.MAX_MATRIX_CELLS:
+            return jsonify({
+                "error": f"At most {config.MAX_MATRIX_CELLS} location × year × species cells per request "
+                         f"(requested {cells})"
+            }), 400
+        if year_range is not None:
+            years = list(range(year_range[0], year_range[1] + 1))
+        
+        latitudes = np.array([float(loc['latitude']) for loc in locations])
+        longitudes = np.array([float(loc['longitude']) for loc in locations])
+        if not ((-90 <= latitudes) & (latitudes <= 90)).all():
+            return jsonify({"error": "Latitude must be between -90 and 90"}), 400
+        if not ((-180 <= longitudes) & (longitudes <= 180)).all():
+            return jsonify({"error": "Longitude must be between -180 and 180"}), 400
+        
+        predictor = get_sakura_predictor()
+        
+        result = predictor.predict_matrix(
+            latitudes=latitudes,
+            longitudes=longitudes,
+            years=years,
+            species=species
+        )
+        
+        ok = result['ok']
+        bloom_day = np.where(ok, result['bloom_day_of_year'], None)
+        confidence = np.where(ok, np.round(result['confidence'], 3), None)
+        
+        return jsonify({
+            "locations": [
+                {"latitude": float(lat), "longitude": float(lon), "name": loc.get('name')}
+                for loc, lat, lon in zip(locations, latitudes, longitudes)
+            ],
+            "years": years,
+            "species": species,
+            "shape": list(ok.shape),
+            "models": result['models'],
+            "bloom_day_of_year": bloom_day.tolist(),
+            "confidence": confidence.tolist(),
+            "model": result['model_index'].tolist()
+        })
+        
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid input: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Matrix prediction error: {str(e)}"}), 500
+
+
 @sakura_bp.route('/features/<model_type>', methods=['GET'])
 def get_feature_importance(model_type):
     """
@@ -280,7 +436,7 @@ def get_feature_importance(model_type):
         return jsonify({"error": "top_n must be between 1 and 100"}), 400
     
     try:
-        predictor = get_sakura_predictor(models_dir='app/models')
+        predictor = get_sakura_predictor()
         importance_df = predictor.get_feature_importance(model_type=model_type)
         
         # Convert to dict
@@ -332,14 +488,19 @@ def compare_models():
         return jsonify({"error": "Year must be between 1900 and 2100"}), 400
     
     try:
-        predictor = get_sakura_predictor(models_dir='app/models')
+        predictor = get_sakura_predictor()
         
         results = {}
         
         # Try global model
         if predictor.global_model:
             try:
-                global_pred = predictor.predict_bloom_date(
+                global_pred = predictor.predict_from_raster(
+                    latitude=latitude,
+                    longitude=longitude,
+                    year=year,
+                    use_japan_model=False
+                ) or predictor.predict_bloom_date(
                     latitude=latitude,
                     longitude=longitude,
                     year=year,
@@ -353,7 +514,12 @@ def compare_models():
         # Try Japan model
         if predictor.japan_model:
             try:
-                japan_pred = predictor.predict_bloom_date(
+                japan_pred = predictor.predict_from_raster(
+                    latitude=latitude,
+                    longitude=longitude,
+                    year=year,
+                    use_japan_model=True
+                ) or predictor.predict_bloom_date(
                     latitude=latitude,
                     longitude=longitude,
                     year=year,
@@ -377,3 +543,46 @@ def compare_models():
         
     except Exception as e:
         return jsonify({"error": f"Comparison error: {str(e)}"}), 500
+
+
+@sakura_bp.route('/fronts', methods=['GET'])
+def bloom_fronts():
+    """
+    Precomputed bloom-front isolines (day-of-year contours) over Japan
+    
+    Query parameters:
+    - year: Forecast year (required)
+    - model: 'japan' or 'global' (optional, default both)
+    
+    Built by build_sakura_raster.py.
+    
+    Example: /api/sakura/fronts?year=2025&model=japan
+    """
+    year = request.args.get('year', type=int)
+    model = request.args.get('model')
+    
+    if year is None:
+        return jsonify({"error": "Missing parameter: year"}), 400
+    if model not in (None, 'japan', 'global'):
+        return jsonify({"error": "model must be 'japan' or 'global'"}), 400
+    
+    # Fronts are built next to the active models
+    try:
+        models_dir = get_sakura_predictor().models_dir
+    except Exception as e:
+        return jsonify({"error": f"Error loading sakura models: {str(e)}"}), 500
+    
+    path = os.path.abspath(os.path.join(models_dir, FRONTS_FILENAME.format(year=year)))
+    if not os.path.exists(path):
+        return jsonify({"error": f"No bloom fronts built for {year}. Run build_sakura_raster.py"}), 404
+    
+    if model is None:
+        return send_file(path, mimetype='application/geo+json')
+    
+    try:
+        with open(path, 'r') as f:
+            fronts = json.load(f)
+        fronts['features'] = [ft for ft in fronts['features'] if ft['properties']['model'] == model]
+        return jsonify(fronts)
+    except Exception as e:
+        return jsonify({"error": f"Error reading bloom fronts: {str(e)}"}), 500
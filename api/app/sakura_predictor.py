@@ -12,11 +12,60 @@ Features two models:
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import joblib
 import os
+import math
 from typing import Dict, List, Optional, Tuple
+from sklearn.preprocessing import StandardScaler
 import json
 
+try:
+    # Try relative import first (when used as module)
+    from .bloom_uncertainty import predict_with_uncertainty, DEFAULT_CONFIDENCE
+    from .bloom_raster import BloomRaster, RASTER_FILENAME
+    from .environment_store import ClimatologyStore, ENVIRONMENT_STORE_FILENAME
+    from .model_registry import ModelSlot, load_artifact, register_slot
+except ImportError:
+    # Fall back to absolute import (when run directly)
+    from bloom_uncertainty import predict_with_uncertainty, DEFAULT_CONFIDENCE
+    from bloom_raster import BloomRaster, RASTER_FILENAME
+    from environment_store import ClimatologyStore, ENVIRONMENT_STORE_FILENAME
+    from model_registry import ModelSlot, load_artifact, register_slot
+
+
+# Models used when the model registry has no sakura versions
+DEFAULT_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+# Japan approximate bounds
+JAPAN_LAT_RANGE = (24.0, 46.0)
+JAPAN_LON_RANGE = (122.0, 154.0)
+
+# Fallback environmental values when neither the request nor the
+# environmental feature provider (environment_store) has them
+JAPAN_DEFAULT_FEATURES = {
+    # Typical Japanese spring conditions
+    'temp_avg_30d': 10.0,  # °C
+    'temp_max_30d': 15.0,
+    'temp_min_30d': 5.0,
+    'precip_total_30d': 100.0,  # mm
+    'humidity_avg_30d': 70.0,  # %
+    'solar_avg_30d': 15.0,  # MJ/m²
+    'gdd_30d': 150.0,  # Growing degree days
+    'photoperiod_at_bloom': 12.0,  # hours
+    'elevation_m': 50.0,  # meters (typical for urban areas)
+}
+TEMPERATE_DEFAULT_FEATURES = {
+    # Generic temperate climate values
+    'temp_avg_30d': 8.0,
+    'temp_max_30d': 13.0,
+    'temp_min_30d': 3.0,
+    'precip_total_30d': 80.0,
+    'humidity_avg_30d': 65.0,
+    'solar_avg_30d': 12.0,
+    'gdd_30d': 120.0,
+    'photoperiod_at_bloom': 12.0,
+    'elevation_m': 100.0,
+}
+
 
 class SakuraBloomPredictor:
     """
@@ -29,20 +78,31 @@ class SakuraBloomPredictor:
     - Model selection based on location/species
     """
     
-    def __init__(self, models_dir='models'):
+    def __init__(self, models_dir='models', feature_provider=None):
         """
         Initialize Sakura Bloom Predictor
         
         Args:
             models_dir: Directory containing trained model files
+            feature_provider: EnvironmentalFeatureProvider for requests without
+                environmental_data (default: the environment store in models_dir)
         """
         self.models_dir = models_dir
         self.global_model = None
         self.japan_model = None
         self.global_scaler = None
         self.japan_scaler = None
+        self.global_quantiles = None
+        self.japan_quantiles = None
+        self.global_calibration = None
+        self.japan_calibration = None
         self.feature_columns = []
+        self.feature_index = {}
+        self.feature_medians = None
+        self.default_row = None
         self.metadata = {}
+        self.raster = None
+        self.feature_provider = feature_provider
         
         # Load models
         self._load_models()
@@ -54,10 +114,13 @@ class SakuraBloomPredictor:
         global_path = os.path.join(self.models_dir, 'sakura_global_model.pkl')
         if os.path.exists(global_path):
             try:
-                data = joblib.load(global_path)
+                data = load_artifact(global_path)
                 self.global_model = data['model']
                 self.global_scaler = data['scaler']
+                self.global_quantiles = data.get('quantile_models')
+                self.global_calibration = data.get('uncertainty_calibration')
                 self.feature_columns = data['feature_columns']
+                self.feature_medians = data.get('feature_medians')
                 self.metadata['global'] = data.get('metadata', {})
                 print(f"✓ Loaded global sakura model from {global_path}")
             except Exception as e:
@@ -69,12 +132,15 @@ class SakuraBloomPredictor:
         japan_path = os.path.join(self.models_dir, 'sakura_japan_model.pkl')
         if os.path.exists(japan_path):
             try:
-                data = joblib.load(japan_path)
+                data = load_artifact(japan_path)
                 self.japan_model = data['model']
                 self.japan_scaler = data['scaler']
+                self.japan_quantiles = data.get('quantile_models')
+                self.japan_calibration = data.get('uncertainty_calibration')
                 # Feature columns should be the same
                 if not self.feature_columns:
                     self.feature_columns = data['feature_columns']
+                    self.feature_medians = data.get('feature_medians')
                 self.metadata['japan'] = data.get('metadata', {})
                 print(f"✓ Loaded Japan sakura model from {japan_path}")
             except Exception as e:
@@ -87,6 +153,105 @@ class SakuraBloomPredictor:
                 f"No models found in {self.models_dir}. "
                 f"Please train models first using train_sakura_model.py"
             )
+        
+        self._build_feature_index()
+        
+        if self.feature_provider is None:
+            self._load_environment_store()
+        self._load_raster()
+    
+    def _build_feature_index(self):
+        """
+        Precompute everything needed to assemble and scale feature matrices
+        
+        - feature_index: column position of each feature
+        - default_row: training medians (0 for models saved without them),
+          the starting value of every feature a request doesn't supply
+        - regional defaults as (column positions, values) arrays
+        - each scaler as a (center, scale) pair, so scaling is plain array math
+        """
+        self.feature_columns = list(self.feature_columns)
+        self.feature_index = {col: j for j, col in enumerate(self.feature_columns)}
+        
+        n_features = len(self.feature_columns)
+        medians = self.feature_medians
+        if medians is not None and len(medians) == n_features:
+            self.default_row = np.nan_to_num(np.asarray(medians, dtype=float))
+        else:
+            self.default_row = np.zeros(n_features)
+        
+        self._regional_defaults = {}
+        for is_japan, defaults in ((True, JAPAN_DEFAULT_FEATURES), (False, TEMPERATE_DEFAULT_FEATURES)):
+            known = [name for name in defaults if name in self.feature_index]
+            self._regional_defaults[is_japan] = (
+                np.array([self.feature_index[name] for name in known], dtype=np.int64),
+                np.array([defaults[name] for name in known], dtype=float)
+            )
+        
+        self._scaling = {id(scaler): self._scaler_affine(scaler, n_features)
+                         for scaler in (self.global_scaler, self.japan_scaler) if scaler is not None}
+    
+    @staticmethod
+    def _scaler_affine(scaler, n_features):
+        """(center, scale) arrays of a StandardScaler, None for other scalers"""
+        if not isinstance(scaler, StandardScaler) or getattr(scaler, 'n_features_in_', n_features) != n_features:
+            return None
+        center = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+        return np.array(center, dtype=float), np.array(scale, dtype=float)
+    
+    def _scale(self, scaler, X: np.ndarray) -> np.ndarray:
+        """Scale a feature matrix without building a DataFrame"""
+        affine = self._scaling.get(id(scaler))
+        if affine is None:
+            return scaler.transform(pd.DataFrame(X, columns=self.feature_columns))
+        center, scale = affine
+        return (X - center) / scale
+    
+    def _load_environment_store(self):
+        """Load the cached environmental feature store (train_sakura_model.py), if present"""
+        store_path = os.path.join(self.models_dir, ENVIRONMENT_STORE_FILENAME)
+        if not os.path.exists(store_path):
+            return
+        
+        try:
+            self.feature_provider = ClimatologyStore.load(store_path)
+            print(f"✓ Loaded environment store from {store_path} "
+                  f"({self.feature_provider.metadata.get('cells')} cells, "
+                  f"{len(self.feature_provider.columns)} features)")
+        except Exception as e:
+            print(f"⚠ Failed to load environment store: {e}")
+    
+    def _load_raster(self):
+        """Load the precomputed Japan bloom-date raster (build_sakura_raster.py), if current"""
+        raster_path = os.path.join(self.models_dir, RASTER_FILENAME)
+        if not os.path.exists(raster_path):
+            return
+        
+        try:
+            raster = BloomRaster.load(raster_path)
+        except Exception as e:
+            print(f"⚠ Failed to load bloom raster: {e}")
+            return
+        
+        # A raster built from older models would serve stale predictions
+        trained = raster.metadata.get('trained_dates', {})
+        for model in raster.models:
+            if trained.get(model) != self.metadata.get(model, {}).get('trained_date'):
+                print(f"⚠ Bloom raster is older than the {model} model, ignoring it "
+                      f"(rebuild with build_sakura_raster.py)")
+                return
+        
+        # Same for a raster built from different environmental features
+        environment = getattr(self.feature_provider, 'version', None)
+        if raster.metadata.get('environment') != environment:
+            print("⚠ Bloom raster was built with different environmental features, ignoring it "
+                  "(rebuild with build_sakura_raster.py)")
+            return
+        
+        self.raster = raster
+        print(f"✓ Loaded bloom raster from {raster_path} "
+              f"(years {raster.years[0]}-{raster.years[-1]}, models: {', '.join(raster.models)})")
     
     def predict_bloom_date(
         self,
@@ -116,70 +281,19 @@ class SakuraBloomPredictor:
             - model_used: Which model was used
         """
         
-        # Determine which model to use
-        is_japan = self._is_japan_location(latitude, longitude, species)
-        
-        if use_japan_model is None:
-            use_japan_model = is_japan
-        
-        # Select model and scaler
-        if use_japan_model and self.japan_model:
-            model = self.japan_model
-            scaler = self.japan_scaler
-            model_name = "Japan-specific"
-        elif self.global_model:
-            model = self.global_model
-            scaler = self.global_scaler
-            model_name = "Global"
-        else:
-            raise RuntimeError("No suitable model available for prediction")
-        
-        # Prepare features
-        features = self._prepare_prediction_features(
-            latitude=latitude,
-            longitude=longitude,
+        result = self._predict_arrays(
+            latitudes=np.array([latitude], dtype=float),
+            longitudes=np.array([longitude], dtype=float),
             year=year,
             species=species,
-            environmental_data=environmental_data
+            environmental_data=[environmental_data],
+            use_japan_model=use_japan_model
         )
         
-        # Ensure all required features are present
-        feature_df = pd.DataFrame([features])
-        for col in self.feature_columns:
-            if col not in feature_df.columns:
-                feature_df[col] = 0  # Default value for missing features
-        
-        # Reorder columns to match training
-        feature_df = feature_df[self.feature_columns]
-        
-        # Scale features
-        X_scaled = scaler.transform(feature_df)
-        
-        # Make prediction
-        bloom_day = model.predict(X_scaled)[0]
+        if not result['ok'][0]:
+            raise result['errors'][0] or RuntimeError("No suitable model available for prediction")
         
-        # Convert to date
-        bloom_date = self._day_of_year_to_date(int(round(bloom_day)), year)
-        
-        # Calculate confidence (based on model's prediction consistency)
-        # For ensemble models, we can use the variance across trees
-        confidence = self._calculate_confidence(model, X_scaled)
-        
-        return {
-            'bloom_day_of_year': int(round(bloom_day)),
-            'bloom_date': bloom_date.strftime('%Y-%m-%d'),
-            'bloom_month': bloom_date.month,
-            'bloom_day': bloom_date.day,
-            'year': year,
-            'model_used': model_name,
-            'confidence': confidence,
-            'location': {
-                'latitude': latitude,
-                'longitude': longitude
-            },
-            'species': species,
-            'is_japan_location': is_japan
-        }
+        return self._prediction_dict(result, 0, latitude, longitude, year, species)
     
     def predict_bloom_window(
         self,
@@ -204,19 +318,23 @@ class SakuraBloomPredictor:
         Returns:
             Dictionary with prediction and date range
         """
-        prediction = self.predict_bloom_date(
-            latitude=latitude,
-            longitude=longitude,
+        # Prediction, confidence and window width come from the same model pass
+        result = self._predict_arrays(
+            latitudes=np.array([latitude], dtype=float),
+            longitudes=np.array([longitude], dtype=float),
             year=year,
             species=species,
-            environmental_data=environmental_data
+            environmental_data=[environmental_data],
+            window_days=window_days
         )
         
-        bloom_date = datetime.strptime(prediction['bloom_date'], '%Y-%m-%d')
+        if not result['ok'][0]:
+            raise result['errors'][0] or RuntimeError("No suitable model available for prediction")
+        
+        prediction = self._prediction_dict(result, 0, latitude, longitude, year, species)
         
-        # Adjust window based on confidence
-        adjusted_window = int(window_days * (1 - prediction['confidence']))
-        adjusted_window = max(3, min(adjusted_window, 14))  # Between 3 and 14 days
+        bloom_date = datetime.strptime(prediction['bloom_date'], '%Y-%m-%d')
+        adjusted_window = int(result['window_days'][0])
         
         early_date = bloom_date - timedelta(days=adjusted_window)
         late_date = bloom_date + timedelta(days=adjusted_window)
@@ -230,6 +348,80 @@ class SakuraBloomPredictor:
         
         return prediction
     
+    def predict_from_raster(
+        self,
+        latitude: float,
+        longitude: float,
+        year: int,
+        use_japan_model: bool = True,
+        include_window: bool = False,
+        species: str = "Prunus × yedoensis"
+    ) -> Optional[Dict]:
+        """
+        Bloom prediction read from the precomputed Japan raster
+        
+        Same response as predict_bloom_date (or predict_bloom_window with
+        include_window) for default environmental data, interpolated from the
+        grid instead of running the model.
+        
+        Args:
+            latitude: Latitude of location
+            longitude: Longitude of location
+            year: Year to predict for
+            use_japan_model: Use the Japan model layer (global otherwise)
+            include_window: Add the bloom_window block
+            species: Scientific name of species
+            
+        Returns:
+            Prediction dictionary, or None when the raster does not cover the
+            location, year or model
+        """
+        if self.raster is None:
+            return None
+        
+        # Same model choice as _predict_arrays
+        if use_japan_model and self.japan_model is not None:
+            model, model_name = 'japan', "Japan-specific"
+        elif self.global_model is not None:
+            model, model_name = 'global', "Global"
+        else:
+            return None
+        
+        values = self.raster.lookup(model, year, latitude, longitude)
+        if values is None:
+            return None
+        
+        bloom_day = values['bloom_day_of_year']
+        bloom_date = self._day_of_year_to_date(bloom_day, year)
+        
+        prediction = {
+            'bloom_day_of_year': bloom_day,
+            'bloom_date': bloom_date.strftime('%Y-%m-%d'),
+            'bloom_month': bloom_date.month,
+            'bloom_day': bloom_date.day,
+            'year': year,
+            'model_used': model_name,
+            'confidence': values['confidence'],
+            'location': {
+                'latitude': latitude,
+                'longitude': longitude
+            },
+            'species': species,
+            'is_japan_location': self._is_japan_location(latitude, longitude, species),
+            'source': 'precomputed_raster'
+        }
+        
+        if include_window:
+            adjusted_window = values['window_days']
+            prediction['bloom_window'] = {
+                'early_date': (bloom_date - timedelta(days=adjusted_window)).strftime('%Y-%m-%d'),
+                'peak_date': bloom_date.strftime('%Y-%m-%d'),
+                'late_date': (bloom_date + timedelta(days=adjusted_window)).strftime('%Y-%m-%d'),
+                'window_days': adjusted_window * 2
+            }
+        
+        return prediction
+    
     def batch_predict(
         self,
         locations: List[Dict],
@@ -247,93 +439,317 @@ class SakuraBloomPredictor:
         Returns:
             List of prediction dictionaries
         """
-        predictions = []
+        n = len(locations)
+        latitudes = np.full(n, np.nan)
+        longitudes = np.full(n, np.nan)
+        errors = [None] * n
         
-        for loc in locations:
+        # Pull coordinates out of the request dicts
+        for i, loc in enumerate(locations):
             try:
-                pred = self.predict_bloom_date(
-                    latitude=loc['latitude'],
-                    longitude=loc['longitude'],
-                    year=year,
-                    species=species,
-                    environmental_data=loc.get('environmental_data')
-                )
-                pred['location_name'] = loc.get('name', 'Unknown')
-                predictions.append(pred)
+                latitudes[i] = float(loc['latitude'])
+                longitudes[i] = float(loc['longitude'])
             except Exception as e:
-                print(f"⚠ Failed to predict for {loc}: {e}")
-                predictions.append({
-                    'location_name': loc.get('name', 'Unknown'),
-                    'error': str(e)
-                })
+                errors[i] = e
+        
+        valid = np.array([e is None for e in errors], dtype=bool)
+        index = np.flatnonzero(valid)
+        
+        result = self._predict_arrays(
+            latitudes=latitudes[valid],
+            longitudes=longitudes[valid],
+            year=year,
+            species=species,
+            environmental_data=[locations[i].get('environmental_data') for i in index]
+        )
+        
+        for k in np.flatnonzero(~result['ok']):
+            errors[index[k]] = result['errors'][k] or RuntimeError("No suitable model available for prediction")
+        
+        predictions = [None] * n
+        for k, i in enumerate(index):
+            if errors[i] is None:
+                pred = self._prediction_dict(result, k, locations[i]['latitude'], locations[i]['longitude'], year, species)
+                pred['location_name'] = locations[i].get('name', 'Unknown')
+                predictions[i] = pred
+        
+        for i, error in enumerate(errors):
+            if error is not None:
+                loc = locations[i]
+                name = loc.get('name', 'Unknown') if isinstance(loc, dict) else 'Unknown'
+                print(f"⚠ Failed to predict for {loc}: {error}")
+                predictions[i] = {
+                    'location_name': name,
+                    'error': str(error)
+                }
         
         return predictions
     
-    def _prepare_prediction_features(
+    def _predict_arrays(
         self,
-        latitude: float,
-        longitude: float,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
         year: int,
         species: str,
-        environmental_data: Optional[Dict]
+        environmental_data: List[Optional[Dict]],
+        use_japan_model: bool = None,
+        window_days: int = 7
     ) -> Dict:
         """
-        Prepare feature dictionary for prediction
+        Predict bloom dates for many locations at once
+        
+        Builds one feature matrix, then scales each model's rows and gets
+        predictions, confidence and window widths from one uncertainty pass
+        per model (Japan-specific and global).
         
         Args:
-            latitude: Latitude
-            longitude: Longitude
-            year: Year
-            species: Species name
-            environmental_data: Optional environmental data
+            latitudes: Latitudes (N,)
+            longitudes: Longitudes (N,)
+            year: Year to predict for
+            species: Scientific name of species
+            environmental_data: Per-location environmental features (or None)
+            use_japan_model: Force Japan model on/off (auto-detected if None)
+            window_days: Base bloom window size (see predict_with_uncertainty)
             
         Returns:
-            Dictionary of features
+            Dictionary of arrays: bloom_day, bloom_date (strings), bloom_month,
+            bloom_day_of_month, confidence, window_days (half-width), model_used,
+            is_japan, ok (False where no model was available or the features
+            were invalid) and errors
         """
-        features = {}
+        n = len(latitudes)
+        is_japan = self._is_japan_mask(latitudes, longitudes, species)
+        use_japan = is_japan if use_japan_model is None else np.full(n, bool(use_japan_model))
+        
+        X, errors = self._prepare_feature_matrix(latitudes, longitudes, year, species, environmental_data, is_japan)
+        ok = np.array([e is None for e in errors], dtype=bool)
+        
+        scores = self._score_feature_matrix(X, use_japan, ok, window_days)
+        bloom_day = scores['bloom_day']
+        
+        # Convert to dates
+        dates = pd.Timestamp(year=year, month=1, day=1) + pd.to_timedelta(bloom_day - 1, unit='D')
+        
+        return {
+            'bloom_day': bloom_day,
+            'bloom_date': np.asarray(dates.strftime('%Y-%m-%d')),
+            'bloom_month': np.asarray(dates.month),
+            'bloom_day_of_month': np.asarray(dates.day),
+            'confidence': scores['confidence'],
+            'window_days': scores['window_days'],
+            'model_used': scores['model_used'],
+            'is_japan': is_japan,
+            'ok': scores['ok'],
+            'errors': errors
+        }
+    
+    def _score_feature_matrix(self, X: np.ndarray, use_japan: np.ndarray, ok: np.ndarray,
+                              window_days: int = 7) -> Dict:
+        """
+        Score a feature matrix with one uncertainty pass per model
+        
+        Args:
+            X: Feature matrix (N, F) in feature_columns order
+            use_japan: Rows that should use the Japan-specific model
+            ok: Rows with valid features
+            window_days: Base bloom window size
+            
+        Returns:
+            Dictionary of arrays (N,): bloom_day, confidence, window_days,
+            model_used and ok (False where no model was available)
+        """
+        n = len(X)
+        bloom_day = np.zeros(n, dtype=np.int64)
+        confidence = np.full(n, DEFAULT_CONFIDENCE)
+        window = np.zeros(n, dtype=np.int64)
+        model_used = np.full(n, None, dtype=object)
+        
+        # Select model and scaler per location
+        japan_rows = ok & use_japan & (self.japan_model is not None)
+        global_rows = ok & ~japan_rows & (self.global_model is not None)
+        ok = ok & (japan_rows | global_rows)
+        
+        for rows, model, scaler, quantiles, calibration, model_name in (
+            (japan_rows, self.japan_model, self.japan_scaler, self.japan_quantiles, self.japan_calibration,
+             "Japan-specific"),
+            (global_rows, self.global_model, self.global_scaler, self.global_quantiles, self.global_calibration,
+             "Global"),
+        ):
+            if not rows.any():
+                continue
+            
+            # Scale features and predict the whole group in one shot
+            X_scaled = self._scale(scaler, X[rows])
+            estimate = predict_with_uncertainty(model, X_scaled, quantiles, window_days, calibration)
+            bloom_day[rows] = np.rint(estimate['prediction']).astype(np.int64)
+            confidence[rows] = estimate['confidence']
+            window[rows] = estimate['window_days']
+            model_used[rows] = model_name
+        
+        return {
+            'bloom_day': bloom_day,
+            'confidence': confidence,
+            'window_days': window,
+            'model_used': model_used,
+            'ok': ok
+        }
+    
+    def predict_matrix(
+        self,
+        latitudes,
+        longitudes,
+        years: List[int],
+        species: List[str]
+    ) -> Dict:
+        """
+        Predict bloom day of year for every location × year × species
+        
+        The cartesian feature tensor is built once (default environmental
+        values) and scored in a single batch per model.
+        
+        Args:
+            latitudes: Location latitudes (L,)
+            longitudes: Location longitudes (L,)
+            years: Years to predict for (Y,)
+            species: Scientific names of species (S,)
+            
+        Returns:
+            Dictionary of (L, Y, S) arrays: bloom_day_of_year, confidence,
+            model_index (into 'models', -1 where no model was available) and
+            ok, plus the 'models' name list
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        years = np.asarray(years, dtype=np.int64)
+        shape = (len(latitudes), len(years), len(species))
+        
+        # Japan model choice depends on location and species only: (L, S)
+        is_japan = np.column_stack([self._is_japan_mask(latitudes, longitudes, sp) for sp in species]) \
+            if len(species) else np.zeros((len(latitudes), 0), dtype=bool)
+        
+        # Flatten the (L, Y, S) tensor in C order
+        lat_rows = np.broadcast_to(latitudes[:, None, None], shape).ravel()
+        lon_rows = np.broadcast_to(longitudes[:, None, None], shape).ravel()
+        year_rows = np.broadcast_to(years[None, :, None], shape).ravel()
+        japan_rows = np.broadcast_to(is_japan[:, None, :], shape).ravel()
+        
+        X, _ = self._prepare_feature_matrix(lat_rows, lon_rows, year_rows, None, None, japan_rows)
+        scores = self._score_feature_matrix(X, japan_rows, np.ones(len(X), dtype=bool))
+        
+        models = ["Japan-specific", "Global"]
+        model_index = np.full(len(X), -1, dtype=np.int64)
+        for i, name in enumerate(models):
+            model_index[scores['model_used'] == name] = i
+        
+        return {
+            'bloom_day_of_year': scores['bloom_day'].reshape(shape),
+            'confidence': scores['confidence'].reshape(shape),
+            'model_index': model_index.reshape(shape),
+            'ok': scores['ok'].reshape(shape),
+            'models': models
+        }
+    
+    @staticmethod
+    def _prediction_dict(result: Dict, k: int, latitude, longitude, year: int, species: str) -> Dict:
+        """Prediction response for row k of a _predict_arrays result"""
+        return {
+            'bloom_day_of_year': int(result['bloom_day'][k]),
+            'bloom_date': str(result['bloom_date'][k]),
+            'bloom_month': int(result['bloom_month'][k]),
+            'bloom_day': int(result['bloom_day_of_month'][k]),
+            'year': year,
+            'model_used': result['model_used'][k],
+            'confidence': float(result['confidence'][k]),
+            'location': {
+                'latitude': latitude,
+                'longitude': longitude
+            },
+            'species': species,
+            'is_japan_location': bool(result['is_japan'][k])
+        }
+    
+    def _prepare_feature_matrix(
+        self,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        year,
+        species: str,
+        environmental_data: Optional[List[Optional[Dict]]],
+        is_japan: np.ndarray
+    ) -> Tuple[np.ndarray, List[Optional[Exception]]]:
+        """
+        Assemble the (N, F) feature matrix in feature_columns order
+        
+        Environmental features come from the request, then the feature
+        provider, then the regional defaults (rows with environmental_data
+        skip the defaults); anything still missing keeps its training median.
+        `year` may be one year or a per-row array; environmental_data None
+        means no request values for any row.
+        
+        Returns:
+            (feature matrix, per-row error or None for invalid coordinates
+            or environmental data, including unknown feature names)
+        """
+        n = len(latitudes)
+        X = np.repeat(self.default_row[np.newaxis, :], n, axis=0)
+        errors = [None] * n
+        
+        # NaN/inf or out-of-range coordinates fail their own row only
+        valid_coords = (np.isfinite(latitudes) & np.isfinite(longitudes) &
+                        (np.abs(latitudes) <= 90) & (np.abs(longitudes) <= 180))
+        for i in np.flatnonzero(~valid_coords):
+            errors[i] = ValueError("Latitude must be between -90 and 90 and longitude between -180 and 180")
+        
+        def set_column(name, values, rows=slice(None)):
+            j = self.feature_index.get(name)
+            if j is not None:
+                X[rows, j] = values
         
         # Basic location and time features
-        features['latitude'] = latitude
-        features['longitude'] = longitude
-        features['year'] = year
-        features['year_normalized'] = (year - 1970) / (2024 - 1970)  # Normalize to 0-1
-        
-        # If environmental data is provided, use it
-        if environmental_data:
-            features.update(environmental_data)
+        set_column('latitude', latitudes)
+        set_column('longitude', longitudes)
+        set_column('year', year)
+        set_column('year_normalized', (year - 1970) / (2024 - 1970))  # Normalize to 0-1
+        
+        # Default environmental values for rows without environmental data
+        if environmental_data is None:
+            has_env = np.zeros(n, dtype=bool)
         else:
-            # Use default/estimated values based on location and time
-            # In production, you'd fetch this from Earth Engine or weather APIs
-            
-            # Estimate typical values for Japan (if Japan location)
-            if self._is_japan_location(latitude, longitude, species):
-                # Typical Japanese spring conditions
-                features.update({
-                    'temp_avg_30d': 10.0,  # °C
-                    'temp_max_30d': 15.0,
-                    'temp_min_30d': 5.0,
-                    'precip_total_30d': 100.0,  # mm
-                    'humidity_avg_30d': 70.0,  # %
-                    'solar_avg_30d': 15.0,  # MJ/m²
-                    'gdd_30d': 150.0,  # Growing degree days
-                    'photoperiod_at_bloom': 12.0,  # hours
-                    'elevation_m': 50.0,  # meters (typical for urban areas)
-                })
-            else:
-                # Generic temperate climate values
-                features.update({
-                    'temp_avg_30d': 8.0,
-                    'temp_max_30d': 13.0,
-                    'temp_min_30d': 3.0,
-                    'precip_total_30d': 80.0,
-                    'humidity_avg_30d': 65.0,
-                    'solar_avg_30d': 12.0,
-                    'gdd_30d': 120.0,
-                    'photoperiod_at_bloom': 12.0,
-                    'elevation_m': 100.0,
-                })
-        
-        return features
+            has_env = np.array([bool(env) for env in environmental_data], dtype=bool)
+        for region, rows in ((True, ~has_env & is_japan), (False, ~has_env & ~is_japan)):
+            columns, values = self._regional_defaults[region]
+            if rows.any() and len(columns):
+                X[np.ix_(rows, columns)] = values
+        
+        # Cached environmental features for all rows in one bulk lookup
+        if self.feature_provider is not None and valid_coords.any():
+            rows = np.flatnonzero(valid_coords)
+            values = self.feature_provider.features(latitudes[rows], longitudes[rows],
+                                                    np.broadcast_to(year, n)[rows])
+            for k, name in enumerate(self.feature_provider.columns):
+                j = self.feature_index.get(name)
+                if j is not None:
+                    known = ~np.isnan(values[:, k])
+                    X[rows[known], j] = values[known, k]
+        
+        # Provided environmental data overrides (as dict.update did per location)
+        for i in np.flatnonzero(has_env):
+            env = environmental_data[i]
+            try:
+                if not isinstance(env, dict):
+                    raise ValueError("environmental_data must be an object")
+                unknown = [name for name in env if name not in self.feature_index]
+                if unknown:
+                    raise ValueError(f"Unknown environmental features: {', '.join(map(str, unknown))}")
+                values = [float(value) for value in env.values()]
+                non_finite = [name for name, value in zip(env, values) if not math.isfinite(value)]
+                if non_finite:
+                    raise ValueError(f"Non-finite environmental features: {', '.join(map(str, non_finite))}")
+                X[i, [self.feature_index[name] for name in env]] = values
+            except (TypeError, ValueError) as e:
+                errors[i] = e
+        
+        return X, errors
     
     def _is_japan_location(self, latitude: float, longitude: float, species: str) -> bool:
         """
@@ -347,9 +763,8 @@ class SakuraBloomPredictor:
         Returns:
             True if location is in Japan
         """
-        # Japan approximate bounds
-        japan_lat_min, japan_lat_max = 24.0, 46.0
-        japan_lon_min, japan_lon_max = 122.0, 154.0
+        japan_lat_min, japan_lat_max = JAPAN_LAT_RANGE
+        japan_lon_min, japan_lon_max = JAPAN_LON_RANGE
         
         is_japan_coords = (
             japan_lat_min <= latitude <= japan_lat_max and
@@ -360,6 +775,20 @@ class SakuraBloomPredictor:
         
         return is_japan_coords or is_sakura
     
+    def _is_japan_mask(self, latitudes: np.ndarray, longitudes: np.ndarray, species: str) -> np.ndarray:
+        """Vectorized _is_japan_location for arrays of coordinates"""
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        
+        is_japan_coords = (
+            (JAPAN_LAT_RANGE[0] <= latitudes) & (latitudes <= JAPAN_LAT_RANGE[1]) &
+            (JAPAN_LON_RANGE[0] <= longitudes) & (longitudes <= JAPAN_LON_RANGE[1])
+        )
+        
+        is_sakura = 'yedoensis' in species.lower() or 'somei' in species.lower()
+        
+        return is_japan_coords | is_sakura
+    
     def _day_of_year_to_date(self, day_of_year: int, year: int) -> datetime:
         """
         Convert day of year to actual date
@@ -373,50 +802,6 @@ class SakuraBloomPredictor:
         """
         return datetime(year, 1, 1) + timedelta(days=day_of_year - 1)
     
-    def _calculate_confidence(self, model, X_scaled: np.ndarray) -> float:
-        """
-        Calculate prediction confidence
-        
-        For Gradient Boosting, we can use the variance across staged predictions
-        
-        Args:
-            model: Trained model
-            X_scaled: Scaled features
-            
-        Returns:
-            Confidence score between 0 and 1
-        """
-        try:
-            # For GradientBoostingRegressor, check prediction variance across stages
-            if hasattr(model, 'estimators_'):
-                # Sample predictions from different stages
-                n_estimators = len(model.estimators_)
-                sample_stages = [
-                    int(n_estimators * 0.5),
-                    int(n_estimators * 0.75),
-                    int(n_estimators * 1.0) - 1
-                ]
-                
-                predictions = []
-                for stage in sample_stages:
-                    pred = model.predict(X_scaled, n_iter=stage + 1)[0]
-                    predictions.append(pred)
-                
-                # Lower variance = higher confidence
-                variance = np.var(predictions)
-                
-                # Map variance to confidence (inverse relationship)
-                # Variance of 10 days = low confidence (0.3)
-                # Variance of 1 day = high confidence (0.9)
-                confidence = 1.0 / (1.0 + variance / 5.0)
-                
-                return min(0.95, max(0.3, confidence))
-        except:
-            pass
-        
-        # Default moderate confidence
-        return 0.7
-    
     def get_model_info(self) -> Dict:
         """
         Get information about loaded models
@@ -437,6 +822,9 @@ class SakuraBloomPredictor:
         if self.japan_model:
             info['models_loaded'].append('japan')
         
+        if self.feature_provider is not None:
+            info['environment'] = getattr(self.feature_provider, 'metadata', {})
+        
         return info
     
     def get_feature_importance(self, model_type: str = 'global') -> pd.DataFrame:
@@ -465,22 +853,31 @@ class SakuraBloomPredictor:
         return importance_df
 
 
-# Global predictor instance (singleton pattern)
+# Predictor for an explicit models_dir (scripts), and the registry-backed slot (API)
 _predictor_instance = None
+_sakura_slot = register_slot(ModelSlot(
+    'sakura',
+    loader=lambda version_dir, manifest: SakuraBloomPredictor(models_dir=version_dir),
+    fallback=lambda: SakuraBloomPredictor(models_dir=DEFAULT_MODELS_DIR)
+))
 
 
-def get_sakura_predictor(models_dir: str = 'models') -> SakuraBloomPredictor:
+def get_sakura_predictor(models_dir: Optional[str] = None) -> SakuraBloomPredictor:
     """
-    Get or create global sakura predictor instance
+    Get the sakura predictor instance
     
     Args:
-        models_dir: Directory containing models
+        models_dir: Directory containing models; None uses the active version
+            in the model registry (app/models when nothing is published)
         
     Returns:
         SakuraBloomPredictor instance
     """
     global _predictor_instance
     
+    if models_dir is None:
+        return _sakura_slot.get()
+    
     if _predictor_instance is None:
         _predictor_instance = SakuraBloomPredictor(models_dir=models_dir)
     
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Build the precomputed sakura bloom-date raster and bloom-front isolines
+
+This script:
+1. Loads the trained sakura models (app/models)
+2. Evaluates the Japan and global models on a dense grid over Japan for each
+   forecast year
+3. Saves the grid as a compressed array (served by /api/sakura/predict/japan
+   and /api/sakura/compare/models via bilinear interpolation)
+4. Exports bloom-front isolines (day-of-year contours) as GeoJSON per year
+   (served by /api/sakura/fronts)
+
+Usage:
+    python build_sakura_raster.py [--years 2025 2026] [--resolution 0.05]
+"""
+
+import sys
+import os
+import argparse
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ml', 'src'))
+
+from bloom_raster import (DEFAULT_RESOLUTION, FRONTS_FILENAME, ISOLINE_INTERVAL_DAYS, RASTER_FILENAME,
+                          build_bloom_raster, write_bloom_fronts)
+from sakura_predictor import SakuraBloomPredictor
+
+
+def main():
+    this_year = datetime.now().year
+    
+    parser = argparse.ArgumentParser(description='Build the precomputed sakura bloom raster and fronts')
+    parser.add_argument('--models-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'models'),
+                        help='Directory with the trained models (outputs are written here too)')
+    parser.add_argument('--years', type=int, nargs='+', default=[this_year, this_year + 1],
+                        help='Forecast years (default: this year and next)')
+    parser.add_argument('--resolution', type=float, default=DEFAULT_RESOLUTION,
+                        help='Grid spacing in degrees (default: 0.05)')
+    parser.add_argument('--interval', type=int, default=ISOLINE_INTERVAL_DAYS,
+                        help='Days between bloom-front isolines (default: 5)')
+    args = parser.parse_args()
+    
+    print("=" * 80)
+    print(" BUILD SAKURA BLOOM RASTER")
+    print("=" * 80)
+    
+    print(f"\n[1/3] Loading models from {args.models_dir}...")
+    predictor = SakuraBloomPredictor(models_dir=args.models_dir)
+    
+    print(f"\n[2/3] Evaluating models on a {args.resolution}° grid for {args.years}...")
+    start = time.perf_counter()
+    raster = build_bloom_raster(predictor, sorted(set(args.years)), resolution=args.resolution)
+    n_cells = len(raster.lats) * len(raster.lons)
+    print(f"  ✓ {n_cells:,} cells × {len(raster.years)} years × {len(raster.models)} models "
+          f"in {time.perf_counter() - start:.1f}s")
+    
+    raster_path = os.path.join(args.models_dir, RASTER_FILENAME)
+    raster.save(raster_path)
+    print(f"  ✓ Raster saved to {raster_path} ({os.path.getsize(raster_path) / 1e6:.1f} MB)")
+    
+    print(f"\n[3/3] Tracing bloom fronts every {args.interval} days...")
+    for year in raster.years:
+        fronts_path = os.path.join(args.models_dir, FRONTS_FILENAME.format(year=year))
+        count = write_bloom_fronts(raster, year, fronts_path, interval=args.interval)
+        print(f"  ✓ {year}: {count} isolines → {fronts_path}")
+    
+    print("\n" + "=" * 80)
+    print(" ✓ RASTER BUILD COMPLETE")
+    print("=" * 80)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,10 +8,14 @@ display it on the map alongside ML predictions.
 
 import sys
 import os
+import numpy as np
 import pandas as pd
-import json
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml', 'src'))
+
+from geojson_writer import GeoJSONWriter, square_rings
+
 def csv_to_geojson(csv_file, output_file='kaggle_blooms_2024.geojson', year=2024):
     """
     Convert Kaggle CSV to GeoJSON
@@ -57,69 +61,46 @@ def csv_to_geojson(csv_file, output_file='kaggle_blooms_2024.geojson', year=2024
     df['bloom_date'] = pd.to_datetime(df['bloom_date'])
     df['bloom_day_of_year'] = df['bloom_date'].dt.dayofyear
     
-    # Create GeoJSON features
-    features = []
-    
-    for idx, row in df.iterrows():
-        lon, lat = row['lon'], row['lat']
-        offset = 0.05  # ~5km radius
-        
-        feature = {
-            "type": "Feature",
-            "id": f"kaggle_{row['location_name'].lower().replace(' ', '_')}",
-            "properties": {
-                "source": "kaggle_forecast",
-                "location_name": row['location_name'],
-                "city": row['location_name'],
-                "country": row['country'],
-                "species": "Prunus serrulata",
-                "predicted_bloom_date": row['bloom_date'].strftime('%Y-%m-%d'),
-                "bloom_day_of_year": int(row['bloom_day_of_year']),
-                "forecast_made_on": f"{year}-01-01",
-                "color": "#0066FF",  # Blue for Kaggle
-                "opacity": 0.6,
-                "display_label": f"Kaggle: {row['bloom_date'].strftime('%b %d')}"
-            },
-            "geometry": {
-                "type": "MultiPolygon",
-                "coordinates": [[[
-                    [lon - offset, lat - offset],
-                    [lon + offset, lat - offset],
-                    [lon + offset, lat + offset],
-                    [lon - offset, lat + offset],
-                    [lon - offset, lat - offset]
-                ]]]
-            }
-        }
-        
-        features.append(feature)
-    
-    # Create GeoJSON FeatureCollection
-    geojson = {
-        "type": "FeatureCollection",
-        "metadata": {
-            "source": "kaggle_cherry_blossom_forecast",
-            "description": f"Kaggle predictions for {year} cherry blossom bloom dates",
-            "locations": len(features),
-            "year": year,
-            "generated_on": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        },
-        "features": features
+    # Feature columns
+    names = df['location_name'].astype(str)
+    n = len(df)
+    properties = {
+        "source": np.full(n, "kaggle_forecast"),
+        "location_name": df['location_name'],
+        "city": df['location_name'],
+        "country": df['country'],
+        "species": np.full(n, "Prunus serrulata"),
+        "predicted_bloom_date": df['bloom_date'].dt.strftime('%Y-%m-%d'),
+        "bloom_day_of_year": df['bloom_day_of_year'].astype(int),
+        "forecast_made_on": np.full(n, f"{year}-01-01"),
+        "color": np.full(n, "#0066FF"),  # Blue for Kaggle
+        "opacity": np.full(n, 0.6),
+        "display_label": "Kaggle: " + df['bloom_date'].dt.strftime('%b %d')
+    }
+    ids = "kaggle_" + names.str.lower().str.replace(' ', '_', regex=False)
+    
+    # Polygon around each location (~5km radius)
+    rings = square_rings(df['lon'], df['lat'], 0.05)
+    
+    metadata = {
+        "source": "kaggle_cherry_blossom_forecast",
+        "description": f"Kaggle predictions for {year} cherry blossom bloom dates",
+        "locations": n,
+        "year": year,
+        "generated_on": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     }
     
     # Save GeoJSON
     script_dir = os.path.dirname(os.path.abspath(__file__))
     output_path = os.path.join(script_dir, '..', 'data', 'geojson', output_file)
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    with open(output_path, 'w') as f:
-        json.dump(geojson, f, indent=2)
+    with GeoJSONWriter(output_path, metadata=metadata) as writer:
+        writer.write_polygons(rings, properties, ids=ids)
     
     print(f"  ✓ GeoJSON saved to {output_path}")
-    print(f"  ✓ Created {len(features)} features")
+    print(f"  ✓ Created {writer.feature_count} features")
     
-    return geojson
-
+    return output_path
 
 if __name__ == '__main__':
     import argparse
@@ -8,10 +8,14 @@ import pandas as pd
 import json
 import numpy as np
 from datetime import datetime, timedelta
+import math
 import os
 import sys
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ml', 'src'))
+
+from geojson_writer import CRS84, GeoJSONWriter, regular_polygon_rings
 
 
 class CombinedGeoJSONGenerator:
@@ -83,107 +87,90 @@ class CombinedGeoJSONGenerator:
         
         return ml_df
     
-    def create_polygon_feature(self, lat, lon, name, bloom_date, bloom_day, source, 
-                              country=None, prefecture=None, radius_deg=0.05):
-        """Create a GeoJSON MultiPolygon feature matching flowering_sites.geojson format"""
-        # Family names based on source
-        family_names = {
-            'kaggle': 'Kaggle_Forecast_2024',
-            'ml_model': 'ML_Model_Prediction'
-        }
+    # Family names based on source
+    FAMILY_NAMES = {
+        'kaggle': 'Kaggle_Forecast_2024',
+        'ml_model': 'ML_Model_Prediction'
+    }
+    
+    def write_polygon_features(self, writer, lat, lon, names, bloom_dates, bloom_days, source,
+                               countries=None, prefectures=None, radius_deg=0.05):
+        """
+        Write one MultiPolygon feature per location (matching flowering_sites.geojson format)
         
-        # Create octagon polygon around point
-        import math
-        polygon_coords = []
-        num_points = 8
-        for i in range(num_points + 1):  # +1 to close the polygon
-            angle = (2 * math.pi * i) / num_points
-            point_lon = lon + (radius_deg * math.cos(angle))
-            point_lat = lat + (radius_deg * math.sin(angle))
-            polygon_coords.append([point_lon, point_lat])
+        Args:
+            writer: Open GeoJSONWriter
+            lat, lon: Coordinate columns
+            names: Site name column (used for id and Genus)
+            bloom_dates: Bloom date strings
+            bloom_days: Bloom day-of-year column
+            source: 'kaggle' or 'ml_model'
+            countries: Country column (default "Japan")
+            prefectures: Prefecture column (default None)
+            radius_deg: Octagon radius in degrees
+        """
+        n = len(names)
         
-        # Calculate approximate area (km²)
-        area_km2 = math.pi * (radius_deg * 111) ** 2  # rough conversion
+        # Octagon polygon around each point
+        rings = regular_polygon_rings(lon, lat, radius_deg, n_vertices=8)
         
-        return {
-            "type": "Feature",
-            "properties": {
-                "id": name,
-                "Family": family_names[source],
-                "Genus": name,
-                "Season": "Spring",
-                "Area": round(area_km2, 3),
-                "year": 2024,
-                "bloom_date": str(bloom_date),
-                "bloom_day": int(bloom_day),
-                "source": source,
-                "country": country or "Japan",
-                "prefecture": prefecture
-            },
-            "geometry": {
-                "type": "MultiPolygon",
-                "coordinates": [[polygon_coords]]
-            }
+        # Approximate area (km²), rough conversion
+        area_km2 = round(math.pi * (radius_deg * 111) ** 2, 3)
+        
+        properties = {
+            "id": names,
+            "Family": np.full(n, self.FAMILY_NAMES[source]),
+            "Genus": names,
+            "Season": np.full(n, "Spring"),
+            "Area": np.full(n, area_km2),
+            "year": np.full(n, 2024),
+            "bloom_date": pd.Series(bloom_dates).astype(str),
+            "bloom_day": pd.Series(bloom_days).astype(int),
+            "source": np.full(n, source),
+            "country": pd.Series(countries).fillna("Japan") if countries is not None else np.full(n, "Japan"),
+            "prefecture": prefectures if prefectures is not None else np.full(n, None)
         }
+        
+        writer.write_polygons(rings, properties)
     
     def create_combined_geojson(self, kaggle_df, ml_df, output_path):
         """Create combined GeoJSON matching flowering_sites.geojson format"""
         print("\n[3/4] Creating combined GeoJSON...")
         
-        features = []
-        
-        # Add Kaggle forecasts (Family: Kaggle_Forecast_2024)
-        if kaggle_df is not None:
-            for _, row in kaggle_df.iterrows():
-                feature = self.create_polygon_feature(
-                    lat=row['lat'],
-                    lon=row['lon'],
-                    name=row['spot_name'],
-                    bloom_date=row['bloom_date'].strftime('%Y-%m-%d'),
-                    bloom_day=row['bloom_day'],
+        with GeoJSONWriter(output_path, name="Cherry_Blossom_Predictions_2024", crs=CRS84) as writer:
+            # Add Kaggle forecasts (Family: Kaggle_Forecast_2024)
+            if kaggle_df is not None:
+                self.write_polygon_features(
+                    writer,
+                    lat=kaggle_df['lat'],
+                    lon=kaggle_df['lon'],
+                    names=kaggle_df['spot_name'],
+                    bloom_dates=kaggle_df['bloom_date'].dt.strftime('%Y-%m-%d'),
+                    bloom_days=kaggle_df['bloom_day'],
                     source='kaggle',
-                    prefecture=row['prefecture_en'],
+                    prefectures=kaggle_df['prefecture_en'],
                     radius_deg=0.03  # Smaller polygons for Kaggle (many points)
                 )
-                features.append(feature)
-            print(f"  ✓ Added {len(kaggle_df)} Kaggle forecasts (Family: Kaggle_Forecast_2024)")
-        
-        # Add ML model predictions (Family: ML_Model_Prediction)
-        if ml_df is not None:
-            for _, row in ml_df.iterrows():
-                feature = self.create_polygon_feature(
-                    lat=row['lat'],
-                    lon=row['lon'],
-                    name=row['city'],
-                    bloom_date=row['bloom_date'],
-                    bloom_day=row['bloom_day'],
+                print(f"  ✓ Added {len(kaggle_df)} Kaggle forecasts (Family: Kaggle_Forecast_2024)")
+            
+            # Add ML model predictions (Family: ML_Model_Prediction)
+            if ml_df is not None:
+                self.write_polygon_features(
+                    writer,
+                    lat=ml_df['lat'],
+                    lon=ml_df['lon'],
+                    names=ml_df['city'],
+                    bloom_dates=ml_df['bloom_date'],
+                    bloom_days=ml_df['bloom_day'],
                     source='ml_model',
-                    country=row['country'],
+                    countries=ml_df['country'],
                     radius_deg=0.08  # Larger polygons for ML predictions (fewer points)
                 )
-                features.append(feature)
-            print(f"  ✓ Added {len(ml_df)} ML predictions (Family: ML_Model_Prediction)")
-        
-        # Create GeoJSON structure matching flowering_sites.geojson
-        geojson = {
-            "type": "FeatureCollection",
-            "name": "Cherry_Blossom_Predictions_2024",
-            "crs": {
-                "type": "name",
-                "properties": {
-                    "name": "urn:ogc:def:crs:OGC:1.3:CRS84"
-                }
-            },
-            "features": features
-        }
-        
-        # Save to file
-        with open(output_path, 'w') as f:
-            json.dump(geojson, f, indent=2)
+                print(f"  ✓ Added {len(ml_df)} ML predictions (Family: ML_Model_Prediction)")
         
         print(f"  ✓ Combined GeoJSON saved to {output_path}")
         
-        return geojson
+        return writer.feature_count
     
     def create_summary_stats(self, kaggle_df, ml_df):
         """Create comparison statistics"""
@@ -246,7 +233,7 @@ def main():
     ml_df = generator.load_ml_predictions(ml_predictions_path)
     
     # Create combined GeoJSON
-    geojson = generator.create_combined_geojson(kaggle_df, ml_df, output_path)
+    feature_count = generator.create_combined_geojson(kaggle_df, ml_df, output_path)
     
     # Generate stats
     stats = generator.create_summary_stats(kaggle_df, ml_df)
@@ -255,7 +242,7 @@ def main():
     print("✓ COMBINED GEOJSON CREATED SUCCESSFULLY")
     print("=" * 70)
     print(f"\nOutput file: {output_path}")
-    print(f"Total predictions: {len(geojson['features'])}")
+    print(f"Total predictions: {feature_count}")
     print("\nGeoJSON Format: MultiPolygon (matching flowering_sites.geojson)")
     print("Family values:")
     print("  📘 Kaggle_Forecast_2024   = Kaggle forecasts")
@@ -3,7 +3,7 @@
 Evaluate Bloom Prediction Model v2 Accuracy
 
 This script provides comprehensive accuracy metrics including:
-- Cross-validation scores
+- Cross-validation scores (from cached out-of-fold predictions, see cv_evaluation)
 - Confusion matrix
 - ROC-AUC, Precision, Recall, F1-Score
 - Per-species performance
@@ -17,12 +17,14 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
 import numpy as np
 import pandas as pd
 from datetime import datetime
-from sklearn.model_selection import TimeSeriesSplit, cross_val_score
+from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import (
     accuracy_score, precision_score, recall_score, f1_score, 
     roc_auc_score, confusion_matrix, classification_report
 )
 
+from cv_evaluation import out_of_fold_predictions
+
 def evaluate_model():
     """Run comprehensive model evaluation"""
     
@@ -65,13 +67,11 @@ def evaluate_model():
     
     tscv = TimeSeriesSplit(n_splits=5)
     
-    cv_scores = {
-        'roc_auc': cross_val_score(predictor.model, X_scaled, y, cv=tscv, scoring='roc_auc', n_jobs=-1),
-        'accuracy': cross_val_score(predictor.model, X_scaled, y, cv=tscv, scoring='accuracy', n_jobs=-1),
-        'precision': cross_val_score(predictor.model, X_scaled, y, cv=tscv, scoring='precision', n_jobs=-1),
-        'recall': cross_val_score(predictor.model, X_scaled, y, cv=tscv, scoring='recall', n_jobs=-1),
-        'f1': cross_val_score(predictor.model, X_scaled, y, cv=tscv, scoring='f1', n_jobs=-1)
-    }
+    # Each fold fitted once; every CV metric comes from the out-of-fold predictions
+    oof = out_of_fold_predictions(predictor.model, X_scaled, y, cv=tscv)
+    if oof.cached:
+        print(f"  ✓ Loaded cached out-of-fold predictions ({oof.key})")
+    cv_scores = oof.classification_scores()
     
     print("\n✓ Cross-Validation Results (5 folds):")
     print("  " + "-" * 60)
@@ -123,17 +123,15 @@ def evaluate_model():
     
     prob_bins = [(0.0, 0.3), (0.3, 0.5), (0.5, 0.7), (0.7, 0.9), (0.9, 1.0)]
     
-    print("\n✓ Probability Calibration (how well probabilities match reality):")
+    print("\n✓ Probability Calibration (out-of-fold; how well probabilities match reality):")
     print("  " + "-" * 70)
     print(f"  {'Probability Range':<20} {'Predictions':<15} {'Actual Blooms':<15} {'Accuracy'}")
     print("  " + "-" * 70)
     
-    for low, high in prob_bins:
-        mask = (y_pred_proba >= low) & (y_pred_proba < high)
-        if mask.sum() > 0:
-            actual_rate = y[mask].mean()
-            count = mask.sum()
-            print(f"  {low:.0%} - {high:.0%}{'':<14} {count:<15d} {y[mask].sum():<15d} {actual_rate:.1%}")
+    for row in oof.calibration(prob_bins):
+        if row['count'] > 0:
+            print(f"  {row['low']:.0%} - {row['high']:.0%}{'':<14} {row['count']:<15d} {row['positives']:<15d} "
+                  f"{row['rate']:.1%}")
     print("  " + "-" * 70)
     
     # Temporal validation
@@ -161,25 +159,21 @@ def evaluate_model():
     train_dates = all_data.iloc[train_indices]
     test_dates = all_data.iloc[test_indices]
     
-    X_train = train_data[predictor.feature_columns].fillna(0)
-    y_train = train_data['bloom']
-    X_test = test_data[predictor.feature_columns].fillna(0)
     y_test = test_data['bloom']
     
-    # Train on past
+    # Train on past, test on future (a single cached fold; scaler fitted on the past only)
     from sklearn.ensemble import GradientBoostingClassifier
+    from sklearn.pipeline import make_pipeline
     from sklearn.preprocessing import StandardScaler
     
-    scaler_temp = StandardScaler()
-    X_train_scaled = scaler_temp.fit_transform(X_train)
-    X_test_scaled = scaler_temp.transform(X_test)
-    
-    model_temp = GradientBoostingClassifier(n_estimators=200, max_depth=5, learning_rate=0.05, random_state=42)
-    model_temp.fit(X_train_scaled, y_train)
+    model_temp = make_pipeline(
+        StandardScaler(),
+        GradientBoostingClassifier(n_estimators=200, max_depth=5, learning_rate=0.05, random_state=42)
+    )
+    temporal = out_of_fold_predictions(model_temp, X, y, cv=[(np.asarray(train_indices), np.asarray(test_indices))])
     
-    # Test on future
-    y_test_pred = model_temp.predict(X_test_scaled)
-    y_test_proba = model_temp.predict_proba(X_test_scaled)[:, 1]
+    y_test_pred = temporal.prediction[test_indices]
+    y_test_proba = temporal.probability[test_indices]
     
     print("  " + "-" * 70)
     print(f"  Train period: {train_dates['date'].min().date()} to {train_dates['date'].max().date()}")
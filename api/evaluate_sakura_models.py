@@ -4,7 +4,7 @@ Evaluate and Compare Sakura Bloom Prediction Models
 
 This script evaluates both the global and Japan-specific models:
 - Performance metrics (MAE, RMSE, R²)
-- Cross-validation results
+- Cross-validation results (cached out-of-fold predictions, see cv_evaluation)
 - Feature importance comparison
 - Prediction accuracy by region/year
 - Model comparison and recommendations
@@ -14,7 +14,7 @@ import sys
 import os
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import TimeSeriesSplit, cross_val_score
+from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 import matplotlib.pyplot as plt
@@ -23,6 +23,10 @@ from datetime import datetime
 
 # Add app directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ml', 'src'))
+
+from processed_data import read_processed
+from cv_evaluation import out_of_fold_predictions
 
 
 class SakuraModelEvaluator:
@@ -48,7 +52,7 @@ class SakuraModelEvaluator:
     def load_data(self):
         """Load evaluation dataset"""
         print(f"\n[1/5] Loading data from {self.data_path}...")
-        self.data = pd.read_csv(self.data_path)
+        self.data = read_processed(self.data_path)
         print(f"  ✓ Loaded {len(self.data)} records")
         
     def load_models(self):
@@ -70,6 +74,27 @@ class SakuraModelEvaluator:
         if not self.models:
             raise FileNotFoundError("No models found. Train models first.")
     
+    def cross_validate(self, model, X_scaled, y, n_splits=5):
+        """
+        Time-series CV from out-of-fold predictions (each fold fitted once, cached on disk)
+        
+        Returns:
+            Dictionary with CV MAE/RMSE/R² and the out-of-fold predictions/actuals
+        """
+        oof = out_of_fold_predictions(model, X_scaled, y, cv=TimeSeriesSplit(n_splits=n_splits))
+        if oof.cached:
+            print(f"  ✓ Loaded cached out-of-fold predictions ({oof.key})")
+        
+        scores = oof.regression_scores()
+        return {
+            'cv_mae_mean': scores['mae'].mean(),
+            'cv_mae_std': scores['mae'].std(),
+            'cv_rmse_mean': scores['rmse'].mean(),
+            'cv_r2_mean': scores['r2'].mean(),
+            'cv_predictions': oof.prediction[oof.tested],
+            'cv_actuals': oof.y[oof.tested]
+        }
+    
     def evaluate_global_model(self):
         """Evaluate global model performance"""
         print(f"\n[3/5] Evaluating Global Model...")
@@ -125,20 +150,13 @@ class SakuraModelEvaluator:
         r2 = r2_score(y, y_pred)
         
         # Cross-validation
-        tscv = TimeSeriesSplit(n_splits=5)
-        cv_scores = cross_val_score(
-            model, X_scaled, y,
-            cv=tscv,
-            scoring='neg_mean_absolute_error',
-            n_jobs=-1
-        )
+        cv = self.cross_validate(model, X_scaled, y, n_splits=5)
         
         self.results['global'] = {
             'mae': mae,
             'rmse': rmse,
             'r2': r2,
-            'cv_mae_mean': -cv_scores.mean(),
-            'cv_mae_std': cv_scores.std(),
+            **cv,
             'n_samples': len(prunus_data),
             'predictions': y_pred,
             'actuals': y.values
@@ -149,7 +167,7 @@ class SakuraModelEvaluator:
         print(f"    MAE:          {mae:.2f} days")
         print(f"    RMSE:         {rmse:.2f} days")
         print(f"    R²:           {r2:.3f}")
-        print(f"    CV MAE:       {-cv_scores.mean():.2f} ± {cv_scores.std():.2f} days")
+        print(f"    CV MAE:       {cv['cv_mae_mean']:.2f} ± {cv['cv_mae_std']:.2f} days")
     
     def evaluate_japan_model(self):
         """Evaluate Japan-specific model performance"""
@@ -218,20 +236,13 @@ class SakuraModelEvaluator:
         r2 = r2_score(y, y_pred)
         
         # Cross-validation
-        tscv = TimeSeriesSplit(n_splits=min(5, len(japan_data) // 5))
-        cv_scores = cross_val_score(
-            model, X_scaled, y,
-            cv=tscv,
-            scoring='neg_mean_absolute_error',
-            n_jobs=-1
-        )
+        cv = self.cross_validate(model, X_scaled, y, n_splits=min(5, len(japan_data) // 5))
         
         self.results['japan'] = {
             'mae': mae,
             'rmse': rmse,
             'r2': r2,
-            'cv_mae_mean': -cv_scores.mean(),
-            'cv_mae_std': cv_scores.std(),
+            **cv,
             'n_samples': len(japan_data),
             'predictions': y_pred,
             'actuals': y.values
@@ -242,7 +253,7 @@ class SakuraModelEvaluator:
         print(f"    MAE:          {mae:.2f} days")
         print(f"    RMSE:         {rmse:.2f} days")
         print(f"    R²:           {r2:.3f}")
-        print(f"    CV MAE:       {-cv_scores.mean():.2f} ± {cv_scores.std():.2f} days")
+        print(f"    CV MAE:       {cv['cv_mae_mean']:.2f} ± {cv['cv_mae_std']:.2f} days")
     
     def compare_models(self):
         """Compare both models side by side"""
@@ -331,6 +342,8 @@ class SakuraModelEvaluator:
                 'r2': float(result['r2']),
                 'cv_mae_mean': float(result['cv_mae_mean']),
                 'cv_mae_std': float(result['cv_mae_std']),
+                'cv_rmse_mean': float(result['cv_rmse_mean']),
+                'cv_r2_mean': float(result['cv_r2_mean']),
                 'n_samples': int(result['n_samples'])
             }
         
@@ -342,15 +355,15 @@ class SakuraModelEvaluator:
         print(f"\n✓ Results saved to {output_path}")
     
     def plot_predictions(self, output_dir='evaluation_plots'):
-        """Create visualization plots"""
+        """Create visualization plots from the out-of-fold CV predictions"""
         os.makedirs(output_dir, exist_ok=True)
         
         for model_name, result in self.results.items():
-            if 'predictions' not in result:
+            if len(result.get('cv_predictions', [])) == 0:
                 continue
             
-            y_true = result['actuals']
-            y_pred = result['predictions']
+            y_true = result['cv_actuals']
+            y_pred = result['cv_predictions']
             
             plt.figure(figsize=(10, 6))
             
@@ -362,7 +375,7 @@ class SakuraModelEvaluator:
                     'r--', lw=2)
             plt.xlabel('Actual Bloom Day')
             plt.ylabel('Predicted Bloom Day')
-            plt.title(f'{model_name.title()} Model: Predictions vs Actuals')
+            plt.title(f'{model_name.title()} Model: Out-of-fold Predictions vs Actuals')
             plt.grid(True, alpha=0.3)
             
             # Residuals
@@ -14,12 +14,16 @@ import os
 import argparse
 import pandas as pd
 import numpy as np
-import json
 from datetime import datetime, timedelta
 import joblib
+from sklearn.neighbors import KDTree
 
 # Add app directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ml', 'src'))
+
+from geojson_writer import GeoJSONWriter, square_rings
+from processed_data import parquet_path, processed_columns, read_processed
 
 
 class PredictionGenerator:
@@ -43,6 +47,10 @@ class PredictionGenerator:
         self.scaler = None
         self.feature_columns = None
         self.training_data = None
+        self.location_tree = None
+        self.training_years = None
+        self.training_regions = None
+        self.training_features = None
         
     def load_model(self):
         """Load trained model from pickle file"""
@@ -54,17 +62,22 @@ class PredictionGenerator:
         self.model_data = joblib.load(self.model_path)
         self.model = self.model_data['model']
         self.scaler = self.model_data['scaler']
-        self.feature_columns = self.model_data['feature_columns']
+        self.feature_columns = list(self.model_data['feature_columns'])
         
         print(f"  ✓ Model loaded successfully")
         print(f"  Features: {len(self.feature_columns)}")
         
         # Load training data for feature lookups
         print(f"\n  Loading training data from {self.data_path}...")
-        if os.path.exists(self.data_path):
-            self.training_data = pd.read_csv(self.data_path)
+        if os.path.exists(self.data_path) or parquet_path(self.data_path).exists():
+            # Only the columns used for nearest-location feature lookups
+            wanted = ['latitude', 'longitude', 'year', 'region'] + list(self.feature_columns)
+            available = set(processed_columns(self.data_path))
+            columns = [col for col in dict.fromkeys(wanted) if col in available]
+            self.training_data = read_processed(self.data_path, columns=columns)
             print(f"  ✓ Loaded {len(self.training_data)} training records")
             print(f"  Date range: {self.training_data['year'].min()}-{self.training_data['year'].max()}")
+            self.build_location_index()
         else:
             print(f"  ⚠ Training data not found, will use estimated values")
             self.training_data = None
@@ -114,104 +127,123 @@ class PredictionGenerator:
         
         return locations_df
     
-    def create_feature_vector(self, lat, lon, year=2024):
+    def build_location_index(self):
         """
-        Create feature vector for prediction using actual training data
-        Finds the closest matching location and most recent year from training data
+        Build a KD-tree over training locations (latitude/longitude in degrees)
+        and cache the feature columns as a float matrix for neighbour lookups.
         """
-        if self.training_data is not None:
-            # Find closest location in training data
-            self.training_data['distance'] = np.sqrt(
-                (self.training_data['latitude'] - lat)**2 + 
-                (self.training_data['longitude'] - lon)**2
-            )
-            
-            # Get closest matches
-            closest_matches = self.training_data.nsmallest(10, 'distance')
-            
-            # Prefer most recent year
-            most_recent = closest_matches.sort_values('year', ascending=False).iloc[0]
-            
-            distance = most_recent['distance']
-            
-            print(f"    Using features from: {most_recent.get('region', 'Unknown')} "
-                  f"({most_recent['year']}) - {distance:.2f}° away")
-            
-            # Create feature vector from actual data
-            # First get fallback estimates
-            fallback_features = self._create_estimated_features(lat, lon, year)
-            
-            features = {}
-            for col in self.feature_columns:
-                if col in most_recent.index:
-                    value = most_recent[col]
-                    # Use actual value if not NaN, otherwise use fallback estimate
-                    if pd.notna(value):
-                        features[col] = value
-                    else:
-                        features[col] = fallback_features.get(col, 0)
-                else:
-                    features[col] = fallback_features.get(col, 0)
-            
-            # Update year to prediction year
-            features['year'] = year
-            features['year_normalized'] = (year - 2010) / 12.0
+        located = self.training_data.dropna(subset=['latitude', 'longitude']).reset_index(drop=True)
+        
+        self.location_tree = KDTree(located[['latitude', 'longitude']].to_numpy(dtype=float))
+        self.training_years = located['year'].to_numpy(dtype=float)
+        self.training_regions = (located['region'].astype(object).to_numpy()
+                                 if 'region' in located.columns else np.full(len(located), 'Unknown', dtype=object))
+        
+        # Feature values in feature_columns order (NaN where the column is absent)
+        self.training_features = np.full((len(located), len(self.feature_columns)), np.nan)
+        for j, col in enumerate(self.feature_columns):
+            if col in located.columns:
+                self.training_features[:, j] = located[col].to_numpy(dtype=float)
+        
+        print(f"  ✓ Indexed {len(located)} training locations")
+    
+    def create_feature_matrix(self, lats, lons, year=2024):
+        """
+        Create feature vectors for many locations using actual training data.
+        For each location, takes the 10 nearest training records and uses the
+        most recent year among them (nearest first on ties); missing values
+        are filled with the estimated features.
+        
+        Args:
+            lats: Latitudes of the target locations
+            lons: Longitudes of the target locations
+            year: Prediction year
+        
+        Returns:
+            (features, sources): DataFrame in feature_columns order, and a
+            DataFrame with the region, year and distance (degrees) of the
+            training record used for each location (None without training data)
+        """
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        
+        # Fallback estimates for every location
+        features = self._estimated_feature_matrix(lats, lons, year)
+        sources = None
+        
+        if self.location_tree is not None and len(self.training_years) > 0:
+            # Closest matches for all locations in one query
+            k = min(10, len(self.training_years))
+            distance, neighbours = self.location_tree.query(np.column_stack([lats, lons]), k=k)
             
-            # Estimate day_of_year based on latitude (for display purposes)
-            # The model will predict the actual bloom day
-            if lat > 40:
-                est_bloom_day = 120
-            elif lat > 35:
-                est_bloom_day = 90
-            elif lat > 30:
-                est_bloom_day = 75
-            else:
-                est_bloom_day = 45
+            # Prefer most recent year (argmax keeps the nearest among ties)
+            best = np.argmax(self.training_years[neighbours], axis=1)
+            rows = np.arange(len(lats))
+            chosen = neighbours[rows, best]
             
-            features['day_of_year'] = est_bloom_day
-            features['month'] = (est_bloom_day // 30) + 1
+            # Use actual value if not NaN, otherwise use fallback estimate
+            actual = self.training_features[chosen]
+            features = np.where(np.isnan(actual), features, actual)
             
-            # Clean up temporary distance column
-            if 'distance' in self.training_data.columns:
-                self.training_data.drop('distance', axis=1, inplace=True)
+            sources = pd.DataFrame({
+                'region': self.training_regions[chosen],
+                'year': self.training_years[chosen].astype(int),
+                'distance': distance[rows, best]
+            })
             
-        else:
-            # Fallback to estimated values if no training data
-            print(f"    Using estimated feature values (no training data)")
-            features = self._create_estimated_features(lat, lon, year)
-        
-        # Create DataFrame
-        feature_df = pd.DataFrame([features])
+            # Update year to prediction year; day_of_year/month are latitude
+            # estimates (for display purposes), the model predicts the bloom day
+            bloom_day, bloom_month = self._estimated_bloom_day(lats)
+            overrides = {
+                'year': year,
+                'year_normalized': (year - 2010) / 12.0,
+                'day_of_year': bloom_day,
+                'month': (bloom_day // 30) + 1,
+            }
+            for col, value in overrides.items():
+                if col in self.feature_columns:
+                    features[:, self.feature_columns.index(col)] = value
         
-        # Ensure we have all required columns in correct order
-        for col in self.feature_columns:
-            if col not in feature_df.columns:
-                feature_df[col] = 0
+        return pd.DataFrame(features, columns=self.feature_columns), sources
+    
+    def create_feature_vector(self, lat, lon, year=2024):
+        """
+        Create feature vector for prediction using actual training data
+        Finds the closest matching location and most recent year from training data
+        """
+        features, sources = self.create_feature_matrix([lat], [lon], year)
         
-        feature_df = feature_df[self.feature_columns]
+        if sources is not None:
+            source = sources.iloc[0]
+            print(f"    Using features from: {source['region']} "
+                  f"({source['year']}) - {source['distance']:.2f}° away")
+        else:
+            print(f"    Using estimated feature values (no training data)")
         
-        return feature_df
+        return features
     
-    def _create_estimated_features(self, lat, lon, year=2024):
+    @staticmethod
+    def _estimated_bloom_day(lats):
+        """Typical bloom day of year and month for each latitude"""
+        lats = np.asarray(lats, dtype=float)
+        bloom_day = np.select([lats > 40, lats > 35, lats > 30], [120, 90, 75], default=45)
+        bloom_month = np.select([lats > 40, lats > 35, lats > 30], [5, 4, 3], default=2)
+        return bloom_day, bloom_month
+    
+    def _estimated_feature_matrix(self, lats, lons, year=2024):
         """
-        Fallback method: Create estimated feature vector when training data unavailable
+        Estimated feature values for many locations, as a float matrix in
+        feature_columns order (0 for features without an estimate)
         """
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        n = len(lats)
+        
         # Estimate typical bloom month based on latitude
-        if lat > 40:
-            bloom_month = 5
-            bloom_day = 120
-        elif lat > 35:
-            bloom_month = 4
-            bloom_day = 90
-        elif lat > 30:
-            bloom_month = 3
-            bloom_day = 75
-        else:
-            bloom_month = 2
-            bloom_day = 45
+        bloom_day, bloom_month = self._estimated_bloom_day(lats)
         
         # Typical spring temperatures at bloom time
-        temp_avg = 10.0 + (40 - abs(lat)) * 0.3  # Warmer closer to equator
+        temp_avg = 10.0 + (40 - np.abs(lats)) * 0.3  # Warmer closer to equator
         temp_min = temp_avg - 3
         temp_max = temp_avg + 5
         
@@ -223,8 +255,8 @@ class PredictionGenerator:
             'day_of_year': bloom_day,
             'month': bloom_month,
             'decade': (year // 10) * 10,
-            'latitude': lat,
-            'longitude': lon,
+            'latitude': lats,
+            'longitude': lons,
             
             # Temperature features
             'temperature_avg': temp_avg,
@@ -241,7 +273,7 @@ class PredictionGenerator:
             'precip_avg_7d': 2.1,
             'humidity_avg_7d': 70.0,
             'solar_avg_7d': 8.0,
-            'gdd_7d': max(0, (temp_avg - 5) * 7),
+            'gdd_7d': np.maximum(0, (temp_avg - 5) * 7),
             
             # 14-day aggregates
             'temp_avg_14d': temp_avg - 2,
@@ -251,7 +283,7 @@ class PredictionGenerator:
             'precip_avg_14d': 2.1,
             'humidity_avg_14d': 70.0,
             'solar_avg_14d': 7.5,
-            'gdd_14d': max(0, (temp_avg - 2 - 5) * 14),
+            'gdd_14d': np.maximum(0, (temp_avg - 2 - 5) * 14),
             
             # 30-day aggregates
             'temp_avg_30d': temp_avg - 3,
@@ -261,7 +293,7 @@ class PredictionGenerator:
             'precip_avg_30d': 2.0,
             'humidity_avg_30d': 68.0,
             'solar_avg_30d': 7.0,
-            'gdd_30d': max(0, (temp_avg - 3 - 5) * 30),
+            'gdd_30d': np.maximum(0, (temp_avg - 3 - 5) * 30),
             
             # 90-day aggregates
             'temp_avg_90d': temp_avg - 5,
@@ -271,10 +303,10 @@ class PredictionGenerator:
             'precip_avg_90d': 2.2,
             'humidity_avg_90d': 65.0,
             'solar_avg_90d': 6.5,
-            'gdd_90d': max(0, (temp_avg - 5 - 5) * 90),
+            'gdd_90d': np.maximum(0, (temp_avg - 5 - 5) * 90),
             'temp_variance_90d': 25.0,
             'temp_range_90d': 15.0,
-            'frost_days_90d': max(0, 10 - (temp_avg - 5)),
+            'frost_days_90d': np.maximum(0, 10 - (temp_avg - 5)),
             
             # Soil properties (typical values for cherry growing regions)
             'soil_ph_0-5cm': 6.5,
@@ -292,7 +324,7 @@ class PredictionGenerator:
             'ndvi_mean_10d': 0.35 + (temp_avg - 8) * 0.02,  # Similar to 5d
             
             # Elevation (approximate based on latitude)
-            'elevation_m': 50.0 if abs(lat - 35) < 5 else 100.0,
+            'elevation_m': np.where(np.abs(lats - 35) < 5, 50.0, 100.0),
             
             # Photoperiod (day length) - critical for phenology
             # Spring equinox is around 12 hours, increasing
@@ -301,13 +333,19 @@ class PredictionGenerator:
             'photoperiod_change_rate': 0.05,  # Minutes per day increase
         }
         
-        # Create DataFrame with all required features
-        feature_df = pd.DataFrame([features])
+        # Assemble in feature_columns order
+        matrix = np.zeros((n, len(self.feature_columns)))
+        for j, col in enumerate(self.feature_columns):
+            if col in features:
+                matrix[:, j] = features[col]
         
-        # Ensure correct column order
-        feature_df = feature_df[self.feature_columns]
-        
-        return feature_df
+        return matrix
+    
+    def _create_estimated_features(self, lat, lon, year=2024):
+        """
+        Fallback method: Create estimated feature vector when training data unavailable
+        """
+        return pd.DataFrame(self._estimated_feature_matrix([lat], [lon], year), columns=self.feature_columns)
     
     def predict_bloom_date(self, lat, lon, year=2024):
         """
@@ -328,38 +366,53 @@ class PredictionGenerator:
         return int(round(day_of_year))
     
     def day_of_year_to_date(self, day_of_year, year=2024):
-        """Convert day of year to date"""
-        return datetime(year, 1, 1) + timedelta(days=day_of_year - 1)
+        """Convert day of year to date (scalar or array of days)"""
+        if np.ndim(day_of_year) == 0:
+            return datetime(year, 1, 1) + timedelta(days=int(day_of_year) - 1)
+        days = np.asarray(day_of_year, dtype='int64') - 1
+        return pd.Timestamp(year=year, month=1, day=1) + pd.to_timedelta(days, unit='D')
     
     def generate_predictions(self, locations_df, year=2024):
         """Generate bloom predictions for all locations"""
         print(f"\n[3/5] Generating predictions for year {year}...")
         
-        predictions = []
+        lats = pd.to_numeric(locations_df['lat'], errors='coerce').to_numpy(dtype=float)
+        lons = pd.to_numeric(locations_df['lon'], errors='coerce').to_numpy(dtype=float)
+        valid = ~(np.isnan(lats) | np.isnan(lons))
         
-        for idx, row in locations_df.iterrows():
-            try:
-                # Predict bloom day
-                bloom_day = self.predict_bloom_date(row['lat'], row['lon'], year)
-                bloom_date = self.day_of_year_to_date(bloom_day, year)
-                
-                predictions.append({
-                    'location_name': row['location_name'],
-                    'country': row['country'],
-                    'lat': row['lat'],
-                    'lon': row['lon'],
-                    'year': year,
-                    'bloom_day_of_year': bloom_day,
-                    'predicted_bloom_date': bloom_date.strftime('%Y-%m-%d'),
-                    'model': 'bloombly_sakura_v1'
-                })
-                
-                print(f"  {row['location_name']:20s} → {bloom_date.strftime('%B %d, %Y')} (Day {bloom_day})")
-                
-            except Exception as e:
-                print(f"  ✗ Error predicting for {row['location_name']}: {e}")
+        for name in locations_df['location_name'][~valid]:
+            print(f"  ✗ Error predicting for {name}: missing coordinates")
+        
+        locations = locations_df[valid]
+        if len(locations) == 0:
+            print(f"  ✓ Generated 0 predictions")
+            return pd.DataFrame()
+        
+        # One feature matrix, one scaler pass and one model.predict for all locations
+        features, sources = self.create_feature_matrix(lats[valid], lons[valid], year)
+        if sources is None:
+            print(f"  Using estimated feature values (no training data)")
+        else:
+            print(f"  Using features from nearest training records "
+                  f"(median {sources['distance'].median():.2f}°, max {sources['distance'].max():.2f}° away)")
+        
+        bloom_days = np.rint(self.model.predict(self.scaler.transform(features))).astype(int)
+        bloom_dates = self.day_of_year_to_date(bloom_days, year)
+        
+        predictions_df = pd.DataFrame({
+            'location_name': locations['location_name'].to_numpy(),
+            'country': locations['country'].to_numpy(),
+            'lat': lats[valid],
+            'lon': lons[valid],
+            'year': year,
+            'bloom_day_of_year': bloom_days,
+            'predicted_bloom_date': bloom_dates.strftime('%Y-%m-%d'),
+            'model': 'bloombly_sakura_v1'
+        })
+        
+        for name, date, day in zip(predictions_df['location_name'], bloom_dates.strftime('%B %d, %Y'), bloom_days):
+            print(f"  {name:20s} → {date} (Day {day})")
         
-        predictions_df = pd.DataFrame(predictions)
         print(f"  ✓ Generated {len(predictions_df)} predictions")
         
         return predictions_df
@@ -368,69 +421,49 @@ class PredictionGenerator:
         """Convert predictions to GeoJSON format"""
         print(f"\n[4/5] Creating GeoJSON...")
         
-        features = []
-        
-        for idx, row in predictions_df.iterrows():
-            # Create polygon around location (small area)
-            lon, lat = row['lon'], row['lat']
-            offset = 0.05  # ~5km radius
-            
-            feature = {
-                "type": "Feature",
-                "id": f"ml_{row['location_name'].lower().replace(' ', '_')}",
-                "properties": {
-                    "source": "ml_model",
-                    "location_name": row['location_name'],
-                    "city": row['location_name'],
-                    "country": row['country'],
-                    "species": "Prunus serrulata",
-                    "predicted_bloom_date": row['predicted_bloom_date'],
-                    "bloom_day_of_year": int(row['bloom_day_of_year']),
-                    "model_version": row['model'],
-                    "forecast_made_on": datetime.now().strftime('%Y-%m-%d'),
-                    "color": "#FF0066",  # Red for ML predictions
-                    "opacity": 0.6,
-                    "display_label": f"ML: {row['predicted_bloom_date']}"
-                },
-                "geometry": {
-                    "type": "MultiPolygon",
-                    "coordinates": [[[
-                        [lon - offset, lat - offset],
-                        [lon + offset, lat - offset],
-                        [lon + offset, lat + offset],
-                        [lon - offset, lat + offset],
-                        [lon - offset, lat - offset]
-                    ]]]
-                }
-            }
-            
-            features.append(feature)
-        
-        # Create GeoJSON FeatureCollection
-        geojson = {
-            "type": "FeatureCollection",
-            "metadata": {
-                "source": "bloombly_ml_model",
-                "description": f"ML model predictions for {predictions_df['year'].iloc[0]} cherry blossom bloom dates",
-                "model_version": "sakura_v1",
-                "generated_on": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                "locations": len(features),
-                "year": int(predictions_df['year'].iloc[0])
-            },
-            "features": features
+        year = int(predictions_df['year'].iloc[0])
+        forecast_made_on = datetime.now().strftime('%Y-%m-%d')
+        names = predictions_df['location_name'].astype(str)
+        n = len(predictions_df)
+        
+        properties = {
+            "source": np.full(n, "ml_model"),
+            "location_name": predictions_df['location_name'],
+            "city": predictions_df['location_name'],
+            "country": predictions_df['country'],
+            "species": np.full(n, "Prunus serrulata"),
+            "predicted_bloom_date": predictions_df['predicted_bloom_date'],
+            "bloom_day_of_year": predictions_df['bloom_day_of_year'].astype(int),
+            "model_version": predictions_df['model'],
+            "forecast_made_on": np.full(n, forecast_made_on),
+            "color": np.full(n, "#FF0066"),  # Red for ML predictions
+            "opacity": np.full(n, 0.6),
+            "display_label": "ML: " + predictions_df['predicted_bloom_date'].astype(str)
+        }
+        ids = "ml_" + names.str.lower().str.replace(' ', '_', regex=False)
+        
+        # Polygon around each location (small area, ~5km radius)
+        rings = square_rings(predictions_df['lon'], predictions_df['lat'], 0.05)
+        
+        metadata = {
+            "source": "bloombly_ml_model",
+            "description": f"ML model predictions for {year} cherry blossom bloom dates",
+            "model_version": "sakura_v1",
+            "generated_on": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "locations": n,
+            "year": year
         }
         
         # Save to file
         script_dir = os.path.dirname(os.path.abspath(__file__))
         output_path = os.path.join(script_dir, '..', 'data', 'geojson', output_file)
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        with open(output_path, 'w') as f:
-            json.dump(geojson, f, indent=2)
+        with GeoJSONWriter(output_path, metadata=metadata) as writer:
+            writer.write_polygons(rings, properties, ids=ids)
         
-        print(f"  ✓ GeoJSON saved to {output_path}")
+        print(f"  ✓ GeoJSON saved to {output_path} ({writer.feature_count} features)")
         
-        return geojson
+        return output_path
     
     def compare_with_kaggle(self, predictions_df, kaggle_file=None):
         """Compare ML predictions with Kaggle forecasts"""
@@ -552,7 +585,7 @@ def main():
         predictions_df = generator.generate_predictions(locations_df, year=args.year)
         
         # Create GeoJSON
-        geojson = generator.create_geojson(predictions_df, output_file=args.output)
+        generator.create_geojson(predictions_df, output_file=args.output)
         
         # Compare with Kaggle (if not skipped)
         if not args.skip_comparison:
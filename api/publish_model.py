@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Publish model versions to the model registry and switch the active version
+
+This script:
+1. publish - copies trained model files into a new registry version
+   (pickles are re-saved uncompressed so API workers can memory-map their
+   arrays; tree nodes are only shared for --backend hist sakura models)
+   and makes it active
+2. activate - points a model at an already published version
+3. list - shows published and active versions
+
+Running API workers pick up the new active version on their next request
+for that model (or immediately on SIGHUP / POST /api/admin/models/reload).
+
+Usage:
+    python publish_model.py publish sakura [--from app/models] [--version ID] [--no-activate]
+    python publish_model.py publish v2 [--from app/bloom_model_v2.pkl]
+    python publish_model.py publish v1 --data ../backend/data.csv
+    python publish_model.py activate sakura 20251019-051200
+    python publish_model.py list
+"""
+
+import sys
+import os
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ml', 'src'))
+
+from model_registry import MODEL_NAMES, ModelRegistry
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app')
+
+# Files of a sakura models directory that belong to a version
+SAKURA_EXTENSIONS = ('.pkl', '.npz', '.json', '.geojson')
+
+
+def collect_artifacts(name, source):
+    """{artifact name: file path} for a model name and source path"""
+    if name == 'sakura':
+        source = source or os.path.join(APP_DIR, 'models')
+        files = sorted(f for f in os.listdir(source) if f.endswith(SAKURA_EXTENSIONS))
+        return {os.path.splitext(f)[0]: os.path.join(source, f) for f in files}
+    if name == 'v2':
+        return {'model': source or os.path.join(APP_DIR, 'bloom_model_v2.pkl')}
+    # v1 trains from its data file on startup, there is nothing to copy
+    return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage versions in the model registry')
+    parser.add_argument('--registry', default=None,
+                        help='Registry directory (default: MODEL_REGISTRY_DIR or api/model_registry)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    publish = commands.add_parser('publish', help='Publish a new model version')
+    publish.add_argument('name', choices=MODEL_NAMES)
+    publish.add_argument('--from', dest='source', default=None,
+                         help='Models directory (sakura) or model file (v2)')
+    publish.add_argument('--data', default=None, help='Training data file pinned for v1')
+    publish.add_argument('--version', default=None, help='Version id (default: timestamp)')
+    publish.add_argument('--no-activate', action='store_true', help='Publish without activating')
+
+    activate = commands.add_parser('activate', help='Switch the active version')
+    activate.add_argument('name', choices=MODEL_NAMES)
+    activate.add_argument('version')
+
+    commands.add_parser('list', help='List published versions')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+
+    if args.command == 'publish':
+        artifacts = collect_artifacts(args.name, args.source)
+        missing = [path for path in artifacts.values() if not os.path.exists(path)]
+        if missing or (args.name != 'v1' and not artifacts):
+            print(f"⚠ Nothing to publish, missing: {', '.join(missing) or args.source}")
+            sys.exit(1)
+        if args.name == 'v1' and not args.data:
+            print("⚠ v1 has no model file, pass --data with its training data")
+            sys.exit(1)
+
+        metadata = {'source': os.path.abspath(args.source) if args.source else None}
+        if args.data:
+            metadata['data_path'] = os.path.abspath(args.data)
+
+        print(f"Publishing {args.name} ({len(artifacts)} files) to {registry.root}...")
+        version = registry.publish(args.name, artifacts, metadata=metadata,
+                                   version=args.version, activate=not args.no_activate)
+        print(f"  ✓ {args.name} version {version} published")
+        print(f"  {'Not activated' if args.no_activate else '✓ Active'}: {registry.active_version(args.name)}")
+
+    elif args.command == 'activate':
+        try:
+            registry.activate(args.name, args.version)
+        except ValueError as e:
+            print(f"⚠ {e}")
+            sys.exit(1)
+        print(f"✓ {args.name} active version: {args.version}")
+
+    else:
+        print(f"Model registry: {registry.root}")
+        for name in MODEL_NAMES:
+            active = registry.active_version(name)
+            versions = registry.versions(name)
+            print(f"\n{name}: {len(versions)} version(s)")
+            for version in versions:
+                print(f"  {'*' if version == active else ' '} {version}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test the model registry: publishing, activation and hot-swapping ModelSlots
+
+Uses a throwaway registry in a temporary directory with small joblib
+artifacts, so no trained models are needed.
+"""
+
+import sys
+import os
+import tempfile
+
+import joblib
+import numpy as np
+
+# Add app directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+from model_registry import ModelRegistry, ModelSlot, load_artifact
+
+
+class DummyPredictor:
+    """Stands in for a predictor: remembers which version it was loaded from"""
+
+    def __init__(self, version, weights=None):
+        self.version = version
+        self.weights = weights
+
+
+def make_registry(tmp):
+    """Registry with sakura versions v-a and v-b, v-a active"""
+    registry = ModelRegistry(os.path.join(tmp, 'registry'))
+    for version, value in (('v-a', 1.0), ('v-b', 2.0)):
+        source = os.path.join(tmp, f'{version}.pkl')
+        joblib.dump({'weights': np.full(1000, value)}, source)
+        registry.publish('sakura', {'model': source}, version=version, activate=(version == 'v-a'))
+    return registry
+
+
+def load_dummy(version_dir, manifest):
+    data = load_artifact(os.path.join(version_dir, manifest['artifacts']['model']))
+    return DummyPredictor(manifest['version'], data['weights'])
+
+
+def test_publish_and_activate():
+    """Published versions are listed, artifacts memory-mapped, unknown versions rejected"""
+    print("\nTEST 1: Publish and activate")
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = make_registry(tmp)
+        assert registry.versions('sakura') == ['v-a', 'v-b']
+        assert registry.active_version('sakura') == 'v-a'
+
+        manifest = registry.manifest('sakura', 'v-b')
+        weights = load_dummy(registry.version_dir('sakura', 'v-b'), manifest).weights
+        assert isinstance(weights, np.memmap), "artifact arrays should be memory-mapped"
+
+        registry.activate('sakura', 'v-b')
+        assert registry.active_version('sakura') == 'v-b'
+
+        for name, version in (('sakura', 'v-missing'), ('unknown', 'v-a')):
+            try:
+                registry.activate(name, version)
+            except ValueError as e:
+                print(f"  ✓ Rejected {name} {version}: {e}")
+            else:
+                raise AssertionError(f"activate({name!r}, {version!r}) should fail")
+        assert registry.active_version('sakura') == 'v-b'
+
+        try:
+            registry.publish('sakura', {}, version='v-a')
+        except ValueError:
+            print("  ✓ Rejected publishing an existing version")
+        else:
+            raise AssertionError("publishing an existing version should fail")
+
+
+def test_slot_swap():
+    """A slot picks up a new active version; held predictors keep working"""
+    print("\nTEST 2: ModelSlot swap")
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = make_registry(tmp)
+        slot = ModelSlot('sakura', load_dummy, registry=registry)
+
+        old = slot.get()
+        assert old.version == 'v-a' and slot.version == 'v-a'
+        assert slot.get() is old, "unchanged pointer should not reload"
+
+        registry.activate('sakura', 'v-b')
+        new = slot.get()
+        assert new.version == 'v-b' and new is not old
+        # An in-flight request holding the old predictor still has valid arrays
+        assert old.weights[0] == 1.0 and new.weights[0] == 2.0
+        print(f"  ✓ Swapped {old.version} -> {new.version}")
+
+
+def test_slot_fallback_and_failed_load():
+    """Empty registry uses the fallback; a broken version keeps the loaded one"""
+    print("\nTEST 3: ModelSlot fallback and failed loads")
+    with tempfile.TemporaryDirectory() as tmp:
+        empty = ModelRegistry(os.path.join(tmp, 'empty'))
+        slot = ModelSlot('sakura', load_dummy, fallback=lambda: DummyPredictor('fallback'), registry=empty)
+        assert slot.get().version == 'fallback' and slot.version is None
+
+        no_fallback = ModelSlot('sakura', load_dummy, registry=empty)
+        try:
+            no_fallback.get()
+        except RuntimeError as e:
+            print(f"  ✓ No versions and no fallback: {e}")
+        else:
+            raise AssertionError("slot without versions or fallback should fail")
+
+        registry = make_registry(tmp)
+        attempts = []
+
+        def flaky_loader(version_dir, manifest):
+            attempts.append(manifest['version'])
+            if manifest['version'] == 'v-b':
+                raise IOError("corrupt artifact")
+            return load_dummy(version_dir, manifest)
+
+        slot = ModelSlot('sakura', flaky_loader, registry=registry)
+        loaded = slot.get()
+        registry.activate('sakura', 'v-b')
+        assert slot.get() is loaded, "failed load should keep serving the old version"
+        assert slot.get() is loaded
+        assert attempts == ['v-a', 'v-b'], f"broken version retried: {attempts}"
+        print(f"  ✓ Kept {slot.version} after failing to load v-b")
+
+
+def main():
+    print("=" * 80)
+    print(" MODEL REGISTRY TESTS")
+    print("=" * 80)
+
+    test_publish_and_activate()
+    test_slot_swap()
+    test_slot_fallback_and_failed_load()
+
+    print("\n✓ Model registry tests passed!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test sakura batch predictions against single predictions
+
+Trains tiny global and Japan models (plus an environment store) on
+synthetic data in a temporary directory, so no trained models are needed.
+"""
+
+import sys
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+from flask import Flask
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.preprocessing import StandardScaler
+
+# Add app directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+import config
+from environment_store import ENVIRONMENT_STORE_FILENAME, build_climatology_store
+from model_registry import ModelRegistry
+from routes import sakura as sakura_routes
+from sakura_predictor import SakuraBloomPredictor
+
+FEATURE_COLUMNS = ['latitude', 'longitude', 'year', 'year_normalized', 'temp_avg_30d', 'gdd_30d']
+
+
+def make_test_models(models_dir, n=600, seed=0):
+    """Write small sakura_global/japan model files and an environment store"""
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'latitude': rng.uniform(25, 55, n),
+        'longitude': np.where(rng.random(n) < 0.5, rng.uniform(125, 145, n), rng.uniform(-5, 20, n)),
+        'year': rng.integers(1990, 2024, n),
+        'temp_avg_30d': rng.normal(9, 3, n),
+        'gdd_30d': rng.normal(130, 30, n),
+    })
+    data['year_normalized'] = (data['year'] - 1970) / (2024 - 1970)
+    y = 60 + 1.5 * (data['latitude'] - 25) - 2 * data['temp_avg_30d'] + rng.normal(0, 2, n)
+
+    X = data[FEATURE_COLUMNS]
+    scaler = StandardScaler().fit(X)
+    model = GradientBoostingRegressor(n_estimators=50, max_depth=3, random_state=seed)
+    model.fit(scaler.transform(X), y)
+
+    for name in ('global', 'japan'):
+        joblib.dump({
+            'model': model,
+            'scaler': scaler,
+            'feature_columns': FEATURE_COLUMNS,
+            'feature_medians': X.median().to_numpy(dtype=float),
+            'metadata': {'model_type': 'GradientBoostingRegressor'}
+        }, os.path.join(models_dir, f'sakura_{name}_model.pkl'))
+
+    build_climatology_store(data, source='synthetic').save(os.path.join(models_dir, ENVIRONMENT_STORE_FILENAME))
+
+
+def test_batch_matches_single_predictions():
+    """Invalid locations get their own error entry; valid ones match predict_bloom_date"""
+    print("\nTEST 1: Batch vs single predictions")
+    with tempfile.TemporaryDirectory() as models_dir:
+        make_test_models(models_dir)
+        predictor = SakuraBloomPredictor(models_dir=models_dir)
+
+        locations = [
+            {'latitude': 35.68, 'longitude': 139.65, 'name': 'Tokyo'},
+            {'latitude': 'nan', 'longitude': 139.65, 'name': 'NaN latitude'},
+            {'latitude': 43.06, 'longitude': 141.35, 'name': 'Sapporo',
+             'environmental_data': {'temp_avg_30d': 4.0}},
+            {'latitude': 48.85, 'longitude': float('inf'), 'name': 'Inf longitude'},
+            {'latitude': 95.0, 'longitude': 10.0, 'name': 'Out of range'},
+            {'longitude': 10.0, 'name': 'Missing latitude'},
+            {'latitude': 52.52, 'longitude': 13.40, 'name': 'Berlin'},
+            {'latitude': 34.69, 'longitude': 135.50, 'name': 'Infinite temperature',
+             'environmental_data': {'temp_avg_30d': 'inf'}},
+            {'latitude': 34.69, 'longitude': 135.50, 'name': 'Unknown feature',
+             'environmental_data': {'temp_avg_30d': 9.0, 'not_a_feature': 1}},
+        ]
+        invalid = {'NaN latitude', 'Inf longitude', 'Out of range', 'Missing latitude',
+                   'Infinite temperature', 'Unknown feature'}
+
+        results = predictor.batch_predict(locations, year=2025)
+        assert len(results) == len(locations)
+
+        for location, result in zip(locations, results):
+            name = location['name']
+            assert result['location_name'] == name
+            if name in invalid:
+                assert 'error' in result, f"{name}: expected an error entry, got {result}"
+                print(f"  ✓ {name}: {result['error']}")
+                continue
+
+            single = predictor.predict_bloom_date(
+                location['latitude'], location['longitude'], 2025,
+                environmental_data=location.get('environmental_data')
+            )
+            for key in ('bloom_date', 'bloom_day_of_year', 'model_used', 'confidence'):
+                assert result[key] == single[key], f"{name}: batch {key} {result[key]} != single {single[key]}"
+            print(f"  ✓ {name}: {result['bloom_date']} matches single prediction")
+
+
+def make_test_client(tmp):
+    """Flask client for the sakura routes, serving test models through a temporary registry"""
+    models_dir = os.path.join(tmp, 'models')
+    os.makedirs(models_dir)
+    make_test_models(models_dir)
+
+    registry = ModelRegistry(os.path.join(tmp, 'registry'))
+    registry.publish('sakura', {
+        name: os.path.join(models_dir, name + ext)
+        for name, ext in (('sakura_global_model', '.pkl'), ('sakura_japan_model', '.pkl'),
+                          ('sakura_environment_store', '.npz'))
+    })
+    # The slot of whichever sakura_predictor module the routes imported
+    predictor_module = sys.modules[sakura_routes.get_sakura_predictor.__module__]
+    predictor_module._sakura_slot.registry = registry
+
+    app = Flask(__name__)
+    app.register_blueprint(sakura_routes.sakura_bp, url_prefix='/api/sakura')
+    return app.test_client()
+
+
+def test_matrix_endpoint():
+    """Columnar output shape, cell cap and year-range validation of /predict/matrix"""
+    print("\nTEST 2: Matrix endpoint")
+    with tempfile.TemporaryDirectory() as tmp:
+        client = make_test_client(tmp)
+        locations = [
+            {'latitude': 35.68, 'longitude': 139.65, 'name': 'Tokyo'},
+            {'latitude': 43.06, 'longitude': 141.35, 'name': 'Sapporo'},
+            {'latitude': 52.52, 'longitude': 13.40, 'name': 'Berlin'},
+        ]
+        species = ['Prunus × yedoensis', 'Prunus serrulata']
+
+        response = client.post('/api/sakura/predict/matrix', json={
+            'locations': locations, 'years': {'start': 2024, 'end': 2027}, 'species': species
+        })
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        assert body['shape'] == [3, 4, 2]
+        assert body['years'] == [2024, 2025, 2026, 2027]
+        for key in ('bloom_day_of_year', 'confidence', 'model'):
+            grid = np.array(body[key])
+            assert grid.shape == (3, 4, 2), f"{key}: shape {grid.shape}"
+        print(f"  ✓ Columnar output shape {body['shape']}")
+
+        # Same cells as a single prediction
+        single = client.post('/api/sakura/predict', json={
+            'latitude': 52.52, 'longitude': 13.40, 'year': 2026, 'species': 'Prunus serrulata'
+        }).get_json()
+        assert body['bloom_day_of_year'][2][2][1] == single['bloom_day_of_year']
+
+        too_many = [{'latitude': 35.0, 'longitude': 139.0}] * (config.MAX_MATRIX_CELLS // 201 + 1)
+        response = client.post('/api/sakura/predict/matrix', json={
+            'locations': too_many, 'years': {'start': 1900, 'end': 2100}
+        })
+        assert response.status_code == 400 and 'cells' in response.get_json()['error']
+        print(f"  ✓ Cell cap: {response.get_json()['error']}")
+
+        for years in ({'start': 0, 'end': 10 ** 7}, {'start': 2030, 'end': 2020}, {'start': 2020},
+                      [2025, 3000], []):
+            response = client.post('/api/sakura/predict/matrix', json={'locations': locations, 'years': years})
+            assert response.status_code == 400, f"years {years}: {response.status_code}"
+            print(f"  ✓ Rejected years {years}: {response.get_json()['error']}")
+
+
+def main():
+    print("=" * 80)
+    print(" SAKURA PREDICTION TESTS")
+    print("=" * 80)
+
+    test_batch_matches_single_predictions()
+    test_matrix_endpoint()
+
+    print("\n✓ Sakura prediction tests passed!")
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,7 @@ from datetime import datetime
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
 
 from bloom_predictor_v2 import ImprovedBloomPredictor
+from cv_evaluation import out_of_fold_predictions
 
 def train_and_save_model(data_path='../data/raw/data.csv', 
                          model_output='app/bloom_model_v2.pkl',
@@ -72,7 +73,7 @@ def train_and_save_model(data_path='../data/raw/data.csv',
     if n_estimators != 200 or max_depth != 5 or learning_rate != 0.05:
         print("\n[2/4] Retraining with custom parameters...")
         from sklearn.ensemble import GradientBoostingClassifier
-        from sklearn.model_selection import TimeSeriesSplit, cross_val_score
+        from sklearn.model_selection import TimeSeriesSplit
         from sklearn.metrics import (accuracy_score, precision_score, 
                                      recall_score, f1_score, roc_auc_score)
         
@@ -92,10 +93,9 @@ def train_and_save_model(data_path='../data/raw/data.csv',
             verbose=1
         )
         
-        # Cross-validation
+        # Cross-validation (each fold fitted once, out-of-fold predictions cached)
         tscv = TimeSeriesSplit(n_splits=5)
-        cv_scores = cross_val_score(predictor.model, X_scaled, y, 
-                                   cv=tscv, scoring='roc_auc', n_jobs=-1)
+        cv_scores = out_of_fold_predictions(predictor.model, X_scaled, y, cv=tscv).classification_scores()['roc_auc']
         print(f"  Cross-val ROC-AUC: {cv_scores.mean():.3f} (+/- {cv_scores.std()*2:.3f})")
         
         # Train final model
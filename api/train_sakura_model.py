@@ -6,17 +6,72 @@ Training script for Sakura Bloom Prediction Models
 import sys
 import os
 import argparse
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from sklearn.ensemble import GradientBoostingRegressor
-from sklearn.model_selection import TimeSeriesSplit, cross_val_score
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
+from sklearn.model_selection import TimeSeriesSplit, cross_val_score, train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
+from joblib import Parallel, delayed
 import json
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ml', 'src'))
+
+from bloom_uncertainty import QUANTILE_ALPHAS, fit_calibration, fit_quantile_models
+from environment_store import ENVIRONMENT_STORE_FILENAME, build_climatology_store
+from processed_data import parquet_path, read_processed
+
+
+# Regressor backends: exact gradient boosting, or histogram gradient boosting
+# with early stopping on a validation split
+BACKENDS = {
+    'gbr': 'GradientBoostingRegressor',
+    'hist': 'HistGradientBoostingRegressor',
+}
+
+# Early stopping holds out 10% of the rows, so only for reasonably large sets
+MIN_EARLY_STOPPING_SAMPLES = 100
+
+
+def regressor_params(backend, params, n_samples):
+    """Constructor arguments for a backend from n_estimators/max_depth/learning_rate"""
+    if backend == 'hist':
+        return {
+            'max_iter': params['n_estimators'],
+            'max_depth': params['max_depth'],
+            'learning_rate': params['learning_rate'],
+            'early_stopping': n_samples >= MIN_EARLY_STOPPING_SAMPLES,
+            'validation_fraction': 0.1,
+            'n_iter_no_change': 20,
+            'random_state': 42
+        }
+    return {
+        'n_estimators': params['n_estimators'],
+        'max_depth': params['max_depth'],
+        'learning_rate': params['learning_rate'],
+        'subsample': 0.8,
+        'random_state': 42
+    }
+
+
+def fit_regressor(backend, X, y, params):
+    """Fit one bloom-day regressor; returns (model, fit seconds)"""
+    start = time.perf_counter()
+    if backend == 'hist':
+        model = HistGradientBoostingRegressor(**regressor_params(backend, params, len(y)))
+    else:
+        model = GradientBoostingRegressor(verbose=0, **regressor_params(backend, params, len(y)))
+    model.fit(X, y)
+    return model, time.perf_counter() - start
+
+
+def n_iterations(model):
+    """Boosting iterations actually fitted (fewer than requested after early stopping)"""
+    return getattr(model, 'n_iter_', None) or getattr(model, 'n_estimators_', None)
 
 
 class SakuraModelTrainer:
@@ -33,115 +88,187 @@ class SakuraModelTrainer:
         self.japan_model = None
         self.global_scaler = None
         self.japan_scaler = None
+        self.global_quantiles = None
+        self.japan_quantiles = None
+        self.global_calibration = None
+        self.japan_calibration = None
         self.feature_columns = []
+        self.feature_medians = None
+        self.model_rows = {}
+        self.scaler = None
+        self.X_scaled = None
+        self.y = None
         
     def load_data(self):
         print(f"\n[1/6] Loading data from {self.data_path}...")
         
-        if not os.path.exists(self.data_path):
+        if not os.path.exists(self.data_path) and not parquet_path(self.data_path).exists():
             raise FileNotFoundError(f"Dataset not found: {self.data_path}")
         
-        self.data = pd.read_csv(self.data_path)
+        # Typed Parquet copy when available, CSV otherwise
+        self.data = read_processed(self.data_path)
         print(f"  Loaded {len(self.data)} records")
         print(f"  Date range: {self.data['year'].min()} - {self.data['year'].max()}")
         print(f"  Unique species: {self.data['scientific_name'].nunique()}")
         
-    def prepare_features(self, df):
+    def prepare_features(self):
+        """
+        Feature matrix shared by both models, built once: numeric feature
+        selection, median imputation and scaling over the Prunus records
+        """
         exclude_cols = [
             'record_id', 'scientific_name', 'family', 'genus', 'species', 
             'common_name', 'region', 'prefecture', 'location_grid',
             'trait', 'is_prediction', 'bloom_date', 'bloom_day_of_year'
         ]
         
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+        numeric_cols = self.data.select_dtypes(include=[np.number]).columns.tolist()
         self.feature_columns = [col for col in numeric_cols if col not in exclude_cols]
         
         print(f"  Selected {len(self.feature_columns)} features")
         
-        X = df[self.feature_columns].copy()
+        # Rows used by either model (Japanese cherries are Prunus too)
+        self.model_rows = {
+            'global': (self.data['genus'] == 'Prunus').to_numpy(),
+            'japan': (
+                (self.data['scientific_name'] == 'Prunus × yedoensis') |
+                ((self.data['genus'] == 'Prunus') & (self.data['species'] == 'yedoensis'))
+            ).to_numpy()
+        }
+        training_rows = self.model_rows['global'] | self.model_rows['japan']
+        
+        X = self.data[self.feature_columns].replace([np.inf, -np.inf], np.nan)
         # Replace inf with nan, then fill with median
-        X = X.replace([np.inf, -np.inf], np.nan)
-        X = X.fillna(X.median().fillna(0))
+        self.feature_medians = X[training_rows].median().fillna(0)
+        X = X.fillna(self.feature_medians)
         
-        y = df['bloom_day_of_year'].copy()
+        y = self.data['bloom_day_of_year']
         # Remove rows where target is NaN
-        valid_idx = ~y.isna()
-        X = X[valid_idx]
-        y = y[valid_idx]
+        valid = y.notna().to_numpy()
+        for name in self.model_rows:
+            self.model_rows[name] = self.model_rows[name] & valid
         
-        print(f"  Using {len(X)} samples with valid target values")
+        self.scaler = StandardScaler()
+        self.scaler.fit(X[training_rows & valid])
+        self.X_scaled = self.scaler.transform(X)
+        self.y = y.to_numpy(dtype=float)
         
-        return X, y
+        print(f"  Using {int((training_rows & valid).sum())} samples with valid target values")
+    
+    def training_tasks(self, models, backend, params, quantiles):
+        """Fit jobs (model name, 'model' or 'quantiles', delayed call) for the requested models"""
+        tasks = []
+        for name, min_records in models:
+            rows = self.model_rows[name]
+            if rows.sum() < min_records:
+                print(f"  Warning: Very few records for {name} model ({int(rows.sum())}), skipping")
+                continue
+            X, y = self.X_scaled[rows], self.y[rows]
+            tasks.append((name, 'model', delayed(fit_regressor)(backend, X, y, params)))
+            if quantiles:
+                tasks.append((name, 'quantiles', delayed(fit_quantile_models)(
+                    X, y, QUANTILE_ALPHAS, backend, **regressor_params(backend, params, len(y))
+                )))
+        return tasks
+    
+    def train_models(self, models=(('global', 10), ('japan', 5)), n_estimators=300, max_depth=10,
+                     learning_rate=0.05, quantiles=False, backend='gbr', n_jobs=-1):
+        """
+        Train the global and Japan models (and quantile models) concurrently
+        
+        Args:
+            models: (model name, minimum records) pairs to train
+            n_estimators: Boosting stages (maximum iterations for 'hist')
+            max_depth: Tree depth
+            learning_rate: Learning rate
+            quantiles: Also train lower/upper quantile models
+            backend: 'gbr' or 'hist' (see BACKENDS)
+            n_jobs: Parallel fit processes (joblib)
+        """
+        if self.X_scaled is None:
+            self.prepare_features()
+        
+        for name, _ in models:
+            print(f"  {name}: {int(self.model_rows[name].sum())} records")
+        
+        params = {'n_estimators': n_estimators, 'max_depth': max_depth, 'learning_rate': learning_rate}
+        tasks = self.training_tasks(models, backend, params, quantiles)
+        
+        start = time.perf_counter()
+        results = Parallel(n_jobs=n_jobs)(call for _, _, call in tasks)
+        print(f"  Fitted {len(tasks)} models in {time.perf_counter() - start:.1f}s ({BACKENDS[backend]})")
+        
+        for (name, kind, *_), result in zip(tasks, results):
+            rows = self.model_rows[name]
+            X, y = self.X_scaled[rows], self.y[rows]
+            if kind == 'model':
+                model, seconds = result
+                setattr(self, f'{name}_model', model)
+                setattr(self, f'{name}_scaler', self.scaler)
+                
+                y_pred = model.predict(X)
+                mae = mean_absolute_error(y, y_pred)
+                rmse = np.sqrt(mean_squared_error(y, y_pred))
+                r2 = r2_score(y, y_pred)
+                print(f"  {name}: MAE: {mae:.2f} days, RMSE: {rmse:.2f} days, R²: {r2:.3f} "
+                      f"({n_iterations(model)} iterations, {seconds:.1f}s)")
+            else:
+                setattr(self, f'{name}_quantiles', result)
+                lower = result['lower'].predict(X)
+                upper = result['upper'].predict(X)
+                coverage = np.mean((y >= lower) & (y <= upper)) * 100
+                print(f"  {name}: quantile interval {result['alphas']}: mean width {np.mean(upper - lower):.1f} days, "
+                      f"coverage {coverage:.1f}%")
+        
+        # Confidence calibration: uncertainty signal distribution over the training rows
+        for name in dict.fromkeys(name for name, _, _ in tasks):
+            calibration = fit_calibration(getattr(self, f'{name}_model'), self.X_scaled[self.model_rows[name]],
+                                          getattr(self, f'{name}_quantiles'))
+            setattr(self, f'{name}_calibration', calibration)
     
-    def train_global_model(self, n_estimators=300, max_depth=10, learning_rate=0.05):
+    def train_global_model(self, n_estimators=300, max_depth=10, learning_rate=0.05, quantiles=False, backend='gbr'):
         print(f"\n[2/6] Training Global Model...")
+        self.train_models((('global', 10),), n_estimators, max_depth, learning_rate, quantiles, backend)
         
-        prunus_data = self.data[self.data['genus'] == 'Prunus'].copy()
-        print(f"  Using {len(prunus_data)} Prunus records")
-        
-        if len(prunus_data) < 10:
-            print("  Warning: Very few records for global model")
-            return
-        
-        X, y = self.prepare_features(prunus_data)
-        
-        self.global_scaler = StandardScaler()
-        X_scaled = self.global_scaler.fit_transform(X)
-        
-        self.global_model = GradientBoostingRegressor(
-            n_estimators=n_estimators,
-            max_depth=max_depth,
-            learning_rate=learning_rate,
-            subsample=0.8,
-            random_state=42,
-            verbose=0
-        )
-        
-        self.global_model.fit(X_scaled, y)
-        
-        y_pred = self.global_model.predict(X_scaled)
-        mae = mean_absolute_error(y, y_pred)
-        rmse = np.sqrt(mean_squared_error(y, y_pred))
-        r2 = r2_score(y, y_pred)
-        
-        print(f"  MAE: {mae:.2f} days, RMSE: {rmse:.2f} days, R²: {r2:.3f}")
-        
-    def train_japan_model(self, n_estimators=300, max_depth=10, learning_rate=0.05):
+    def train_japan_model(self, n_estimators=300, max_depth=10, learning_rate=0.05, quantiles=False, backend='gbr'):
         print(f"\n[3/6] Training Japan Model...")
-        
-        japan_data = self.data[
-            (self.data['scientific_name'] == 'Prunus × yedoensis') |
-            ((self.data['genus'] == 'Prunus') & (self.data['species'] == 'yedoensis'))
-        ].copy()
-        
-        print(f"  Using {len(japan_data)} Japanese cherry records")
-        
-        if len(japan_data) < 5:
-            print("  Warning: Very few records for Japan model")
-            return
-        
-        X, y = self.prepare_features(japan_data)
-        
-        self.japan_scaler = StandardScaler()
-        X_scaled = self.japan_scaler.fit_transform(X)
-        
-        self.japan_model = GradientBoostingRegressor(
-            n_estimators=n_estimators,
-            max_depth=max_depth,
-            learning_rate=learning_rate,
-            subsample=0.8,
-            random_state=42,
-            verbose=0
-        )
-        
-        self.japan_model.fit(X_scaled, y)
-        
-        y_pred = self.japan_model.predict(X_scaled)
-        mae = mean_absolute_error(y, y_pred)
-        rmse = np.sqrt(mean_squared_error(y, y_pred))
-        r2 = r2_score(y, y_pred)
-        
-        print(f"  MAE: {mae:.2f} days, RMSE: {rmse:.2f} days, R²: {r2:.3f}")
+        self.train_models((('japan', 5),), n_estimators, max_depth, learning_rate, quantiles, backend)
+    
+    def compare_backends(self, n_estimators=300, max_depth=10, learning_rate=0.05, test_size=0.2, n_jobs=-1):
+        """
+        Fit time and MAE of every backend for both models
+        
+        Each backend is fitted on the same random training split and scored
+        on the held-out rows; all fits run concurrently.
+        """
+        if self.X_scaled is None:
+            self.prepare_features()
+        
+        params = {'n_estimators': n_estimators, 'max_depth': max_depth, 'learning_rate': learning_rate}
+        splits = {}
+        tasks = []
+        for name, rows in self.model_rows.items():
+            index = np.flatnonzero(rows)
+            if len(index) < 10:
+                continue
+            train, test = train_test_split(index, test_size=test_size, random_state=42)
+            splits[name] = (train, test)
+            for backend in BACKENDS:
+                tasks.append((name, backend, (backend, self.X_scaled[train], self.y[train], params)))
+        
+        results = Parallel(n_jobs=n_jobs)(delayed(fit_regressor)(*args) for _, _, args in tasks)
+        
+        print(f"  {'model':<8} {'backend':<32} {'fit time':>9} {'train MAE':>10} {'test MAE':>9} {'iters':>6}")
+        comparison = []
+        for (name, backend, _), (model, seconds) in zip(tasks, results):
+            train, test = splits[name]
+            train_mae = mean_absolute_error(self.y[train], model.predict(self.X_scaled[train]))
+            test_mae = mean_absolute_error(self.y[test], model.predict(self.X_scaled[test]))
+            print(f"  {name:<8} {BACKENDS[backend]:<32} {seconds:>8.2f}s {train_mae:>10.2f} {test_mae:>9.2f} "
+                  f"{n_iterations(model):>6}")
+            comparison.append({'model': name, 'backend': backend, 'fit_seconds': seconds,
+                               'train_mae': train_mae, 'test_mae': test_mae})
+        return comparison
     
     def save_models(self, output_dir='app/models'):
         print(f"\n[4/6] Saving models to {output_dir}...")
@@ -153,10 +280,15 @@ class SakuraModelTrainer:
             joblib.dump({
                 'model': self.global_model,
                 'scaler': self.global_scaler,
+                'quantile_models': self.global_quantiles,
+                'uncertainty_calibration': self.global_calibration,
                 'feature_columns': self.feature_columns,
+                # Default row for features a prediction request doesn't supply
+                'feature_medians': self.feature_medians.to_numpy(dtype=float),
                 'metadata': {
                     'trained_date': datetime.now().isoformat(),
-                    'model_type': 'GradientBoostingRegressor',
+                    'model_type': type(self.global_model).__name__,
+                    'n_iterations': n_iterations(self.global_model),
                     'target': 'bloom_day_of_year'
                 }
             }, global_path)
@@ -167,14 +299,29 @@ class SakuraModelTrainer:
             joblib.dump({
                 'model': self.japan_model,
                 'scaler': self.japan_scaler,
+                'quantile_models': self.japan_quantiles,
+                'uncertainty_calibration': self.japan_calibration,
                 'feature_columns': self.feature_columns,
+                # Default row for features a prediction request doesn't supply
+                'feature_medians': self.feature_medians.to_numpy(dtype=float),
                 'metadata': {
                     'trained_date': datetime.now().isoformat(),
-                    'model_type': 'GradientBoostingRegressor',
+                    'model_type': type(self.japan_model).__name__,
+                    'n_iterations': n_iterations(self.japan_model),
                     'target': 'bloom_day_of_year'
                 }
             }, japan_path)
             print(f"  Saved Japan model: {japan_path}")
+    
+    def save_environment_store(self, output_dir='app/models'):
+        """Per-cell environmental features for requests without environmental_data"""
+        print(f"\n[5/6] Building environment store...")
+        
+        store = build_climatology_store(self.data, source=os.path.basename(self.data_path))
+        store_path = os.path.join(output_dir, ENVIRONMENT_STORE_FILENAME)
+        store.save(store_path)
+        print(f"  {store.metadata['cells']} cells, {len(store.columns)} features")
+        print(f"  Saved environment store: {store_path}")
 
 
 def main():
@@ -186,6 +333,14 @@ def main():
     parser.add_argument('--learning_rate', type=float, default=0.05)
     parser.add_argument('--global-only', action='store_true')
     parser.add_argument('--japan-only', action='store_true')
+    parser.add_argument('--quantiles', action='store_true',
+                        help='Also train 10%%/90%% quantile models for bloom windows')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='gbr',
+                        help='gbr: exact gradient boosting, hist: histogram gradient boosting with early stopping')
+    parser.add_argument('--n-jobs', type=int, default=-1,
+                        help='Models fitted in parallel (default: all cores)')
+    parser.add_argument('--compare-backends', action='store_true',
+                        help='Report fit time and held-out MAE of every backend before training')
     
     args = parser.parse_args()
     
@@ -197,13 +352,25 @@ def main():
         trainer = SakuraModelTrainer(data_path=args.data)
         trainer.load_data()
         
-        if not args.japan_only:
-            trainer.train_global_model(args.n_estimators, args.max_depth, args.learning_rate)
+        print(f"\n[2/6] Preparing features...")
+        trainer.prepare_features()
+        
+        if args.compare_backends:
+            print(f"\n  Comparing backends (80/20 split)...")
+            trainer.compare_backends(args.n_estimators, args.max_depth, args.learning_rate, n_jobs=args.n_jobs)
         
+        models = []
+        if not args.japan_only:
+            models.append(('global', 10))
         if not args.global_only:
-            trainer.train_japan_model(args.n_estimators, args.max_depth, args.learning_rate)
+            models.append(('japan', 5))
+        
+        print(f"\n[3/6] Training {' and '.join(name for name, _ in models)} models...")
+        trainer.train_models(models, args.n_estimators, args.max_depth, args.learning_rate, args.quantiles,
+                             backend=args.backend, n_jobs=args.n_jobs)
         
         trainer.save_models(output_dir=args.output_dir)
+        trainer.save_environment_store(output_dir=args.output_dir)
         
         print(f"\n[6/6] Training completed successfully!")
         
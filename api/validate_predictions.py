@@ -10,9 +10,19 @@ import json
 import os
 from datetime import datetime, timedelta
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.neighbors import BallTree
 import sys
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ml', 'src'))
+
+from processed_data import read_processed
+
+EARTH_RADIUS_KM = 6371.0
+
+# Match radii (great-circle km) between a prediction and its nearest actual bloom
+ML_MATCH_RADIUS_KM = 222.0    # ~2 degrees
+KAGGLE_MATCH_RADIUS_KM = 55.0  # ~0.5 degrees, closer match for dense Kaggle data
 
 
 class PredictionValidator:
@@ -21,24 +31,25 @@ class PredictionValidator:
         self.actual_data = None
         self.ml_predictions = None
         self.kaggle_forecasts = None
+        self.actual_index = None
         
     def load_actual_blooms(self, csv_path):
         """Load actual 2024 bloom observations (ground truth)"""
         print("\n[1/5] Loading actual 2024 bloom observations (GROUND TRUTH)...")
         
-        df = pd.read_csv(csv_path)
-        
-        # Filter for 2024 actual blooms
-        actual_2024 = df[df['year'] == 2024].copy()
-        
-        # Focus on Prunus (cherry) species
-        actual_2024 = actual_2024[actual_2024['genus'] == 'Prunus'].copy()
+        # 2024 Prunus (cherry) blooms only, pushed down into the Parquet scan
+        actual_2024 = read_processed(
+            csv_path,
+            columns=['year', 'genus', 'region', 'latitude', 'longitude', 'day_of_year'],
+            filters=[('year', '==', 2024), ('genus', '==', 'Prunus')]
+        )
         
         print(f"  ✓ Loaded {len(actual_2024)} actual cherry bloom observations")
         print(f"  Date range: Day {actual_2024['day_of_year'].min():.0f} to Day {actual_2024['day_of_year'].max():.0f}")
         print(f"  Regions: {actual_2024['region'].unique().tolist()}")
         
         self.actual_data = actual_2024
+        self.actual_index = self.build_actual_index(actual_2024)
         return actual_2024
     
     def load_ml_predictions(self, geojson_path):
@@ -97,83 +108,132 @@ class PredictionValidator:
         self.kaggle_forecasts = kaggle_2024[['spot_name', 'lat', 'lon', 'predicted_day', 'bloom_date']]
         return self.kaggle_forecasts
     
-    def find_nearest_actual(self, pred_lat, pred_lon, actual_df, max_distance_deg=5.0):
-        """Find nearest actual bloom observation to a prediction"""
-        # Calculate distances
-        actual_df = actual_df.copy()
-        actual_df['distance'] = np.sqrt(
-            (actual_df['latitude'] - pred_lat)**2 + 
-            (actual_df['longitude'] - pred_lon)**2
-        )
-        
-        # Find closest within max distance
-        closest = actual_df.nsmallest(1, 'distance')
-        
-        if len(closest) > 0 and closest.iloc[0]['distance'] <= max_distance_deg:
-            return closest.iloc[0]
-        return None
-    
+    def build_actual_index(self, actual_df=None):
+        """
+        Build a haversine BallTree over the actual bloom locations.
+
+        Args:
+            actual_df: Observations with latitude/longitude (default: self.actual_data)
+
+        Returns:
+            (BallTree, DataFrame of the indexed observations)
+        """
+        actual_df = self.actual_data if actual_df is None else actual_df
+        located = actual_df.dropna(subset=['latitude', 'longitude']).reset_index(drop=True)
+        coords = np.radians(located[['latitude', 'longitude']].to_numpy(dtype=float))
+        return BallTree(coords, metric='haversine'), located
+
+    def match_nearest_actual(self, lats, lons, max_distance_km, actual_df=None):
+        """
+        Match every prediction to its nearest actual bloom in one BallTree query.
+
+        Args:
+            lats: Prediction latitudes
+            lons: Prediction longitudes
+            max_distance_km: Matches farther than this (great-circle) are dropped
+            actual_df: Observations to match against (default: self.actual_data)
+
+        Returns:
+            Dict of arrays: 'matched' (bool mask over predictions), and for the
+            matched predictions 'actual_day' and 'distance_km'
+        """
+        if actual_df is None:
+            if self.actual_index is None:
+                self.actual_index = self.build_actual_index()
+            tree, located = self.actual_index
+        else:
+            tree, located = self.build_actual_index(actual_df)
+
+        query = np.radians(np.column_stack([np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)]))
+        valid = ~np.isnan(query).any(axis=1)
+        distance_km = np.full(len(query), np.inf)
+        nearest = np.zeros(len(query), dtype=np.int64)
+
+        if len(located) > 0 and valid.any():
+            dist, ind = tree.query(query[valid], k=1)
+            distance_km[valid] = dist[:, 0] * EARTH_RADIUS_KM
+            nearest[valid] = ind[:, 0]
+
+        matched = distance_km <= max_distance_km
+        return {
+            'matched': matched,
+            'actual_day': located['day_of_year'].to_numpy(dtype=float)[nearest[matched]],
+            'distance_km': distance_km[matched],
+        }
+
     def validate_predictions(self):
         """Compare predictions against actual blooms"""
         print("\n[4/5] Validating predictions against actual blooms...")
         
-        results = {
-            'ml_model': {'matches': [], 'errors': [], 'predictions': []},
-            'kaggle': {'matches': [], 'errors': [], 'predictions': []}
-        }
+        results = {}
         
         # Validate ML predictions
         print("\n  Validating ML model predictions...")
-        for idx, pred in self.ml_predictions.iterrows():
-            actual = self.find_nearest_actual(
-                pred['latitude'], 
-                pred['longitude'], 
-                self.actual_data,
-                max_distance_deg=2.0  # Within ~200km
-            )
-            
-            if actual is not None:
-                error = abs(pred['predicted_day'] - actual['day_of_year'])
-                results['ml_model']['matches'].append({
-                    'location': pred['name'],
-                    'predicted': pred['predicted_day'],
-                    'actual': actual['day_of_year'],
-                    'error_days': error,
-                    'distance_deg': actual['distance']
-                })
-                results['ml_model']['errors'].append(error)
-                print(f"    ✓ {pred['name']}: Predicted Day {pred['predicted_day']:.0f}, Actual Day {actual['day_of_year']:.0f}, Error: {error:.1f} days")
+        ml = self.ml_predictions
+        predicted = ml['predicted_day'].to_numpy(dtype=float)
+        match = self.match_nearest_actual(ml['latitude'], ml['longitude'], ML_MATCH_RADIUS_KM)
+        errors = np.abs(predicted[match['matched']] - match['actual_day'])
+        
+        matches = pd.DataFrame({
+            'location': ml['name'].to_numpy()[match['matched']],
+            'predicted': predicted[match['matched']],
+            'actual': match['actual_day'],
+            'error_days': errors,
+            'distance_km': match['distance_km']
+        })
+        
+        matched_rows = matches.itertuples(index=False)
+        for name, is_matched in zip(ml['name'], match['matched']):
+            if is_matched:
+                row = next(matched_rows)
+                print(f"    ✓ {name}: Predicted Day {row.predicted:.0f}, Actual Day {row.actual:.0f}, Error: {row.error_days:.1f} days")
             else:
-                print(f"    ⚠ {pred['name']}: No nearby actual bloom found")
-            
-            results['ml_model']['predictions'].append(pred['predicted_day'])
-        
-        # Validate Kaggle (sample for comparison)
-        print("\n  Validating Kaggle forecasts (sample)...")
-        kaggle_sample = self.kaggle_forecasts.sample(min(100, len(self.kaggle_forecasts)))
-        
-        for idx, pred in kaggle_sample.iterrows():
-            actual = self.find_nearest_actual(
-                pred['lat'], 
-                pred['lon'], 
-                self.actual_data,
-                max_distance_deg=0.5  # Closer match for dense Kaggle data
-            )
-            
-            if actual is not None:
-                error = abs(pred['predicted_day'] - actual['day_of_year'])
-                results['kaggle']['matches'].append({
-                    'location': pred['spot_name'],
-                    'predicted': pred['predicted_day'],
-                    'actual': actual['day_of_year'],
-                    'error_days': error
-                })
-                results['kaggle']['errors'].append(error)
-        
-        print(f"    ✓ Matched {len(results['kaggle']['matches'])} Kaggle forecasts to actual blooms")
+                print(f"    ⚠ {name}: No nearby actual bloom found")
+        
+        results['ml_model'] = {
+            'matches': matches.to_dict('records'),
+            'errors': errors,
+            'predictions': predicted
+        }
+        
+        # Validate all Kaggle forecasts
+        print("\n  Validating Kaggle forecasts...")
+        kaggle = self.kaggle_forecasts
+        predicted = kaggle['predicted_day'].to_numpy(dtype=float)
+        match = self.match_nearest_actual(kaggle['lat'], kaggle['lon'], KAGGLE_MATCH_RADIUS_KM)
+        errors = np.abs(predicted[match['matched']] - match['actual_day'])
+        
+        matches = pd.DataFrame({
+            'location': kaggle['spot_name'].to_numpy()[match['matched']],
+            'predicted': predicted[match['matched']],
+            'actual': match['actual_day'],
+            'error_days': errors
+        })
+        results['kaggle'] = {
+            'matches': matches.to_dict('records'),
+            'errors': errors,
+            'predictions': predicted
+        }
+        
+        print(f"    ✓ Matched {len(matches)}/{len(kaggle)} Kaggle forecasts to actual blooms")
         
         return results
     
+    @staticmethod
+    def error_metrics(errors):
+        """Summary statistics of absolute errors (days), computed on arrays"""
+        errors = np.asarray(errors, dtype=float)
+        return {
+            'mean_absolute_error': float(errors.mean()),
+            'median_error': float(np.median(errors)),
+            'std_error': float(errors.std()),
+            'max_error': float(errors.max()),
+            'min_error': float(errors.min()),
+            'rmse': float(np.sqrt(np.mean(errors ** 2))),
+            'within_7_days': float(np.mean(errors <= 7) * 100),
+            'within_14_days': float(np.mean(errors <= 14) * 100)
+        }
+    
     def generate_metrics(self, results):
         """Calculate accuracy metrics"""
         print("\n[5/5] Generating accuracy metrics...")
@@ -181,35 +241,19 @@ class PredictionValidator:
         metrics = {}
         
         # ML Model metrics
-        if results['ml_model']['errors']:
-            ml_errors = results['ml_model']['errors']
+        if len(results['ml_model']['errors']):
             metrics['ml_model'] = {
                 'matches_found': len(results['ml_model']['matches']),
                 'total_predictions': len(self.ml_predictions),
-                'mean_absolute_error': np.mean(ml_errors),
-                'median_error': np.median(ml_errors),
-                'std_error': np.std(ml_errors),
-                'max_error': np.max(ml_errors),
-                'min_error': np.min(ml_errors),
-                'rmse': np.sqrt(np.mean([e**2 for e in ml_errors])),
-                'within_7_days': sum(1 for e in ml_errors if e <= 7) / len(ml_errors) * 100,
-                'within_14_days': sum(1 for e in ml_errors if e <= 14) / len(ml_errors) * 100
+                **self.error_metrics(results['ml_model']['errors'])
             }
         
         # Kaggle metrics
-        if results['kaggle']['errors']:
-            kaggle_errors = results['kaggle']['errors']
+        if len(results['kaggle']['errors']):
             metrics['kaggle'] = {
                 'matches_found': len(results['kaggle']['matches']),
-                'sample_size': len(results['kaggle']['matches']),
-                'mean_absolute_error': np.mean(kaggle_errors),
-                'median_error': np.median(kaggle_errors),
-                'std_error': np.std(kaggle_errors),
-                'max_error': np.max(kaggle_errors),
-                'min_error': np.min(kaggle_errors),
-                'rmse': np.sqrt(np.mean([e**2 for e in kaggle_errors])),
-                'within_7_days': sum(1 for e in kaggle_errors if e <= 7) / len(kaggle_errors) * 100,
-                'within_14_days': sum(1 for e in kaggle_errors if e <= 14) / len(kaggle_errors) * 100
+                'sample_size': len(results['kaggle']['predictions']),
+                **self.error_metrics(results['kaggle']['errors'])
             }
         
         return metrics
@@ -252,7 +296,7 @@ class PredictionValidator:
         
         if 'kaggle' in metrics:
             k = metrics['kaggle']
-            print(f"\nSample validated: {k['matches_found']} forecasts")
+            print(f"\nForecasts validated: {k['matches_found']}/{k['sample_size']}")
             print(f"\nAccuracy Metrics:")
             print(f"  Mean Absolute Error (MAE):  {k['mean_absolute_error']:.2f} days")
             print(f"  Median Error:               {k['median_error']:.2f} days")
@@ -307,7 +351,7 @@ class PredictionValidator:
             },
             'kaggle': {
                 'metrics': metrics.get('kaggle', {}),
-                'sample_size': len(results['kaggle']['matches'])
+                'matches_found': len(results['kaggle']['matches'])
             }
         }
         
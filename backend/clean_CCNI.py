@@ -1,20 +1,26 @@
-import pandas as pd
 import os
-import json
-
-def get_season(doy):
-    try:
-        doy = int(doy)
-        if 80 <= doy <= 171:
-            return 'spring'
-        elif 172 <= doy <= 265:
-            return 'summer'
-        elif 266 <= doy <= 355:
-            return 'fall'
-        else:
-            return 'winter'
-    except ValueError:
-        return 'unknown'
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Hive-partitioned (family=/genus=) Parquet dataset read by json_to_geojson.py
+FLOWERING_DATASET = '../data/parquet/flowering'
+
+
+def get_seasons(doy):
+    """Season for each day of year; days that int() cannot parse are 'unknown'"""
+    doy = pd.Series(doy)
+    if not pd.api.types.is_numeric_dtype(doy):
+        # Text columns: only integer strings parse (int('150.7') fails)
+        doy = doy.where(doy.astype(str).str.strip().str.fullmatch(r'[+-]?\d+', na=False))
+    doy = np.trunc(pd.to_numeric(doy, errors='coerce').to_numpy(dtype=float))
+    return np.select(
+        [np.isnan(doy), (80 <= doy) & (doy <= 171), (172 <= doy) & (doy <= 265), (266 <= doy) & (doy <= 355)],
+        ['unknown', 'spring', 'summer', 'fall'],
+        default='winter'
+    )
+
 
 # Read the CSV file
 df = pd.read_csv('data2.csv', encoding='latin1')
@@ -22,32 +28,25 @@ df = pd.read_csv('data2.csv', encoding='latin1')
 # Filter for phenophase 'flower' or 'flowerend'
 df = df[df['phenophase'].isin(['flower', 'flowerend'])]
 
-# Add season column based on DOY
-df['season'] = df['DOY'].apply(get_season)
-
-# Group by functional_group (as family) and genus
-grouped = df.groupby(['functional_group', 'genus'])
-
-last_file = None
-for (family, genus), group in grouped:
-    # Create directory for family
-    os.makedirs(family, exist_ok=True)
-    
-    # Select relevant columns: year, season, lat, long
-    data = group[['year', 'season', 'lat', 'long']]
-    
-    # Save as JSON Lines for efficient processing
-    filename = f'{family}/{genus}.jsonl'
-    with open(filename, 'w') as f:
-        for _, row in data.iterrows():
-            json.dump({
-                'year': int(row['year']),
-                'season': row['season'],
-                'lat': float(row['lat']),
-                'long': float(row['long'])
-            }, f)
-            f.write('\n')
-    
-    last_file = filename
-
-print(f'Last file created: {last_file}')
+# Rows without a family or genus have no partition
+df = df[df['functional_group'].notna() & df['genus'].notna()]
+
+# Select relevant columns: functional_group (as family), genus, year, season, lat, long
+data = pd.DataFrame({
+    'family': df['functional_group'].astype(str),
+    'genus': df['genus'].astype(str),
+    'year': df['year'].astype('int64'),
+    # Add season column based on DOY
+    'season': get_seasons(df['DOY']),
+    'lat': df['lat'].astype(float),
+    'long': df['long'].astype(float),
+})
+
+# Write every (family, genus) partition in one pass, replacing the previous build
+if os.path.exists(FLOWERING_DATASET):
+    shutil.rmtree(FLOWERING_DATASET)
+os.makedirs(FLOWERING_DATASET)
+data.to_parquet(FLOWERING_DATASET, partition_cols=['family', 'genus'], index=False)
+
+n_partitions = data.groupby(['family', 'genus']).ngroups
+print(f'Wrote {len(data)} observations in {n_partitions} family/genus partitions to {FLOWERING_DATASET}')
@@ -1,133 +1,244 @@
-import csv
-csv.field_size_limit(1000000)  # Increase field size limit
-import json
+import os
 import sys
-from datetime import datetime
 import math
 
-def determine_season(date_str):
-    try:
-        date = datetime.strptime(date_str, '%Y-%m-%d')
-        month = date.month
-        if month in [3, 4, 5]:
-            return "Spring"
-        elif month in [6, 7, 8]:
-            return "Summer"
-        elif month in [9, 10, 11]:
-            return "Fall"
-        else:
-            return "Winter"
-    except:
-        return "Spring"  # default
-
-def distance(p1, p2):
-    return math.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml', 'src'))
+
+from geojson_writer import CRS84, GeoJSONWriter, box_rings
+
+# Month -> season (index 0 unused)
+SEASON_BY_MONTH = np.array([
+    "Spring", "Winter", "Winter", "Spring", "Spring", "Spring", "Summer",
+    "Summer", "Summer", "Fall", "Fall", "Fall", "Winter"
+], dtype=object)
+
+# Site pairs compared per batch when linking neighbouring grid cells
+PAIR_BATCH_SIZE = 2_000_000
+
+
+def determine_seasons(dates):
+    """Season for each 'YYYY-MM-DD' string; unparseable dates default to Spring"""
+    months = pd.to_datetime(pd.Series(dates), format='%Y-%m-%d', errors='coerce').dt.month
+    return SEASON_BY_MONTH[months.fillna(0).astype(int).to_numpy()]
+
 
 def approx_area(min_lon, max_lon, min_lat, max_lat):
-    # Approximate area in square km
+    # Approximate area in square km (works on scalars or arrays)
     lat_diff = max_lat - min_lat
     lon_diff = max_lon - min_lon
     avg_lat = (min_lat + max_lat) / 2
     # 1 degree lat ≈ 111 km, lon ≈ 111 * cos(lat) km
-    area = lat_diff * 111 * lon_diff * 111 * math.cos(math.radians(avg_lat))
+    area = lat_diff * 111 * lon_diff * 111 * np.cos(np.radians(avg_lat))
     return area
 
-def csv_to_geojson(csv_file_path):
-    points = []
-    
-    with open(csv_file_path, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            try:
-                lat = float(row['latitude'])
-                lon = float(row['longitude'])
-                season = determine_season(row['date'])
-                points.append((lon, lat, row['scientificName'], row['family'], row['genus'], season))
-            except (ValueError, KeyError):
-                continue
-    
-    # Simple clustering: group points within 0.1 degrees
-    threshold = 0.1
-    clusters = []
-    for point in points:
-        found = False
-        for cluster in clusters:
-            if any(distance(point[:2], p[:2]) < threshold for p in cluster):
-                cluster.append(point)
-                found = True
+
+def union_find(n, a, b):
+    """
+    Connected components of n nodes joined by edges (a[i], b[i]).
+    Vectorized union-find: every node hooks onto the smallest root among its
+    edges, then paths are compressed by pointer jumping, until stable.
+
+    Returns:
+        Root (smallest node id) of each node's component
+    """
+    parent = np.arange(n)
+    if len(a) == 0:
+        return parent
+
+    while True:
+        root_a, root_b = parent[a], parent[b]
+        low = np.minimum(root_a, root_b)
+        new_parent = parent.copy()
+        np.minimum.at(new_parent, root_a, low)
+        np.minimum.at(new_parent, root_b, low)
+
+        # Path compression
+        while True:
+            jumped = new_parent[new_parent]
+            if np.array_equal(jumped, new_parent):
                 break
-        if not found:
-            clusters.append([point])
-    
-    features = []
-    for cluster in clusters:
-        if not cluster:
+            new_parent = jumped
+
+        if np.array_equal(new_parent, parent):
+            return parent
+        parent = new_parent
+
+
+def grid_clusters(lon, lat, threshold=0.1):
+    """
+    Single-linkage clusters of points at `threshold` degrees (two points are
+    linked when their Euclidean distance is < threshold).
+
+    Identical coordinates are collapsed to one site, sites are hashed into
+    grid cells of side threshold/√2 (so every pair within a cell is linked),
+    and cells are joined with union-find whenever a site pair in neighbouring
+    cells is closer than threshold.
+
+    Returns:
+        Cluster label per point, numbered in order of each cluster's first point
+    """
+    coords = np.column_stack([np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)])
+    if len(coords) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # Hash-based dedupe of identical coordinates (lon + i*lat as one hashable value)
+    site_of_point, unique_sites = pd.factorize(coords[:, 0] + 1j * coords[:, 1])
+    sites = np.column_stack([unique_sites.real, unique_sites.imag])
+
+    # Slightly under threshold/√2 so rounding can never link a pair at >= threshold
+    cell_size = threshold / math.sqrt(2) * (1 - 1e-9)
+    cells = np.floor(sites / cell_size).astype(np.int64)
+
+    # Integer key per cell with a 2-cell margin so neighbour keys never wrap
+    cx = cells[:, 0] - cells[:, 0].min() + 2
+    cy = cells[:, 1] - cells[:, 1].min() + 2
+    width = int(cy.max()) + 3
+    site_keys = cx * width + cy
+
+    # Sites sorted by cell; each cell is a contiguous run
+    order = np.argsort(site_keys)
+    sites, site_keys = sites[order], site_keys[order]
+    position_of_site = np.empty_like(order)
+    position_of_site[order] = np.arange(len(order))
+    site_of_point = position_of_site[site_of_point]
+
+    cell_start = np.flatnonzero(np.r_[True, site_keys[1:] != site_keys[:-1]])
+    cell_keys = site_keys[cell_start]
+    cell_count = np.diff(np.r_[cell_start, len(site_keys)])
+    cell_of_site = np.repeat(np.arange(len(cell_keys)), cell_count)
+
+    # Neighbouring cells that can hold a pair closer than threshold
+    # (one direction of each pair; cells 2 apart diagonally are always too far)
+    offsets = [(dx, dy) for dx in range(0, 3) for dy in range(-2, 3)
+               if (dx > 0 or dy > 0) and not (abs(dx) == 2 and abs(dy) == 2)]
+
+    # Bounding box of the sites in each cell, for pruning cell pairs
+    cell_min = np.minimum.reduceat(sites, cell_start)
+    cell_max = np.maximum.reduceat(sites, cell_start)
+
+    # Nearest offsets first; later offsets only test cells not yet connected
+    offsets.sort(key=lambda offset: offset[0] ** 2 + offset[1] ** 2)
+
+    threshold_sq = threshold ** 2
+    cell_root = np.arange(len(cell_keys))
+    for dx, dy in offsets:
+        neighbour_keys = cell_keys + dx * width + dy
+        position = np.searchsorted(cell_keys, neighbour_keys)
+        position = np.minimum(position, len(cell_keys) - 1)
+        found = (cell_keys[position] == neighbour_keys) & (cell_root != cell_root[position])
+        cell_a = np.flatnonzero(found)
+        cell_b = position[found]
+        if len(cell_a) == 0:
             continue
-        lons = [p[0] for p in cluster]
-        lats = [p[1] for p in cluster]
-        min_lon, max_lon = min(lons), max(lons)
-        min_lat, max_lat = min(lats), max(lats)
-        
-        # Expand the bounding box based on number of points
-        margin = 0.01 * (len(cluster) ** 0.5)
-        min_lon -= margin
-        max_lon += margin
-        min_lat -= margin
-        max_lat += margin
-        
-        # Create a rectangle polygon
-        square_coords = [
-            [min_lon, min_lat],
-            [max_lon, min_lat],
-            [max_lon, max_lat],
-            [min_lon, max_lat],
-            [min_lon, min_lat]  # close
-        ]
-        
+
+        # Closest and farthest possible site pair from the two bounding boxes
+        gap = np.maximum(0, np.maximum(cell_min[cell_b] - cell_max[cell_a], cell_min[cell_a] - cell_max[cell_b]))
+        span = np.maximum(cell_max[cell_b] - cell_min[cell_a], cell_max[cell_a] - cell_min[cell_b])
+        candidate = (gap ** 2).sum(axis=1) < threshold_sq
+        linked = candidate & ((span ** 2).sum(axis=1) < threshold_sq)
+
+        check = np.flatnonzero(candidate & ~linked)
+        if len(check):
+            linked[check] = _linked_cell_pairs(sites, cell_start, cell_count, cell_a[check], cell_b[check],
+                                               threshold_sq)
+
+        # Union the newly linked cells into the existing components
+        edges_a = np.concatenate([np.arange(len(cell_keys)), cell_a[linked]])
+        edges_b = np.concatenate([cell_root, cell_b[linked]])
+        cell_root = union_find(len(cell_keys), edges_a, edges_b)
+
+    point_root = cell_root[cell_of_site[site_of_point]]
+
+    # Renumber clusters by first appearance (same order as scanning the file)
+    labels, _ = pd.factorize(point_root)
+    return labels
+
+
+def _linked_cell_pairs(sites, cell_start, cell_count, cell_a, cell_b, threshold_sq):
+    """For each cell pair, whether any site pair between them is closer than threshold"""
+    pair_sizes = cell_count[cell_a] * cell_count[cell_b]
+    linked = np.zeros(len(cell_a), dtype=bool)
+
+    # Batch cell pairs so the exploded site pairs stay bounded
+    cumulative = np.cumsum(pair_sizes)
+    start = 0
+    while start < len(cell_a):
+        limit = cumulative[start] - pair_sizes[start] + PAIR_BATCH_SIZE
+        end = max(int(np.searchsorted(cumulative, limit, side='right')), start + 1)
+        batch = np.arange(start, end)
+        start = end
+
+        sizes = pair_sizes[batch]
+        pair_id = np.repeat(np.arange(len(batch)), sizes)
+        within = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        count_b = cell_count[cell_b[batch]][pair_id]
+        site_a = cell_start[cell_a[batch]][pair_id] + within // count_b
+        site_b = cell_start[cell_b[batch]][pair_id] + within % count_b
+
+        close = ((sites[site_a] - sites[site_b]) ** 2).sum(axis=1) < threshold_sq
+        linked[batch[np.unique(pair_id[close])]] = True
+
+    return linked
+
+
+def csv_to_geojson(csv_file_path, output_path, threshold=0.1):
+    columns = ['latitude', 'longitude', 'date', 'scientificName', 'family', 'genus']
+    try:
+        df = pd.read_csv(csv_file_path, usecols=columns, dtype=str, keep_default_na=False)
+    except ValueError:
+        # Required columns missing: nothing to cluster
+        df = pd.DataFrame(columns=columns)
+
+    lat = pd.to_numeric(df['latitude'], errors='coerce')
+    lon = pd.to_numeric(df['longitude'], errors='coerce')
+    valid = (lat.notna() & lon.notna()).to_numpy()
+    points = pd.DataFrame({
+        'lon': lon[valid].to_numpy(),
+        'lat': lat[valid].to_numpy(),
+        'Site': df['scientificName'][valid].to_numpy(),
+        'Family': df['family'][valid].to_numpy(),
+        'Genus': df['genus'][valid].to_numpy(),
+        'Season': determine_seasons(df['date'][valid]),
+    })
+
+    # Single-linkage clustering: group points within 0.1 degrees
+    points['cluster'] = grid_clusters(points['lon'], points['lat'], threshold)
+
+    clusters = points.groupby('cluster', sort=True).agg(
+        min_lon=('lon', 'min'), max_lon=('lon', 'max'),
+        min_lat=('lat', 'min'), max_lat=('lat', 'max'),
+        n=('lon', 'size'),
         # Use the first point's properties
-        first = cluster[0]
-        area = approx_area(min_lon, max_lon, min_lat, max_lat)
-        properties = {
-            "id": None,
-            "Site": first[2],  # scientificName
-            "Family": first[3],
-            "Genus": first[4],
-            "Season": first[5],
-            "Area": area  # Approximate area in square km
-        }
-        
-        geometry = {
-            "type": "MultiPolygon",
-            "coordinates": [[square_coords]]
-        }
-        
-        feature = {
-            "type": "Feature",
-            "properties": properties,
-            "geometry": geometry
-        }
-        
-        features.append(feature)
-    
-    geojson = {
-        "type": "FeatureCollection",
-        "name": "Flowering_sites_US",
-        "crs": {
-            "type": "name",
-            "properties": {
-                "name": "urn:ogc:def:crs:OGC:1.3:CRS84"
-            }
-        },
-        "features": features
+        Site=('Site', 'first'), Family=('Family', 'first'),
+        Genus=('Genus', 'first'), Season=('Season', 'first'),
+    )
+
+    # Expand the bounding box based on number of points
+    margin = 0.01 * np.sqrt(clusters['n'].to_numpy())
+    min_lon = clusters['min_lon'].to_numpy() - margin
+    max_lon = clusters['max_lon'].to_numpy() + margin
+    min_lat = clusters['min_lat'].to_numpy() - margin
+    max_lat = clusters['max_lat'].to_numpy() + margin
+
+    properties = {
+        "id": np.full(len(clusters), None),
+        "Site": clusters['Site'],
+        "Family": clusters['Family'],
+        "Genus": clusters['Genus'],
+        "Season": clusters['Season'],
+        "Area": approx_area(min_lon, max_lon, min_lat, max_lat)  # Approximate area in square km
     }
-    
-    return geojson
+
+    with GeoJSONWriter(output_path, name="Flowering_sites_US", crs=CRS84) as writer:
+        writer.write_polygons(box_rings(min_lon, min_lat, max_lon, max_lat), properties)
+
+    return writer.feature_count
 
 if __name__ == "__main__":
     csv_path = "../data/csv/data.csv"
-    geojson_data = csv_to_geojson(csv_path)
-    
-    with open("../data/geojson/output.geojson", "w") as f:
-        json.dump(geojson_data, f, indent=2)
-    
-    print("GeoJSON file created: ../data/geojson/output.geojson")
\ No newline at end of file
+    feature_count = csv_to_geojson(csv_path, "../data/geojson/output.geojson")
+
+    print(f"GeoJSON file created: ../data/geojson/output.geojson ({feature_count} features)")
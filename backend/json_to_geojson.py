@@ -1,197 +1,315 @@
+import argparse
 import os
-import json
-import pandas as pd
-from shapely.geometry import Point, MultiPoint
+import sys
 import math
+import time
+from urllib.parse import unquote
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import numpy as np
+import pandas as pd
+import shapely
 from sklearn.cluster import DBSCAN
 
-# Collect all features
-features = []
-
-def calculate_area(polygon):
-    """Calculate approximate area in km²"""
-    coords = list(polygon.exterior.coords)
-    area = 0
-    for i in range(len(coords) - 1):
-        lon1, lat1 = coords[i]
-        lon2, lat2 = coords[i + 1]
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        lon_diff = math.radians(lon2 - lon1)
-        area += lon_diff * (2 + math.sin(lat1_rad) + math.sin(lat2_rad))
-    area = abs(area * 6371**2 / 2)
-    return area
-
-def create_polygon(points, num_observations):
-    """Create a simple polygon with minimal coordinates"""
-    # Much smaller scale factor for tighter polygons
-    scale = min(1.0 + (num_observations / 20), 3.0)  # Scale 1.0-3.0x
-    
-    if len(points) == 1:
-        # Single point: create a simple square (4 vertices instead of 16)
-        lon, lat = points[0]
-        radius = 0.05 * scale  # Base ~5km, up to ~15km
-        
-        # Square around the point
-        coords = [
-            [lon - radius, lat - radius],
-            [lon + radius, lat - radius],
-            [lon + radius, lat + radius],
-            [lon - radius, lat + radius],
-            [lon - radius, lat - radius]  # Close the polygon
-        ]
-        from shapely.geometry import Polygon
-        return Polygon(coords)
-    
-    elif len(points) == 2:
-        # Two points: create a simple rectangle/diamond (4-5 vertices)
-        lon1, lat1 = points[0]
-        lon2, lat2 = points[1]
-        
-        width = 0.03 * scale
-        
-        # Calculate perpendicular offset
-        dx = lon2 - lon1
-        dy = lat2 - lat1
-        length = math.sqrt(dx**2 + dy**2)
-        
-        if length < 0.001:  # Points too close, make square
-            radius = 0.05 * scale
-            coords = [
-                [lon1 - radius, lat1 - radius],
-                [lon1 + radius, lat1 - radius],
-                [lon1 + radius, lat1 + radius],
-                [lon1 - radius, lat1 + radius],
-                [lon1 - radius, lat1 - radius]
-            ]
-        else:
-            # Perpendicular vector for width
-            px = -dy / length * width
-            py = dx / length * width
-            
-            # Rectangle around the line
-            coords = [
-                [lon1 + px, lat1 + py],
-                [lon2 + px, lat2 + py],
-                [lon2 - px, lat2 - py],
-                [lon1 - px, lat1 - py],
-                [lon1 + px, lat1 + py]  # Close
-            ]
-        
-        from shapely.geometry import Polygon
-        return Polygon(coords)
-    
-    else:
-        # Multiple points: use simplified convex hull (already minimal vertices)
-        lons = [p[0] for p in points]
-        lats = [p[1] for p in points]
-        spread = math.sqrt((max(lons) - min(lons))**2 + (max(lats) - min(lats))**2)
-        
-        # Create convex hull (naturally minimal vertices)
-        hull = MultiPoint(points).convex_hull
-        
-        # Small buffer with LOW resolution for fewer vertices
-        buffer_size = 0.02 * scale * (1 + spread * 0.2)
-        buffered = hull.buffer(buffer_size, resolution=3)  # Only 3 segments per corner
-        
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ml', 'src'))
+
+from geojson_writer import CRS84, GeoJSONWriter, square_rings
+
+# Hive-partitioned dataset written by clean_CCNI.py, and the older per-genus JSONL tree
+FLOWERING_DATASET = '../data/parquet/flowering'
+JSONL_DIR = '../data/jsonl'
+
+PARTITION_COLUMNS = ['year', 'season', 'lat', 'long']
+
+EARTH_RADIUS_KM = 6371.0
+
+# Cluster radius: the old Euclidean eps of 0.15 degrees measured along a
+# meridian (~16.7 km), now applied as a great-circle distance at every latitude
+CLUSTER_EPS_KM = 0.15 * math.pi / 180 * EARTH_RADIUS_KM
+
+
+def calculate_areas(coords, ring_index, n_rings):
+    """
+    Approximate area in km² of many closed lon/lat rings at once.
+
+    Args:
+        coords: (m, 2) array of [lon, lat] vertices, rings stored back to back
+        ring_index: Ring number of each vertex
+        n_rings: Total number of rings
+    """
+    lon = np.radians(coords[:, 0])
+    lat_sin = np.sin(np.radians(coords[:, 1]))
+    same_ring = ring_index[1:] == ring_index[:-1]
+    terms = (lon[1:] - lon[:-1]) * (2 + lat_sin[:-1] + lat_sin[1:])
+    area = np.bincount(ring_index[1:][same_ring], weights=terms[same_ring], minlength=n_rings)
+    return np.abs(area * EARTH_RADIUS_KM ** 2 / 2)
+
+
+def cluster_labels(lon, lat, eps_km=CLUSTER_EPS_KM):
+    """
+    Cluster one (year, season) group of points.
+
+    Groups of 3+ points use haversine DBSCAN on a BallTree; noise points and
+    smaller groups become single-point clusters.
+
+    Returns:
+        Cluster number per point, numbered in order of each cluster's first point
+    """
+    n = len(lon)
+    if n < 3:
+        # Too few points, treat each separately
+        return np.arange(n)
+
+    coords = np.radians(np.column_stack([lat, lon]))
+    # Tighter clustering for smaller, more concentrated polygons
+    labels = DBSCAN(eps=eps_km / EARTH_RADIUS_KM, min_samples=2, metric='haversine',
+                    algorithm='ball_tree').fit(coords).labels_
+
+    # Each noise point is its own cluster
+    noise = labels == -1
+    labels = labels.astype(np.int64)
+    labels[noise] = labels.max() + 1 + np.arange(noise.sum())
+    return pd.factorize(labels)[0]
+
+
+def create_polygons(cluster_lon, cluster_lat, cluster_id, sizes, scales):
+    """
+    Simple polygons with minimal coordinates for many clusters at once.
+
+    Args:
+        cluster_lon, cluster_lat: Point coordinates sorted by cluster
+        cluster_id: Cluster number of each point (0..k-1, contiguous)
+        sizes: Points per cluster
+        scales: Polygon scale factor per cluster (1.0-3.0x)
+
+    Returns:
+        List of closed (v, 2) rings (None where no polygon could be made)
+    """
+    rings = [None] * len(sizes)
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+
+    # Single point: a simple square (base ~5km, up to ~15km)
+    single = np.flatnonzero(sizes == 1)
+    if len(single):
+        squares = square_rings(cluster_lon[starts[single]], cluster_lat[starts[single]], 0.05 * scales[single])
+        for k, ring in zip(single, squares):
+            rings[k] = ring
+
+    # Two points: a rectangle around the line (square if the points coincide)
+    double = np.flatnonzero(sizes == 2)
+    if len(double):
+        lon1, lat1 = cluster_lon[starts[double]], cluster_lat[starts[double]]
+        lon2, lat2 = cluster_lon[starts[double] + 1], cluster_lat[starts[double] + 1]
+        dx, dy = lon2 - lon1, lat2 - lat1
+        length = np.sqrt(dx ** 2 + dy ** 2)
+        too_close = length < 0.001
+
+        width = 0.03 * scales[double]
+        safe_length = np.where(too_close, 1.0, length)
+        px, py = -dy / safe_length * width, dx / safe_length * width
+        rectangles = np.stack([
+            np.stack([lon1 + px, lat1 + py], axis=-1),
+            np.stack([lon2 + px, lat2 + py], axis=-1),
+            np.stack([lon2 - px, lat2 - py], axis=-1),
+            np.stack([lon1 - px, lat1 - py], axis=-1),
+            np.stack([lon1 + px, lat1 + py], axis=-1),
+        ], axis=1)
+        squares = square_rings(lon1, lat1, 0.05 * scales[double])
+        rectangles[too_close] = squares[too_close]
+        for k, ring in zip(double, rectangles):
+            rings[k] = ring
+
+    # Multiple points: buffered, simplified convex hull
+    multi = np.flatnonzero(sizes >= 3)
+    if len(multi):
+        in_multi = np.isin(cluster_id, multi)
+        points = np.column_stack([cluster_lon[in_multi], cluster_lat[in_multi]])
+        owner = np.searchsorted(multi, cluster_id[in_multi])
+
+        # Bounding-box diagonal of each cluster
+        spread = np.hypot(
+            np.maximum.reduceat(cluster_lon, starts) - np.minimum.reduceat(cluster_lon, starts),
+            np.maximum.reduceat(cluster_lat, starts) - np.minimum.reduceat(cluster_lat, starts),
+        )[multi]
+
+        hulls = shapely.convex_hull(shapely.multipoints(points, indices=owner))
+        # Small buffer with LOW resolution for fewer vertices (3 segments per corner)
+        buffered = shapely.buffer(hulls, 0.02 * scales[multi] * (1 + spread * 0.2), quad_segs=3)
         # Simplify to reduce vertices further
-        simplified = buffered.simplify(0.01, preserve_topology=True)
-        
-        return simplified
-
-# Scan family directories
-for family in os.listdir('../data/jsonl'):
-    family_path = os.path.join('../data/jsonl', family)
-    if not os.path.isdir(family_path):
-        continue
-        
-    for file in os.listdir(family_path):
-        if not file.endswith('.jsonl'):
-            continue
-            
-        genus = file[:-6]  # remove .jsonl
-        filepath = os.path.join(family_path, file)
-        
-        try:
-            df = pd.read_json(filepath, lines=True)
-        except:
+        simplified = shapely.simplify(buffered, 0.01, preserve_topology=True)
+
+        is_polygon = shapely.get_type_id(simplified) == shapely.GeometryType.POLYGON
+        exteriors = shapely.get_exterior_ring(simplified[is_polygon])
+        coords, index = shapely.get_coordinates(exteriors, return_index=True)
+        breaks = np.flatnonzero(np.diff(index)) + 1
+        for k, ring in zip(multi[is_polygon], np.split(coords, breaks)):
+            rings[k] = ring
+
+    return rings
+
+
+def read_partition(path):
+    """Observations of one family/genus partition (Parquet directory or JSONL file)"""
+    if os.path.isdir(path):
+        # Only the columns the polygon builder uses
+        return pd.read_parquet(path, columns=PARTITION_COLUMNS)
+    return pd.read_json(path, lines=True)
+
+
+def partition_polygons(family, genus, path):
+    """
+    Polygons for one family/genus partition.
+
+    Returns:
+        (rings, properties) ready for GeoJSONWriter.write_polygons, or None
+    """
+    try:
+        df = read_partition(path)
+    except Exception:
+        return None
+
+    if df.empty or not {'year', 'season', 'long', 'lat'}.issubset(df.columns):
+        return None
+
+    df = df[df['long'].notna() & df['lat'].notna()]
+    if df.empty:
+        return None
+
+    # Group by year and season; clusters keep the group order of the old per-group loop
+    frames = []
+    for group_number, ((year, season), group_df) in enumerate(df.groupby(['year', 'season'])):
+        labels = cluster_labels(group_df['long'].to_numpy(dtype=float), group_df['lat'].to_numpy(dtype=float))
+        frames.append(pd.DataFrame({
+            'group': group_number,
+            'cluster': labels,
+            'lon': group_df['long'].to_numpy(dtype=float),
+            'lat': group_df['lat'].to_numpy(dtype=float),
+            'year': int(year),
+            'season': str(season).capitalize(),
+            'num_observations': len(group_df),
+        }))
+
+    points = pd.concat(frames, ignore_index=True)
+    points = points.sort_values(['group', 'cluster'], kind='stable').reset_index(drop=True)
+    cluster_id = points.groupby(['group', 'cluster'], sort=False).ngroup().to_numpy()
+
+    clusters = points.groupby(cluster_id, sort=True).agg(
+        size=('lon', 'size'), year=('year', 'first'),
+        season=('season', 'first'), num_observations=('num_observations', 'first'),
+    )
+
+    # Much smaller scale factor for tighter polygons: 1.0-3.0x
+    scales = np.minimum(1.0 + clusters['num_observations'].to_numpy() / 20, 3.0)
+    rings = create_polygons(points['lon'].to_numpy(), points['lat'].to_numpy(), cluster_id,
+                            clusters['size'].to_numpy(), scales)
+
+    keep = np.array([ring is not None for ring in rings])
+    if not keep.any():
+        return None
+    rings = [ring for ring in rings if ring is not None]
+    clusters = clusters[keep]
+
+    ring_index = np.repeat(np.arange(len(rings)), [len(ring) for ring in rings])
+    areas = calculate_areas(np.concatenate(rings), ring_index, len(rings))
+
+    properties = {
+        "id": np.full(len(rings), None),
+        "Family": np.full(len(rings), family),
+        "Genus": np.full(len(rings), genus),
+        "Season": clusters['season'],
+        "Area": np.round(areas, 3),
+        "year": clusters['year'].astype(int),
+    }
+    return rings, properties
+
+
+def list_partitions(source_dir, families=None):
+    """
+    (family, genus, path) for every partition, in sorted order.
+
+    Supports a Hive-partitioned Parquet dataset (family=<f>/genus=<g>/ directories)
+    and the per-genus JSONL layout (<family>/<genus>.jsonl).
+
+    Args:
+        source_dir: Dataset root
+        families: Only list these families (default: all)
+    """
+    partitions = []
+    for family_entry in sorted(os.listdir(source_dir)):
+        family_path = os.path.join(source_dir, family_entry)
+        if not os.path.isdir(family_path):
             continue
-            
-        if df.empty:
+
+        hive = family_entry.startswith('family=')
+        family = unquote(family_entry[len('family='):]) if hive else family_entry
+        if families is not None and family not in families:
             continue
-        
-        # Group by year and season
-        for (year, season), group_df in df.groupby(['year', 'season']):
-            # Collect points
-            points = [(row['long'], row['lat']) for _, row in group_df.iterrows() 
-                     if pd.notna(row['long']) and pd.notna(row['lat'])]
-            
-            if not points:
-                continue
-            
-            num_observations = len(points)
-            
-            # Cluster nearby points
-            if len(points) >= 3:
-                coords_array = np.array(points)
-                # Tighter clustering for smaller, more concentrated polygons
-                clustering = DBSCAN(eps=0.15, min_samples=2).fit(coords_array)  # Reduced from 0.3
-                
-                # Group by cluster
-                clusters = {}
-                for idx, label in enumerate(clustering.labels_):
-                    key = label if label != -1 else f"noise_{idx}"
-                    if key not in clusters:
-                        clusters[key] = []
-                    clusters[key].append(points[idx])
-            else:
-                # Too few points, treat each separately
-                clusters = {i: [points[i]] for i in range(len(points))}
-            
-            # Create polygon for each cluster
-            for cluster_points in clusters.values():
-                poly = create_polygon(cluster_points, num_observations)
-                
-                if poly.geom_type != 'Polygon':
-                    continue
-                
-                # Calculate area
-                area = calculate_area(poly)
-                
-                # Create feature
-                feature = {
-                    "type": "Feature",
-                    "properties": {
-                        "id": None,
-                        "Family": family,
-                        "Genus": genus,
-                        "Season": str(season).capitalize(),
-                        "Area": round(area, 3),
-                        "year": int(year)
-                    },
-                    "geometry": {
-                        "type": "MultiPolygon",
-                        "coordinates": [[ [[x, y] for x, y in poly.exterior.coords] ]]
-                    }
-                }
-                features.append(feature)
-
-# Create GeoJSON
-geojson = {
-    "type": "FeatureCollection",
-    "name": "Flowering_sites",
-    "crs": {
-        "type": "name",
-        "properties": {
-            "name": "urn:ogc:def:crs:OGC:1.3:CRS84"
-        }
-    },
-    "features": features
-}
-
-# Write to file
-with open("../data/geojson/flowering_sites.geojson", "w") as f:
-    json.dump(geojson, f, indent=2)
-
-print(f"GeoJSON file created with {len(features)} features")
\ No newline at end of file
+
+        for entry in sorted(os.listdir(family_path)):
+            path = os.path.join(family_path, entry)
+            if hive and entry.startswith('genus=') and os.path.isdir(path):
+                partitions.append((family, unquote(entry[len('genus='):]), path))
+            elif not hive and entry.endswith('.jsonl'):
+                partitions.append((family, entry[:-6], path))
+    return partitions
+
+
+def json_to_geojson(source_dir=None, output_path='../data/geojson/flowering_sites.geojson',
+                    parallel=True, max_workers=None, families=None):
+    """
+    Build flowering-site polygons for every family/genus partition and stream
+    them to one GeoJSON file.
+
+    The Parquet dataset from clean_CCNI.py is used when it exists (each worker
+    opens only its own partition directory and reads only PARTITION_COLUMNS);
+    otherwise the JSONL tree.
+
+    Partitions are processed in a process pool (results are written in
+    partition order, so the output is deterministic) and sequentially when
+    only one worker is available or the pool cannot start.
+
+    Returns:
+        Number of features written
+    """
+    start = time.perf_counter()
+    if source_dir is None:
+        source_dir = FLOWERING_DATASET if os.path.isdir(FLOWERING_DATASET) else JSONL_DIR
+    partitions = list_partitions(source_dir, families)
+    workers = min(len(partitions), max_workers or os.cpu_count() or 1)
+
+    with GeoJSONWriter(output_path, name="Flowering_sites", crs=CRS84) as writer:
+        done = 0
+        if parallel and workers > 1:
+            print(f"Processing {len(partitions)} family/genus partitions in {workers} processes...")
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    # map() yields in submission order
+                    for result in executor.map(partition_polygons, *zip(*partitions)):
+                        if result is not None:
+                            writer.write_polygons(*result)
+                        done += 1
+            except (BrokenProcessPool, OSError) as e:
+                print(f"Process pool unavailable ({e}), processing remaining partitions sequentially")
+
+        for family, genus, path in partitions[done:]:
+            result = partition_polygons(family, genus, path)
+            if result is not None:
+                writer.write_polygons(*result)
+
+    print(f"Processed {len(partitions)} partitions in {time.perf_counter() - start:.1f}s")
+    return writer.feature_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build flowering-site polygons from family/genus partitions')
+    parser.add_argument('--source', default=None,
+                        help=f'Partitioned dataset (default: {FLOWERING_DATASET} if present, else {JSONL_DIR})')
+    parser.add_argument('--family', action='append', dest='families', help='Only build these families')
+    parser.add_argument('--output', default='../data/geojson/flowering_sites.geojson')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    feature_count = json_to_geojson(args.source, args.output, max_workers=args.workers, families=args.families)
+
+    print(f"GeoJSON file created with {feature_count} features")
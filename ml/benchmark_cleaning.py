@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the vectorized BloomDataCleaner source cleaners
+Times the current cleaners against the previous row-by-row implementations
+(kept below as LegacyBloomDataCleaner) on the bundled raw files and on a
+synthetic upscale, and checks that both produce identical DataFrames.
+
+Usage:
+    python benchmark_cleaning.py [--scale 100]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from clean_data import BloomDataCleaner
+
+RAW_DIR = Path(__file__).parent.parent / 'data' / 'raw'
+
+
+class LegacyBloomDataCleaner(BloomDataCleaner):
+    """Row-by-row cleaners as they were before vectorization (reference only)"""
+    
+    def clean_historical_sakura_data(self, sakura_bloom_path, cities_geocoded_path):
+        """
+        Clean historical Japanese cherry blossom data (1953-2025).
+        Combines JMA observation data with geocoded city coordinates.
+        
+        Args:
+            sakura_bloom_path: Path to sakura_first_bloom_dates.csv
+            cities_geocoded_path: Path to japan_cities_geocoded.csv
+            
+        Returns:
+            pandas DataFrame with cleaned historical cherry blossom data
+        """
+        print(f"\n Processing Historical Japanese Sakura Data (1953-2025)...")
+        print(f" Reading bloom dates from: {sakura_bloom_path}")
+        print(f" Reading geocoded cities from: {cities_geocoded_path}")
+
+        # Load bloom dates and geocoded cities
+        blooms = pd.read_csv(sakura_bloom_path)
+        cities = pd.read_csv(cities_geocoded_path)
+        
+        print(f" Cities: {len(blooms)} locations")
+        print(f" Geocoded cities: {len(cities)} with coordinates")
+        
+        # Create a dictionary mapping city names to their coordinates
+        city_lookup = cities.set_index('city_name').to_dict('index')
+        
+        # Prepare data for transformation
+        records = []
+        
+        # Get year columns (exclude first 2 columns: Site Name, Currently Being Observed)
+        # and last 2 columns: 30 Year Average, Notes
+        year_columns = blooms.columns[2:-2]
+        
+        print(f" Processing bloom dates from {len(year_columns)} years...")
+        
+        for idx, row in blooms.iterrows():
+            city_name = row['Site Name']
+            currently_observed = row['Currently Being Observed']
+            notes = row.get('Notes', '') if pd.notna(row.get('Notes', '')) else ''
+            
+            # Get city coordinates
+            city_info = city_lookup.get(city_name, {})
+            latitude = city_info.get('latitude')
+            longitude = city_info.get('longitude')
+            elevation = city_info.get('elevation_m')
+            
+            if latitude is None or longitude is None:
+                print(f"   Warning: No coordinates for {city_name}, skipping...")
+                continue
+            
+            # Determine species from notes
+            if 'Sargent cherry' in notes or 'Prunus sargentii' in notes:
+                species_name = 'Prunus sargentii'
+                common_name = 'Sargent Cherry'
+                species_code = 'sargentii'
+            elif 'Taiwan cherry' in notes or 'Prunus campanulata' in notes:
+                species_name = 'Prunus campanulata'
+                common_name = 'Taiwan Cherry'
+                species_code = 'campanulata'
+            elif 'Kurile' in notes or 'kurilensis' in notes:
+                species_name = 'Cerasus nipponica var. kurilensis'
+                common_name = 'Kurile Island Cherry'
+                species_code = 'kurilensis'
+            else:
+                # Default to Yoshino (most common)
+                species_name = 'Prunus × yedoensis'
+                common_name = 'Yoshino Cherry'
+                species_code = 'yedoensis'
+            
+            # Process each year's bloom date
+            for year_col in year_columns:
+                bloom_date_str = row[year_col]
+                
+                # Skip empty/NaN values
+                if pd.isna(bloom_date_str) or bloom_date_str == '':
+                    continue
+                
+                try:
+                    # Parse the datetime
+                    bloom_date = pd.to_datetime(bloom_date_str)
+                    
+                    # Extract year from column name (should match bloom_date year)
+                    year = int(year_col)
+                    
+                    # Create record
+                    record = {
+                        'record_id': f'jma_sakura_{city_name.lower().replace(" ", "_")}_{year}',
+                        'data_source': 'Japan Meteorological Agency (JMA) Historical',
+                        'scientific_name': species_name,
+                        'family': 'Rosaceae',
+                        'genus': species_name.split()[0],  # First word of scientific name
+                        'species': species_code,
+                        'common_name': common_name,
+                        'location_name': city_name,
+                        'prefecture': '',  # Could be extracted from region if needed
+                        'region': 'Japan',
+                        'latitude': latitude,
+                        'longitude': longitude,
+                        'elevation_m': elevation,
+                        'date': bloom_date,
+                        'year': year,
+                        'month': bloom_date.month,
+                        'day_of_year': bloom_date.timetuple().tm_yday,
+                        'season': self.determine_season(bloom_date),
+                        'full_bloom_date': pd.NaT,  # Not available in this dataset
+                        'full_bloom_day_of_year': np.nan,
+                        'temperature_avg': np.nan,  # Will be added by feature engineering
+                        'temperature_min': np.nan,
+                        'temperature_max': np.nan,
+                        'precipitation': np.nan,
+                        'trait': 'first flowering (kaika)',
+                        'basis_of_record': 'Human Observation',
+                        'is_prediction': False,  # Historical observations
+                        'currently_observed': currently_observed,
+                        'species_notes': notes
+                    }
+                    
+                    records.append(record)
+                    
+                except Exception as e:
+                    print(f"   Warning: Could not parse date '{bloom_date_str}' for {city_name} in {year_col}: {e}")
+                    continue
+        
+        # Create DataFrame from records
+        cleaned = pd.DataFrame(records)
+        
+        if len(cleaned) == 0:
+            print(f" WARNING: No historical sakura data could be processed!")
+            return pd.DataFrame()
+        
+        # Remove duplicates
+        print(f" Removing duplicates...")
+        initial_count = len(cleaned)
+        cleaned = cleaned.drop_duplicates(
+            subset=['location_name', 'latitude', 'longitude', 'year', 'day_of_year'],
+            keep='first'
+        )
+        removed = initial_count - len(cleaned)
+        print(f"   Removed {removed} duplicate observations")
+        
+        # Sort by date
+        cleaned = cleaned.sort_values(['year', 'day_of_year', 'location_name']).reset_index(drop=True)
+        
+        # Summary statistics
+        print(f"\n Historical Sakura Data Summary:")
+        print(f"   Total observations: {len(cleaned):,}")
+        print(f"   Cities: {cleaned['location_name'].nunique()}")
+        print(f"   Year range: {cleaned['year'].min()} - {cleaned['year'].max()}")
+        print(f"   Species: {cleaned['scientific_name'].nunique()}")
+        for species in cleaned['scientific_name'].unique():
+            count = (cleaned['scientific_name'] == species).sum()
+            print(f"     • {species}: {count:,} observations")
+        print(f"   Currently observed stations: {cleaned['currently_observed'].sum()}")
+        print(f"   Geographic range:")
+        print(f"     • Latitude: {cleaned['latitude'].min():.2f}° to {cleaned['latitude'].max():.2f}°")
+        print(f"     • Longitude: {cleaned['longitude'].min():.2f}° to {cleaned['longitude'].max():.2f}°")
+        print(f"     • Elevation: {cleaned['elevation_m'].min():.0f}m to {cleaned['elevation_m'].max():.0f}m")
+        
+        return cleaned
+    
+    def clean_symphyotrichum_data(self, csv_path):
+        """
+        Clean Symphyotrichum species data (National Phenology Network).
+        
+        Args:
+            csv_path: Path to data.csv (Symphyotrichum observations)
+            
+        Returns:
+            pandas DataFrame with cleaned data
+        """
+        print(f"\n Processing Symphyotrichum Species Data...")
+        print(f" Reading data from: {csv_path}")
+
+        df = pd.read_csv(csv_path, encoding='utf-8')
+
+        print(f" Initial rows: {len(df)}")
+        
+        # Create cleaned copy
+        cleaned = pd.DataFrame()
+        
+        # Extract core fields
+        cleaned['record_id'] = 'npn_' + df['annotationID'].str.replace('npn:', '')
+        cleaned['data_source'] = df.get('dataSource', 'National Phenology Network')
+        cleaned['scientific_name'] = df['scientificName']
+        cleaned['family'] = df['family']
+        cleaned['genus'] = df['genus']
+        cleaned['species'] = df.get('species', '')
+        cleaned['common_name'] = df['scientificName'].apply(self._get_common_name)
+        
+        # Location
+        cleaned['location_name'] = ''  # Not provided in this dataset
+        cleaned['prefecture'] = ''
+        cleaned['region'] = 'North America'  # Based on lat/lng
+        cleaned['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
+        cleaned['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
+        
+        # Date and temporal features
+        cleaned['date'] = pd.to_datetime(df['date'], errors='coerce')
+        cleaned['year'] = df['year']
+        cleaned['day_of_year'] = df.get('dayOfYear', cleaned['date'].dt.dayofyear)
+        cleaned['month'] = cleaned['date'].dt.month
+        cleaned['season'] = cleaned['date'].apply(self.determine_season)
+        cleaned['full_bloom_date'] = None  # Not tracked for these species
+        cleaned['full_bloom_day_of_year'] = None
+        
+        # Climate data (not available in this dataset)
+        cleaned['temperature_avg'] = None
+        cleaned['temperature_min'] = None
+        cleaned['temperature_max'] = None
+        cleaned['precipitation'] = None
+        
+        # Observation metadata
+        cleaned['trait'] = df.get('trait', 'open flower present')
+        cleaned['basis_of_record'] = df.get('basisOfRecord', 'Human Observation')
+        cleaned['is_prediction'] = False  # Historical observations
+        
+        # Remove rows with missing critical data
+        print(f"🧹 Removing rows with missing coordinates or dates...")
+        initial_count = len(cleaned)
+        cleaned = cleaned.dropna(subset=['latitude', 'longitude', 'date', 'day_of_year'])
+        removed = initial_count - len(cleaned)
+        print(f"   Removed {removed} rows with missing data")
+        
+        # Remove invalid coordinates
+        print(f"🧹 Removing invalid coordinates...")
+        initial_count = len(cleaned)
+        cleaned = cleaned[
+            (cleaned['latitude'].between(-90, 90)) & 
+            (cleaned['longitude'].between(-180, 180))
+        ]
+        removed = initial_count - len(cleaned)
+        print(f"   Removed {removed} rows with invalid coordinates")
+        
+        # Remove duplicates
+        print(f"🧹 Removing duplicates...")
+        initial_count = len(cleaned)
+        cleaned = cleaned.drop_duplicates(
+            subset=['scientific_name', 'latitude', 'longitude', 'date'],
+            keep='first'
+        )
+        removed = initial_count - len(cleaned)
+        print(f"   Removed {removed} duplicate observations")
+        
+        # Sort by date
+        cleaned = cleaned.sort_values(['year', 'day_of_year']).reset_index(drop=True)
+        
+        print(f" Symphyotrichum data cleaned: {len(cleaned)} observations")
+        
+        return cleaned
+    
+    def clean_sweet_cherry_data(self, csv_path):
+        """
+        Clean Sweet Cherry phenology data (1978-2015 European dataset).
+        
+        Args:
+            csv_path: Path to Sweet_cherry_phenology_data_1978-2015.csv
+            
+        Returns:
+            pandas DataFrame with cleaned sweet cherry data
+        """
+        print(f"\n Processing Sweet Cherry Phenology Data...")
+        print(f" Reading data from: {csv_path}")
+
+        df = pd.read_csv(csv_path, encoding='utf-8')
+
+        print(f" Initial rows: {len(df)}")
+        
+        # Create cleaned copy
+        cleaned = pd.DataFrame()
+        
+        # Generate unique IDs
+        cleaned['record_id'] = 'swc_' + df.index.astype(str)
+        cleaned['data_source'] = df['Country'] + ' - ' + df['Institute']
+        
+        # Taxonomy (all are Sweet Cherry)
+        cleaned['scientific_name'] = 'Prunus avium'
+        cleaned['family'] = 'Rosaceae'
+        cleaned['genus'] = 'Prunus'
+        cleaned['species'] = 'avium'
+        cleaned['common_name'] = 'Sweet Cherry'
+        
+        # Location information
+        cleaned['location_name'] = df['Site']
+        cleaned['prefecture'] = df['Country']
+        cleaned['region'] = df['Country']
+        cleaned['latitude'] = pd.to_numeric(df['Latitude'], errors='coerce')
+        cleaned['longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
+        
+        # Parse dates - the file uses "Beginning of flowering" column (day of year)
+        cleaned['year'] = pd.to_numeric(df['Year'], errors='coerce')
+        cleaned['day_of_year'] = pd.to_numeric(df['Beginning of flowering'], errors='coerce')
+        
+        # Create actual date from year and day of year
+        def create_date(row):
+            try:
+                if pd.notnull(row['year']) and pd.notnull(row['day_of_year']):
+                    return datetime.strptime(f"{int(row['year'])}-{int(row['day_of_year'])}", "%Y-%j")
+            except:
+                pass
+            return None
+        
+        cleaned['date'] = cleaned.apply(create_date, axis=1)
+        cleaned['month'] = cleaned['date'].dt.month
+        cleaned['season'] = cleaned['date'].apply(self.determine_season)
+        
+        # Full flowering data
+        cleaned['full_bloom_day_of_year'] = pd.to_numeric(df.get('Full Flowering'), errors='coerce')
+        
+        def create_full_bloom_date(row):
+            try:
+                if pd.notnull(row['year']) and pd.notnull(row['full_bloom_day_of_year']):
+                    return datetime.strptime(f"{int(row['year'])}-{int(row['full_bloom_day_of_year'])}", "%Y-%j")
+            except:
+                pass
+            return None
+        
+        cleaned['full_bloom_date'] = cleaned.apply(create_full_bloom_date, axis=1)
+        
+        # Climate data (not available in this dataset)
+        cleaned['temperature_avg'] = None
+        cleaned['temperature_min'] = None
+        cleaned['temperature_max'] = None
+        cleaned['precipitation'] = None
+        
+        # Metadata
+        cleaned['trait'] = 'beginning of flowering'
+        cleaned['basis_of_record'] = 'Field Observation'
+        cleaned['is_prediction'] = False  # Historical observations
+        
+        # Add cultivar info for reference (optional)
+        # cleaned['cultivar'] = df.get('Cultivar', '')
+        
+        # Remove rows with missing critical data
+        print(f"🧹 Removing rows with missing coordinates or dates...")
+        initial_count = len(cleaned)
+        cleaned = cleaned.dropna(subset=['latitude', 'longitude', 'year', 'day_of_year'])
+        removed = initial_count - len(cleaned)
+        print(f"   Removed {removed} rows with missing data")
+        
+        # Remove invalid coordinates (Europe bounds approximately)
+        print(f"🧹 Validating coordinates for Europe...")
+        initial_count = len(cleaned)
+        # Europe bounds: lat 35-71, lng -10 to 40
+        cleaned = cleaned[
+            (cleaned['latitude'].between(35, 71)) & 
+            (cleaned['longitude'].between(-10, 40))
+        ]
+        removed = initial_count - len(cleaned)
+        print(f"   Removed {removed} rows with invalid coordinates")
+        
+        # Remove duplicates
+        print(f"🧹 Removing duplicates...")
+        initial_count = len(cleaned)
+        cleaned = cleaned.drop_duplicates(
+            subset=['location_name', 'latitude', 'longitude', 'year', 'day_of_year'],
+            keep='first'
+        )
+        removed = initial_count - len(cleaned)
+        print(f"   Removed {removed} duplicate observations")
+        
+        # Sort by date
+        cleaned = cleaned.sort_values(['year', 'day_of_year']).reset_index(drop=True)
+        
+        print(f" Sweet Cherry data cleaned: {len(cleaned)} observations")
+        
+        return cleaned
+
+
+def upscale_raw_files(raw_dir, out_dir, scale):
+    """
+    Write `scale` copies of each raw file with distinct sites/IDs so that the
+    copies survive deduplication. Returns the paths of the upscaled files.
+    """
+    out_dir = Path(out_dir)
+    copies = range(scale)
+
+    blooms = pd.read_csv(raw_dir / 'sakura_first_bloom_dates.csv')
+    cities = pd.read_csv(raw_dir / 'japan_cities_geocoded.csv')
+    pd.concat([blooms.assign(**{'Site Name': blooms['Site Name'] + f' {k}'}) for k in copies]) \
+        .to_csv(out_dir / 'sakura_first_bloom_dates.csv', index=False)
+    pd.concat([cities.assign(city_name=cities['city_name'] + f' {k}') for k in copies]) \
+        .to_csv(out_dir / 'japan_cities_geocoded.csv', index=False)
+
+    symph = pd.read_csv(raw_dir / 'data.csv')
+    pd.concat([
+        symph.assign(annotationID=symph['annotationID'] + f'_{k}', latitude=symph['latitude'] + k * 1e-4)
+        for k in copies
+    ]).to_csv(out_dir / 'data.csv', index=False)
+
+    sweet = pd.read_csv(raw_dir / 'Sweet_cherry_phenology_data_1978-2015.csv')
+    pd.concat([sweet.assign(Site=sweet['Site'] + f' {k}') for k in copies]) \
+        .to_csv(out_dir / 'Sweet_cherry_phenology_data_1978-2015.csv', index=False)
+
+    return out_dir
+
+
+def time_cleaner(func, *args):
+    """Run a cleaner with its console output suppressed; returns (DataFrame, seconds)"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def normalize(df):
+    """Datetime columns to one resolution (legacy rows build microsecond datetimes)"""
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].astype('datetime64[ns]')
+    return df
+
+
+def run_benchmark(raw_dir, label):
+    legacy = LegacyBloomDataCleaner(raw_data_dir=raw_dir, processed_data_dir=tempfile.gettempdir())
+    current = BloomDataCleaner(raw_data_dir=raw_dir, processed_data_dir=tempfile.gettempdir())
+
+    sources = [
+        ('JMA historical sakura', 'clean_historical_sakura_data',
+         (raw_dir / 'sakura_first_bloom_dates.csv', raw_dir / 'japan_cities_geocoded.csv')),
+        ('Symphyotrichum', 'clean_symphyotrichum_data', (raw_dir / 'data.csv',)),
+        ('Sweet cherry', 'clean_sweet_cherry_data', (raw_dir / 'Sweet_cherry_phenology_data_1978-2015.csv',)),
+    ]
+
+    print(f"\n{label}")
+    print(f"   {'Source':<24}{'Rows':>10}{'Legacy (s)':>13}{'Vectorized (s)':>17}{'Speedup':>10}")
+    for name, method, args in sources:
+        expected, legacy_time = time_cleaner(getattr(legacy, method), *args)
+        actual, current_time = time_cleaner(getattr(current, method), *args)
+
+        pd.testing.assert_frame_equal(normalize(actual), normalize(expected), check_dtype=False)
+
+        speedup = legacy_time / current_time if current_time > 0 else float('inf')
+        print(f"   {name:<24}{len(actual):>10,}{legacy_time:>13.3f}{current_time:>17.3f}{speedup:>9.1f}x")
+    print("   ✓ Outputs identical")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark legacy vs vectorized source cleaners')
+    parser.add_argument('--raw-dir', type=Path, default=RAW_DIR)
+    parser.add_argument('--scale', type=int, default=100, help='Copies of each raw file in the upscaled run')
+    args = parser.parse_args()
+
+    run_benchmark(args.raw_dir, f"Bundled raw files ({args.raw_dir})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        upscale_raw_files(args.raw_dir, tmp, args.scale)
+        run_benchmark(Path(tmp), f"Synthetic {args.scale}x upscale")
+
+
+if __name__ == '__main__':
+    main()
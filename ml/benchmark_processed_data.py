@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the processed-data formats
+Compares loading a processed dataset from CSV (as the training, prediction and
+validation scripts used to) against its typed Parquet copy: full loads, column
+projection and the filtered 2024 Prunus load used by validate_predictions.py.
+Reports file size, load time and in-memory DataFrame size, and checks that the
+Parquet and CSV loads agree.
+
+Usage:
+    python benchmark_processed_data.py [--scale 50] [--repeat 3]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from processed_data import PYARROW_AVAILABLE, parquet_path, read_processed, write_processed
+
+PROCESSED_DIR = Path(__file__).parent.parent / 'data' / 'processed'
+
+# Columns used by PredictionGenerator's nearest-location lookups
+LOOKUP_COLUMNS = ['latitude', 'longitude', 'year', 'region', 'temp_avg_30d', 'gdd_30d', 'ndvi_mean_10d', 'elevation_m']
+VALIDATION_COLUMNS = ['year', 'genus', 'region', 'latitude', 'longitude', 'day_of_year']
+VALIDATION_FILTERS = [('year', '==', 2024), ('genus', '==', 'Prunus')]
+
+
+def upscale(source_csv, out_csv, scale):
+    """Write `scale` copies of a processed CSV (record IDs made unique) plus its Parquet copy"""
+    df = pd.read_csv(source_csv)
+    copies = [df.assign(record_id=df['record_id'].astype(str) + f'_{k}') for k in range(scale)]
+    write_processed(pd.concat(copies, ignore_index=True), out_csv)
+    return out_csv
+
+
+def time_load(func, repeat):
+    """Best-of-`repeat` wall time; returns (DataFrame, seconds)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def frame_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def run_benchmark(csv_path, label, repeat):
+    csv_path = Path(csv_path)
+    pq_path = parquet_path(csv_path)
+    available = set(pd.read_csv(csv_path, nrows=0).columns)
+    lookup = [c for c in LOOKUP_COLUMNS if c in available]
+
+    cases = [
+        ('Full load', dict()),
+        (f'Projection ({len(lookup)} cols)', dict(columns=lookup)),
+        ('2024 Prunus (filtered)', dict(columns=VALIDATION_COLUMNS, filters=VALIDATION_FILTERS)),
+    ]
+
+    print(f"\n{label}")
+    print(f"   CSV: {csv_path.stat().st_size / 1e6:.1f} MB | Parquet: {pq_path.stat().st_size / 1e6:.1f} MB")
+    print(f"   {'Load':<26}{'Rows':>10}{'CSV (s)':>10}{'Parquet (s)':>13}{'Speedup':>9}"
+          f"{'CSV MB':>9}{'Parquet MB':>12}")
+
+    # Plain read_csv is what the loaders did before
+    baseline, baseline_time = time_load(lambda: pd.read_csv(csv_path), repeat)
+    print(f"   {'read_csv (previous)':<26}{len(baseline):>10,}{baseline_time:>10.3f}{'':>13}{'':>9}"
+          f"{frame_mb(baseline):>9.1f}{'':>12}")
+
+    for name, kwargs in cases:
+        from_csv, csv_time = time_load(lambda: read_processed(csv_path, prefer_parquet=False, **kwargs), repeat)
+        from_parquet, pq_time = time_load(lambda: read_processed(csv_path, **kwargs), repeat)
+
+        pd.testing.assert_frame_equal(from_parquet, from_csv, check_dtype=False, check_categorical=False)
+
+        speedup = csv_time / pq_time if pq_time > 0 else float('inf')
+        print(f"   {name:<26}{len(from_parquet):>10,}{csv_time:>10.3f}{pq_time:>13.3f}{speedup:>8.1f}x"
+              f"{frame_mb(from_csv):>9.1f}{frame_mb(from_parquet):>12.1f}")
+    print("   ✓ Parquet and CSV loads identical")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CSV vs Parquet processed-data loads')
+    parser.add_argument('--source', type=Path, default=PROCESSED_DIR / 'bloom_features_ml.csv')
+    parser.add_argument('--scale', type=int, default=50, help='Copies of the dataset in the upscaled run')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per load (best is reported)')
+    args = parser.parse_args()
+
+    if not PYARROW_AVAILABLE:
+        print("pyarrow is required for this benchmark. Install with: pip install pyarrow")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_benchmark(upscale(args.source, Path(tmp) / 'bundled.csv', 1),
+                      f"Bundled dataset ({args.source.name})", args.repeat)
+        run_benchmark(upscale(args.source, Path(tmp) / 'upscaled.csv', args.scale),
+                      f"Synthetic {args.scale}x upscale", args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Local mock of the NASA AppEEARS API for testing batched NDVI retrieval
+Implements the endpoints used by Bloombly: /login, /task, /task/<id>,
+/bundle/<id> and /bundle/<id>/<file_id>. Point tasks return a results CSV with
+deterministic synthetic NDVI for every coordinate and 16-day composite date.
+"""
+
+import argparse
+import json
+import math
+import threading
+import uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def synthetic_ndvi(latitude, date):
+    """Deterministic NDVI in [-1, 1]: seasonal cycle, earlier green-up at low latitudes"""
+    day = date.timetuple().tm_yday
+    phase = (day - 100 + abs(latitude)) / 365.0
+    return round(0.45 + 0.35 * math.sin(2 * math.pi * phase), 4)
+
+
+def composite_dates(start, end):
+    """MODIS 16-day composite dates (day 1, 17, 33, ... of each year) within [start, end]"""
+    dates = []
+    for year in range(start.year, end.year + 1):
+        date = datetime(year, 1, 1)
+        while date.year == year:
+            if start <= date <= end:
+                dates.append(date)
+            date += timedelta(days=16)
+    return dates
+
+
+class MockAppEEARSState:
+    """In-memory task registry shared by all request handlers"""
+
+    def __init__(self, polls_until_done=2):
+        self.polls_until_done = polls_until_done
+        self.tasks = {}
+        self.lock = threading.Lock()
+
+
+def make_handler(state):
+    class MockAppEEARSHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass  # keep test output quiet
+
+        def _send(self, status, body, content_type='application/json'):
+            payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _authorized(self):
+            return self.headers.get('Authorization', '').startswith('Bearer ')
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length) if length else b''
+
+            if self.path.rstrip('/').endswith('/login'):
+                return self._send(200, {'token': 'mock-token', 'token_type': 'Bearer'})
+
+            if self.path.rstrip('/').endswith('/task'):
+                if not self._authorized():
+                    return self._send(403, {'message': 'Missing bearer token'})
+                task = json.loads(body or b'{}')
+                task_id = uuid.uuid4().hex
+                with state.lock:
+                    state.tasks[task_id] = {'task': task, 'polls': 0}
+                return self._send(202, {'task_id': task_id, 'status': 'pending'})
+
+            return self._send(404, {'message': 'Not found'})
+
+        def do_GET(self):
+            if not self._authorized():
+                return self._send(403, {'message': 'Missing bearer token'})
+
+            parts = [p for p in self.path.split('/') if p]
+            if len(parts) >= 2 and parts[-2] == 'task':
+                return self._task_status(parts[-1])
+            if len(parts) >= 2 and parts[-2] == 'bundle':
+                return self._bundle(parts[-1])
+            if len(parts) >= 3 and parts[-3] == 'bundle':
+                return self._results_file(parts[-2])
+            return self._send(404, {'message': 'Not found'})
+
+        def _task_status(self, task_id):
+            with state.lock:
+                entry = state.tasks.get(task_id)
+                if entry is None:
+                    return self._send(404, {'message': 'Unknown task'})
+                entry['polls'] += 1
+                done = entry['polls'] > state.polls_until_done
+            return self._send(200, {'task_id': task_id, 'status': 'done' if done else 'processing'})
+
+        def _bundle(self, task_id):
+            entry = state.tasks.get(task_id)
+            if entry is None:
+                return self._send(404, {'message': 'Unknown task'})
+            product = entry['task']['params']['layers'][0]['product'].replace('.', '-')
+            return self._send(200, {
+                'task_id': task_id,
+                'files': [{
+                    'file_id': f'results-{task_id}',
+                    'file_name': f"{entry['task']['task_name']}-{product}-results.csv",
+                    'file_type': 'csv',
+                }]
+            })
+
+        def _results_file(self, task_id):
+            entry = state.tasks.get(task_id)
+            if entry is None:
+                return self._send(404, {'message': 'Unknown task'})
+
+            params = entry['task']['params']
+            layer = params['layers'][0]
+            column = f"{layer['product'].replace('.', '_')}_{layer['layer']}"
+            date_range = params['dates'][0]
+            start = datetime.strptime(date_range['startDate'], '%m-%d-%Y')
+            end = datetime.strptime(date_range['endDate'], '%m-%d-%Y')
+
+            lines = [f'ID,Latitude,Longitude,Date,{column}']
+            for coord in params['coordinates']:
+                for date in composite_dates(start, end):
+                    value = synthetic_ndvi(coord['latitude'], date)
+                    lines.append(f"{coord['id']},{coord['latitude']},{coord['longitude']},"
+                                 f"{date.strftime('%Y-%m-%d')},{value}")
+            return self._send(200, ('\n'.join(lines) + '\n').encode(), content_type='text/csv')
+
+    return MockAppEEARSHandler
+
+
+def start_mock_server(port=0, polls_until_done=2):
+    """
+    Start the mock server in a daemon thread.
+
+    Returns:
+        (server, state, base_url) - call server.shutdown() when done
+    """
+    state = MockAppEEARSState(polls_until_done=polls_until_done)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/api"
+    return server, state, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local mock AppEEARS API')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--polls-until-done', type=int, default=2)
+    args = parser.parse_args()
+
+    server, _, base_url = start_mock_server(args.port, args.polls_until_done)
+    print(f"Mock AppEEARS running at {base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+Batched AppEEARS NDVI Retrieval for Bloombly
+Submits every observation that still needs NDVI as a few multi-coordinate
+AppEEARS point tasks (grouped by MODIS product and year, chunked by point count),
+polls all tasks concurrently and fans the sampled NDVI back out to observations
+using the same windows as BloomFeatureEngineer.get_ndvi_appeears.
+"""
+
+import asyncio
+import io
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import requests
+
+# Same windows as the per-observation AppEEARS path
+NDVI_WINDOWS = {'5d': 5, '10d': 10}
+
+# Temporal gap-filling shifts tried (in order) when AppEEARS is the fallback
+DEFAULT_GAP_DAYS = (14, 30)
+
+
+class AppEEARSBatchClient:
+    """Multi-point AppEEARS task client with concurrent polling"""
+
+    def __init__(self, base_url: str = "https://appeears.earthdatacloud.nasa.gov/api",
+                 token: Optional[str] = None, username: Optional[str] = None,
+                 password: Optional[str] = None, max_points_per_task: int = 500,
+                 poll_interval: float = 10.0, max_wait: float = 3600.0,
+                 max_concurrent_requests: int = 8):
+        """
+        Args:
+            base_url: AppEEARS API root (point this at a mock server for testing)
+            token: Existing bearer token (skips login)
+            username: Earthdata username (used if no token)
+            password: Earthdata password (used if no token)
+            max_points_per_task: Unique coordinates per submitted task
+            poll_interval: Seconds between status checks of one task
+            max_wait: Seconds before a task is given up on
+            max_concurrent_requests: Simultaneous HTTP requests to AppEEARS
+        """
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.username = username
+        self.password = password
+        self.max_points_per_task = max(1, max_points_per_task)
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.max_concurrent_requests = max(1, max_concurrent_requests)
+        self.session = requests.Session()
+
+    def authenticate(self) -> bool:
+        """Log in and store the bearer token"""
+        if self.token:
+            return True
+        if not self.username or not self.password:
+            print("  ⚠ AppEEARS credentials not found in .env file")
+            return False
+
+        try:
+            response = self.session.post(f"{self.base_url}/login", auth=(self.username, self.password), timeout=30)
+            if response.status_code == 200:
+                self.token = response.json()['token']
+                return True
+            print(f"  ✗ AppEEARS authentication failed: HTTP {response.status_code}")
+        except Exception as e:
+            print(f"  ✗ AppEEARS authentication error: {str(e)}")
+        return False
+
+    @staticmethod
+    def product_for_year(year: int) -> Optional[Tuple[str, str]]:
+        """MODIS product/layer used by get_ndvi_appeears for a given year"""
+        if year >= 2015:
+            return "MOD13Q1.061", "_250m_16_days_NDVI"
+        if year >= 2000:
+            return "MOD13A2.061", "_1_km_16_days_NDVI"
+        return None
+
+    @staticmethod
+    def candidate_windows(bloom_date: datetime, gap_days: Sequence[int]) -> List[Dict[str, Tuple[datetime, datetime]]]:
+        """
+        (start, end) per NDVI window for each gap-filling shift, in the order
+        they are tried (-g, +g for each g).
+        """
+        candidates = []
+        for gap in gap_days:
+            for shift in (-gap, gap):
+                shifted = bloom_date + timedelta(days=shift)
+                candidates.append({
+                    name: (shifted - timedelta(days=days + 20), shifted - timedelta(days=max(1, days - 5)))
+                    for name, days in NDVI_WINDOWS.items()
+                })
+        return candidates
+
+    def build_task_specs(self, observations: Sequence[Tuple[Hashable, float, float, datetime]],
+                         gap_days: Sequence[int] = DEFAULT_GAP_DAYS) -> List[Dict]:
+        """
+        Group observations into multi-coordinate task specs.
+
+        Args:
+            observations: (key, latitude, longitude, bloom_date) tuples
+            gap_days: Gap-filling shifts to cover
+
+        Returns:
+            List of specs: {'task': payload, 'layer': str, 'observations': [...]}
+        """
+        groups: Dict[Tuple[str, str, int], List] = {}
+        for key, latitude, longitude, bloom_date in observations:
+            bloom_date = pd.Timestamp(bloom_date).to_pydatetime()
+            product = self.product_for_year(bloom_date.year)
+            if product is None:
+                continue
+            groups.setdefault((product[0], product[1], bloom_date.year), []).append(
+                (key, float(latitude), float(longitude), bloom_date)
+            )
+
+        specs = []
+        for (product, layer, year), members in sorted(groups.items(), key=lambda item: item[0]):
+            # Deduplicate coordinates so repeat sites are sampled once
+            point_ids: Dict[Tuple[float, float], str] = {}
+            for _, latitude, longitude, _ in members:
+                point_ids.setdefault((round(latitude, 5), round(longitude, 5)), f"pt{len(point_ids)}")
+
+            coords = list(point_ids.items())
+            for chunk_start in range(0, len(coords), self.max_points_per_task):
+                chunk = dict(coords[chunk_start:chunk_start + self.max_points_per_task])
+                chunk_members = [m for m in members if (round(m[1], 5), round(m[2], 5)) in chunk]
+
+                windows = [
+                    window
+                    for _, _, _, bloom_date in chunk_members
+                    for candidate in self.candidate_windows(bloom_date, gap_days)
+                    for window in candidate.values()
+                ]
+                start = min(w[0] for w in windows)
+                end = max(w[1] for w in windows)
+
+                task_name = f"bloom_ndvi_batch_{product.split('.')[0]}_{year}_{chunk_start // self.max_points_per_task}"
+                specs.append({
+                    'task': {
+                        "task_type": "point",
+                        "task_name": task_name,
+                        "params": {
+                            "dates": [{"startDate": start.strftime('%m-%d-%Y'), "endDate": end.strftime('%m-%d-%Y')}],
+                            "layers": [{"product": product, "layer": layer}],
+                            "coordinates": [
+                                {"latitude": lat, "longitude": lon, "id": point_id}
+                                for (lat, lon), point_id in chunk.items()
+                            ]
+                        }
+                    },
+                    'layer': layer,
+                    'observations': [
+                        (key, chunk[(round(lat, 5), round(lon, 5))], bloom_date)
+                        for key, lat, lon, bloom_date in chunk_members
+                    ]
+                })
+        return specs
+
+    def fetch_ndvi(self, observations: Sequence[Tuple[Hashable, float, float, datetime]],
+                   gap_days: Sequence[int] = DEFAULT_GAP_DAYS) -> Dict[Hashable, Dict[str, float]]:
+        """
+        Batch NDVI for many observations.
+
+        Returns:
+            {key: {'ndvi_mean_5d': ..., 'ndvi_mean_10d': ...}} for every
+            observation that was part of a completed task
+        """
+        if not self.authenticate():
+            return {}
+
+        specs = self.build_task_specs(observations, gap_days)
+        if not specs:
+            return {}
+
+        print(f"  📤 Submitting {len(specs)} AppEEARS batch task(s) for {len(observations)} observations...")
+        return asyncio.run(self._run_specs(specs, gap_days))
+
+    async def _run_specs(self, specs: List[Dict], gap_days: Sequence[int]) -> Dict[Hashable, Dict[str, float]]:
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        results = await asyncio.gather(*(self._run_task(spec, semaphore) for spec in specs))
+
+        features = {}
+        for spec, samples in zip(specs, results):
+            if samples is None:
+                continue
+            features.update(self.fan_out(spec, samples, gap_days))
+        return features
+
+    async def _request(self, semaphore: asyncio.Semaphore, method: str, path: str, **kwargs) -> requests.Response:
+        headers = {"Authorization": f"Bearer {self.token}"}
+        async with semaphore:
+            return await asyncio.to_thread(
+                self.session.request, method, f"{self.base_url}{path}",
+                headers=headers, timeout=60, **kwargs
+            )
+
+    async def _run_task(self, spec: Dict, semaphore: asyncio.Semaphore) -> Optional[pd.DataFrame]:
+        """Submit, poll and download one task. Returns samples or None on failure"""
+        task_name = spec['task']['task_name']
+        try:
+            response = await self._request(semaphore, 'POST', '/task', json=spec['task'])
+            if response.status_code not in [200, 201, 202]:
+                print(f"    ✗ AppEEARS task submission failed for {task_name}: HTTP {response.status_code}")
+                return None
+
+            task_id = response.json().get('task_id')
+            if not task_id:
+                print(f"    ✗ No task_id in response for {task_name}")
+                return None
+            print(f"    ✓ {task_name}: {len(spec['task']['params']['coordinates'])} points (ID: {task_id})")
+
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            while loop.time() - started < self.max_wait:
+                status_response = await self._request(semaphore, 'GET', f'/task/{task_id}')
+                if status_response.status_code == 200:
+                    status = status_response.json().get('status')
+                    if status == 'done':
+                        return await self._download_samples(task_id, spec['layer'], semaphore)
+                    if status == 'error':
+                        print(f"    ✗ AppEEARS task error for {task_name}")
+                        return None
+                await asyncio.sleep(self.poll_interval)
+
+            print(f"    ⚠ AppEEARS timeout for {task_name}")
+            return None
+
+        except Exception as e:
+            print(f"    ✗ AppEEARS batch task {task_name} failed: {str(e)}")
+            return None
+
+    async def _download_samples(self, task_id: str, layer: str, semaphore: asyncio.Semaphore) -> Optional[pd.DataFrame]:
+        """Fetch the results CSV of a finished task as (point_id, date, ndvi) rows"""
+        bundle = await self._request(semaphore, 'GET', f'/bundle/{task_id}')
+        if bundle.status_code != 200:
+            return None
+
+        files = [f for f in bundle.json().get('files', []) if f.get('file_name', '').endswith('results.csv')]
+        if not files:
+            return None
+
+        content = await self._request(semaphore, 'GET', f"/bundle/{task_id}/{files[0]['file_id']}")
+        if content.status_code != 200:
+            return None
+
+        raw = pd.read_csv(io.StringIO(content.text))
+        value_cols = [c for c in raw.columns if c.endswith(layer)]
+        if not value_cols or 'ID' not in raw.columns or 'Date' not in raw.columns:
+            return None
+
+        values = pd.to_numeric(raw[value_cols[0]], errors='coerce').to_numpy(dtype=float, copy=True)
+        # Results are normally scaled to -1..1; raw MODIS integers are NDVI * 10000
+        if np.nanmax(np.abs(values), initial=0) > 1.5:
+            values = values / 10000.0
+        values[values < -0.2] = np.nan  # fill values
+
+        return pd.DataFrame({
+            'point_id': raw['ID'].astype(str).to_numpy(),
+            'date': pd.to_datetime(raw['Date']).to_numpy(),
+            'ndvi': values,
+        })
+
+    def fan_out(self, spec: Dict, samples: pd.DataFrame,
+                gap_days: Sequence[int] = DEFAULT_GAP_DAYS) -> Dict[Hashable, Dict[str, float]]:
+        """Assign NDVI window means to each observation of a task"""
+        by_point = {
+            point_id: (group['date'].to_numpy(), group['ndvi'].to_numpy())
+            for point_id, group in samples.groupby('point_id')
+        }
+
+        features = {}
+        for key, point_id, bloom_date in spec['observations']:
+            dates, values = by_point.get(point_id, (np.array([], dtype='datetime64[ns]'), np.array([])))
+            result = {f'ndvi_mean_{name}': np.nan for name in NDVI_WINDOWS}
+
+            for candidate in self.candidate_windows(bloom_date, gap_days):
+                window_result = {}
+                for name, (start, end) in candidate.items():
+                    mask = (dates >= np.datetime64(start)) & (dates <= np.datetime64(end)) & ~np.isnan(values)
+                    window_result[f'ndvi_mean_{name}'] = float(values[mask].mean()) if mask.any() else np.nan
+
+                if any(not np.isnan(v) for v in window_result.values()):
+                    result = window_result
+                    break
+
+            features[key] = result
+        return features
+
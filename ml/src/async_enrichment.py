@@ -0,0 +1,300 @@
+"""
+Concurrent Enrichment Pipeline for Bloombly
+Runs BloomFeatureEngineer's per-observation API calls concurrently with asyncio.
+HTTP services (NASA POWER, Open-Elevation) share a pooled aiohttp session; blocking
+Earth Engine / AppEEARS calls run in a thread pool. Every upstream service gets its
+own concurrency cap and token-bucket rate limit instead of a global sleep.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+# aiohttp import (optional)
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+
+# Concurrency cap and sustained requests/second per upstream service.
+# 'gee_soil' and 'gee_ndvi' are blocking Earth Engine calls run in threads;
+# NDVI also covers the AppEEARS fallback, which is triggered from inside it.
+DEFAULT_SERVICE_LIMITS = {
+    'nasa_power': {'concurrency': 8, 'rate': 4.0},
+    'open_elevation': {'concurrency': 4, 'rate': 2.0},
+    'gee_soil': {'concurrency': 6, 'rate': 5.0},
+    'gee_ndvi': {'concurrency': 6, 'rate': 3.0},
+}
+
+
+class TokenBucket:
+    """Async token bucket: allows `rate` acquisitions per second with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available, then consume it"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ServiceLimiter:
+    """Bounded concurrency plus token-bucket rate limiting for one upstream service"""
+
+    def __init__(self, name: str, concurrency: int, rate: float):
+        self.name = name
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate)
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self.semaphore:
+            await self.bucket.acquire()
+            yield
+
+
+class ProgressReporter:
+    """Print throughput and ETA every `every` completed observations"""
+
+    def __init__(self, total: int, every: int = 25):
+        self.total = total
+        self.every = max(1, every)
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def update(self, ok: bool = True):
+        self.done += 1
+        if not ok:
+            self.failed += 1
+
+        if self.done % self.every == 0 or self.done == self.total:
+            elapsed = time.monotonic() - self.started
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            remaining = (self.total - self.done) / rate if rate > 0 else 0.0
+            pct = (self.done / self.total) * 100 if self.total else 100.0
+            print(f"   [{self.done}/{self.total}] {pct:.1f}% | {rate:.2f} obs/s | "
+                  f"elapsed {self._format(elapsed)} | ETA {self._format(remaining)} | "
+                  f"failed {self.failed}")
+
+    @staticmethod
+    def _format(seconds: float) -> str:
+        seconds = int(seconds)
+        hours, rem = divmod(seconds, 3600)
+        minutes, secs = divmod(rem, 60)
+        return f"{hours:d}:{minutes:02d}:{secs:02d}"
+
+
+class AsyncBloomEnricher:
+    """Concurrent driver around a BloomFeatureEngineer"""
+
+    def __init__(self, engineer, service_limits: Optional[Dict] = None,
+                 max_in_flight: int = 32, progress_every: int = 25):
+        """
+        Args:
+            engineer: Configured BloomFeatureEngineer (caches and credentials are shared)
+            service_limits: Overrides merged into DEFAULT_SERVICE_LIMITS
+            max_in_flight: Maximum observations being enriched at once
+            progress_every: Print a progress line every N completed observations
+        """
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp is required for concurrent enrichment. Install with: pip install aiohttp")
+
+        self.engineer = engineer
+        self.max_in_flight = max_in_flight
+        self.progress_every = progress_every
+
+        self.service_limits = {name: dict(limits) for name, limits in DEFAULT_SERVICE_LIMITS.items()}
+        for name, limits in (service_limits or {}).items():
+            self.service_limits.setdefault(name, {}).update(limits)
+
+        self.limiters = {}
+        self._executor = None
+
+    def enrich(self, df: pd.DataFrame, on_result: Optional[Callable[[int, Dict], None]] = None) -> List[Dict]:
+        """
+        Enrich every row of df concurrently.
+
+        Args:
+            df: Observations to enrich
+            on_result: Optional callback(position, features) called as each
+                observation completes (e.g. to stream into a checkpoint store).
+                When given, results are handed off instead of kept in memory.
+
+        Returns:
+            List of feature dictionaries in the same order as df
+            (empty when on_result is given)
+        """
+        return asyncio.run(self.enrich_rows(df, on_result=on_result))
+
+    async def enrich_rows(self, df: pd.DataFrame,
+                          on_result: Optional[Callable[[int, Dict], None]] = None) -> List[Dict]:
+        """Async entry point; results are assembled by position, not completion order"""
+        # Limiters hold asyncio primitives, so build them inside the running loop
+        self.limiters = {
+            name: ServiceLimiter(name, limits['concurrency'], limits['rate'])
+            for name, limits in self.service_limits.items()
+        }
+
+        blocking_workers = sum(
+            self.service_limits[name]['concurrency'] for name in ('gee_soil', 'gee_ndvi')
+        )
+        http_workers = sum(
+            self.service_limits[name]['concurrency'] for name in ('nasa_power', 'open_elevation')
+        )
+
+        rows = [row for _, row in df.iterrows()]
+        results: List[Optional[Dict]] = [None] * len(rows)
+        progress = ProgressReporter(len(rows), every=self.progress_every)
+
+        queue = asyncio.Queue()
+        for position, row in enumerate(rows):
+            queue.put_nowait((position, row))
+
+        print(f"   Concurrent enrichment: {len(rows)} observations, "
+              f"{min(self.max_in_flight, max(1, len(rows)))} in flight")
+        for name, limits in self.service_limits.items():
+            print(f"     • {name}: {limits['concurrency']} concurrent, {limits['rate']:.1f} req/s")
+
+        connector = aiohttp.TCPConnector(limit=max(1, http_workers), ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=60)
+
+        with ThreadPoolExecutor(max_workers=max(1, blocking_workers)) as executor:
+            self._executor = executor
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+
+                async def worker():
+                    while True:
+                        try:
+                            position, row = queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            return
+
+                        try:
+                            features = await self.enrich_observation(session, row)
+                            ok = True
+                        except Exception as e:
+                            print(f"   ✗ Error for {row.get('record_id', position)}: {str(e)}")
+                            features = {}
+                            ok = False
+
+                        if on_result is not None:
+                            on_result(position, features)
+                        else:
+                            results[position] = features
+                        progress.update(ok=ok)
+
+                n_workers = min(self.max_in_flight, max(1, len(rows)))
+                await asyncio.gather(*(worker() for _ in range(n_workers)))
+            self._executor = None
+
+        return results if on_result is None else []
+
+    async def enrich_observation(self, session, row: pd.Series) -> Dict[str, float]:
+        """Async counterpart of BloomFeatureEngineer.enrich_single_observation"""
+        engineer = self.engineer
+        latitude = row['latitude']
+        longitude = row['longitude']
+        bloom_date = engineer._parse_bloom_date(row)
+
+        weather, soil, ndvi, elevation = await asyncio.gather(
+            self.fetch_weather(session, latitude, longitude, bloom_date),
+            self._run_blocking('gee_soil', engineer.get_soil_properties, latitude, longitude),
+            self._run_blocking('gee_ndvi', engineer.get_ndvi_with_temporal_fallback,
+                               latitude, longitude, bloom_date),
+            self.fetch_elevation(session, latitude, longitude),
+        )
+
+        # Same key order as the sequential path
+        features = {}
+        features.update(weather)
+        features.update(soil)
+        features.update(ndvi)
+        features['elevation_m'] = elevation
+        features.update(engineer.calculate_photoperiod_features(latitude, bloom_date))
+
+        return features
+
+    async def fetch_weather(self, session, latitude: float, longitude: float,
+                            bloom_date, days_before: int = 90) -> Dict[str, float]:
+        """Fetch NASA POWER weather features through the pooled session"""
+        engineer = self.engineer
+        cache_key = engineer._weather_cache_key(latitude, longitude, bloom_date, days_before)
+        if cache_key in engineer.weather_cache:
+            return engineer.weather_cache[cache_key]
+
+        params = engineer._weather_request_params(latitude, longitude, bloom_date, days_before)
+
+        try:
+            async with self.limiters['nasa_power'].slot():
+                async with session.get(engineer.nasa_power_url, params=params,
+                                       timeout=aiohttp.ClientTimeout(total=30)) as response:
+                    if response.status != 200:
+                        print(f"  NASA POWER API error {response.status} for {latitude}, {longitude}")
+                        return engineer._get_default_weather_features()
+                    data = await response.json(content_type=None)
+
+            weather_features = engineer._compute_weather_features(data['properties']['parameter'])
+            engineer.weather_cache[cache_key] = weather_features
+            return weather_features
+
+        except Exception as e:
+            print(f"  NASA POWER request failed: {str(e)}")
+            return engineer._get_default_weather_features()
+
+    async def fetch_elevation(self, session, latitude: float, longitude: float) -> Optional[float]:
+        """Fetch Open-Elevation elevation through the pooled session"""
+        engineer = self.engineer
+        cache_key = f"{latitude:.4f},{longitude:.4f}"
+        if cache_key in engineer.elevation_cache:
+            return engineer.elevation_cache[cache_key]
+        provider = engineer.elevation_provider
+        if provider.has_failed(latitude, longitude):
+            return None
+
+        try:
+            async with self.limiters['open_elevation'].slot():
+                async with session.get(engineer.elevation_url,
+                                       params={"locations": f"{latitude},{longitude}"},
+                                       timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    if response.status != 200:
+                        print(f"  Elevation API error {response.status} for {latitude}, {longitude}")
+                        provider.remember(latitude, longitude, None)
+                        return None
+                    data = await response.json(content_type=None)
+
+            elevation = data['results'][0]['elevation']
+            provider.remember(latitude, longitude, elevation)
+            return elevation
+
+        except Exception as e:
+            print(f"  Elevation request failed: {str(e)}")
+            provider.remember(latitude, longitude, None)
+            return None
+
+    async def _run_blocking(self, service: str, func, *args):
+        """Run a blocking engineer method in the thread pool under a service limiter"""
+        loop = asyncio.get_running_loop()
+        async with self.limiters[service].slot():
+            return await loop.run_in_executor(self._executor, partial(func, *args))
@@ -0,0 +1,144 @@
+"""
+Enrichment Checkpoint Store for Bloombly
+Append-only, partitioned store for per-observation feature dictionaries.
+Every flush writes one new part file (one Parquet row group) keyed by record_id,
+so a crashed or interrupted enrichment run can resume where it stopped.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+
+# Parquet engine (optional - falls back to CSV part files)
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Features computed locally (never come back NaN) - ignored when deciding
+# whether a record's API features failed and need a retry
+LOCAL_FEATURE_PREFIXES = ('photoperiod',)
+
+
+class EnrichmentCheckpoint:
+    """Append-only part-file store of enriched features keyed by record_id"""
+
+    def __init__(self, checkpoint_dir, flush_every: int = 100):
+        """
+        Args:
+            checkpoint_dir: Directory holding the part files (created if missing)
+            flush_every: Number of buffered records that triggers a new part file
+        """
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.flush_every = max(1, flush_every)
+        self.extension = 'parquet' if PARQUET_AVAILABLE else 'csv'
+        self._buffer: List[Dict] = []
+
+    def part_files(self) -> List[Path]:
+        """Existing part files in write order"""
+        return sorted(self.checkpoint_dir.glob(f'part-*.{self.extension}'))
+
+    def append(self, record_id: str, features: Dict):
+        """Buffer one record's features, flushing to a new part file when full"""
+        record = {'record_id': str(record_id)}
+        record.update(features)
+        self._buffer.append(record)
+
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Write buffered records as a new part file"""
+        if not self._buffer:
+            return
+
+        part = pd.DataFrame(self._buffer)
+        for col in part.columns:
+            if col != 'record_id':
+                part[col] = pd.to_numeric(part[col], errors='coerce').astype('float64')
+
+        existing = self.part_files()
+        next_index = int(existing[-1].stem.split('-')[1]) + 1 if existing else 0
+        path = self.checkpoint_dir / f'part-{next_index:05d}.{self.extension}'
+        tmp_path = path.with_name(path.name + '.tmp')
+
+        if self.extension == 'parquet':
+            part.to_parquet(tmp_path, index=False, row_group_size=len(part))
+        else:
+            part.to_csv(tmp_path, index=False)
+
+        # Atomic rename so a crash never leaves a half-written part behind
+        os.replace(tmp_path, path)
+        self._buffer = []
+
+    def load(self, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Read all parts, keeping the latest entry for each record_id.
+
+        Args:
+            columns: Optional column projection (record_id is always included)
+        """
+        parts = self.part_files()
+        if not parts:
+            return pd.DataFrame(columns=['record_id'])
+
+        if columns is not None:
+            columns = ['record_id'] + [c for c in columns if c != 'record_id']
+
+        frames = []
+        for path in parts:
+            if self.extension == 'parquet':
+                frames.append(pd.read_parquet(path, columns=columns))
+            else:
+                frames.append(pd.read_csv(path, usecols=columns, dtype={'record_id': str}))
+
+        store = pd.concat(frames, ignore_index=True)
+        return store.drop_duplicates(subset=['record_id'], keep='last').reset_index(drop=True)
+
+    def completed_ids(self) -> Set[str]:
+        """
+        record_ids that are done. Records whose API features all came back
+        NaN (or that failed outright) are not counted, so they get retried.
+        """
+        store = self.load()
+        if store.empty:
+            return set()
+
+        api_cols = [
+            c for c in store.columns
+            if c != 'record_id' and not c.startswith(LOCAL_FEATURE_PREFIXES)
+        ]
+        if not api_cols:
+            return set()
+
+        has_data = store[api_cols].notna().any(axis=1).to_numpy()
+        return set(store.loc[has_data, 'record_id'].astype(str))
+
+    def summary(self) -> Dict:
+        """Counts for progress printing"""
+        store = self.load(columns=[])
+        return {
+            'parts': len(self.part_files()),
+            'records': int(store['record_id'].nunique()) if not store.empty else 0,
+            'completed': len(self.completed_ids()),
+        }
+
+
+def align_features(df: pd.DataFrame, store: pd.DataFrame) -> pd.DataFrame:
+    """
+    Feature rows from the checkpoint store in the same order as df.
+
+    Args:
+        df: Observations being enriched (must have 'record_id')
+        store: Output of EnrichmentCheckpoint.load()
+
+    Returns:
+        DataFrame of feature columns with one row per row in df
+    """
+    keys = pd.DataFrame({'record_id': df['record_id'].astype(str).to_numpy()})
+    aligned = keys.merge(store, on='record_id', how='left')
+    return aligned.drop(columns=['record_id'])
@@ -0,0 +1,392 @@
+"""
+Chunked Out-of-Core Cleaning for Bloombly
+Streams very large phenology exports (USA-NPN annotation CSVs, GBIF Darwin Core
+occurrence downloads) through BloomDataCleaner without loading them into memory.
+
+Passes:
+    1. stage     - read each source in chunks with explicit dtypes, standardize,
+                   validate coordinates/dates, write to year/bucket partitions
+    2. dedupe    - drop duplicates one partition at a time (duplicates always
+                   share year and coordinates, so they share a partition)
+    3. baseline  - aggregate baseline-period rows per species and coordinate
+    4. finalize  - add climate indicators per partition and write the output
+
+Peak memory is bounded by the chunk size and the largest partition, not by
+the size of the input.
+"""
+
+import shutil
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Parquet engine (required for the partitioned output)
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+# Unified schema written to every partition, so part files always agree
+UNIFIED_DTYPES = {
+    'record_id': 'string',
+    'data_source': 'string',
+    'scientific_name': 'string',
+    'family': 'string',
+    'genus': 'string',
+    'species': 'string',
+    'common_name': 'string',
+    'location_name': 'string',
+    'prefecture': 'string',
+    'region': 'string',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'date': 'datetime64[ns]',
+    'year': 'int64',
+    'month': 'int64',
+    'day_of_year': 'float64',
+    'season': 'string',
+    'full_bloom_date': 'datetime64[ns]',
+    'full_bloom_day_of_year': 'float64',
+    'temperature_avg': 'float64',
+    'temperature_min': 'float64',
+    'temperature_max': 'float64',
+    'precipitation': 'float64',
+    'trait': 'string',
+    'basis_of_record': 'string',
+    'is_prediction': 'bool',
+}
+
+# Per input format: read_csv options (explicit dtypes, only needed columns)
+# and the columns that identify a duplicate observation
+SOURCE_FORMATS = {
+    # USA-NPN annotation export (same layout as data/raw/data.csv)
+    'npn': {
+        'read_csv': {
+            'sep': ',',
+            'usecols': ['dataSource', 'scientificName', 'basisOfRecord', 'family', 'genus',
+                        'species', 'date', 'year', 'dayOfYear', 'latitude', 'longitude',
+                        'trait', 'annotationID'],
+            'dtype': {
+                'dataSource': 'string', 'scientificName': 'string', 'basisOfRecord': 'string',
+                'family': 'string', 'genus': 'string', 'species': 'string', 'date': 'string',
+                'year': 'float64', 'dayOfYear': 'float64', 'latitude': 'float64',
+                'longitude': 'float64', 'trait': 'string', 'annotationID': 'string',
+            },
+        },
+        'dedupe_subset': ['scientific_name', 'latitude', 'longitude', 'date'],
+    },
+    # GBIF Darwin Core Archive occurrence.txt (tab separated)
+    'dwc': {
+        'read_csv': {
+            'sep': '\t',
+            'quoting': 3,  # csv.QUOTE_NONE - GBIF does not quote fields
+            'usecols': ['gbifID', 'datasetName', 'basisOfRecord', 'scientificName', 'family',
+                        'genus', 'specificEpithet', 'decimalLatitude', 'decimalLongitude',
+                        'eventDate', 'year', 'startDayOfYear', 'countryCode', 'stateProvince',
+                        'locality'],
+            'dtype': {
+                'gbifID': 'string', 'datasetName': 'string', 'basisOfRecord': 'string',
+                'scientificName': 'string', 'family': 'string', 'genus': 'string',
+                'specificEpithet': 'string', 'decimalLatitude': 'float64',
+                'decimalLongitude': 'float64', 'eventDate': 'string', 'year': 'float64',
+                'startDayOfYear': 'float64', 'countryCode': 'string',
+                'stateProvince': 'string', 'locality': 'string',
+            },
+        },
+        'dedupe_subset': ['scientific_name', 'latitude', 'longitude', 'date'],
+    },
+}
+
+
+def standardize_darwin_core(cleaner, df: pd.DataFrame) -> pd.DataFrame:
+    """Map GBIF Darwin Core occurrence rows to the unified schema"""
+    # eventDate may be an interval ("2014-05-01/2014-05-03"); use its start
+    date = pd.to_datetime(df['eventDate'].str.split('/').str[0], errors='coerce', utc=True) \
+        .dt.tz_localize(None).dt.normalize()
+    day_of_year = df['startDayOfYear'].fillna(date.dt.dayofyear)
+
+    cleaned = pd.DataFrame(index=df.index)
+    cleaned['record_id'] = 'gbif_' + df['gbifID']
+    cleaned['data_source'] = df['datasetName'].fillna('GBIF')
+    cleaned['scientific_name'] = df['scientificName']
+    cleaned['family'] = df['family']
+    cleaned['genus'] = df['genus']
+    cleaned['species'] = df['specificEpithet']
+    cleaned['common_name'] = df['scientificName'].map(
+        {name: cleaner._get_common_name(name) for name in df['scientificName'].dropna().unique()}
+    ).fillna(df['scientificName'])
+    cleaned['location_name'] = df['locality'].fillna('')
+    cleaned['prefecture'] = df['stateProvince'].fillna('')
+    cleaned['region'] = df['countryCode'].fillna('')
+    cleaned['latitude'] = df['decimalLatitude']
+    cleaned['longitude'] = df['decimalLongitude']
+    cleaned['date'] = date
+    cleaned['year'] = df['year'].fillna(date.dt.year)
+    cleaned['day_of_year'] = day_of_year
+    cleaned['month'] = date.dt.month
+    cleaned['season'] = cleaner.seasons_for_dates(date)
+    cleaned['full_bloom_date'] = pd.NaT
+    cleaned['full_bloom_day_of_year'] = np.nan
+    cleaned['temperature_avg'] = np.nan
+    cleaned['temperature_min'] = np.nan
+    cleaned['temperature_max'] = np.nan
+    cleaned['precipitation'] = np.nan
+    cleaned['trait'] = 'flowering'
+    cleaned['basis_of_record'] = df['basisOfRecord']
+    cleaned['is_prediction'] = False
+    return cleaned
+
+
+def quantile_from_counts(counts: Dict[int, int], q: float) -> float:
+    """Same result as pd.Series(values).quantile(q) (linear) from a value histogram"""
+    values = np.array(sorted(counts), dtype=float)
+    weights = np.array([counts[v] for v in sorted(counts)], dtype=np.int64)
+    n = int(weights.sum())
+    if n == 0:
+        return np.nan
+
+    position = (n - 1) * q
+    lower = int(np.floor(position))
+    upper = min(lower + 1, n - 1)
+    cumulative = np.cumsum(weights)
+    value_at = lambda i: values[np.searchsorted(cumulative, i, side='right')]
+    return value_at(lower) + (position - lower) * (value_at(upper) - value_at(lower))
+
+
+class ChunkedBloomCleaner:
+    """Out-of-core cleaning of large phenology exports into partitioned Parquet"""
+
+    def __init__(self, cleaner, output_dir=None, chunksize: int = 500_000, n_buckets: int = 8):
+        """
+        Args:
+            cleaner: BloomDataCleaner (provides standardization and baseline helpers)
+            output_dir: Partitioned Parquet output (default: <processed>/clean_blooms_parquet)
+            chunksize: Rows read per chunk
+            n_buckets: Coordinate hash buckets per year; more buckets mean
+                smaller partitions and lower peak memory in later passes
+        """
+        if not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow is required for chunked cleaning. Install with: pip install pyarrow")
+
+        self.cleaner = cleaner
+        self.output_dir = Path(output_dir) if output_dir else cleaner.processed_data_dir / 'clean_blooms_parquet'
+        self.staging_dir = self.output_dir.with_name(self.output_dir.name + '_staging')
+        self.chunksize = max(1, chunksize)
+        self.n_buckets = max(1, n_buckets)
+        self.timings: Dict[str, float] = {}
+
+    def run(self, sources: Iterable[Tuple[str, str]]) -> Dict:
+        """
+        Clean every source into output_dir/year=YYYY/bucket=NN/part-0.parquet.
+
+        Args:
+            sources: (path, format) pairs, format one of SOURCE_FORMATS
+
+        Returns:
+            Summary dictionary (row counts, baseline cutoff, timings)
+        """
+        sources = list(sources)
+        for path, fmt in sources:
+            if fmt not in SOURCE_FORMATS:
+                raise ValueError(f"Unknown source format '{fmt}' for {path} (expected one of {list(SOURCE_FORMATS)})")
+
+        print(f"\n🚀 Chunked cleaning of {len(sources)} source(s) -> {self.output_dir}")
+        for directory in (self.staging_dir, self.output_dir):
+            if directory.exists():
+                shutil.rmtree(directory)
+        self.staging_dir.mkdir(parents=True)
+
+        staged = self._timed('stage', self._stage_sources, sources)
+        year_counts = self._timed('dedupe', self._dedupe_partitions, sources)
+
+        if not year_counts:
+            shutil.rmtree(self.staging_dir)
+            raise ValueError("No valid observations found in any source!")
+
+        # Same cutoff as add_climate_indicators: first 30% of (deduplicated) years
+        historical_cutoff = quantile_from_counts(year_counts, 0.3)
+        aggregates = self._timed('baseline', self._baseline_aggregates, historical_cutoff)
+        total = self._timed('finalize', self._finalize_partitions, year_counts, historical_cutoff, aggregates)
+
+        shutil.rmtree(self.staging_dir)
+
+        summary = {
+            'rows_staged': staged,
+            'rows_written': total,
+            'years': (min(year_counts), max(year_counts)),
+            'historical_cutoff': historical_cutoff,
+            'baseline_coordinates': len(aggregates),
+            'partitions': len(self._partitions(self.output_dir)),
+            'timings': dict(self.timings),
+        }
+
+        print(f"\n✅ Chunked cleaning complete")
+        print(f"   Rows staged: {staged:,} | written after dedupe: {total:,}")
+        print(f"   Partitions: {summary['partitions']} | baseline cutoff: {historical_cutoff:.0f}")
+        for stage, seconds in self.timings.items():
+            print(f"   • {stage:<9} {seconds:8.2f}s")
+        return summary
+
+    def _timed(self, stage: str, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.timings[stage] = time.perf_counter() - start
+        return result
+
+    # Pass 1 ---------------------------------------------------------------
+
+    def _stage_sources(self, sources: List[Tuple[str, str]]) -> int:
+        total = 0
+        for source_index, (path, fmt) in enumerate(sources):
+            print(f"\n📥 [{source_index + 1}/{len(sources)}] Staging {path} ({fmt})")
+            reader = pd.read_csv(path, chunksize=self.chunksize, encoding='utf-8',
+                                 on_bad_lines='skip', **SOURCE_FORMATS[fmt]['read_csv'])
+
+            for chunk_index, chunk in enumerate(reader):
+                cleaned = self.clean_chunk(chunk, fmt)
+                cleaned['source_index'] = source_index
+                self._write_partitions(self.staging_dir, cleaned,
+                                       f"part-{source_index:03d}-{chunk_index:06d}.parquet")
+                total += len(cleaned)
+                print(f"   chunk {chunk_index + 1}: {len(chunk):,} rows read, {len(cleaned):,} kept")
+        return total
+
+    def clean_chunk(self, chunk: pd.DataFrame, fmt: str) -> pd.DataFrame:
+        """Standardize one chunk and drop rows with missing/invalid coordinates or dates"""
+        if fmt == 'npn':
+            cleaned = self.cleaner.standardize_npn_observations(chunk)
+        else:
+            cleaned = standardize_darwin_core(self.cleaner, chunk)
+
+        cleaned = cleaned.dropna(subset=['latitude', 'longitude', 'date', 'year', 'day_of_year'])
+        cleaned = cleaned[
+            (cleaned['latitude'].between(-90, 90)) &
+            (cleaned['longitude'].between(-180, 180))
+        ]
+        return self._apply_schema(cleaned)
+
+    @staticmethod
+    def _apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+        df = df.copy()
+        for column, dtype in UNIFIED_DTYPES.items():
+            if column not in df.columns:
+                df[column] = None
+            if dtype.startswith('datetime'):
+                df[column] = pd.to_datetime(df[column], errors='coerce').astype(dtype)
+            elif dtype in ('float64', 'int64'):
+                df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+            else:
+                df[column] = df[column].astype(dtype)
+        return df[list(UNIFIED_DTYPES)]
+
+    def _write_partitions(self, root: Path, df: pd.DataFrame, filename: str):
+        """Write df split by year and coordinate bucket (Hive-style directories)"""
+        if len(df) == 0:
+            return
+        # Duplicates have identical coordinates, so they always land in the same bucket
+        bucket = pd.util.hash_pandas_object(df[['latitude', 'longitude']], index=False) % self.n_buckets
+        for (year, bucket_id), part in df.groupby([df['year'], bucket.to_numpy()], sort=True):
+            directory = root / f"year={int(year)}" / f"bucket={int(bucket_id):02d}"
+            directory.mkdir(parents=True, exist_ok=True)
+            part.to_parquet(directory / filename, index=False)
+
+    @staticmethod
+    def _partitions(root: Path) -> List[Path]:
+        return sorted(p for p in root.glob('year=*/bucket=*') if p.is_dir())
+
+    # Pass 2 ---------------------------------------------------------------
+
+    def _dedupe_partitions(self, sources: List[Tuple[str, str]]) -> Counter:
+        """Deduplicate each staged partition in place; returns rows per year"""
+        print(f"\n🧹 Removing duplicates per partition...")
+        year_counts = Counter()
+        removed = 0
+
+        for partition in self._partitions(self.staging_dir):
+            # Part files sort by (source, chunk), i.e. file order, so keep='first' matches a full read
+            parts = sorted(partition.glob('part-*.parquet'))
+            df = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+
+            kept = []
+            for source_index, group in df.groupby('source_index', sort=True):
+                subset = SOURCE_FORMATS[sources[source_index][1]]['dedupe_subset']
+                kept.append(group.drop_duplicates(subset=subset, keep='first'))
+            deduped = pd.concat(kept, ignore_index=True)
+
+            removed += len(df) - len(deduped)
+            year_counts[int(partition.parent.name.split('=')[1])] += len(deduped)
+
+            for p in parts:
+                p.unlink()
+            deduped.to_parquet(partition / 'deduped.parquet', index=False)
+
+        print(f"   Removed {removed:,} duplicate observations")
+        return year_counts
+
+    # Pass 3 ---------------------------------------------------------------
+
+    def _baseline_aggregates(self, historical_cutoff: float) -> pd.DataFrame:
+        """Per species/coordinate baseline sums from partitions up to the cutoff year"""
+        print(f"\n📊 Aggregating baseline (year <= {historical_cutoff:.0f})...")
+        aggregates = []
+        for partition in self._partitions(self.staging_dir):
+            if int(partition.parent.name.split('=')[1]) > historical_cutoff:
+                continue
+            df = pd.read_parquet(partition / 'deduped.parquet',
+                                 columns=['scientific_name', 'latitude', 'longitude', 'day_of_year'])
+            aggregates.append(self.cleaner.baseline_aggregates(df))
+        combined = self.cleaner.combine_baseline_aggregates(aggregates)
+        print(f"   Baseline coordinates: {len(combined):,}")
+        return combined
+
+    # Pass 4 ---------------------------------------------------------------
+
+    def _finalize_partitions(self, year_counts: Counter, historical_cutoff: float,
+                             aggregates: pd.DataFrame) -> int:
+        """Climate indicators per partition, written to the output directory"""
+        print(f"\n🌡️  Adding climate indicators per partition...")
+        min_year, max_year = min(year_counts), max(year_counts)
+        # Baseline trees are shared by every partition
+        baseline_index = self.cleaner.baseline_index(aggregates)
+        total = 0
+
+        for partition in self._partitions(self.staging_dir):
+            df = pd.read_parquet(partition / 'deduped.parquet').drop(columns=['source_index'])
+
+            # Same columns as BloomDataCleaner.add_climate_indicators
+            df['year_normalized'] = (df['year'] - min_year) / max(1, (max_year - min_year))
+            df['decade'] = (df['year'] // 10) * 10
+            baseline = self.cleaner.query_baseline_index(baseline_index, df)
+            df['deviation_from_baseline'] = df['day_of_year'] - baseline
+            df['lat_grid'] = (df['latitude'] * 10).round() / 10
+            df['lng_grid'] = (df['longitude'] * 10).round() / 10
+            df['location_grid'] = df['lat_grid'].astype(str) + '_' + df['lng_grid'].astype(str)
+
+            output = self.output_dir / partition.relative_to(self.staging_dir)
+            output.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(output / 'part-0.parquet', index=False)
+            total += len(df)
+
+        return total
+
+
+def read_partitioned(output_dir, columns: Optional[List[str]] = None, years: Optional[Tuple[int, int]] = None) -> pd.DataFrame:
+    """
+    Load (a year range of) a chunked-cleaning output.
+
+    Args:
+        output_dir: Directory written by ChunkedBloomCleaner
+        columns: Columns to read (default all)
+        years: Optional inclusive (first, last) year filter, applied on partitions
+    """
+    filters = None
+    if years is not None:
+        filters = [('year', '>=', years[0]), ('year', '<=', years[1])]
+    # year is stored in the files too; skip Hive key discovery so it keeps its int64 type
+    return pd.read_parquet(output_dir, columns=columns, filters=filters, partitioning=None)
@@ -6,10 +6,34 @@ Preserves critical taxonomic data: family, genus, season.
 """
 
 import pandas as pd
-import json
+import contextlib
+import io
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
 import numpy as np
+from scipy.spatial import cKDTree
+
+from chunked_cleaning import ChunkedBloomCleaner
+from geojson_writer import CRS84, GeoJSONWriter, square_rings
+from processed_data import write_processed
+
+class BaselineIndex:
+    """Per-species baseline KD-trees and sums, built by BloomDataCleaner.baseline_index"""
+    
+    def __init__(self, species, min_points):
+        """
+        Args:
+            species: {species: (tree, rows, valid, doy_sum)} over baseline coordinates
+            min_points: Minimum baseline rows for a mean, fixed when the index is built
+        """
+        self.species = species
+        self.min_points = min_points
+
 
 class BloomDataCleaner:
     """Clean and prepare bloom observation data from multiple sources for ML pipeline"""
@@ -58,6 +82,38 @@ class BloomDataCleaner:
         except:
             return "Unknown"
     
+    # Season per calendar month; index 0 collects missing dates, which
+    # determine_season also maps to Winter (NaT.month is NaN)
+    SEASON_BY_MONTH = np.array([
+        'Winter',
+        'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+        'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter'
+    ], dtype=object)
+    
+    def seasons_for_dates(self, dates):
+        """Vectorized determine_season for a Series of dates"""
+        months = pd.to_datetime(dates, errors='coerce').dt.month.fillna(0).astype(int)
+        return pd.Series(self.SEASON_BY_MONTH[months.to_numpy()], index=dates.index)
+    
+    def dates_from_day_of_year(self, year, day_of_year):
+        """
+        Vectorized datetime.strptime(f"{int(year)}-{int(day_of_year)}", "%Y-%j").
+        
+        Day 366 of a non-leap year rolls over to January 1st like strptime does;
+        missing or out-of-range values (day < 1 or > 366) become NaT.
+        """
+        year = pd.to_numeric(year, errors='coerce')
+        day = np.trunc(pd.to_numeric(day_of_year, errors='coerce'))
+        valid = year.between(1678, 2261) & day.between(1, 366)
+        
+        dates = pd.Series(pd.NaT, index=year.index, dtype='datetime64[ns]')
+        if valid.any():
+            year_start = pd.to_datetime(
+                year[valid].astype(int).astype(str), format='%Y'
+            )
+            dates[valid] = year_start + pd.to_timedelta(day[valid] - 1, unit='D')
+        return dates
+    
     def clean_japanese_cherry_data(self, forecasts_path, places_path):
         """
         Clean Japanese cherry blossom forecast data (Kaggle 2024 dataset).
@@ -116,7 +172,7 @@ class BloomDataCleaner:
         cleaned['day_of_year'] = cleaned['date'].dt.dayofyear
         cleaned['full_bloom_day_of_year'] = cleaned['full_bloom_date'].dt.dayofyear
         cleaned['month'] = cleaned['date'].dt.month
-        cleaned['season'] = cleaned['date'].apply(self.determine_season)
+        cleaned['season'] = self.seasons_for_dates(cleaned['date'])
         
         # Climate data
         cleaned['temperature_avg'] = pd.to_numeric(merged.get('tavg'), errors='coerce')
@@ -187,113 +243,102 @@ class BloomDataCleaner:
         print(f" Cities: {len(blooms)} locations")
         print(f" Geocoded cities: {len(cities)} with coordinates")
         
-        # Create a dictionary mapping city names to their coordinates
-        city_lookup = cities.set_index('city_name').to_dict('index')
-        
-        # Prepare data for transformation
-        records = []
-        
         # Get year columns (exclude first 2 columns: Site Name, Currently Being Observed)
         # and last 2 columns: 30 Year Average, Notes
         year_columns = blooms.columns[2:-2]
         
         print(f" Processing bloom dates from {len(year_columns)} years...")
         
-        for idx, row in blooms.iterrows():
-            city_name = row['Site Name']
-            currently_observed = row['Currently Being Observed']
-            notes = row.get('Notes', '') if pd.notna(row.get('Notes', '')) else ''
-            
-            # Get city coordinates
-            city_info = city_lookup.get(city_name, {})
-            latitude = city_info.get('latitude')
-            longitude = city_info.get('longitude')
-            elevation = city_info.get('elevation_m')
-            
-            if latitude is None or longitude is None:
-                print(f"   Warning: No coordinates for {city_name}, skipping...")
-                continue
-            
-            # Determine species from notes
-            if 'Sargent cherry' in notes or 'Prunus sargentii' in notes:
-                species_name = 'Prunus sargentii'
-                common_name = 'Sargent Cherry'
-                species_code = 'sargentii'
-            elif 'Taiwan cherry' in notes or 'Prunus campanulata' in notes:
-                species_name = 'Prunus campanulata'
-                common_name = 'Taiwan Cherry'
-                species_code = 'campanulata'
-            elif 'Kurile' in notes or 'kurilensis' in notes:
-                species_name = 'Cerasus nipponica var. kurilensis'
-                common_name = 'Kurile Island Cherry'
-                species_code = 'kurilensis'
-            else:
-                # Default to Yoshino (most common)
-                species_name = 'Prunus × yedoensis'
-                common_name = 'Yoshino Cherry'
-                species_code = 'yedoensis'
-            
-            # Process each year's bloom date
-            for year_col in year_columns:
-                bloom_date_str = row[year_col]
-                
-                # Skip empty/NaN values
-                if pd.isna(bloom_date_str) or bloom_date_str == '':
-                    continue
-                
-                try:
-                    # Parse the datetime
-                    bloom_date = pd.to_datetime(bloom_date_str)
-                    
-                    # Extract year from column name (should match bloom_date year)
-                    year = int(year_col)
-                    
-                    # Create record
-                    record = {
-                        'record_id': f'jma_sakura_{city_name.lower().replace(" ", "_")}_{year}',
-                        'data_source': 'Japan Meteorological Agency (JMA) Historical',
-                        'scientific_name': species_name,
-                        'family': 'Rosaceae',
-                        'genus': species_name.split()[0],  # First word of scientific name
-                        'species': species_code,
-                        'common_name': common_name,
-                        'location_name': city_name,
-                        'prefecture': '',  # Could be extracted from region if needed
-                        'region': 'Japan',
-                        'latitude': latitude,
-                        'longitude': longitude,
-                        'elevation_m': elevation,
-                        'date': bloom_date,
-                        'year': year,
-                        'month': bloom_date.month,
-                        'day_of_year': bloom_date.timetuple().tm_yday,
-                        'season': self.determine_season(bloom_date),
-                        'full_bloom_date': pd.NaT,  # Not available in this dataset
-                        'full_bloom_day_of_year': np.nan,
-                        'temperature_avg': np.nan,  # Will be added by feature engineering
-                        'temperature_min': np.nan,
-                        'temperature_max': np.nan,
-                        'precipitation': np.nan,
-                        'trait': 'first flowering (kaika)',
-                        'basis_of_record': 'Human Observation',
-                        'is_prediction': False,  # Historical observations
-                        'currently_observed': currently_observed,
-                        'species_notes': notes
-                    }
-                    
-                    records.append(record)
-                    
-                except Exception as e:
-                    print(f"   Warning: Could not parse date '{bloom_date_str}' for {city_name} in {year_col}: {e}")
-                    continue
+        # Attach city coordinates; cities without a geocode entry are skipped
+        cities = cities.rename(columns={'city_name': 'Site Name'})
+        city_columns = ['Site Name', 'latitude', 'longitude', 'elevation_m']
+        blooms = blooms.merge(cities[city_columns], on='Site Name', how='left', indicator=True)
+        for city_name in blooms.loc[blooms['_merge'] == 'left_only', 'Site Name']:
+            print(f"   Warning: No coordinates for {city_name}, skipping...")
+        blooms = blooms[blooms['_merge'] == 'both'].reset_index(drop=True)
+        blooms['site_order'] = np.arange(len(blooms))
+        
+        # Determine species from notes (first matching rule wins, default Yoshino)
+        notes = blooms['Notes'].fillna('') if 'Notes' in blooms.columns else pd.Series('', index=blooms.index)
+        blooms['species_notes'] = notes
+        species_rules = [
+            (notes.str.contains('Sargent cherry', regex=False) | notes.str.contains('Prunus sargentii', regex=False),
+             ('Prunus sargentii', 'Sargent Cherry', 'sargentii')),
+            (notes.str.contains('Taiwan cherry', regex=False) | notes.str.contains('Prunus campanulata', regex=False),
+             ('Prunus campanulata', 'Taiwan Cherry', 'campanulata')),
+            (notes.str.contains('Kurile', regex=False) | notes.str.contains('kurilensis', regex=False),
+             ('Cerasus nipponica var. kurilensis', 'Kurile Island Cherry', 'kurilensis')),
+        ]
+        default_species = ('Prunus × yedoensis', 'Yoshino Cherry', 'yedoensis')
+        for i, column in enumerate(['scientific_name', 'common_name', 'species']):
+            blooms[column] = np.select(
+                [mask.to_numpy() for mask, _ in species_rules],
+                [names[i] for _, names in species_rules],
+                default=default_species[i]
+            )
+        
+        # Wide (one column per year) -> long (one row per city-year)
+        long = blooms.melt(
+            id_vars=['site_order', 'Site Name', 'Currently Being Observed', 'latitude', 'longitude',
+                     'elevation_m', 'scientific_name', 'common_name', 'species', 'species_notes'],
+            value_vars=list(year_columns),
+            var_name='year_column',
+            value_name='bloom_date_str'
+        )
+        long['year_order'] = long['year_column'].map({col: i for i, col in enumerate(year_columns)})
         
-        # Create DataFrame from records
-        cleaned = pd.DataFrame(records)
+        # Skip empty/NaN values
+        long = long[long['bloom_date_str'].notna() & (long['bloom_date_str'] != '')]
         
-        if len(cleaned) == 0:
+        # Same row order as a city-by-city, year-by-year scan
+        long = long.sort_values(['site_order', 'year_order'], kind='stable')
+        
+        long['bloom_date'] = pd.to_datetime(long['bloom_date_str'], errors='coerce', format='mixed')
+        unparsed = long['bloom_date'].isna()
+        for _, bad in long[unparsed].iterrows():
+            print(f"   Warning: Could not parse date '{bad['bloom_date_str']}' for {bad['Site Name']} in {bad['year_column']}")
+        long = long[~unparsed]
+        
+        if len(long) == 0:
             print(f" WARNING: No historical sakura data could be processed!")
             return pd.DataFrame()
         
+        # Extract year from column name (should match bloom_date year)
+        year = long['year_column'].astype(int)
+        bloom_date = long['bloom_date']
+        
+        cleaned = pd.DataFrame({
+            'record_id': 'jma_sakura_' + long['Site Name'].str.lower().str.replace(' ', '_', regex=False) + '_' + year.astype(str),
+            'data_source': 'Japan Meteorological Agency (JMA) Historical',
+            'scientific_name': long['scientific_name'],
+            'family': 'Rosaceae',
+            'genus': long['scientific_name'].str.split().str[0],  # First word of scientific name
+            'species': long['species'],
+            'common_name': long['common_name'],
+            'location_name': long['Site Name'],
+            'prefecture': '',  # Could be extracted from region if needed
+            'region': 'Japan',
+            'latitude': long['latitude'],
+            'longitude': long['longitude'],
+            'elevation_m': long['elevation_m'],
+            'date': bloom_date,
+            'year': year,
+            'month': bloom_date.dt.month.astype('int64'),
+            'day_of_year': bloom_date.dt.dayofyear.astype('int64'),
+            'season': self.seasons_for_dates(bloom_date),
+            'full_bloom_date': pd.NaT,  # Not available in this dataset
+            'full_bloom_day_of_year': np.nan,
+            'temperature_avg': np.nan,  # Will be added by feature engineering
+            'temperature_min': np.nan,
+            'temperature_max': np.nan,
+            'precipitation': np.nan,
+            'trait': 'first flowering (kaika)',
+            'basis_of_record': 'Human Observation',
+            'is_prediction': False,  # Historical observations
+            'currently_observed': long['Currently Being Observed'],
+            'species_notes': long['species_notes']
+        }).reset_index(drop=True)
+        
         # Remove duplicates
         print(f" Removing duplicates...")
         initial_count = len(cleaned)
@@ -341,7 +386,53 @@ class BloomDataCleaner:
 
         print(f" Initial rows: {len(df)}")
         
-        # Create cleaned copy
+        cleaned = self.standardize_npn_observations(df)
+        
+        # Remove rows with missing critical data
+        print(f"🧹 Removing rows with missing coordinates or dates...")
+        initial_count = len(cleaned)
+        cleaned = cleaned.dropna(subset=['latitude', 'longitude', 'date', 'day_of_year'])
+        removed = initial_count - len(cleaned)
+        print(f"   Removed {removed} rows with missing data")
+        
+        # Remove invalid coordinates
+        print(f"🧹 Removing invalid coordinates...")
+        initial_count = len(cleaned)
+        cleaned = cleaned[
+            (cleaned['latitude'].between(-90, 90)) & 
+            (cleaned['longitude'].between(-180, 180))
+        ]
+        removed = initial_count - len(cleaned)
+        print(f"   Removed {removed} rows with invalid coordinates")
+        
+        # Remove duplicates
+        print(f"🧹 Removing duplicates...")
+        initial_count = len(cleaned)
+        cleaned = cleaned.drop_duplicates(
+            subset=['scientific_name', 'latitude', 'longitude', 'date'],
+            keep='first'
+        )
+        removed = initial_count - len(cleaned)
+        print(f"   Removed {removed} duplicate observations")
+        
+        # Sort by date
+        cleaned = cleaned.sort_values(['year', 'day_of_year']).reset_index(drop=True)
+        
+        print(f" Symphyotrichum data cleaned: {len(cleaned)} observations")
+        
+        return cleaned
+    
+    def standardize_npn_observations(self, df):
+        """
+        Map raw National Phenology Network annotation rows (data.csv layout) to
+        the unified schema. No rows are dropped, so this also works per chunk.
+        
+        Args:
+            df: Raw rows as read from the CSV
+            
+        Returns:
+            DataFrame in the unified column layout
+        """
         cleaned = pd.DataFrame()
         
         # Extract core fields
@@ -351,7 +442,9 @@ class BloomDataCleaner:
         cleaned['family'] = df['family']
         cleaned['genus'] = df['genus']
         cleaned['species'] = df.get('species', '')
-        cleaned['common_name'] = df['scientificName'].apply(self._get_common_name)
+        cleaned['common_name'] = df['scientificName'].map(
+            {name: self._get_common_name(name) for name in df['scientificName'].dropna().unique()}
+        ).fillna(df['scientificName'])
         
         # Location
         cleaned['location_name'] = ''  # Not provided in this dataset
@@ -365,7 +458,7 @@ class BloomDataCleaner:
         cleaned['year'] = df['year']
         cleaned['day_of_year'] = df.get('dayOfYear', cleaned['date'].dt.dayofyear)
         cleaned['month'] = cleaned['date'].dt.month
-        cleaned['season'] = cleaned['date'].apply(self.determine_season)
+        cleaned['season'] = self.seasons_for_dates(cleaned['date'])
         cleaned['full_bloom_date'] = None  # Not tracked for these species
         cleaned['full_bloom_day_of_year'] = None
         
@@ -380,38 +473,6 @@ class BloomDataCleaner:
         cleaned['basis_of_record'] = df.get('basisOfRecord', 'Human Observation')
         cleaned['is_prediction'] = False  # Historical observations
         
-        # Remove rows with missing critical data
-        print(f"🧹 Removing rows with missing coordinates or dates...")
-        initial_count = len(cleaned)
-        cleaned = cleaned.dropna(subset=['latitude', 'longitude', 'date', 'day_of_year'])
-        removed = initial_count - len(cleaned)
-        print(f"   Removed {removed} rows with missing data")
-        
-        # Remove invalid coordinates
-        print(f"🧹 Removing invalid coordinates...")
-        initial_count = len(cleaned)
-        cleaned = cleaned[
-            (cleaned['latitude'].between(-90, 90)) & 
-            (cleaned['longitude'].between(-180, 180))
-        ]
-        removed = initial_count - len(cleaned)
-        print(f"   Removed {removed} rows with invalid coordinates")
-        
-        # Remove duplicates
-        print(f"🧹 Removing duplicates...")
-        initial_count = len(cleaned)
-        cleaned = cleaned.drop_duplicates(
-            subset=['scientific_name', 'latitude', 'longitude', 'date'],
-            keep='first'
-        )
-        removed = initial_count - len(cleaned)
-        print(f"   Removed {removed} duplicate observations")
-        
-        # Sort by date
-        cleaned = cleaned.sort_values(['year', 'day_of_year']).reset_index(drop=True)
-        
-        print(f" Symphyotrichum data cleaned: {len(cleaned)} observations")
-        
         return cleaned
     
     def clean_sweet_cherry_data(self, csv_path):
@@ -457,30 +518,13 @@ class BloomDataCleaner:
         cleaned['day_of_year'] = pd.to_numeric(df['Beginning of flowering'], errors='coerce')
         
         # Create actual date from year and day of year
-        def create_date(row):
-            try:
-                if pd.notnull(row['year']) and pd.notnull(row['day_of_year']):
-                    return datetime.strptime(f"{int(row['year'])}-{int(row['day_of_year'])}", "%Y-%j")
-            except:
-                pass
-            return None
-        
-        cleaned['date'] = cleaned.apply(create_date, axis=1)
+        cleaned['date'] = self.dates_from_day_of_year(cleaned['year'], cleaned['day_of_year'])
         cleaned['month'] = cleaned['date'].dt.month
-        cleaned['season'] = cleaned['date'].apply(self.determine_season)
+        cleaned['season'] = self.seasons_for_dates(cleaned['date'])
         
         # Full flowering data
         cleaned['full_bloom_day_of_year'] = pd.to_numeric(df.get('Full Flowering'), errors='coerce')
-        
-        def create_full_bloom_date(row):
-            try:
-                if pd.notnull(row['year']) and pd.notnull(row['full_bloom_day_of_year']):
-                    return datetime.strptime(f"{int(row['year'])}-{int(row['full_bloom_day_of_year'])}", "%Y-%j")
-            except:
-                pass
-            return None
-        
-        cleaned['full_bloom_date'] = cleaned.apply(create_full_bloom_date, axis=1)
+        cleaned['full_bloom_date'] = self.dates_from_day_of_year(cleaned['year'], cleaned['full_bloom_day_of_year'])
         
         # Climate data (not available in this dataset)
         cleaned['temperature_avg'] = None
@@ -607,21 +651,7 @@ class BloomDataCleaner:
         
         print(f"   Calculating deviations from baseline (year <= {historical_cutoff:.0f})...")
         
-        def calc_deviation(row):
-            """Calculate deviation from historical average for this species in this region"""
-            # Group by species and approximate region (rounded lat/lng)
-            species_region_data = df[
-                (df['scientific_name'] == row['scientific_name']) &
-                (df['year'] <= historical_cutoff) &
-                (abs(df['latitude'] - row['latitude']) < 5) &  # ~500km radius
-                (abs(df['longitude'] - row['longitude']) < 5)
-            ]
-            if len(species_region_data) > 5:  # Need minimum data points
-                baseline = species_region_data['day_of_year'].mean()
-                return row['day_of_year'] - baseline
-            return None
-        
-        df['deviation_from_baseline'] = df.apply(calc_deviation, axis=1)
+        df['deviation_from_baseline'] = self._baseline_deviation(df, historical_cutoff)
         
         # Add location-based grouping (round to ~10km grid)
         df['lat_grid'] = (df['latitude'] * 10).round() / 10
@@ -632,6 +662,150 @@ class BloomDataCleaner:
         
         return df
     
+    def _baseline_deviation(self, df, historical_cutoff, radius=5, min_points=6, chunk_size=20000):
+        """
+        Deviation of each row's day_of_year from the mean of baseline-period rows
+        of the same species within a +/-radius degree lat/lng box (~500km).
+        
+        Args:
+            df: DataFrame with scientific_name, year, latitude, longitude, day_of_year
+            historical_cutoff: Last year of the baseline period (inclusive)
+            radius: Half-width of the box in degrees (strict, as |delta| < radius)
+            min_points: Minimum baseline rows (including missing day_of_year) needed
+            chunk_size: Unique coordinates queried per batch
+            
+        Returns:
+            Series aligned with df (NaN where no baseline is available)
+        """
+        aggregates = self.baseline_aggregates(df[df['year'] <= historical_cutoff])
+        baseline = self.baseline_means(aggregates, df, radius, min_points, chunk_size)
+        return pd.to_numeric(df['day_of_year'], errors='coerce').astype(float) - baseline
+    
+    def baseline_aggregates(self, baseline_df):
+        """
+        Collapse baseline-period rows to one row per species and coordinate.
+        
+        Aggregates from separate chunks can be concatenated and passed through
+        combine_baseline_aggregates, so the baseline never needs all rows in memory.
+        
+        Returns:
+            DataFrame: scientific_name, latitude, longitude, rows, valid, doy_sum
+        """
+        located = baseline_df[['scientific_name', 'latitude', 'longitude', 'day_of_year']].dropna(
+            subset=['scientific_name', 'latitude', 'longitude']
+        )
+        doy = pd.to_numeric(located['day_of_year'], errors='coerce').astype(float)
+        return located.assign(day_of_year=doy).groupby(
+            ['scientific_name', 'latitude', 'longitude'], sort=False
+        ).agg(
+            rows=('day_of_year', 'size'),
+            valid=('day_of_year', 'count'),
+            doy_sum=('day_of_year', 'sum')
+        ).reset_index()
+    
+    def combine_baseline_aggregates(self, aggregates):
+        """Merge baseline_aggregates computed over separate chunks"""
+        aggregates = [agg for agg in aggregates if len(agg) > 0]
+        if not aggregates:
+            return self.baseline_aggregates(pd.DataFrame(
+                columns=['scientific_name', 'latitude', 'longitude', 'day_of_year']
+            ))
+        return pd.concat(aggregates, ignore_index=True).groupby(
+            ['scientific_name', 'latitude', 'longitude'], sort=False
+        )[['rows', 'valid', 'doy_sum']].sum().reset_index()
+    
+    def baseline_index(self, aggregates, min_points=6):
+        """
+        Per-species KD-trees (Chebyshev metric) and sums over baseline_aggregates.
+        
+        Build once and pass to query_baseline_index when querying many frames
+        (e.g. one per partition) against the same baseline.
+        
+        Returns:
+            BaselineIndex; species with fewer than min_points baseline rows
+            are left out
+        """
+        species_index = {}
+        for species, base in aggregates.groupby('scientific_name', sort=False):
+            if base['rows'].sum() < min_points:
+                continue
+            species_index[species] = (
+                cKDTree(base[['latitude', 'longitude']].to_numpy(dtype=float)),
+                base['rows'].to_numpy(dtype=np.int64),
+                base['valid'].to_numpy(dtype=np.int64),
+                base['doy_sum'].to_numpy(dtype=float)
+            )
+        return BaselineIndex(species_index, min_points)
+    
+    def baseline_means(self, aggregates, df, radius=5, min_points=6, chunk_size=20000):
+        """
+        Baseline day_of_year mean for each row of df from baseline_aggregates.
+        
+        Returns:
+            Series aligned with df (NaN where fewer than min_points baseline rows)
+        """
+        return self.query_baseline_index(self.baseline_index(aggregates, min_points), df, radius, chunk_size)
+    
+    def query_baseline_index(self, index, df, radius=5, chunk_size=20000):
+        """
+        Baseline day_of_year mean for each row of df from a built baseline_index.
+        
+        Queries unique coordinates of df in chunks against one KD-tree per
+        species, so the cost grows with the number of neighbours instead of
+        rows x rows.
+        
+        Args:
+            index: BaselineIndex from baseline_index
+            df: Rows to compute baselines for
+            radius: Half-width of the box in degrees (strict, as |delta| < radius)
+            chunk_size: Unique coordinates queried per batch
+        
+        Returns:
+            Series aligned with df (NaN where fewer than index.min_points baseline rows)
+        """
+        min_points = index.min_points
+        baseline = pd.Series(np.nan, index=df.index, dtype=float)
+        # Largest float below radius: the tree's closed ball then equals the strict box
+        tree_radius = np.nextafter(float(radius), 0)
+        
+        lat = pd.to_numeric(df['latitude'], errors='coerce').to_numpy(dtype=float)
+        lng = pd.to_numeric(df['longitude'], errors='coerce').to_numpy(dtype=float)
+        located = ~(np.isnan(lat) | np.isnan(lng))
+        
+        for species, positions in df.groupby('scientific_name', sort=False).indices.items():
+            positions = positions[located[positions]]
+            if species not in index.species or len(positions) == 0:
+                continue
+            tree, base_rows, base_valid, base_sum = index.species[species]
+            
+            # Observations at the same coordinates share one query
+            coords, inverse = np.unique(
+                np.column_stack([lat[positions], lng[positions]]), axis=0, return_inverse=True
+            )
+            means = np.full(len(coords), np.nan)
+            
+            for start in range(0, len(coords), chunk_size):
+                batch = coords[start:start + chunk_size]
+                neighbours = tree.query_ball_point(batch, r=tree_radius, p=np.inf, return_sorted=False)
+                lengths = np.fromiter((len(n) for n in neighbours), dtype=np.int64, count=len(neighbours))
+                
+                found = np.flatnonzero(lengths > 0)
+                if len(found) == 0:
+                    continue
+                
+                flat = np.concatenate([neighbours[i] for i in found]).astype(np.int64)
+                offsets = np.concatenate([[0], np.cumsum(lengths[found])[:-1]])
+                rows = np.add.reduceat(base_rows[flat], offsets)
+                valid = np.add.reduceat(base_valid[flat], offsets)
+                sums = np.add.reduceat(base_sum[flat], offsets)
+                
+                enough = (rows >= min_points) & (valid > 0)
+                means[start + found[enough]] = sums[enough] / valid[enough]
+            
+            baseline.iloc[positions] = means[inverse.ravel()]
+        
+        return baseline
+    
     def create_species_summary(self, df):
         """
         Create summary statistics per species for quick reference.
@@ -692,9 +866,11 @@ class BloomDataCleaner:
         ]
         
         ml_df = df[ml_columns].copy()
-        ml_df.to_csv(output_path, index=False)
+        parquet_output = write_processed(ml_df, output_path)
         
         print(f"\n💾 ML data exported to: {output_path}")
+        if parquet_output is not None:
+            print(f"   Typed Parquet copy: {parquet_output}")
         print(f"   Rows: {len(ml_df):,}")
         print(f"   Columns: {len(ml_df.columns)}")
         
@@ -710,74 +886,44 @@ class BloomDataCleaner:
         """
         output_path = self.processed_data_dir / filename
         
-        features = []
-        
         print(f"\n🗺️ Generating GeoJSON features...")
         
-        for _, row in df.iterrows():
-            # Create a small square around the point (0.01 degrees ~ 1km)
-            size = 0.005
-            lat, lon = row['latitude'], row['longitude']
-            
-            square_coords = [
-                [lon - size, lat - size],
-                [lon + size, lat - size],
-                [lon + size, lat + size],
-                [lon - size, lat + size],
-                [lon - size, lat - size]
-            ]
-            
-            properties = {
-                "id": str(row['record_id']),
-                "Site": row.get('location_name') or row['scientific_name'],
-                "Family": row['family'],
-                "Genus": row['genus'],
-                "Species": row.get('species', ''),
-                "CommonName": row.get('common_name', ''),
-                "Season": row['season'],
-                "Year": int(row['year']),
-                "DayOfYear": int(row['day_of_year']),
-                "Date": row['date'].strftime('%Y-%m-%d') if pd.notnull(row['date']) else '',
-                "Area": 1.0,
-                "Latitude": float(row['latitude']),
-                "Longitude": float(row['longitude']),
-                "Region": row.get('region', ''),
-                "Prefecture": row.get('prefecture', ''),
-                "Temperature": float(row['temperature_avg']) if pd.notnull(row.get('temperature_avg')) else None,
-                "DeviationFromBaseline": float(row.get('deviation_from_baseline', 0)) if pd.notnull(row.get('deviation_from_baseline')) else None,
-                "IsPrediction": bool(row.get('is_prediction', False))
-            }
-            
-            geometry = {
-                "type": "MultiPolygon",
-                "coordinates": [[square_coords]]
-            }
-            
-            feature = {
-                "type": "Feature",
-                "properties": properties,
-                "geometry": geometry
-            }
-            
-            features.append(feature)
-        
-        geojson = {
-            "type": "FeatureCollection",
-            "name": "Global_Bloom_Observations",
-            "crs": {
-                "type": "name",
-                "properties": {
-                    "name": "urn:ogc:def:crs:OGC:1.3:CRS84"
-                }
-            },
-            "features": features
+        def column(name, default=''):
+            return df[name] if name in df.columns else pd.Series(default, index=df.index)
+        
+        location_name = column('location_name')
+        temperature = pd.to_numeric(column('temperature_avg', np.nan), errors='coerce')
+        deviation = pd.to_numeric(column('deviation_from_baseline', np.nan), errors='coerce')
+        
+        properties = {
+            "id": df['record_id'].astype(str),
+            "Site": location_name.where(location_name.notna() & (location_name != ''), df['scientific_name']),
+            "Family": df['family'],
+            "Genus": df['genus'],
+            "Species": column('species'),
+            "CommonName": column('common_name'),
+            "Season": df['season'],
+            "Year": df['year'].astype(int),
+            "DayOfYear": df['day_of_year'].astype(float).astype(int),
+            "Date": pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d').fillna(''),
+            "Area": np.full(len(df), 1.0),
+            "Latitude": df['latitude'].astype(float),
+            "Longitude": df['longitude'].astype(float),
+            "Region": column('region'),
+            "Prefecture": column('prefecture'),
+            "Temperature": temperature.astype(float),
+            "DeviationFromBaseline": deviation.astype(float),
+            "IsPrediction": column('is_prediction', False).fillna(False).astype(bool)
         }
         
-        with open(output_path, 'w') as f:
-            json.dump(geojson, f, indent=2)
+        # Create a small square around each point (0.01 degrees ~ 1km)
+        rings = square_rings(df['longitude'], df['latitude'], 0.005)
+        
+        with GeoJSONWriter(output_path, name="Global_Bloom_Observations", crs=CRS84) as writer:
+            writer.write_polygons(rings, properties)
         
         print(f" GeoJSON exported to: {output_path}")
-        print(f"   Features: {len(features):,}")
+        print(f"   Features: {writer.feature_count:,}")
         
         return output_path
     
@@ -844,10 +990,15 @@ class BloomDataCleaner:
     
     def run_full_pipeline(self, cherry_forecasts=None, cherry_places=None, 
                          symphyotrichum_data=None, sweet_cherry_data=None,
-                         historical_sakura=None, sakura_cities_geocoded=None):
+                         historical_sakura=None, sakura_cities_geocoded=None,
+                         parallel=True, max_workers=None):
         """
         Execute the complete data cleaning pipeline for all datasets.
         
+        The source cleaners are independent, so by default they run concurrently
+        in a process pool; results are still combined in the fixed order below
+        (forecasts, historical sakura, Symphyotrichum, sweet cherry).
+        
         Args:
             cherry_forecasts: Path to cherry_blossom_forecasts.csv (or None to skip)
             cherry_places: Path to cherry_blossom_places.csv (or None to skip)
@@ -855,11 +1006,17 @@ class BloomDataCleaner:
             sweet_cherry_data: Path to sweet cherry data (or None to skip)
             historical_sakura: Path to sakura_first_bloom_dates.csv (or None to skip)
             sakura_cities_geocoded: Path to japan_cities_geocoded.csv (or None to skip)
+            parallel: Run the source cleaners in a process pool
+            max_workers: Pool size (default: one process per source, capped at CPU count)
         """
         print("\n🚀 Starting Multi-Dataset Bloom Data Cleaning Pipeline\n")
         print("="*70)
         
-        datasets = []
+        pipeline_start = time.perf_counter()
+        self.stage_timings = {}
+        
+        # (stage name, cleaner method, paths) in merge order
+        jobs = []
         
         # Process Japanese Cherry Blossoms (2024 forecasts)
         if cherry_forecasts and cherry_places:
@@ -868,8 +1025,7 @@ class BloomDataCleaner:
             places_path = self._find_file(cherry_places)
             
             if forecasts_path and places_path:
-                cherry_df = self.clean_japanese_cherry_data(forecasts_path, places_path)
-                datasets.append(cherry_df)
+                jobs.append(('japanese_forecasts', 'clean_japanese_cherry_data', (forecasts_path, places_path)))
             else:
                 print(f" Skipping Japanese cherry forecast data - files not found")
         
@@ -879,9 +1035,7 @@ class BloomDataCleaner:
             cities_path = self._find_file(sakura_cities_geocoded)
             
             if sakura_path and cities_path:
-                historical_df = self.clean_historical_sakura_data(sakura_path, cities_path)
-                if len(historical_df) > 0:
-                    datasets.append(historical_df)
+                jobs.append(('historical_sakura', 'clean_historical_sakura_data', (sakura_path, cities_path)))
             else:
                 print(f" Skipping historical sakura data - files not found")
                 if not sakura_path:
@@ -893,8 +1047,7 @@ class BloomDataCleaner:
         if symphyotrichum_data:
             symph_path = self._find_file(symphyotrichum_data)
             if symph_path:
-                symph_df = self.clean_symphyotrichum_data(symph_path)
-                datasets.append(symph_df)
+                jobs.append(('symphyotrichum', 'clean_symphyotrichum_data', (symph_path,)))
             else:
                 print(f" Skipping Symphyotrichum data - file not found")
         
@@ -902,33 +1055,121 @@ class BloomDataCleaner:
         if sweet_cherry_data:
             sweet_path = self._find_file(sweet_cherry_data)
             if sweet_path:
-                sweet_df = self.clean_sweet_cherry_data(sweet_path)
-                datasets.append(sweet_df)
+                jobs.append(('sweet_cherry', 'clean_sweet_cherry_data', (sweet_path,)))
             else:
                 print(f" Skipping Sweet Cherry data - file not found")
         
+        cleaned_sources = self._run_source_cleaners(jobs, parallel, max_workers)
+        
+        # Historical sakura returns an empty frame when nothing could be parsed
+        datasets = [df for df in cleaned_sources if len(df) > 0]
+        
         if not datasets:
             raise ValueError("No valid datasets found! Please check file paths.")
         
         # Combine all datasets
-        df_combined = self.combine_datasets(*datasets)
+        df_combined = self._timed_stage('combine', self.combine_datasets, *datasets)
         
         # Add climate indicators
-        df_enriched = self.add_climate_indicators(df_combined)
+        df_enriched = self._timed_stage('climate_indicators', self.add_climate_indicators, df_combined)
         
         # Generate summary stats
-        self.generate_summary_stats(df_enriched)
+        self._timed_stage('summary_stats', self.generate_summary_stats, df_enriched)
         
         # Export for ML
-        self.export_for_ml(df_enriched)
+        self._timed_stage('export_ml', self.export_for_ml, df_enriched)
         
         # Export to GeoJSON
-        self.export_to_geojson(df_enriched)
+        self._timed_stage('export_geojson', self.export_to_geojson, df_enriched)
+        
+        self.stage_timings['total'] = time.perf_counter() - pipeline_start
+        
+        print("\n⏱️  Stage timings:")
+        for stage, seconds in self.stage_timings.items():
+            print(f"   • {stage:<28} {seconds:8.2f}s")
         
         print("\n Multi-dataset cleaning pipeline completed successfully!\n")
         
         return df_enriched
     
+    def _timed_stage(self, stage, func, *args):
+        """Run one pipeline stage and record its wall time in stage_timings"""
+        start = time.perf_counter()
+        result = func(*args)
+        self.stage_timings[stage] = time.perf_counter() - start
+        return result
+    
+    def _run_source_cleaners(self, jobs, parallel=True, max_workers=None):
+        """
+        Run the source cleaners, concurrently when possible.
+        
+        Each worker's console output is captured and printed once all sources
+        are done, in job order, so logs and the returned list are deterministic.
+        
+        Returns:
+            Cleaned DataFrames in the same order as jobs
+        """
+        if not jobs:
+            return []
+        
+        workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+        
+        if parallel and workers > 1:
+            print(f"\n⚡ Cleaning {len(jobs)} sources in parallel ({workers} processes)...")
+            clean_start = time.perf_counter()
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        executor.submit(_run_source_cleaner, self, method, args)
+                        for _, method, args in jobs
+                    ]
+                    # Collected in submission order, not completion order
+                    outcomes = [future.result() for future in futures]
+            except (BrokenProcessPool, OSError, pickle.PicklingError) as e:
+                print(f" Process pool unavailable ({e}), cleaning sources sequentially")
+            else:
+                results = []
+                for (name, _, _), (df, log, seconds) in zip(jobs, outcomes):
+                    print(log, end='')
+                    self.stage_timings[f'clean_{name}'] = seconds
+                    results.append(df)
+                self.stage_timings['clean_sources (wall)'] = time.perf_counter() - clean_start
+                return results
+        
+        clean_start = time.perf_counter()
+        results = [
+            self._timed_stage(f'clean_{name}', getattr(self, method), *args)
+            for name, method, args in jobs
+        ]
+        self.stage_timings['clean_sources (wall)'] = time.perf_counter() - clean_start
+        return results
+    
+    def run_chunked_pipeline(self, sources, output_dir=None, chunksize=500_000, n_buckets=8):
+        """
+        Out-of-core pipeline for exports too large for memory (full USA-NPN or
+        GBIF Darwin Core downloads). Sources are read in chunks and written to
+        Parquet partitioned by year and coordinate bucket; deduplication and the
+        climate baseline run as separate passes over the partitions.
+        
+        Args:
+            sources: (path, format) pairs, format 'npn' (data.csv layout) or 'dwc' (GBIF occurrence.txt)
+            output_dir: Output directory (default: <processed>/clean_blooms_parquet)
+            chunksize: Rows read per chunk
+            n_buckets: Coordinate buckets per year partition
+            
+        Returns:
+            Summary dictionary (see ChunkedBloomCleaner.run)
+        """
+        resolved = []
+        for path, fmt in sources:
+            found = self._find_file(path)
+            if not found:
+                raise FileNotFoundError(f"Source not found: {path}")
+            resolved.append((found, fmt))
+        
+        pipeline = ChunkedBloomCleaner(self, output_dir=output_dir, chunksize=chunksize, n_buckets=n_buckets)
+        return pipeline.run(resolved)
+    
     def _find_file(self, filename):
         """Helper to find file in multiple possible locations"""
         possible_locations = [
@@ -945,6 +1186,20 @@ class BloomDataCleaner:
         return None
 
 
+def _run_source_cleaner(cleaner, method, args):
+    """
+    Process-pool worker: run one BloomDataCleaner source cleaner.
+    
+    Returns:
+        (cleaned DataFrame, captured console output, seconds)
+    """
+    start = time.perf_counter()
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        df = getattr(cleaner, method)(*args)
+    return df, log.getvalue(), time.perf_counter() - start
+
+
 def main():
     """Main execution function"""
     cleaner = BloomDataCleaner()
@@ -0,0 +1,202 @@
+"""
+Elevation Provider for Bloombly
+Batched elevation lookups with a persistent on-disk cache.
+Resolution order per coordinate: disk/memory cache -> local SRTM DEM tile
+(.hgt, if present) -> Open-Elevation POST requests of up to `chunk_size`
+deduplicated locations each. Elevation never changes, so cached values are
+kept forever. Locations without an elevation (ocean points, failed requests)
+are remembered for the rest of the run and not requested again.
+
+Lookups only update the in-memory cache; prefetch() and save() write it to
+disk.
+"""
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import requests
+
+
+class ElevationProvider:
+    """Batched, persistently cached elevation lookups"""
+
+    def __init__(self, cache_path=None, api_url: str = "https://api.open-elevation.com/api/v1/lookup",
+                 dem_dir=None, chunk_size: int = 1000, timeout: int = 60):
+        """
+        Args:
+            cache_path: JSON file used as persistent cache (optional)
+            api_url: Open-Elevation lookup endpoint
+            dem_dir: Directory of SRTM .hgt tiles (e.g. N35E139.hgt), used first when present
+            chunk_size: Locations per POST request
+            timeout: Seconds per POST request
+        """
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.api_url = api_url
+        self.dem_dir = Path(dem_dir) if dem_dir else None
+        self.chunk_size = max(1, chunk_size)
+        self.timeout = timeout
+
+        self.cache: Dict[str, float] = {}
+        # Keys with no elevation this run (not persisted, retried next run)
+        self.failed: Set[str] = set()
+        self._tiles: Dict[str, Optional[np.ndarray]] = {}
+        self._dirty = False
+
+        if self.cache_path and self.cache_path.exists():
+            try:
+                with open(self.cache_path) as f:
+                    self.cache = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"  ⚠ Could not read elevation cache {self.cache_path}: {e}")
+
+    @staticmethod
+    def cache_key(latitude: float, longitude: float) -> str:
+        """Same key format as BloomFeatureEngineer's in-memory caches"""
+        return f"{latitude:.4f},{longitude:.4f}"
+
+    def get(self, latitude: float, longitude: float) -> Optional[float]:
+        """Elevation in meters for one coordinate (None if unavailable)"""
+        return self.get_many([(latitude, longitude)])[0]
+
+    def get_many(self, coords: Iterable[Tuple[float, float]]) -> List[Optional[float]]:
+        """
+        Elevation for many coordinates with one request per `chunk_size`
+        uncached unique locations.
+
+        Args:
+            coords: (latitude, longitude) pairs
+
+        Returns:
+            Elevations in the same order as coords
+        """
+        coords = [(float(lat), float(lon)) for lat, lon in coords]
+        keys = [self.cache_key(lat, lon) for lat, lon in coords]
+
+        # Unique uncached locations, first occurrence wins
+        pending: Dict[str, Tuple[float, float]] = {}
+        for key, coord in zip(keys, coords):
+            if key not in self.cache and key not in self.failed and key not in pending:
+                pending[key] = coord
+
+        if pending and self.dem_dir is not None:
+            for key, (lat, lon) in list(pending.items()):
+                elevation = self._sample_dem(lat, lon)
+                if elevation is not None:
+                    self._store(key, elevation)
+                    del pending[key]
+
+        if pending:
+            self._fetch_remote(pending)
+            self.failed.update(key for key in pending if key not in self.cache)
+
+        return [self.cache.get(key) for key in keys]
+
+    def prefetch(self, latitudes, longitudes) -> int:
+        """
+        Warm the cache for a whole dataset before per-row enrichment.
+
+        Returns:
+            Number of coordinates with a known elevation afterwards
+        """
+        elevations = self.get_many(zip(latitudes, longitudes))
+        self.save()
+        return sum(1 for e in elevations if e is not None)
+
+    def remember(self, latitude: float, longitude: float, elevation: Optional[float]):
+        """
+        Add an elevation obtained elsewhere (e.g. a single-point request) to the cache.
+
+        None marks the location as having no elevation for the rest of the run.
+        """
+        key = self.cache_key(latitude, longitude)
+        if elevation is None:
+            self.failed.add(key)
+        else:
+            self._store(key, elevation)
+
+    def has_failed(self, latitude: float, longitude: float) -> bool:
+        """Whether a lookup for this location already failed this run"""
+        return self.cache_key(latitude, longitude) in self.failed
+
+    def save(self):
+        """Write the cache to disk (atomic replace) if anything changed"""
+        if not self.cache_path or not self._dirty:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.cache, f)
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
+
+    def _store(self, key: str, elevation: float):
+        self.cache[key] = float(elevation)
+        self._dirty = True
+
+    def _fetch_remote(self, pending: Dict[str, Tuple[float, float]]):
+        """POST uncached locations to Open-Elevation in chunks"""
+        items = list(pending.items())
+        n_chunks = math.ceil(len(items) / self.chunk_size)
+        print(f"  Fetching elevation for {len(items):,} locations in {n_chunks} request(s)...")
+
+        for start in range(0, len(items), self.chunk_size):
+            chunk = items[start:start + self.chunk_size]
+            payload = {"locations": [{"latitude": lat, "longitude": lon} for _, (lat, lon) in chunk]}
+
+            try:
+                response = requests.post(self.api_url, json=payload, timeout=self.timeout)
+                if response.status_code != 200:
+                    print(f"  Elevation API error {response.status_code} for chunk of {len(chunk)}")
+                    continue
+
+                results = response.json().get('results', [])
+                # Results come back in request order
+                for (key, _), result in zip(chunk, results):
+                    if result.get('elevation') is not None:
+                        self._store(key, result['elevation'])
+
+            except Exception as e:
+                print(f"  Elevation request failed: {str(e)}")
+
+    def _sample_dem(self, latitude: float, longitude: float) -> Optional[float]:
+        """Bilinear sample from an SRTM .hgt tile, or None if no tile covers the point"""
+        lat_floor = math.floor(latitude)
+        lon_floor = math.floor(longitude)
+        name = (f"{'N' if lat_floor >= 0 else 'S'}{abs(lat_floor):02d}"
+                f"{'E' if lon_floor >= 0 else 'W'}{abs(lon_floor):03d}")
+
+        tile = self._load_tile(name)
+        if tile is None:
+            return None
+
+        size = tile.shape[0]
+        # Row 0 is the northern edge, column 0 the western edge
+        row = (lat_floor + 1 - latitude) * (size - 1)
+        col = (longitude - lon_floor) * (size - 1)
+        r0, c0 = int(row), int(col)
+        r1, c1 = min(r0 + 1, size - 1), min(c0 + 1, size - 1)
+        dr, dc = row - r0, col - c0
+
+        window = tile[[r0, r0, r1, r1], [c0, c1, c0, c1]].astype(float)
+        if np.any(window == -32768):  # SRTM void
+            return None
+
+        top = window[0] * (1 - dc) + window[1] * dc
+        bottom = window[2] * (1 - dc) + window[3] * dc
+        return round(float(top * (1 - dr) + bottom * dr), 1)
+
+    def _load_tile(self, name: str) -> Optional[np.ndarray]:
+        if name not in self._tiles:
+            path = self.dem_dir / f"{name}.hgt"
+            tile = None
+            if path.exists():
+                n_values = path.stat().st_size // 2
+                size = int(math.isqrt(n_values))
+                if size * size == n_values:
+                    tile = np.memmap(path, dtype='>i2', mode='r', shape=(size, size))
+            self._tiles[name] = tile
+        return self._tiles[name]
@@ -13,8 +13,13 @@ from pathlib import Path
 import json
 import math
 import os
+import shutil
 from typing import Dict, Tuple, Optional
 import warnings
+
+from elevation import ElevationProvider
+from processed_data import read_processed, write_processed
+from soil_sampling import DEFAULT_CHUNK_SIZE, build_soil_image, sample_soil_points, scale_soil_values
 warnings.filterwarnings('ignore')
 
 # Load environment variables
@@ -61,6 +66,10 @@ class BloomFeatureEngineer:
         self.max_temporal_gap = 30  # Maximum days to look back/forward for data
         self.temporal_windows = [0, 7, 14, 30]  # Days to try for gap filling
         
+        # When True, the AppEEARS fallback is skipped per observation and run
+        # afterwards as batched multi-point tasks (see batch_fill_ndvi_appeears)
+        self.defer_appeears = False
+        
         # Google Earth Engine setup
         self.use_gee = use_gee and GEE_AVAILABLE
         if self.use_gee:
@@ -95,7 +104,14 @@ class BloomFeatureEngineer:
         # Cache for API responses to avoid redundant calls
         self.weather_cache = {}
         self.soil_cache = {}
-        self.elevation_cache = {}
+        
+        # Elevation: persistent disk cache, optional local SRTM tiles (DEM_DIR), batched POSTs
+        self.elevation_provider = ElevationProvider(
+            cache_path=self.processed_data_dir / 'elevation_cache.json',
+            api_url=self.elevation_url,
+            dem_dir=os.getenv('DEM_DIR')
+        )
+        self.elevation_cache = self.elevation_provider.cache
         
     def calculate_photoperiod(self, latitude: float, date: datetime) -> float:
         """
@@ -140,7 +156,10 @@ class BloomFeatureEngineer:
     
     def get_elevation(self, latitude: float, longitude: float) -> Optional[float]:
         """
-        Get elevation in meters from Open-Elevation API.
+        Get elevation in meters (cache, local DEM tile, then Open-Elevation API).
+        
+        For whole datasets call elevation_provider.prefetch() first so that all
+        coordinates are resolved with a few batched requests.
         
         Args:
             latitude: Latitude in degrees
@@ -149,30 +168,7 @@ class BloomFeatureEngineer:
         Returns:
             Elevation in meters or None if request fails
         """
-        # Check cache
-        cache_key = f"{latitude:.4f},{longitude:.4f}"
-        if cache_key in self.elevation_cache:
-            return self.elevation_cache[cache_key]
-        
-        try:
-            params = {
-                "locations": f"{latitude},{longitude}"
-            }
-            
-            response = requests.get(self.elevation_url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                elevation = data['results'][0]['elevation']
-                self.elevation_cache[cache_key] = elevation
-                return elevation
-            else:
-                print(f"  Elevation API error {response.status_code} for {latitude}, {longitude}")
-                return None
-                
-        except Exception as e:
-            print(f"  Elevation request failed: {str(e)}")
-            return None
+        return self.elevation_provider.get(latitude, longitude)
     
     def get_soil_properties_gee(self, latitude: float, longitude: float) -> Dict[str, float]:
         """
@@ -185,6 +181,9 @@ class BloomFeatureEngineer:
         - Sand content: g/kg  
         - Organic carbon: g/kg
         
+        For whole datasets call prefetch_soil() first so that all coordinates
+        are sampled with a few batched requests.
+        
         Args:
             latitude: Latitude in degrees
             longitude: Longitude in degrees
@@ -206,100 +205,21 @@ class BloomFeatureEngineer:
             # Create point geometry
             point = ee.Geometry.Point([longitude, latitude])
             
-            soil_features = {}
-            
             # Use OpenLandMap datasets (more reliable global coverage)
             # Reference: https://www.openlandmap.org/
+            # All four properties are stacked into one image, so a single
+            # request returns every band (see soil_sampling.py)
             print(f"  Fetching soil properties from OpenLandMap...")
             
-            try:
-                # 1. pH in H2O (0-5cm and 5-15cm depths)
-                # OpenLandMap: b0=0cm, b10=10cm, b30=30cm, b60=60cm, b100=100cm, b200=200cm
-                ph_img = ee.Image("OpenLandMap/SOL/SOL_PH-H2O_USDA-4C1A2A_M/v02")
-                ph_values = ph_img.select(['b0', 'b10']).reduceRegion(
-                    reducer=ee.Reducer.first(),
-                    geometry=point,
-                    scale=250,
-                    bestEffort=True
-                ).getInfo()
-                
-                # pH is stored as pH * 10, convert to actual pH
-                ph_0cm = ph_values.get('b0')
-                ph_10cm = ph_values.get('b10')
-                
-                soil_features['soil_ph_0-5cm'] = round(ph_0cm / 10, 2) if ph_0cm is not None else None
-                soil_features['soil_ph_5-15cm'] = round(ph_10cm / 10, 2) if ph_10cm is not None else None
-                print(f"    ✓ pH data retrieved")
-            except Exception as e:
-                print(f"    ✗ pH data failed: {str(e)[:80]}")
-                soil_features['soil_ph_0-5cm'] = None
-                soil_features['soil_ph_5-15cm'] = None
+            values = build_soil_image().reduceRegion(
+                reducer=ee.Reducer.first(),
+                geometry=point,
+                scale=250,
+                bestEffort=True
+            ).getInfo()
             
-            try:
-                # 2. Clay content (0-5cm and 5-15cm depths)
-                clay_img = ee.Image("OpenLandMap/SOL/SOL_CLAY-WFRACTION_USDA-3A1A1A_M/v02")
-                clay_values = clay_img.select(['b0', 'b10']).reduceRegion(
-                    reducer=ee.Reducer.first(),
-                    geometry=point,
-                    scale=250,
-                    bestEffort=True
-                ).getInfo()
-                
-                # Clay is stored as g/kg, values are already in the right range
-                clay_0cm = clay_values.get('b0')
-                clay_10cm = clay_values.get('b10')
-                
-                soil_features['soil_clay_0-5cm'] = round(clay_0cm, 2) if clay_0cm is not None else None
-                soil_features['soil_clay_5-15cm'] = round(clay_10cm, 2) if clay_10cm is not None else None
-                print(f"    ✓ Clay data retrieved")
-            except Exception as e:
-                print(f"    ✗ Clay data failed: {str(e)[:80]}")
-                soil_features['soil_clay_0-5cm'] = None
-                soil_features['soil_clay_5-15cm'] = None
-            
-            try:
-                # 3. Sand content (0-5cm and 5-15cm depths)
-                sand_img = ee.Image("OpenLandMap/SOL/SOL_SAND-WFRACTION_USDA-3A1A1A_M/v02")
-                sand_values = sand_img.select(['b0', 'b10']).reduceRegion(
-                    reducer=ee.Reducer.first(),
-                    geometry=point,
-                    scale=250,
-                    bestEffort=True
-                ).getInfo()
-                
-                # Sand is stored as g/kg
-                sand_0cm = sand_values.get('b0')
-                sand_10cm = sand_values.get('b10')
-                
-                soil_features['soil_sand_0-5cm'] = round(sand_0cm, 2) if sand_0cm is not None else None
-                soil_features['soil_sand_5-15cm'] = round(sand_10cm, 2) if sand_10cm is not None else None
-                print(f"    ✓ Sand data retrieved")
-            except Exception as e:
-                print(f"    ✗ Sand data failed: {str(e)[:80]}")
-                soil_features['soil_sand_0-5cm'] = None
-                soil_features['soil_sand_5-15cm'] = None
-            
-            try:
-                # 4. Soil Organic Carbon (0-5cm and 5-15cm depths)
-                soc_img = ee.Image("OpenLandMap/SOL/SOL_ORGANIC-CARBON_USDA-6A1C_M/v02")
-                soc_values = soc_img.select(['b0', 'b10']).reduceRegion(
-                    reducer=ee.Reducer.first(),
-                    geometry=point,
-                    scale=250,
-                    bestEffort=True
-                ).getInfo()
-                
-                # SOC is stored as g/kg * 5
-                soc_0cm = soc_values.get('b0')
-                soc_10cm = soc_values.get('b10')
-                
-                soil_features['soil_organic_carbon_0-5cm'] = round(soc_0cm / 5, 2) if soc_0cm is not None else None
-                soil_features['soil_organic_carbon_5-15cm'] = round(soc_10cm / 5, 2) if soc_10cm is not None else None
-                print(f"    ✓ Organic carbon data retrieved")
-            except Exception as e:
-                print(f"    ✗ Organic carbon data failed: {str(e)[:80]}")
-                soil_features['soil_organic_carbon_0-5cm'] = None
-                soil_features['soil_organic_carbon_5-15cm'] = None
+            soil_features = scale_soil_values(values)
+            print(f"    ✓ Soil data retrieved")
             
             # Cache the results
             self.soil_cache[cache_key] = soil_features
@@ -309,6 +229,36 @@ class BloomFeatureEngineer:
             print(f"  ✗ GEE soil request failed: {str(e)}")
             return self._get_default_soil_features()
     
+    def prefetch_soil(self, latitudes, longitudes, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """
+        Warm soil_cache for a whole dataset before per-row enrichment.
+        
+        Unique uncached coordinates are sampled with one reduceRegions request
+        per chunk of points instead of one reduceRegion request per point.
+        
+        Args:
+            latitudes: Latitudes in degrees
+            longitudes: Longitudes in degrees
+            chunk_size: Points per Earth Engine request
+            
+        Returns:
+            Number of coordinates with cached soil data afterwards
+        """
+        keys = [f"{lat:.4f},{lon:.4f}" for lat, lon in zip(latitudes, longitudes)]
+        
+        if self.use_gee:
+            pending = {}
+            for key, lat, lon in zip(keys, latitudes, longitudes):
+                if key not in self.soil_cache and key not in pending:
+                    pending[key] = (key, float(lat), float(lon))
+            
+            if pending:
+                n_chunks = math.ceil(len(pending) / max(1, chunk_size))
+                print(f"  Fetching soil properties for {len(pending):,} locations in {n_chunks} request(s)...")
+                self.soil_cache.update(sample_soil_points(pending.values(), chunk_size=chunk_size))
+        
+        return sum(1 for key in keys if key in self.soil_cache)
+    
     def get_soil_properties(self, latitude: float, longitude: float) -> Dict[str, float]:
         """
         Get soil properties using Google Earth Engine (preferred) or fallback method.
@@ -738,7 +688,7 @@ class BloomFeatureEngineer:
                 return temp_features
             
             # After 10 days gap, switch to AppEEARS for remaining windows
-            if gap_days > 10:
+            if gap_days > 10 and not self.defer_appeears:
                 print(f"    ⚠ No GEE data within 10 days, trying AppEEARS for {gap_days}d window...")
                 
                 # Try earlier with AppEEARS
@@ -753,9 +703,68 @@ class BloomFeatureEngineer:
                     print(f"    ✓ Found data from {gap_days} days later (AppEEARS)")
                     return temp_features
         
-        print(f"    ✗ No NDVI data found within {self.max_temporal_gap} days (tried GEE + AppEEARS)")
+        if self.defer_appeears:
+            print(f"    ✗ No GEE NDVI within {self.max_temporal_gap} days (queued for batched AppEEARS)")
+        else:
+            print(f"    ✗ No NDVI data found within {self.max_temporal_gap} days (tried GEE + AppEEARS)")
         return self._get_default_ndvi_features()
     
+    def batch_fill_ndvi_appeears(self, df: pd.DataFrame, features_df: pd.DataFrame) -> int:
+        """
+        Fill missing NDVI for many observations with batched AppEEARS tasks.
+        Collects every row whose NDVI features are all NaN, submits them as a few
+        multi-coordinate point tasks, polls concurrently and writes the results
+        back into features_df in place.
+        
+        Args:
+            df: Observations (latitude, longitude, bloom_date), aligned with features_df
+            features_df: Engineered features, one row per row of df
+            
+        Returns:
+            Number of observations that received NDVI
+        """
+        from appeears_batch import AppEEARSBatchClient
+        
+        ndvi_cols = [c for c in features_df.columns if c.startswith('ndvi_mean_')]
+        if not ndvi_cols:
+            ndvi_cols = list(self._get_default_ndvi_features().keys())
+            for col in ndvi_cols:
+                features_df[col] = np.nan
+        
+        missing = features_df[ndvi_cols].isna().all(axis=1).to_numpy()
+        if not missing.any():
+            return 0
+        
+        print(f"\n🛰️  Batched AppEEARS fallback for {int(missing.sum()):,} observations without GEE NDVI...")
+        
+        client = AppEEARSBatchClient(
+            base_url=self.appeears_url,
+            token=self.appeears_token,
+            username=self.appeears_username,
+            password=self.appeears_password
+        )
+        
+        positions = np.flatnonzero(missing)
+        observations = list(zip(
+            positions,
+            df['latitude'].to_numpy()[positions],
+            df['longitude'].to_numpy()[positions],
+            pd.to_datetime(df['bloom_date']).to_numpy()[positions]
+        ))
+        
+        results = client.fetch_ndvi(observations, gap_days=[g for g in self.temporal_windows if g > 10])
+        self.appeears_token = client.token
+        
+        filled = 0
+        for position, ndvi_features in results.items():
+            if any(not np.isnan(v) for v in ndvi_features.values()):
+                for col, value in ndvi_features.items():
+                    features_df.iat[position, features_df.columns.get_loc(col)] = value
+                filled += 1
+        
+        print(f"   ✓ AppEEARS filled NDVI for {filled:,}/{len(positions):,} observations")
+        return filled
+    
     def calculate_gdd(self, temps: list, base_temp: float = 5.0) -> float:
         """
         Calculate Growing Degree Days (GDD).
@@ -785,63 +794,18 @@ class BloomFeatureEngineer:
             Dictionary with weather features
         """
         # Check cache
-        cache_key = f"{latitude:.4f},{longitude:.4f},{bloom_date.strftime('%Y-%m-%d')},{days_before}"
+        cache_key = self._weather_cache_key(latitude, longitude, bloom_date, days_before)
         if cache_key in self.weather_cache:
             return self.weather_cache[cache_key]
         
         try:
-            start_date = bloom_date - timedelta(days=days_before)
-            end_date = bloom_date - timedelta(days=1)  # Day before bloom
-            
-            params = {
-                "parameters": "T2M,T2M_MAX,T2M_MIN,PRECTOTCORR,RH2M,ALLSKY_SFC_SW_DWN",
-                "community": "AG",
-                "longitude": longitude,
-                "latitude": latitude,
-                "start": start_date.strftime("%Y%m%d"),
-                "end": end_date.strftime("%Y%m%d"),
-                "format": "JSON"
-            }
+            params = self._weather_request_params(latitude, longitude, bloom_date, days_before)
             
             response = requests.get(self.nasa_power_url, params=params, timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
-                parameters = data['properties']['parameter']
-                
-                # Extract daily values
-                temps_avg = list(parameters['T2M'].values())
-                temps_max = list(parameters['T2M_MAX'].values())
-                temps_min = list(parameters['T2M_MIN'].values())
-                precip = list(parameters['PRECTOTCORR'].values())
-                humidity = list(parameters['RH2M'].values())
-                solar = list(parameters['ALLSKY_SFC_SW_DWN'].values())
-                
-                # Calculate features for different time windows
-                weather_features = {}
-                
-                for window in [7, 14, 30, 90]:
-                    if len(temps_avg) >= window:
-                        window_temps = temps_avg[-window:]
-                        window_precip = precip[-window:]
-                        window_humidity = humidity[-window:]
-                        window_solar = solar[-window:]
-                        
-                        weather_features[f'temp_avg_{window}d'] = round(np.mean(window_temps), 2)
-                        weather_features[f'temp_max_{window}d'] = round(np.max(temps_max[-window:]), 2)
-                        weather_features[f'temp_min_{window}d'] = round(np.min(temps_min[-window:]), 2)
-                        weather_features[f'precip_total_{window}d'] = round(np.sum(window_precip), 2)
-                        weather_features[f'precip_avg_{window}d'] = round(np.mean(window_precip), 2)
-                        weather_features[f'humidity_avg_{window}d'] = round(np.mean(window_humidity), 2)
-                        weather_features[f'solar_avg_{window}d'] = round(np.mean(window_solar), 2)
-                        
-                        # Growing Degree Days
-                        weather_features[f'gdd_{window}d'] = self.calculate_gdd(window_temps)
-                
-                # Overall statistics (full 90 days)
-                weather_features['temp_variance_90d'] = round(np.var(temps_avg), 2)
-                weather_features['temp_range_90d'] = round(np.max(temps_max) - np.min(temps_min), 2)
-                weather_features['frost_days_90d'] = sum(1 for t in temps_min if t < 0)
+                weather_features = self._compute_weather_features(data['properties']['parameter'])
                 
                 self.weather_cache[cache_key] = weather_features
                 return weather_features
@@ -854,6 +818,73 @@ class BloomFeatureEngineer:
             print(f"  NASA POWER request failed: {str(e)}")
             return self._get_default_weather_features()
     
+    def _weather_cache_key(self, latitude: float, longitude: float,
+                           bloom_date: datetime, days_before: int) -> str:
+        """Build the cache key shared by the sync and async weather fetchers"""
+        return f"{latitude:.4f},{longitude:.4f},{bloom_date.strftime('%Y-%m-%d')},{days_before}"
+    
+    def _weather_request_params(self, latitude: float, longitude: float,
+                                bloom_date: datetime, days_before: int) -> Dict:
+        """Build NASA POWER query parameters for the period before bloom"""
+        start_date = bloom_date - timedelta(days=days_before)
+        end_date = bloom_date - timedelta(days=1)  # Day before bloom
+        
+        return {
+            "parameters": "T2M,T2M_MAX,T2M_MIN,PRECTOTCORR,RH2M,ALLSKY_SFC_SW_DWN",
+            "community": "AG",
+            "longitude": longitude,
+            "latitude": latitude,
+            "start": start_date.strftime("%Y%m%d"),
+            "end": end_date.strftime("%Y%m%d"),
+            "format": "JSON"
+        }
+    
+    def _compute_weather_features(self, parameters: Dict) -> Dict[str, float]:
+        """
+        Turn a NASA POWER 'parameter' block into windowed weather features.
+        
+        Args:
+            parameters: data['properties']['parameter'] from a NASA POWER response
+            
+        Returns:
+            Dictionary with weather features
+        """
+        # Extract daily values
+        temps_avg = list(parameters['T2M'].values())
+        temps_max = list(parameters['T2M_MAX'].values())
+        temps_min = list(parameters['T2M_MIN'].values())
+        precip = list(parameters['PRECTOTCORR'].values())
+        humidity = list(parameters['RH2M'].values())
+        solar = list(parameters['ALLSKY_SFC_SW_DWN'].values())
+        
+        # Calculate features for different time windows
+        weather_features = {}
+        
+        for window in [7, 14, 30, 90]:
+            if len(temps_avg) >= window:
+                window_temps = temps_avg[-window:]
+                window_precip = precip[-window:]
+                window_humidity = humidity[-window:]
+                window_solar = solar[-window:]
+                
+                weather_features[f'temp_avg_{window}d'] = round(np.mean(window_temps), 2)
+                weather_features[f'temp_max_{window}d'] = round(np.max(temps_max[-window:]), 2)
+                weather_features[f'temp_min_{window}d'] = round(np.min(temps_min[-window:]), 2)
+                weather_features[f'precip_total_{window}d'] = round(np.sum(window_precip), 2)
+                weather_features[f'precip_avg_{window}d'] = round(np.mean(window_precip), 2)
+                weather_features[f'humidity_avg_{window}d'] = round(np.mean(window_humidity), 2)
+                weather_features[f'solar_avg_{window}d'] = round(np.mean(window_solar), 2)
+                
+                # Growing Degree Days
+                weather_features[f'gdd_{window}d'] = self.calculate_gdd(window_temps)
+        
+        # Overall statistics (full 90 days)
+        weather_features['temp_variance_90d'] = round(np.var(temps_avg), 2)
+        weather_features['temp_range_90d'] = round(np.max(temps_max) - np.min(temps_min), 2)
+        weather_features['frost_days_90d'] = sum(1 for t in temps_min if t < 0)
+        
+        return weather_features
+    
     def _get_default_weather_features(self) -> Dict[str, float]:
         """Return default weather features when API fails"""
         features = {}
@@ -898,6 +929,15 @@ class BloomFeatureEngineer:
             'photoperiod_change_rate': round(photoperiod_change_rate, 4)
         }
     
+    def _parse_bloom_date(self, row: pd.Series) -> datetime:
+        """Get the bloom date of an observation from 'bloom_date' or 'year' + 'day_of_year'"""
+        if 'bloom_date' in row:
+            return pd.to_datetime(row['bloom_date'])
+        elif 'year' in row and 'day_of_year' in row:
+            return datetime(int(row['year']), 1, 1) + timedelta(days=int(row['day_of_year']) - 1)
+        else:
+            raise ValueError("Need either 'bloom_date' or 'year' + 'day_of_year' columns")
+    
     def enrich_single_observation(self, row: pd.Series) -> Dict[str, float]:
         """
         Enrich a single bloom observation with all environmental features.
@@ -910,14 +950,7 @@ class BloomFeatureEngineer:
         """
         latitude = row['latitude']
         longitude = row['longitude']
-        
-        # Parse bloom date
-        if 'bloom_date' in row:
-            bloom_date = pd.to_datetime(row['bloom_date'])
-        elif 'year' in row and 'day_of_year' in row:
-            bloom_date = datetime(int(row['year']), 1, 1) + timedelta(days=int(row['day_of_year']) - 1)
-        else:
-            raise ValueError("Need either 'bloom_date' or 'year' + 'day_of_year' columns")
+        bloom_date = self._parse_bloom_date(row)
         
         features = {}
         
@@ -950,8 +983,46 @@ class BloomFeatureEngineer:
         
         return features
     
+    def _enrich_rows_concurrently(self, df_to_enrich: pd.DataFrame, checkpoint=None,
+                                  service_limits: Optional[Dict] = None) -> Optional[list]:
+        """
+        Enrich rows with the asyncio pipeline.
+        
+        Args:
+            df_to_enrich: Observations to enrich
+            checkpoint: EnrichmentCheckpoint to stream completed rows into (optional)
+            service_limits: Per-service overrides for the concurrent pipeline
+            
+        Returns:
+            List of feature dictionaries in the same order as df_to_enrich
+            (empty when streaming to a checkpoint), or None if aiohttp is not
+            installed (caller runs the sequential loop)
+        """
+        from async_enrichment import AsyncBloomEnricher, AIOHTTP_AVAILABLE
+        
+        if not AIOHTTP_AVAILABLE:
+            print("  aiohttp not available, falling back to sequential enrichment")
+            print("   Install with: pip install aiohttp")
+            return None
+        
+        enricher = AsyncBloomEnricher(self, service_limits=service_limits)
+        
+        if checkpoint is None:
+            return enricher.enrich(df_to_enrich)
+        
+        record_ids = df_to_enrich['record_id'].astype(str).tolist()
+        enricher.enrich(
+            df_to_enrich,
+            on_result=lambda position, features: checkpoint.append(record_ids[position], features)
+        )
+        return []
+    
     def enrich_dataset(self, input_csv: str, output_csv: str = None, 
-                      sample_size: int = None) -> pd.DataFrame:
+                      sample_size: int = None, concurrent: bool = False,
+                      service_limits: Optional[Dict] = None,
+                      checkpoint_dir: Optional[str] = None,
+                      flush_every: int = 100,
+                      batch_appeears: bool = False) -> pd.DataFrame:
         """
         Enrich entire bloom dataset with environmental features.
         Only processes historical observations (is_prediction=False) from 2013 onwards.
@@ -961,12 +1032,22 @@ class BloomFeatureEngineer:
             input_csv: Path to input CSV file
             output_csv: Path to output CSV file (optional)
             sample_size: Number of rows to process (for testing, optional)
+            concurrent: Use the asyncio pipeline (pooled sessions, per-service
+                rate limits) instead of the sequential loop
+            service_limits: Per-service overrides for the concurrent pipeline,
+                e.g. {'nasa_power': {'concurrency': 4, 'rate': 2.0}}
+            checkpoint_dir: Directory for the resumable checkpoint store (optional).
+                Features are streamed there as they complete; on restart, records
+                already done are skipped and only all-NaN records are retried.
+            flush_every: Records per checkpoint part file
+            batch_appeears: Skip the per-observation AppEEARS fallback and fill
+                rows still missing NDVI with batched multi-point tasks at the end
             
         Returns:
             Enriched DataFrame with observations from 2013 onwards only
         """
         print(f"\n Loading bloom dataset from {input_csv}")
-        df = pd.read_csv(input_csv)
+        df = read_processed(input_csv)
         
         print(f" Dataset shape: {df.shape[0]} total observations")
         
@@ -1018,35 +1099,96 @@ class BloomFeatureEngineer:
             print(f" Sampling {sample_size} historical observations for testing...")
             df_to_enrich = df_to_enrich.sample(n=sample_size, random_state=42)
         
-        # Initialize feature columns
-        feature_list = []
-        
         print(f"\n🔧 Starting feature engineering for {len(df_to_enrich)} historical observations...")
         print("=" * 70)
         
-        for idx, row in df_to_enrich.iterrows():
-            print(f"\n[{idx + 1}/{len(df_to_enrich)}] Processing observation {row.get('record_id', idx)}:")
-            print(f"  Species: {row.get('scientific_name', 'Unknown')}")
-            print(f"  Location: {row['latitude']:.2f}, {row['longitude']:.2f}")
-            print(f"  Year: {row.get('year', 'Unknown')}")
+        checkpoint = None
+        df_pending = df_to_enrich
+        if checkpoint_dir is not None:
+            if 'record_id' not in df_to_enrich.columns:
+                raise ValueError("Checkpointing requires a 'record_id' column")
             
-            try:
-                features = self.enrich_single_observation(row)
+            from checkpoint import EnrichmentCheckpoint, align_features
+            checkpoint = EnrichmentCheckpoint(checkpoint_dir, flush_every=flush_every)
+            completed = checkpoint.completed_ids()
+            df_pending = df_to_enrich[~df_to_enrich['record_id'].astype(str).isin(completed)]
+            
+            print(f" 📌 Checkpoint store: {checkpoint.checkpoint_dir}")
+            print(f"   • Already enriched: {len(df_to_enrich) - len(df_pending):,}")
+            print(f"   • Pending (new or all-NaN retries): {len(df_pending):,}")
+        
+        feature_list = []
+        
+        def record_features(row, features):
+            if checkpoint is not None:
+                checkpoint.append(row['record_id'], features)
+            else:
                 feature_list.append(features)
-                print(f"   ✓ Enriched with {len(features)} features")
-                
-            except Exception as e:
-                print(f"   ✗ Error: {str(e)}")
-                # Add empty features
-                feature_list.append({})
+        
+        self.defer_appeears = batch_appeears
+        
+        # Resolve every elevation up front: one request per chunk of unique coordinates
+        if len(df_pending) > 0:
+            known = self.elevation_provider.prefetch(df_pending['latitude'], df_pending['longitude'])
+            print(f" ⛰️  Elevation known for {known:,}/{len(df_pending):,} pending observations")
             
-            # Small delay to avoid overwhelming APIs
-            time.sleep(0.5)
+            # Same for soil: one reduceRegions request per chunk of unique points
+            if self.use_gee:
+                known = self.prefetch_soil(df_pending['latitude'], df_pending['longitude'])
+                print(f" 🪨 Soil known for {known:,}/{len(df_pending):,} pending observations")
+        
+        try:
+            concurrent_features = None
+            if concurrent:
+                concurrent_features = self._enrich_rows_concurrently(
+                    df_pending, checkpoint, service_limits
+                )
+            
+            if concurrent_features is not None:
+                feature_list = concurrent_features
+            else:
+                for idx, row in df_pending.iterrows():
+                    print(f"\n[{idx + 1}/{len(df_pending)}] Processing observation {row.get('record_id', idx)}:")
+                    print(f"  Species: {row.get('scientific_name', 'Unknown')}")
+                    print(f"  Location: {row['latitude']:.2f}, {row['longitude']:.2f}")
+                    print(f"  Year: {row.get('year', 'Unknown')}")
+                    
+                    try:
+                        features = self.enrich_single_observation(row)
+                        record_features(row, features)
+                        print(f"   ✓ Enriched with {len(features)} features")
+                        
+                    except Exception as e:
+                        print(f"   ✗ Error: {str(e)}")
+                        # Add empty features
+                        record_features(row, {})
+                    
+                    # Small delay to avoid overwhelming APIs
+                    time.sleep(0.5)
+        finally:
+            self.defer_appeears = False
+            self.elevation_provider.save()
+            # Persist whatever is buffered, even on Ctrl+C or a crash
+            if checkpoint is not None:
+                checkpoint.flush()
         
         print("\n" + "=" * 70)
         
         # Convert feature list to DataFrame
-        features_df = pd.DataFrame(feature_list)
+        if checkpoint is not None:
+            features_df = align_features(df_to_enrich, checkpoint.load())
+        else:
+            features_df = pd.DataFrame(feature_list)
+        
+        if batch_appeears and len(features_df) > 0:
+            ndvi_before = features_df.filter(like='ndvi_mean_').notna().any(axis=1).to_numpy()
+            if self.batch_fill_ndvi_appeears(df_to_enrich.reset_index(drop=True), features_df) and checkpoint is not None:
+                # Record the newly filled rows so a restart does not redo them
+                ndvi_after = features_df.filter(like='ndvi_mean_').notna().any(axis=1).to_numpy()
+                record_ids = df_to_enrich['record_id'].astype(str).to_numpy()
+                for position in np.flatnonzero(ndvi_after & ~ndvi_before):
+                    checkpoint.append(record_ids[position], features_df.iloc[position].to_dict())
+                checkpoint.flush()
         
         # Combine original historical data with new features
         df_enriched_historical = pd.concat([df_to_enrich.reset_index(drop=True), features_df.reset_index(drop=True)], axis=1)
@@ -1079,8 +1221,10 @@ class BloomFeatureEngineer:
         if output_csv is None:
             output_csv = self.processed_data_dir / 'bloom_features_ml.csv'
         
-        df_enriched_historical.to_csv(output_csv, index=False)
+        parquet_output = write_processed(df_enriched_historical, output_csv)
         print(f"\n💾 Enriched data (2013+ only) saved to: {output_csv}")
+        if parquet_output is not None:
+            print(f"   🗂️ Typed Parquet copy: {parquet_output}")
         print(f"   📊 Total observations: {len(df_enriched_historical):,}")
         print(f"   � Date range: 2013 onwards (satellite data availability)")
         print(f"   📝 Note: Pre-2013 data and predictions excluded from output")
@@ -1165,12 +1309,26 @@ def main():
     else:
         sample_size = 10
     
+    # One checkpoint per input file and sample, so other runs never resume stale rows
+    sample_label = 'full' if sample_size is None else f'sample{sample_size}'
+    checkpoint_dir = engineer.processed_data_dir / f'enrichment_checkpoint_{input_csv.stem}_{sample_label}'
+    if checkpoint_dir.exists():
+        fresh = input(f"\nCheckpoint {checkpoint_dir} exists. Resume it? (Y/n): ").strip().lower() == 'n'
+        if fresh:
+            shutil.rmtree(checkpoint_dir)
+            print(" Cleared checkpoint, starting fresh.")
+    print(f"\n Checkpoint: {checkpoint_dir} (re-run to resume an interrupted job)")
+    
+    concurrent = input("\nUse concurrent enrichment (asyncio, per-service rate limits)? (Y/n): ").strip().lower() != 'n'
+    
     # Run enrichment
     try:
         df_enriched = engineer.enrich_dataset(
             input_csv=input_csv,
             output_csv=output_csv,
-            sample_size=sample_size
+            sample_size=sample_size,
+            concurrent=concurrent,
+            checkpoint_dir=checkpoint_dir
         )
         
         print("\n" + "=" * 70)
@@ -1188,7 +1346,8 @@ def main():
         
     except KeyboardInterrupt:
         print("\n\n  Process interrupted by user.")
-        print("   Partial results may be saved.")
+        print(f"   Completed observations are checkpointed in {checkpoint_dir}")
+        print("   Run again to resume where it stopped.")
     except Exception as e:
         print(f"\n\n Error: {str(e)}")
         import traceback
@@ -0,0 +1,218 @@
+"""
+Streaming GeoJSON Writer for Bloombly
+Writes FeatureCollections to disk feature by feature (compact separators, fixed
+coordinate precision) instead of building the whole document in memory and
+pretty-printing it. Geometry and properties are taken from column arrays, so
+exporters never need iterrows. Uses orjson when installed.
+
+Shared by the ML cleaner, the API GeoJSON scripts and the backend exporters.
+"""
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# orjson import (optional, ~5-10x faster encoding)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+CRS84 = {
+    "type": "name",
+    "properties": {
+        "name": "urn:ogc:def:crs:OGC:1.3:CRS84"
+    }
+}
+
+# Default decimal places for coordinates (~0.1m)
+DEFAULT_PRECISION = 6
+
+
+def column_values(values) -> list:
+    """
+    Column -> plain Python list for encoding: numpy scalars become int/float/bool
+    and NaN/NaT/None become None. Format datetime columns as strings first.
+    """
+    series = pd.Series(values) if not isinstance(values, pd.Series) else values
+    mask = series.isna().to_numpy()
+    items = series.astype(object).tolist() if series.dtype.kind in 'Mm' else series.tolist()
+    if mask.any():
+        items = [None if missing else item for item, missing in zip(items, mask)]
+    return items
+
+
+def box_rings(min_lon, min_lat, max_lon, max_lat) -> np.ndarray:
+    """
+    Closed rectangular rings from bounding boxes.
+
+    Returns:
+        Array of shape (n, 5, 2) with [lon, lat] vertices
+    """
+    min_lon, min_lat, max_lon, max_lat = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (min_lon, min_lat, max_lon, max_lat))
+    )
+    return np.stack([
+        np.stack([min_lon, max_lon, max_lon, min_lon, min_lon], axis=-1),
+        np.stack([min_lat, min_lat, max_lat, max_lat, min_lat], axis=-1),
+    ], axis=-1)
+
+
+def square_rings(lon, lat, half_size) -> np.ndarray:
+    """
+    Closed square rings around points.
+
+    Returns:
+        Array of shape (n, 5, 2) with [lon, lat] vertices
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    return box_rings(lon - half_size, lat - half_size, lon + half_size, lat + half_size)
+
+
+def regular_polygon_rings(lon, lat, radius, n_vertices: int = 8) -> np.ndarray:
+    """
+    Closed regular polygons (e.g. octagons) around points.
+
+    Returns:
+        Array of shape (n, n_vertices + 1, 2) with [lon, lat] vertices
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    radius = np.broadcast_to(np.asarray(radius, dtype=float), lon.shape)
+    angles = 2 * math.pi * np.arange(n_vertices + 1) / n_vertices
+    return np.stack([
+        lon[:, None] + radius[:, None] * np.cos(angles),
+        lat[:, None] + radius[:, None] * np.sin(angles),
+    ], axis=-1)
+
+
+class GeoJSONWriter:
+    """Incremental FeatureCollection writer"""
+
+    def __init__(self, path, name: Optional[str] = None, crs: Optional[Dict] = None,
+                 metadata: Optional[Dict] = None, precision: int = DEFAULT_PRECISION,
+                 fast_json: bool = True, flush_every: int = 1000):
+        """
+        Args:
+            path: Output file (parent directories are created)
+            name: Optional collection "name" member
+            crs: Optional "crs" member (e.g. CRS84)
+            metadata: Optional "metadata" member; written after the features,
+                so it can still be updated (e.g. with counts) before close()
+            precision: Decimal places kept for coordinates
+            fast_json: Use orjson when it is installed
+            flush_every: Encoded features buffered per write
+        """
+        self.path = Path(path)
+        self.precision = precision
+        self.metadata = dict(metadata) if metadata is not None else None
+        self.flush_every = max(1, flush_every)
+        self.feature_count = 0
+        self._buffer = []
+        self._written_any = False
+
+        if fast_json and ORJSON_AVAILABLE:
+            self._encode = orjson.dumps
+        else:
+            self._encode = lambda obj: json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self.path.with_name(self.path.name + '.tmp')
+        self._file = open(self._tmp_path, 'wb')
+
+        header = b'{"type":"FeatureCollection"'
+        if name is not None:
+            header += b',"name":' + self._encode(name)
+        if crs is not None:
+            header += b',"crs":' + self._encode(crs)
+        self._file.write(header + b',"features":[')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write_feature(self, feature: Dict):
+        """Append one already-built feature dictionary"""
+        self._buffer.append(self._encode(feature))
+        self.feature_count += 1
+        if len(self._buffer) >= self.flush_every:
+            self._flush()
+
+    def write_features(self, features: Iterable[Dict]):
+        for feature in features:
+            self.write_feature(feature)
+
+    def write_polygons(self, rings, properties: Dict[str, Sequence], ids: Optional[Sequence] = None,
+                       geometry_type: str = 'MultiPolygon'):
+        """
+        Append one polygon feature per row from column arrays.
+
+        Args:
+            rings: Array (n, k, 2) of closed [lon, lat] rings, or a list of
+                (k_i, 2) arrays when rings have different vertex counts
+            properties: {property name: column of length n}; property order
+                follows the dict
+            ids: Optional feature "id" column
+            geometry_type: 'MultiPolygon' (default) or 'Polygon'
+        """
+        if isinstance(rings, np.ndarray):
+            coordinates = np.round(rings, self.precision).tolist()
+        else:
+            coordinates = [np.round(np.asarray(r, dtype=float), self.precision).tolist() for r in rings]
+
+        names = list(properties)
+        columns = [column_values(properties[name]) for name in names]
+        id_values = column_values(ids) if ids is not None else None
+
+        for i, ring in enumerate(coordinates):
+            feature = {"type": "Feature"}
+            if id_values is not None:
+                feature["id"] = id_values[i]
+            feature["properties"] = {name: column[i] for name, column in zip(names, columns)}
+            feature["geometry"] = {
+                "type": geometry_type,
+                "coordinates": [[ring]] if geometry_type == 'MultiPolygon' else [ring]
+            }
+            self.write_feature(feature)
+
+    def round_coordinates(self, coordinates):
+        """Round nested coordinate lists to the writer's precision"""
+        return np.round(np.asarray(coordinates, dtype=float), self.precision).tolist()
+
+    def close(self) -> int:
+        """Finish the document and move it into place. Returns the feature count"""
+        self._flush()
+        footer = b']'
+        if self.metadata is not None:
+            footer += b',"metadata":' + self._encode(self.metadata)
+        self._file.write(footer + b'}')
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        return self.feature_count
+
+    def abort(self):
+        """Discard a partially written file"""
+        self._file.close()
+        if self._tmp_path.exists():
+            self._tmp_path.unlink()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        separator = b',' if self._written_any else b''
+        self._file.write(separator + b','.join(self._buffer))
+        self._written_any = True
+        self._buffer = []
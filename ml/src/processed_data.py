@@ -0,0 +1,174 @@
+"""
+Processed Dataset I/O for Bloombly
+Typed Parquet copies of the processed CSVs in data/processed. Writers keep the
+CSV (for notebooks and external tools) and add a Parquet file next to it with
+categorical taxonomy/region columns, real date columns and numeric dtypes.
+Loaders prefer the Parquet copy with column projection and row filters, and
+fall back to the CSV when pyarrow or the Parquet file is missing (or the CSV
+is newer).
+"""
+
+import operator
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# pyarrow import (optional, required for Parquet)
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# Low-cardinality text columns stored as categoricals (dictionary-encoded in Parquet)
+CATEGORICAL_COLUMNS = (
+    'scientific_name', 'family', 'genus', 'species', 'common_name',
+    'season', 'region', 'prefecture', 'location_grid', 'trait', 'data_source'
+)
+
+# Columns parsed to datetime64
+DATE_COLUMNS = ('date', 'bloom_date')
+
+# Row filter operators accepted by read_processed (pyarrow filter syntax)
+FILTER_OPERATORS = {
+    '==': operator.eq,
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'in': lambda column, values: column.isin(values),
+    'not in': lambda column, values: ~column.isin(values),
+}
+
+
+def parquet_path(path) -> Path:
+    """Parquet file that accompanies a processed CSV (same name, .parquet suffix)"""
+    return Path(path).with_suffix('.parquet')
+
+
+def to_typed(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Apply the processed-data dtypes: categoricals for CATEGORICAL_COLUMNS,
+    datetime64 for DATE_COLUMNS, bool for is_prediction when it has no gaps.
+
+    Args:
+        df: DataFrame as read from CSV or built by a pipeline
+
+    Returns:
+        New DataFrame with converted columns
+    """
+    df = df.copy()
+
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+
+    for column in DATE_COLUMNS:
+        if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+
+    if 'is_prediction' in df.columns and df['is_prediction'].notna().all():
+        df['is_prediction'] = df['is_prediction'].astype(bool)
+
+    return df
+
+
+def write_processed(df: pd.DataFrame, csv_path, write_csv: bool = True) -> Optional[Path]:
+    """
+    Save a processed dataset as CSV plus a typed Parquet copy.
+
+    Args:
+        df: Dataset to save
+        csv_path: CSV output path; the Parquet file goes next to it
+        write_csv: Also (re)write the CSV
+
+    Returns:
+        Path of the Parquet file, or None when pyarrow is not installed
+    """
+    csv_path = Path(csv_path)
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if write_csv:
+        df.to_csv(csv_path, index=False)
+
+    if not PYARROW_AVAILABLE:
+        print("   ⚠ pyarrow not installed, skipping Parquet copy (pip install pyarrow)")
+        return None
+
+    # Written after the CSV so the Parquet copy is never older than it
+    output_path = parquet_path(csv_path)
+    to_typed(df).to_parquet(output_path, index=False, compression='zstd')
+    return output_path
+
+
+def processed_columns(path) -> List[str]:
+    """Column names of a processed dataset without loading its rows"""
+    path = Path(path)
+    csv_path = path.with_suffix('.csv') if path.suffix == '.parquet' else path
+    pq_path = parquet_path(path)
+
+    if PYARROW_AVAILABLE and pq_path.exists():
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(pq_path).names)
+    return list(pd.read_csv(csv_path, nrows=0).columns)
+
+
+def read_processed(path, columns: Optional[Sequence[str]] = None,
+                   filters: Optional[Iterable[Tuple]] = None,
+                   prefer_parquet: bool = True) -> pd.DataFrame:
+    """
+    Load a processed dataset, preferring its typed Parquet copy.
+
+    Args:
+        path: Processed CSV (or its .parquet) path
+        columns: Only load these columns
+        filters: Row filters as (column, op, value) tuples, ANDed together,
+            e.g. [('year', '==', 2024), ('genus', 'in', ['Prunus'])]
+        prefer_parquet: Use the Parquet copy when it is available and current
+
+    Returns:
+        DataFrame with processed-data dtypes (see to_typed)
+    """
+    path = Path(path)
+    csv_path = path.with_suffix('.csv') if path.suffix == '.parquet' else path
+    pq_path = parquet_path(path)
+    columns = list(columns) if columns is not None else None
+    filters = list(filters) if filters else None
+
+    use_parquet = (
+        prefer_parquet and PYARROW_AVAILABLE and pq_path.exists()
+        and (not csv_path.exists() or pq_path.stat().st_mtime >= csv_path.stat().st_mtime)
+    )
+
+    if use_parquet:
+        return pd.read_parquet(pq_path, columns=columns, filters=filters)
+
+    if not csv_path.exists():
+        raise FileNotFoundError(f"Dataset not found: {csv_path}")
+
+    # Filter columns must be read even if they are not requested
+    usecols = None
+    if columns is not None:
+        usecols = columns + [c for c, _, _ in (filters or []) if c not in columns]
+
+    df = pd.read_csv(csv_path, usecols=usecols)
+    if filters:
+        df = df[_filter_mask(df, filters)].reset_index(drop=True)
+    if columns is not None:
+        # usecols keeps file order; match Parquet's requested order
+        df = df[columns]
+
+    return to_typed(df)
+
+
+def _filter_mask(df: pd.DataFrame, filters: List[Tuple]) -> pd.Series:
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator: {op!r}")
+        mask &= FILTER_OPERATORS[op](df[column], value)
+    return mask
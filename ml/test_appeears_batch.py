@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for batched AppEEARS NDVI retrieval
+Runs the multi-point task client against the local mock AppEEARS server,
+so no Earthdata credentials or network access are needed.
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from appeears_batch import AppEEARSBatchClient
+from mock_appeears_server import start_mock_server
+
+
+def test_batched_appeears_against_mock():
+    """Many observations should become one task per (product, year) group"""
+    server, state, base_url = start_mock_server(polls_until_done=2)
+
+    try:
+        client = AppEEARSBatchClient(
+            base_url=base_url,
+            username='mock',
+            password='mock',
+            poll_interval=0.05,
+            max_wait=10
+        )
+
+        # 60 observations at 12 repeated sites over two years
+        sites = [(35.0 + i * 0.5, 135.0 + i * 0.3) for i in range(12)]
+        observations = []
+        for i in range(60):
+            latitude, longitude = sites[i % len(sites)]
+            year = 2018 if i < 30 else 2019
+            bloom_date = datetime(year, 3, 20) + timedelta(days=i % 10)
+            observations.append((f"obs_{i}", latitude, longitude, bloom_date))
+
+        results = client.fetch_ndvi(observations)
+
+        print(f"   Tasks submitted: {len(state.tasks)}")
+        print(f"   Observations filled: {len(results)}/{len(observations)}")
+
+        assert len(state.tasks) == 2, "Expected one multi-point task per year"
+        for task in state.tasks.values():
+            assert len(task['task']['params']['coordinates']) == len(sites)
+
+        assert set(results) == {key for key, _, _, _ in observations}
+        for features in results.values():
+            assert not np.isnan(features['ndvi_mean_5d'])
+            assert not np.isnan(features['ndvi_mean_10d'])
+            assert -1.0 <= features['ndvi_mean_5d'] <= 1.0
+    finally:
+        server.shutdown()
+
+
+def test_batch_chunks_large_point_sets():
+    """Point sets larger than max_points_per_task are split across tasks"""
+    client = AppEEARSBatchClient(base_url='http://unused', token='mock', max_points_per_task=25)
+    observations = [
+        (i, 30.0 + i * 0.01, 130.0, datetime(2020, 4, 1))
+        for i in range(60)
+    ]
+
+    specs = client.build_task_specs(observations)
+
+    assert len(specs) == 3
+    assert sum(len(spec['observations']) for spec in specs) == 60
+
+
+if __name__ == "__main__":
+    print("\n" + "=" * 70)
+    print(" BATCHED APPEEARS TEST (mock server)")
+    print("=" * 70)
+    test_batch_chunks_large_point_sets()
+    print("✓ Task chunking")
+    test_batched_appeears_against_mock()
+    print("✓ Batched submission, concurrent polling and fan-out")
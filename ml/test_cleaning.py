@@ -3,13 +3,20 @@
 Quick test script to verify data cleaning pipeline
 """
 
+import contextlib
+import io
 import sys
+import tempfile
 from pathlib import Path
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
+import numpy as np
+import pandas as pd
+
 from clean_data import BloomDataCleaner
+from chunked_cleaning import read_partitioned
 
 def test_cleaning_pipeline():
     """Test the data cleaning pipeline with your data"""
@@ -47,6 +54,69 @@ def test_cleaning_pipeline():
         traceback.print_exc()
         return False
 
+def test_baseline_deviation_matches_row_scan():
+    """KD-tree baseline deviation must equal the original per-row box scan"""
+    rng = np.random.default_rng(0)
+    n = 1500
+    df = pd.DataFrame({
+        'scientific_name': rng.choice(['Prunus serrulata', 'Prunus avium', None], n),
+        'year': rng.integers(1950, 2024, n),
+        # Half on whole degrees so many pairs sit exactly on the 5 degree edge
+        'latitude': np.where(rng.random(n) < 0.5, rng.integers(30, 45, n), rng.uniform(30, 45, n)),
+        'longitude': np.where(rng.random(n) < 0.5, rng.integers(130, 145, n), rng.uniform(130, 145, n)),
+        'day_of_year': np.where(rng.random(n) < 0.05, np.nan, rng.integers(60, 130, n)),
+    })
+    historical_cutoff = df['year'].quantile(0.3)
+    
+    def calc_deviation(row):
+        species_region_data = df[
+            (df['scientific_name'] == row['scientific_name']) &
+            (df['year'] <= historical_cutoff) &
+            (abs(df['latitude'] - row['latitude']) < 5) &
+            (abs(df['longitude'] - row['longitude']) < 5)
+        ]
+        if len(species_region_data) > 5:
+            return row['day_of_year'] - species_region_data['day_of_year'].mean()
+        return None
+    
+    expected = df.apply(calc_deviation, axis=1).astype(float)
+    
+    cleaner = BloomDataCleaner.__new__(BloomDataCleaner)
+    actual = cleaner._baseline_deviation(df, historical_cutoff, chunk_size=100)
+    
+    assert (expected.isna() == actual.isna()).all()
+    assert np.allclose(expected.dropna(), actual.dropna())
+
+
+def test_chunked_pipeline_matches_in_memory():
+    """Chunked Parquet cleaning gives the same rows and baseline deviations"""
+    raw_csv = Path(__file__).parent.parent / 'data' / 'raw' / 'data.csv'
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cleaner = BloomDataCleaner(processed_data_dir=tmp)
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = cleaner.add_climate_indicators(
+                cleaner.combine_datasets(cleaner.clean_symphyotrichum_data(raw_csv))
+            )
+            cleaner.run_chunked_pipeline([(raw_csv, 'npn')], output_dir=Path(tmp) / 'out',
+                                         chunksize=200, n_buckets=3)
+        actual = read_partitioned(Path(tmp) / 'out')
+    
+    assert len(actual) == len(expected)
+    merged = expected.merge(actual, on='record_id', suffixes=('_expected', '_actual'))
+    assert len(merged) == len(expected)
+    
+    expected_dev = merged['deviation_from_baseline_expected'].astype(float)
+    actual_dev = merged['deviation_from_baseline_actual']
+    assert (expected_dev.isna() == actual_dev.isna()).all()
+    assert np.allclose(expected_dev.dropna(), actual_dev.dropna())
+
+
 if __name__ == "__main__":
+    test_chunked_pipeline_matches_in_memory()
+    print("✅ Chunked pipeline matches in-memory pipeline\n")
+    test_baseline_deviation_matches_row_scan()
+    print("✅ Baseline deviation matches row-by-row scan\n")
     success = test_cleaning_pipeline()
     sys.exit(0 if success else 1)